@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+
+import struct
+
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QImage, QPixmap
+
+try:
+    import numpy
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+
+# size of the tiles grouped into changed regions
+REGION_TILE = 32
+
+# color of the changed pixels in the mask
+DIFF_COLOR = 0xFFFF0000
+
+# rows xor'ed at once by the buffer backend
+_BAND_BYTES = 2 * 1024 * 1024
+
+_TO_ONE = bytes([0] + [1] * 255)
+
+
+def _argb32(image):
+    if isinstance(image, QPixmap):
+        image = image.toImage()
+    if image.format() != QImage.Format_ARGB32:
+        image = image.convertToFormat(QImage.Format_ARGB32)
+    return image
+
+
+class _Mask:
+    """Changed pixels of a `width` x `height` image
+
+    `data` is a bool array with numpy, otherwise a bytearray of one
+    byte (0 or 1) per pixel. `rows` is the sorted list of rows having
+    changes.
+    """
+
+    def __init__(self, width, height, data, rows):
+        self.width = width
+        self.height = height
+        self.data = data
+        self.rows = rows
+
+
+def _bands(rows, maxRows):
+    """Group sorted @rows into ranges of consecutive rows"""
+    start = end = None
+    for y in rows:
+        if start is not None and y == end and end - start < maxRows:
+            end += 1
+            continue
+        if start is not None:
+            yield start, end
+        start, end = y, y + 1
+
+    if start is not None:
+        yield start, end
+
+
+class _BufferBackend:
+    """Works on the raw bytes of the images with the C loops of bytes
+    and int, only the rows that differ are looked at pixel by pixel."""
+
+    @staticmethod
+    def changedMask(bitsA, bitsB, width, height):
+        # memoryview compares item by item, the larger the faster
+        if width % 2 == 0:
+            itemsA, itemsB, n = bitsA.cast("Q"), bitsB.cast("Q"), width // 2
+        else:
+            itemsA, itemsB, n = bitsA.cast("I"), bitsB.cast("I"), width
+        rows = [y for y in range(height)
+                if itemsA[y * n:(y + 1) * n] != itemsB[y * n:(y + 1) * n]]
+
+        data = bytearray(width * height)
+        maxRows = max(1, _BAND_BYTES // (width * 4))
+        for y0, y1 in _bands(rows, maxRows):
+            start = y0 * width * 4
+            end = y1 * width * 4
+            data[y0 * width:y1 * width] = _BufferBackend._diffBytes(
+                bitsA[start:end], bitsB[start:end])
+
+        return _Mask(width, height, data, rows)
+
+    @staticmethod
+    def _diffBytes(a, b):
+        """One byte per pixel, 1 if the pixel differs"""
+        size = len(a)
+        x = (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(size, "little")
+        flags = 0
+        for i in range(4):
+            flags |= int.from_bytes(x[i::4], "little")
+        return flags.to_bytes(size // 4, "little").translate(_TO_ONE)
+
+    @staticmethod
+    def count(mask):
+        return mask.data.count(1)
+
+    @staticmethod
+    def changedTiles(mask, tile):
+        width = mask.width
+        data = mask.data
+        tiles = set()
+        for y0, y1 in _bands(mask.rows, tile):
+            # rows of the same tile row may still span two tile rows
+            ty = y0 // tile
+            if (y1 - 1) // tile != ty:
+                split = (ty + 1) * tile
+                bands = ((y0, split), (split, y1))
+            else:
+                bands = ((y0, y1),)
+
+            for b0, b1 in bands:
+                merged = 0
+                for y in range(b0, b1):
+                    merged |= int.from_bytes(
+                        data[y * width:(y + 1) * width], "little")
+                row = merged.to_bytes(width, "little")
+                pos = row.find(1)
+                while pos != -1:
+                    tx = pos // tile
+                    tiles.add((b0 // tile, tx))
+                    pos = row.find(1, (tx + 1) * tile)
+        return tiles
+
+    @staticmethod
+    def bounds(mask, x0, y0, x1, y1):
+        width = mask.width
+        data = mask.data
+        left, top, right, bottom = x1, y1, -1, -1
+        for y in range(y0, y1):
+            offset = y * width
+            first = data.find(1, offset + x0, offset + x1)
+            if first == -1:
+                continue
+            last = data.rfind(1, offset + x0, offset + x1)
+            left = min(left, first - offset)
+            right = max(right, last - offset)
+            top = min(top, y)
+            bottom = y
+        if right < 0:
+            return None
+        return QRect(left, top, right - left + 1, bottom - top + 1)
+
+    @staticmethod
+    def render(mask, image, color):
+        bits = image.bits()
+        width = mask.width
+        channels = struct.pack("=I", color)
+        for y0, y1 in _bands(mask.rows, max(1, _BAND_BYTES // (width * 4))):
+            flags = mask.data[y0 * width:y1 * width]
+            # strided writes are much faster on a bytearray than on the
+            # memoryview of the image
+            band = bytearray(len(flags) * 4)
+            for i, value in enumerate(channels):
+                if value:
+                    band[i::4] = flags.translate(bytes([0, value]) + bytes(254))
+            bits[y0 * width * 4:y1 * width * 4] = band
+
+    @staticmethod
+    def intersect(mask, other):
+        width = mask.width
+        rows = sorted(set(mask.rows).intersection(other.rows))
+        data = bytearray(width * mask.height)
+        for y0, y1 in _bands(rows, max(1, _BAND_BYTES // width)):
+            start = y0 * width
+            end = y1 * width
+            flags = int.from_bytes(mask.data[start:end], "little") & \
+                int.from_bytes(other.data[start:end], "little")
+            data[start:end] = flags.to_bytes(end - start, "little")
+
+        rows = [y for y in rows if 1 in data[y * width:(y + 1) * width]]
+        return _Mask(width, mask.height, data, rows)
+
+    @staticmethod
+    def copyPixels(dst, src, mask):
+        """Copy the pixels of @src where @mask is set into @dst"""
+        width = mask.width
+        dstBits = dst.bits()
+        srcBits = src.constBits()
+        for y0, y1 in _bands(mask.rows, max(1, _BAND_BYTES // (width * 4))):
+            flags = mask.data[y0 * width:y1 * width].translate(
+                bytes([0, 255]) + bytes(254))
+            expanded = bytearray(len(flags) * 4)
+            for i in range(4):
+                expanded[i::4] = flags
+            start = y0 * width * 4
+            end = y1 * width * 4
+            d = int.from_bytes(dstBits[start:end], "little")
+            s = int.from_bytes(srcBits[start:end], "little")
+            m = int.from_bytes(expanded, "little")
+            dstBits[start:end] = (d ^ ((d ^ s) & m)).to_bytes(
+                end - start, "little")
+
+
+class _NumpyBackend:
+
+    @staticmethod
+    def _pixels(bits, width, height):
+        return numpy.frombuffer(bits, dtype=numpy.uint32).reshape(height, width)
+
+    @staticmethod
+    def changedMask(bitsA, bitsB, width, height):
+        data = _NumpyBackend._pixels(bitsA, width, height) != \
+            _NumpyBackend._pixels(bitsB, width, height)
+        rows = numpy.flatnonzero(data.any(axis=1)).tolist()
+        return _Mask(width, height, data, rows)
+
+    @staticmethod
+    def count(mask):
+        return int(numpy.count_nonzero(mask.data))
+
+    @staticmethod
+    def changedTiles(mask, tile):
+        height, width = mask.height, mask.width
+        rows = -(-height // tile)
+        cols = -(-width // tile)
+        padded = numpy.zeros((rows * tile, cols * tile), dtype=bool)
+        padded[:height, :width] = mask.data
+        tiles = padded.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+        return set(map(tuple, numpy.argwhere(tiles).tolist()))
+
+    @staticmethod
+    def bounds(mask, x0, y0, x1, y1):
+        sub = mask.data[y0:y1, x0:x1]
+        ys = numpy.flatnonzero(sub.any(axis=1))
+        if not len(ys):
+            return None
+        xs = numpy.flatnonzero(sub.any(axis=0))
+        return QRect(x0 + int(xs[0]), y0 + int(ys[0]),
+                     int(xs[-1] - xs[0]) + 1, int(ys[-1] - ys[0]) + 1)
+
+    @staticmethod
+    def render(mask, image, color):
+        pixels = _NumpyBackend._pixels(image.bits(), mask.width, mask.height)
+        pixels[mask.data] = color
+
+    @staticmethod
+    def intersect(mask, other):
+        data = mask.data & other.data
+        rows = numpy.flatnonzero(data.any(axis=1)).tolist()
+        return _Mask(mask.width, mask.height, data, rows)
+
+    @staticmethod
+    def copyPixels(dst, src, mask):
+        d = _NumpyBackend._pixels(dst.bits(), mask.width, mask.height)
+        s = _NumpyBackend._pixels(src.constBits(), mask.width, mask.height)
+        d[mask.data] = s[mask.data]
+
+
+def _backend():
+    return _NumpyBackend if HAVE_NUMPY else _BufferBackend
+
+
+def _regions(backend, mask, tile=REGION_TILE):
+    """Bounding boxes of the groups of touching changed tiles"""
+    tiles = backend.changedTiles(mask, tile)
+    regions = []
+    while tiles:
+        stack = [tiles.pop()]
+        ty0 = ty1 = stack[0][0]
+        tx0 = tx1 = stack[0][1]
+        while stack:
+            ty, tx = stack.pop()
+            ty0 = min(ty0, ty)
+            ty1 = max(ty1, ty)
+            tx0 = min(tx0, tx)
+            tx1 = max(tx1, tx)
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    neighbor = (ty + dy, tx + dx)
+                    if neighbor in tiles:
+                        tiles.remove(neighbor)
+                        stack.append(neighbor)
+
+        rect = backend.bounds(mask, tx0 * tile, ty0 * tile,
+                              min(mask.width, (tx1 + 1) * tile),
+                              min(mask.height, (ty1 + 1) * tile))
+        if rect is not None:
+            regions.append(rect)
+
+    regions.sort(key=lambda rc: (rc.top(), rc.left()))
+    return regions
+
+
+class ImageDifference:
+    """Pixels that differ between two images
+
+    Images of different sizes are considered entirely different.
+    """
+
+    def __init__(self, width, height, mask=None, changedPixels=None, backend=None):
+        self._width = width
+        self._height = height
+        self._mask = mask
+        self._backend = backend or _backend()
+        self._regions = None
+        if changedPixels is None:
+            changedPixels = width * height
+        self._changedPixels = changedPixels
+
+    def size(self):
+        return self._width, self._height
+
+    def sizeMatched(self):
+        return self._mask is not None
+
+    def changedPixels(self):
+        return self._changedPixels
+
+    def totalPixels(self):
+        return self._width * self._height
+
+    def isIdentical(self):
+        return self._changedPixels == 0
+
+    def similarity(self):
+        """Ratio of the unchanged pixels, from 0.0 to 1.0"""
+        total = self.totalPixels()
+        if not total:
+            return 1.0 if self.sizeMatched() else 0.0
+        return 1.0 - self._changedPixels / total
+
+    def regions(self):
+        """Bounding rectangles of the changed areas"""
+        if self._regions is None:
+            if self._mask is None:
+                self._regions = [QRect(0, 0, self._width, self._height)]
+            elif not self._changedPixels:
+                self._regions = []
+            else:
+                self._regions = _regions(self._backend, self._mask)
+        return self._regions
+
+    def maskImage(self, color=DIFF_COLOR):
+        """Transparent image with the changed pixels in @color"""
+        image = QImage(self._width, self._height, QImage.Format_ARGB32)
+        if self._mask is None:
+            image.fill(color)
+        else:
+            image.fill(0)
+            self._backend.render(self._mask, image, color)
+        return image
+
+
+def diffImages(imageA, imageB):
+    """Compare @imageA with @imageB (QImage or QPixmap) pixel by pixel"""
+    imageA = _argb32(imageA)
+    imageB = _argb32(imageB)
+
+    width = max(imageA.width(), imageB.width())
+    height = max(imageA.height(), imageB.height())
+    if imageA.size() != imageB.size():
+        return ImageDifference(width, height)
+
+    backend = _backend()
+    mask = backend.changedMask(
+        imageA.constBits(), imageB.constBits(), width, height)
+    return ImageDifference(width, height, mask, backend.count(mask), backend)
+
+
+class ImageMerge:
+    """Suggested result of a three-way image merge"""
+
+    def __init__(self, image, conflicts, conflictPixels):
+        self._image = image
+        self._conflicts = conflicts
+        self._conflictPixels = conflictPixels
+
+    def image(self):
+        return self._image
+
+    def hasConflicts(self):
+        return self._conflictPixels > 0
+
+    def conflictPixels(self):
+        return self._conflictPixels
+
+    def conflicts(self):
+        """Areas changed differently by both sides, ours is taken there"""
+        return self._conflicts
+
+
+def mergeImages(base, ours, theirs):
+    """Merge the changes of @ours and @theirs over @base
+
+    Pixels changed by one side only are taken from that side. Where both
+    sides changed a pixel differently, ours is taken and the area is
+    reported as a conflict. Return None if the sizes differ.
+    """
+    base = _argb32(base)
+    ours = _argb32(ours)
+    theirs = _argb32(theirs)
+    if base.size() != ours.size() or base.size() != theirs.size():
+        return None
+
+    width = base.width()
+    height = base.height()
+    backend = _backend()
+    baseBits = base.constBits()
+    oursMask = backend.changedMask(
+        baseBits, ours.constBits(), width, height)
+    theirsMask = backend.changedMask(
+        baseBits, theirs.constBits(), width, height)
+
+    merged = base.copy()
+    backend.copyPixels(merged, theirs, theirsMask)
+    backend.copyPixels(merged, ours, oursMask)
+
+    conflicts = []
+    conflictPixels = 0
+    both = backend.intersect(oursMask, theirsMask)
+    if both.rows:
+        sides = backend.changedMask(
+            ours.constBits(), theirs.constBits(), width, height)
+        conflictMask = backend.intersect(both, sides)
+        conflictPixels = backend.count(conflictMask)
+        if conflictPixels:
+            conflicts = _regions(backend, conflictMask)
+
+    return ImageMerge(merged, conflicts, conflictPixels)
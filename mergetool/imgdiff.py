@@ -5,7 +5,15 @@ import shutil
 import sys
 
 from PySide6.QtCore import QSize, Qt, Signal
-from PySide6.QtGui import QActionGroup, QImage, QKeySequence, QPixmap
+from PySide6.QtGui import (
+    QActionGroup,
+    QColor,
+    QImage,
+    QKeySequence,
+    QPainter,
+    QPen,
+    QPixmap,
+)
 from PySide6.QtWidgets import (
     QApplication,
     QCheckBox,
@@ -24,6 +32,12 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+try:
+    from mergetool.diffengine import DIFF_COLOR, diffImages, mergeImages
+except ImportError:
+    # run as a script from the source tree
+    from diffengine import DIFF_COLOR, diffImages, mergeImages
+
 
 def selectImage(parent):
     filter = "Images (*.png *.xpm *.jpg *.gif *.svg)"
@@ -138,6 +152,10 @@ class ImageViewer(QWidget):
         self.btnBrowse = QPushButton("...", self)
         self.btnBrowse.setFixedWidth(30)
         self.orgImage = QPixmap()
+        # the image with the differences drawn over it
+        self.viewImage = self.orgImage
+        self._overlay = None
+        self._regions = []
 
         hlayout = QHBoxLayout()
         hlayout.addWidget(self.lbName)
@@ -163,7 +181,27 @@ class ImageViewer(QWidget):
 
     def __onPathChanged(self, path):
         self.orgImage = QPixmap(path)
-        self.viewer.setPixmap(self.orgImage)
+        self.setOverlay(None)
+
+    def __updateViewImage(self):
+        if self.orgImage.isNull() or (self._overlay is None and not self._regions):
+            self.viewImage = self.orgImage
+        else:
+            self.viewImage = QPixmap(self.orgImage)
+            painter = QPainter(self.viewImage)
+            if self._overlay is not None:
+                painter.setOpacity(0.6)
+                painter.drawImage(0, 0, self._overlay)
+                painter.setOpacity(1.0)
+            pen = QPen(QColor.fromRgba(DIFF_COLOR))
+            pen.setWidth(2)
+            painter.setPen(pen)
+            painter.setBrush(Qt.NoBrush)
+            for rc in self._regions:
+                painter.drawRect(rc.adjusted(-2, -2, 2, 2))
+            painter.end()
+
+        self.viewer.setPixmap(self.viewImage)
 
     def __onBtnBrowseClicked(self, checked=False):
         f = selectImage(self)
@@ -178,17 +216,23 @@ class ImageViewer(QWidget):
             self.lePath.setText(image)
         elif isinstance(image, QPixmap):
             self.orgImage = image
-            self.viewer.setPixmap(image)
+            self.setOverlay(None)
         elif isinstance(image, QImage):
             self.orgImage = QPixmap.fromImage(image)
-            self.viewer.setPixmap(self.orgImage)
+            self.setOverlay(None)
+
+    def setOverlay(self, overlay, regions=None):
+        """Draw @overlay (a QImage) and the @regions rectangles over the image"""
+        self._overlay = overlay
+        self._regions = regions or []
+        self.__updateViewImage()
 
     def setBrowseEnabled(self, enabled=True):
         self.lePath.setReadOnly(not enabled)
         self.btnBrowse.setVisible(enabled)
 
     def scaleImage(self, factor):
-        pixmap = self.orgImage
+        pixmap = self.viewImage
         if not pixmap.isNull():
             # firstly, restore the default image
             self.viewer.setPixmap(pixmap)
@@ -234,6 +278,7 @@ class ImgDiff(QWidget):
         self.imageO = None
 
         self._outputFile = ""
+        self._base = "A"
 
         self.imageA.setName("A:")
         self.imageB.setName("B:")
@@ -289,6 +334,7 @@ class ImgDiff(QWidget):
             self.imageO.setVisible(False)
 
     def setBase(self, base):
+        self._base = base.upper()
         if not self.imageC:
             return
 
@@ -386,6 +432,66 @@ class ImgDiff(QWidget):
             self.imageO.setImage(image)
             self.dataChanged.emit()
 
+    def __sourceViewers(self):
+        viewers = [self.imageA, self.imageB]
+        if self.imageC and not self.imageC.isHidden():
+            viewers.append(self.imageC)
+        return viewers
+
+    def __baseViewer(self, viewers):
+        if len(viewers) == 3 and self._base in "ABC":
+            return viewers["ABC".index(self._base)]
+        return viewers[0]
+
+    def showDifference(self, show=True):
+        """Highlight the pixels that differ from the base image
+        return [(viewer, ImageDifference)]
+        """
+        viewers = self.__sourceViewers()
+        for viewer in viewers:
+            viewer.setOverlay(None)
+        if not show:
+            return []
+
+        base = self.__baseViewer(viewers)
+        if base.getImage().isNull():
+            return []
+
+        differences = []
+        for viewer in viewers:
+            if viewer is base or viewer.getImage().isNull():
+                continue
+            difference = diffImages(base.getImage(), viewer.getImage())
+            overlay = difference.maskImage()
+            viewer.setOverlay(overlay, difference.regions())
+            # nothing else to compare the base with
+            if len(viewers) == 2:
+                base.setOverlay(overlay, difference.regions())
+            differences.append((viewer, difference))
+
+        return differences
+
+    def autoMerge(self):
+        """Merge the two images changed from the base into the output
+        return the ImageMerge, None if it can't be done
+        """
+        viewers = self.__sourceViewers()
+        if len(viewers) != 3 or not self.imageO:
+            return None
+
+        base = self.__baseViewer(viewers)
+        ours, theirs = [v.getImage() for v in viewers if v is not base]
+        if base.getImage().isNull() or ours.isNull() or theirs.isNull():
+            return None
+
+        merge = mergeImages(base.getImage(), ours, theirs)
+        if merge is None:
+            return None
+
+        self.setOutputImage(merge.image())
+        self.imageO.setOverlay(None, merge.conflicts())
+        return merge
+
 
 class DiffWindow(QMainWindow):
 
@@ -399,6 +505,7 @@ class DiffWindow(QMainWindow):
         self._fitWindow = True
         self._resolved = False
         self._targetPath = ""
+        self._targetImage = None
 
         self.__setupMenu()
 
@@ -448,6 +555,10 @@ class DiffWindow(QMainWindow):
         self.mergeMenu.addAction(self.tr("Choose &C"),
                                  self.__onMenuChooseC,
                                  QKeySequence("Ctrl+3"))
+        self.mergeMenu.addSeparator()
+        self.mergeMenu.addAction(self.tr("Auto &Merge"),
+                                 self.__onMenuAutoMerge,
+                                 QKeySequence("Ctrl+4"))
         self.mergeMenu.setEnabled(False)
 
     def __doQuit(self):
@@ -472,9 +583,14 @@ class DiffWindow(QMainWindow):
                                 dlg.imageC(), dlg.imageO())
             self.setBase('A')
             self.mergeMenu.setEnabled(self._diffView.hasOutput())
+            self.__updateDifference()
 
     def __onMenuSave(self):
-        if self._targetPath:
+        if self._targetImage is not None:
+            filePath = self._diffView.outputFile()
+            self._resolved = self._targetImage.save(filePath)
+            self.acSave.setEnabled(not self._resolved)
+        elif self._targetPath:
             filePath = self._diffView.outputFile()
             try:
                 shutil.copy2(self._targetPath, filePath)
@@ -497,24 +613,67 @@ class DiffWindow(QMainWindow):
         self._diffView.normalSize()
 
     def __onMenuShowDifference(self):
-        # TODO:
-        pass
+        self.__updateDifference()
+
+    def __updateDifference(self):
+        show = self.acShowDiff.isChecked()
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            differences = self._diffView.showDifference(show)
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        messages = []
+        for viewer, difference in differences:
+            messages.append(self.tr("{0} {1:.2%} similar, {2} changed regions").format(
+                viewer.lbName.text(), difference.similarity(), len(difference.regions())))
+        self.statusBar().showMessage("; ".join(messages))
+        self.__refreshView()
+
+    def __refreshView(self):
+        if self._fitWindow:
+            self._diffView.fitWindow()
+        else:
+            self._diffView.normalSize()
 
     def __onMenuChooseA(self):
         image = self._diffView.getImageA()
+        self._targetImage = None
         self._diffView.setOutputImage(image)
         self._targetPath = self._diffView.getImageAPath()
 
     def __onMenuChooseB(self):
         image = self._diffView.getImageB()
+        self._targetImage = None
         self._diffView.setOutputImage(image)
         self._targetPath = self._diffView.getImageBPath()
 
     def __onMenuChooseC(self):
         image = self._diffView.getImageC()
+        self._targetImage = None
         self._diffView.setOutputImage(image)
         self._targetPath = self._diffView.getImageCPath()
 
+    def __onMenuAutoMerge(self):
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            merge = self._diffView.autoMerge()
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        if merge is None:
+            QMessageBox.information(self, self.windowTitle(),
+                                    self.tr("Auto merge needs a base and two other images of the same size."))
+            return
+
+        self._targetPath = ""
+        self._targetImage = merge.image()
+        if merge.hasConflicts():
+            self.statusBar().showMessage(
+                self.tr("{0} conflicting regions, highlighted in the output").format(len(merge.conflicts())))
+        else:
+            self.statusBar().showMessage(self.tr("Merged without conflicts"))
+
     def __onDataChanged(self):
         self._resolved = False
         self.acSave.setEnabled(True)
@@ -551,9 +710,11 @@ class DiffWindow(QMainWindow):
         else:
             self._diffView.diff(imageA, imageB, imageC, imageO)
             self.mergeMenu.setEnabled(self._diffView.hasOutput())
+            self.__updateDifference()
 
     def setBase(self, base):
         self._diffView.setBase(base)
+        self.__updateDifference()
 
 
 def main():
@@ -1,45 +1,105 @@
 # -*- coding: utf-8 -*-
 
-from qgitc.agent.agent_loop import AgentLoop, QueryParams
-from qgitc.agent.aimodel_adapter import AiModelBaseAdapter
-from qgitc.agent.compaction import CompactionResult, ConversationCompactor
-from qgitc.agent.message_convert import historyDictsToMessages, messagesToHistoryDicts
-from qgitc.agent.permission_presets import createPermissionEngine
-from qgitc.agent.permissions import (
-    PermissionAllow,
-    PermissionAsk,
-    PermissionBehavior,
-    PermissionDeny,
-    PermissionEngine,
-    PermissionRule,
-    PermissionUpdate,
-)
-from qgitc.agent.provider import (
-    ContentDelta,
-    MessageComplete,
-    ModelProvider,
-    ReasoningDelta,
-    StreamEvent,
-    ToolCallDelta,
-)
-from qgitc.agent.skills.discovery import loadSkillRegistry
-from qgitc.agent.skills.registry import SkillRegistry
-from qgitc.agent.tool import Tool, ToolContext, ToolResult, ToolType, toolTypeFromTool
-from qgitc.agent.tool_registration import registerBuiltinTools
-from qgitc.agent.tool_registry import ToolRegistry
-from qgitc.agent.types import (
-    AssistantMessage,
-    ContentBlock,
-    Message,
-    SystemMessage,
-    TextBlock,
-    ThinkingBlock,
-    ToolResultBlock,
-    ToolUseBlock,
-    Usage,
-    UserMessage,
-)
-from qgitc.agent.ui_tool import UiTool, UiToolDispatcher
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from qgitc.agent.agent_loop import AgentLoop, QueryParams
+    from qgitc.agent.aimodel_adapter import AiModelBaseAdapter
+    from qgitc.agent.compaction import CompactionResult, ConversationCompactor
+    from qgitc.agent.message_convert import (
+        historyDictsToMessages,
+        messagesToHistoryDicts,
+    )
+    from qgitc.agent.permission_presets import createPermissionEngine
+    from qgitc.agent.permissions import (
+        PermissionAllow,
+        PermissionAsk,
+        PermissionBehavior,
+        PermissionDeny,
+        PermissionEngine,
+        PermissionRule,
+        PermissionUpdate,
+    )
+    from qgitc.agent.provider import (
+        ContentDelta,
+        MessageComplete,
+        ModelProvider,
+        ReasoningDelta,
+        StreamEvent,
+        ToolCallDelta,
+    )
+    from qgitc.agent.skills.discovery import loadSkillRegistry
+    from qgitc.agent.skills.registry import SkillRegistry
+    from qgitc.agent.tool import (
+        Tool,
+        ToolContext,
+        ToolResult,
+        ToolType,
+        toolTypeFromTool,
+    )
+    from qgitc.agent.tool_registration import registerBuiltinTools
+    from qgitc.agent.tool_registry import ToolRegistry
+    from qgitc.agent.types import (
+        AssistantMessage,
+        ContentBlock,
+        Message,
+        SystemMessage,
+        TextBlock,
+        ThinkingBlock,
+        ToolResultBlock,
+        ToolUseBlock,
+        Usage,
+        UserMessage,
+    )
+    from qgitc.agent.ui_tool import UiTool, UiToolDispatcher
+
+# The agent stack is imported on first use of its names, so that importing a
+# single module such as `qgitc.agent.tool` stays cheap.
+_EXPORTS = {
+    "AgentLoop": "qgitc.agent.agent_loop",
+    "QueryParams": "qgitc.agent.agent_loop",
+    "AiModelBaseAdapter": "qgitc.agent.aimodel_adapter",
+    "CompactionResult": "qgitc.agent.compaction",
+    "ConversationCompactor": "qgitc.agent.compaction",
+    "historyDictsToMessages": "qgitc.agent.message_convert",
+    "messagesToHistoryDicts": "qgitc.agent.message_convert",
+    "createPermissionEngine": "qgitc.agent.permission_presets",
+    "PermissionAllow": "qgitc.agent.permissions",
+    "PermissionAsk": "qgitc.agent.permissions",
+    "PermissionBehavior": "qgitc.agent.permissions",
+    "PermissionDeny": "qgitc.agent.permissions",
+    "PermissionEngine": "qgitc.agent.permissions",
+    "PermissionRule": "qgitc.agent.permissions",
+    "PermissionUpdate": "qgitc.agent.permissions",
+    "ContentDelta": "qgitc.agent.provider",
+    "MessageComplete": "qgitc.agent.provider",
+    "ModelProvider": "qgitc.agent.provider",
+    "ReasoningDelta": "qgitc.agent.provider",
+    "StreamEvent": "qgitc.agent.provider",
+    "ToolCallDelta": "qgitc.agent.provider",
+    "loadSkillRegistry": "qgitc.agent.skills.discovery",
+    "SkillRegistry": "qgitc.agent.skills.registry",
+    "Tool": "qgitc.agent.tool",
+    "ToolContext": "qgitc.agent.tool",
+    "ToolResult": "qgitc.agent.tool",
+    "ToolType": "qgitc.agent.tool",
+    "toolTypeFromTool": "qgitc.agent.tool",
+    "registerBuiltinTools": "qgitc.agent.tool_registration",
+    "ToolRegistry": "qgitc.agent.tool_registry",
+    "AssistantMessage": "qgitc.agent.types",
+    "ContentBlock": "qgitc.agent.types",
+    "Message": "qgitc.agent.types",
+    "SystemMessage": "qgitc.agent.types",
+    "TextBlock": "qgitc.agent.types",
+    "ThinkingBlock": "qgitc.agent.types",
+    "ToolResultBlock": "qgitc.agent.types",
+    "ToolUseBlock": "qgitc.agent.types",
+    "Usage": "qgitc.agent.types",
+    "UserMessage": "qgitc.agent.types",
+    "UiTool": "qgitc.agent.ui_tool",
+    "UiToolDispatcher": "qgitc.agent.ui_tool",
+}
 
 __all__ = [
     "AgentLoop",
@@ -85,3 +145,17 @@ __all__ = [
     "registerBuiltinTools",
     "toolTypeFromTool",
 ]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
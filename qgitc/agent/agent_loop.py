@@ -8,7 +8,13 @@ from typing import Any, Dict, List, Optional, Union
 
 from PySide6.QtCore import QMutex, QThread, QWaitCondition, Signal
 
-from qgitc.agent.compaction import ConversationCompactor, microcompactMessages
+from qgitc.agent.compaction import (
+    BackgroundCompaction,
+    ConversationCompactor,
+    TokenLedger,
+    microcompactCutoff,
+    microcompactMessages,
+)
 from qgitc.agent.permissions import PermissionEngine
 from qgitc.agent.provider import (
     ContentDelta,
@@ -19,6 +25,7 @@ from qgitc.agent.provider import (
 )
 from qgitc.agent.skills.registry import SkillRegistry
 from qgitc.agent.tool import ToolContext
+from qgitc.agent.tool_cache import TOOL_RESULT_CACHE_KEY, ToolResultCache
 from qgitc.agent.tool_executor import executeToolBlocks
 from qgitc.agent.tool_registry import ToolRegistry
 from qgitc.agent.types import (
@@ -43,6 +50,9 @@ class QueryParams:
     context_window: int = 100000
     max_output_tokens: int = 4096
     skill_registry: Optional[SkillRegistry] = None
+    # Second stream used to compact the conversation in the background
+    # before it reaches the context limit, compacted in-line when None
+    compaction_provider: Optional[ModelProvider] = None
 
 
 class AgentLoop(QThread):
@@ -78,8 +88,15 @@ class AgentLoop(QThread):
         self._system_prompt = system_prompt
 
         self._messages = []  # type: List[Message]
+        # Running token count of `_messages`
+        self._token_ledger = TokenLedger()
+        # Messages before this index are already microcompacted
+        self._microcompacted = 0
+        self._compaction = None  # type: Optional[BackgroundCompaction]
         self._abort_flag = False
         self._context_extra_state = {}  # type: Dict[str, Any]
+        # Results of read-only git tools for this conversation
+        self._tool_cache = ToolResultCache()
 
         # Permission wait mechanism
         self._perm_mutex = QMutex()
@@ -104,6 +121,7 @@ class AgentLoop(QThread):
         self._context_extra_state = {
             "tool_allowed_tools": None,
             "skill_registry": params.skill_registry,
+            TOOL_RESULT_CACHE_KEY: self._tool_cache,
         }
         self.start()
 
@@ -127,6 +145,9 @@ class AgentLoop(QThread):
         # type: () -> None
         """Signal the agent loop to stop."""
         self._abort_flag = True
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.cancel()
         # Wake any waiting permission check
         self._perm_mutex.lock()
         self._perm_cond.wakeAll()
@@ -141,6 +162,24 @@ class AgentLoop(QThread):
         # type: (List[Message]) -> None
         """Replace conversation history (call before submit, not while running)."""
         self._messages = list(messages)
+        self._microcompacted = 0
+        self._tool_cache.invalidate()
+        self.cancelCompaction()
+
+    def cancelCompaction(self):
+        # type: () -> None
+        """Cancel the background compaction and wait for its thread, which
+        uses the compaction provider until then (call when not running)."""
+        compaction = self._compaction
+        self._compaction = None
+        if compaction is not None:
+            compaction.cancel()
+            compaction.wait()
+
+    def toolResultCache(self):
+        # type: () -> ToolResultCache
+        """Return the cache of read-only tool results (with hit/miss counters)."""
+        return self._tool_cache
 
     def getSystemPrompt(self):
         # type: () -> Optional[str]
@@ -169,22 +208,25 @@ class AgentLoop(QThread):
             params.context_window,
             params.max_output_tokens,
         )
+        background_compactor = None
+        if params.compaction_provider is not None:
+            background_compactor = ConversationCompactor(
+                params.compaction_provider,
+                params.context_window,
+                params.max_output_tokens,
+            )
 
         for i in range(self._max_turns):
             if self._abort_flag:
                 return
 
             if i > 0:
-                self._messages = microcompactMessages(self._messages)
+                self._messages = microcompactMessages(
+                    self._messages, start=self._microcompacted)
+                self._microcompacted = microcompactCutoff(self._messages)
 
-                # Check compaction
-                if compactor.shouldCompact(self._messages):
-                    result = compactor.compact(self._messages)
-                    self._messages = [result.boundary, result.summary]
-                    self.conversationCompacted.emit(
-                        result.pre_token_estimate,
-                        result.post_token_estimate,
-                    )
+            # Check compaction
+            self._compact_history(compactor, background_compactor, i > 0)
 
             if self._abort_flag:
                 return
@@ -192,6 +234,7 @@ class AgentLoop(QThread):
             # Stream from provider
             tool_schemas = self._tool_registry.getToolSchemas() or None
 
+            self._token_ledger.sync(self._messages)
             assistant_msg = self._stream_response(
                 params.provider,
                 tool_schemas,
@@ -199,6 +242,13 @@ class AgentLoop(QThread):
             if assistant_msg is None:
                 return
 
+            usage = assistant_msg.usage
+            if usage is not None:
+                self._token_ledger.calibrate(
+                    usage.input_tokens
+                    + usage.cache_creation_input_tokens
+                    + usage.cache_read_input_tokens)
+
             self._messages.append(assistant_msg)
             self.turnComplete.emit(assistant_msg)
 
@@ -226,6 +276,71 @@ class AgentLoop(QThread):
             for prompt in prompts:
                 self._messages.append(UserMessage(content=[TextBlock(text=prompt)]))
 
+    def _compact_history(self, compactor, background_compactor, check_threshold):
+        # type: (ConversationCompactor, Optional[ConversationCompactor], bool) -> None
+        """Compact the history at a turn boundary.
+
+        A finished background compaction is swapped in first. Past the
+        threshold, the conversation is compacted in-line (waiting for the
+        background compaction if one is running), and past the soft
+        watermark a background compaction of the current history starts.
+        """
+        tokens = self._token_ledger.sync(self._messages)
+        compaction = self._compaction
+        if compaction is not None and (compaction.isDone() or compaction.isCancelled()):
+            if self._swap_compaction(tokens):
+                tokens = self._token_ledger.sync(self._messages)
+
+        if not check_threshold:
+            return
+
+        if compactor.shouldCompact(self._messages, tokens):
+            compaction = self._compaction
+            if compaction is not None:
+                # most of the history is being summarized already
+                while not compaction.wait(0.1):
+                    if self._abort_flag:
+                        return
+                if self._swap_compaction(tokens):
+                    tokens = self._token_ledger.sync(self._messages)
+                    if not compactor.shouldCompact(self._messages, tokens):
+                        return
+
+            result = compactor.compact(self._messages, tokens)
+            self._messages = [result.boundary, result.summary]
+            self._microcompacted = 0
+            self._token_ledger.reset()
+            self.conversationCompacted.emit(
+                tokens,
+                self._token_ledger.sync(self._messages),
+            )
+        elif (background_compactor is not None
+              and self._compaction is None
+              and background_compactor.shouldPrecompact(self._messages, tokens)):
+            logger.debug("Start background compaction at %d tokens", tokens)
+            self._compaction = BackgroundCompaction(
+                background_compactor, self._messages, tokens)
+
+    def _swap_compaction(self, tokens):
+        # type: (int) -> bool
+        """Replace the history prefix summarized by the finished background
+        compaction."""
+        compaction = self._compaction
+        self._compaction = None
+        if compaction.result() is None:
+            logger.debug("Background compaction failed: %s", compaction.error())
+            return False
+
+        self._messages = compaction.apply(self._messages)
+        self._microcompacted = 0
+        # the calibration covered the summarized messages
+        self._token_ledger.reset()
+        self.conversationCompacted.emit(
+            tokens,
+            self._token_ledger.sync(self._messages),
+        )
+        return True
+
     def _stream_response(self, provider, tool_schemas):
         # type: (ModelProvider, Optional[List[Dict[str, Any]]]) -> Optional[AssistantMessage]
         """Stream from the LLM and accumulate into an AssistantMessage."""
@@ -346,4 +461,7 @@ class AgentLoop(QThread):
             onToolResult=onToolResult,
         )
 
+        stats = self._tool_cache.stats()
+        logger.debug("Tool result cache: %d hits, %d misses",
+                     stats["hits"], stats["misses"])
         return results
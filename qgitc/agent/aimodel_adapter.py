@@ -30,6 +30,7 @@ from qgitc.llm import AiChatMode, AiModelBase, AiParameters, AiResponse, AiRole
 
 class _QueryDispatcher(QObject):
     queryRequested = Signal(object)
+    interruptionRequested = Signal()
 
 
 class AiModelBaseAdapter(ModelProvider):
@@ -42,9 +43,12 @@ class AiModelBaseAdapter(ModelProvider):
         self._max_tokens = max_tokens
         self._temperature = temperature
         self._chat_mode = chat_mode
+        self._aborted = False
         self._queryDispatcher = _QueryDispatcher()
         self._queryDispatcher.queryRequested.connect(
             self._model.queryAsync, Qt.ConnectionType.QueuedConnection)
+        self._queryDispatcher.interruptionRequested.connect(
+            self._model.requestInterruption, Qt.ConnectionType.QueuedConnection)
 
     def _startQueryOnModelThread(self, params):
         # type: (AiParameters) -> None
@@ -56,6 +60,17 @@ class AiModelBaseAdapter(ModelProvider):
         # Ensure model network operations are created on the model owner's thread.
         self._queryDispatcher.queryRequested.emit(params)
 
+    def abort(self):
+        # type: () -> None
+        """Interrupt the request of the model, the stream in progress and the
+        later ones raise instead of waiting for the model."""
+        self._aborted = True
+        modelThread = self._model.thread()
+        if modelThread is None or QThread.currentThread() is modelThread:
+            self._model.requestInterruption()
+        else:
+            self._queryDispatcher.interruptionRequested.emit()
+
     def stream(
         self,
         messages,          # type: List[Message]
@@ -109,6 +124,9 @@ class AiModelBaseAdapter(ModelProvider):
         self._model.serviceUnavailable.connect(_on_service_unavailable)
 
         try:
+            if self._aborted:
+                raise RuntimeError("Request aborted")
+
             # Build history from messages
             self._model.clear()
             for msg in messages:
@@ -173,6 +191,8 @@ class AiModelBaseAdapter(ModelProvider):
             # Pump event loop until finished
             while not finished_flag[0]:
                 QCoreApplication.processEvents()
+                if self._aborted:
+                    raise RuntimeError("Request aborted")
                 if network_error[0] is not None:
                     raise RuntimeError(network_error[0])
                 while not event_queue.empty():
@@ -3,8 +3,9 @@
 import json
 import math
 import re
+import threading
 from dataclasses import dataclass
-from typing import List
+from typing import Callable, List, Optional
 
 from qgitc.agent.provider import ContentDelta, ModelProvider
 from qgitc.agent.types import (
@@ -25,6 +26,35 @@ MAX_OUTPUT_TOKENS_FOR_SUMMARY = 20_000
 # Buffer subtracted from the effective window before the threshold check.
 AUTOCOMPACT_BUFFER_TOKENS = 13_000
 
+# Fraction of the compaction threshold from which the conversation is
+# summarized in the background, ahead of the threshold.
+SPECULATIVE_COMPACT_RATIO = 0.8
+
+
+def estimateMessageTokens(msg):
+    # type: (Message) -> int
+    """Estimate the token count of a single message.
+
+    Uses char/4 with a 4/3 padding factor
+    """
+    msgChars = 0
+
+    if isinstance(msg, SystemMessage):
+        msgChars = len(msg.content)
+    elif hasattr(msg, "content"):
+        for block in msg.content:
+            if isinstance(block, TextBlock):
+                msgChars += len(block.text)
+            elif isinstance(block, ToolUseBlock):
+                msgChars += len(block.name)
+                msgChars += len(json.dumps(block.input))
+            elif isinstance(block, ToolResultBlock):
+                msgChars += len(block.content) if isinstance(block.content, str) else 0
+            elif isinstance(block, ThinkingBlock):
+                msgChars += len(block.thinking)
+
+    return math.ceil(msgChars / 4 * (4 / 3))
+
 
 def roughEstimateTokens(messages):
     # type: (List[Message]) -> int
@@ -32,28 +62,76 @@ def roughEstimateTokens(messages):
 
     Uses char/4 with a 4/3 padding factor per message
     """
-    total = 0
+    return sum(estimateMessageTokens(msg) for msg in messages)
 
-    for msg in messages:
-        msgChars = 0
 
-        if isinstance(msg, SystemMessage):
-            msgChars = len(msg.content)
-        elif hasattr(msg, "content"):
-            for block in msg.content:
-                if isinstance(block, TextBlock):
-                    msgChars += len(block.text)
-                elif isinstance(block, ToolUseBlock):
-                    msgChars += len(block.name)
-                    msgChars += len(json.dumps(block.input))
-                elif isinstance(block, ToolResultBlock):
-                    msgChars += len(block.content) if isinstance(block.content, str) else 0
-                elif isinstance(block, ThinkingBlock):
-                    msgChars += len(block.thinking)
+class TokenLedger:
+    """Running token count of a message history.
 
-        total += math.ceil(msgChars / 4 * (4 / 3))
+    Estimates are cached per message, so `sync` only estimates the messages
+    appended or replaced since the previous call (messages are never mutated
+    in place, a changed message is a new object). The prompt size reported
+    by the provider calibrates the count: its difference to the estimate of
+    the messages it covered (tool schemas, tokenizer error) is kept as an
+    offset until that prefix of the history is dropped.
+    """
 
-    return total
+    def __init__(self):
+        self._messages = []  # type: List[Message]
+        self._estimates = []  # type: List[int]
+        self._estimated = 0
+        # Number of messages covered by the last calibration
+        self._calibrated_count = 0
+        self._offset = 0
+
+    def sync(self, messages):
+        # type: (List[Message]) -> int
+        """Update the ledger to @messages and return the token count."""
+        common = min(len(messages), len(self._messages))
+        for i in range(common):
+            msg = messages[i]
+            if msg is not self._messages[i]:
+                estimate = estimateMessageTokens(msg)
+                self._estimated += estimate - self._estimates[i]
+                self._messages[i] = msg
+                self._estimates[i] = estimate
+
+        if len(self._messages) > common:
+            self._estimated -= sum(self._estimates[common:])
+            del self._messages[common:]
+            del self._estimates[common:]
+            if self._calibrated_count > common:
+                self._calibrated_count = 0
+                self._offset = 0
+
+        for msg in messages[common:]:
+            estimate = estimateMessageTokens(msg)
+            self._messages.append(msg)
+            self._estimates.append(estimate)
+            self._estimated += estimate
+
+        return self.tokens()
+
+    def calibrate(self, prompt_tokens):
+        # type: (int) -> None
+        """Record @prompt_tokens, the real size of a request made of the
+        messages last synced."""
+        if prompt_tokens <= 0 or not self._messages:
+            return
+        self._calibrated_count = len(self._messages)
+        self._offset = prompt_tokens - self._estimated
+
+    def tokens(self):
+        # type: () -> int
+        return max(0, self._estimated + self._offset)
+
+    def isCalibrated(self):
+        # type: () -> bool
+        return self._calibrated_count > 0
+
+    def reset(self):
+        # type: () -> None
+        self.sync([])
 
 
 _NO_TOOLS_PREAMBLE = (
@@ -110,10 +188,26 @@ _NO_TOOLS_TRAILER = (
 )
 
 
-def _getCompactPrompt():
-    # type: () -> str
-    """Return the structured compaction prompt (ports TS getCompactPrompt)."""
-    return _NO_TOOLS_PREAMBLE + _BASE_COMPACT_PROMPT + _NO_TOOLS_TRAILER
+_INCREMENTAL_COMPACT_NOTE = (
+    "The conversation above starts with the summary of its earlier portion. "
+    "Carry that summary over into your summary and update it with the "
+    "messages that follow it, do not summarize it again from scratch.\n\n"
+)
+
+
+def _getCompactPrompt(incremental=False):
+    # type: (bool) -> str
+    """Return the structured compaction prompt (ports TS getCompactPrompt).
+
+    An @incremental prompt updates the summary of a previous compaction.
+    """
+    note = _INCREMENTAL_COMPACT_NOTE if incremental else ""
+    return _NO_TOOLS_PREAMBLE + note + _BASE_COMPACT_PROMPT + _NO_TOOLS_TRAILER
+
+
+def _isCompactBoundary(msg):
+    # type: (Message) -> bool
+    return isinstance(msg, SystemMessage) and msg.subtype == "compact_boundary"
 
 
 def _formatCompactSummary(text):
@@ -146,30 +240,36 @@ def _formatCompactSummary(text):
 _MICROCOMPACT_CLEARED = "[Old tool result content cleared]"
 
 
-def microcompactMessages(messages, thresholdChars=5000):
-    # type: (List[Message], int) -> List[Message]
+def microcompactCutoff(messages):
+    # type: (List[Message]) -> int
+    """Index of the last AssistantMessage, tool results from there on are
+    protected from microcompaction."""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], AssistantMessage):
+            return i
+    return 0
+
+
+def microcompactMessages(messages, thresholdChars=5000, start=0):
+    # type: (List[Message], int, int) -> List[Message]
     """Truncate oversized tool results from old turns to reduce context size.
 
     Protects tool results from UserMessages at or after the second-to-last
-    AssistantMessage index. Returns the same list object if no changes.
-    Never mutates input.
+    AssistantMessage index. Messages before @start were already
+    microcompacted and are skipped. Returns the same list object if no
+    changes. Never mutates input.
     """
     if not messages:
         return messages
 
-    assistantIndices = [
-        i for i, m in enumerate(messages) if isinstance(m, AssistantMessage)
-    ]
-    if assistantIndices:
-        cutoffIndex = assistantIndices[-1]
-    else:
-        cutoffIndex = 0
-
-    result = []
-    changed = False
-    for i, msg in enumerate(messages):
-        if not isinstance(msg, UserMessage) or i >= cutoffIndex:
-            result.append(msg)
+    cutoffIndex = microcompactCutoff(messages)
+    if start >= cutoffIndex:
+        return messages
+
+    result = None  # type: List[Message]
+    for i in range(start, cutoffIndex):
+        msg = messages[i]
+        if not isinstance(msg, UserMessage):
             continue
 
         newContent = []
@@ -184,16 +284,15 @@ def microcompactMessages(messages, thresholdChars=5000):
                     is_error=block.is_error,
                 ))
                 msgChanged = True
-                changed = True
             else:
                 newContent.append(block)
 
         if msgChanged:
-            result.append(UserMessage(content=newContent))
-        else:
-            result.append(msg)
+            if result is None:
+                result = list(messages)
+            result[i] = UserMessage(content=newContent)
 
-    return result if changed else messages
+    return result if result is not None else messages
 
 
 def _message_text(msg):
@@ -251,9 +350,28 @@ class ConversationCompactor:
         self._context_window = context_window
         self._max_output_tokens = max_output_tokens
 
-    def shouldCompact(self, messages):
-        # type: (List[Message]) -> bool
-        """Check whether the conversation should be compacted."""
+    def shouldCompact(self, messages, token_count=None):
+        # type: (List[Message], Optional[int]) -> bool
+        """Check whether the conversation should be compacted.
+
+        @token_count is the known size of @messages (see `TokenLedger`),
+        estimated when not given.
+        """
+        return self._isOver(messages, token_count, 1.0)
+
+    def shouldPrecompact(self, messages, token_count=None):
+        # type: (List[Message], Optional[int]) -> bool
+        """Check whether the conversation is close enough to the compaction
+        threshold to start summarizing it in the background."""
+        return self._isOver(messages, token_count, SPECULATIVE_COMPACT_RATIO)
+
+    def abort(self):
+        # type: () -> None
+        """Stop the summary request in progress."""
+        self._provider.abort()
+
+    def _isOver(self, messages, token_count, ratio):
+        # type: (List[Message], Optional[int], float) -> bool
         if not messages:
             return False
 
@@ -265,22 +383,34 @@ class ConversationCompactor:
         reserved = min(self._max_output_tokens, MAX_OUTPUT_TOKENS_FOR_SUMMARY)
         effectiveWindow = self._context_window - reserved
         threshold = effectiveWindow - AUTOCOMPACT_BUFFER_TOKENS
-        return roughEstimateTokens(messages) > threshold
+        if token_count is None:
+            token_count = roughEstimateTokens(messages)
+        return token_count > threshold * ratio
 
-    def compact(self, messages):
-        # type: (List[Message]) -> CompactionResult
-        """Compact the conversation by summarizing it via the provider."""
+    def compact(self, messages, token_count=None, is_aborted=None):
+        # type: (List[Message], Optional[int], Optional[Callable[[], bool]]) -> CompactionResult
+        """Compact the conversation by summarizing it via the provider.
+
+        A conversation that was already compacted starts with the previous
+        summary, which is updated rather than summarized again.
+        """
         if not messages:
             raise ValueError("Cannot compact an empty message list")
 
-        preTokens = roughEstimateTokens(messages)
+        preTokens = token_count
+        if preTokens is None:
+            preTokens = roughEstimateTokens(messages)
 
-        promptMsg = UserMessage(content=[TextBlock(text=_getCompactPrompt())])
+        incremental = _isCompactBoundary(messages[0])
+        promptMsg = UserMessage(
+            content=[TextBlock(text=_getCompactPrompt(incremental))])
 
         messageToSummarize = messages
         summaryParts = []  # type: List[str]
         for event in self._provider.stream(
                 messageToSummarize + [promptMsg]):
+            if is_aborted is not None and is_aborted():
+                raise RuntimeError("Compaction aborted")
             if isinstance(event, ContentDelta):
                 summaryParts.append(event.text)
 
@@ -308,3 +438,80 @@ class ConversationCompactor:
             pre_token_estimate=preTokens,
             post_token_estimate=post_tokens,
         )
+
+
+class BackgroundCompaction:
+    """Compacts a snapshot of the conversation in a worker thread.
+
+    The snapshot becomes the older prefix of the history as the
+    conversation goes on, `apply` replaces that prefix by the summary and
+    keeps the messages appended meanwhile.
+    """
+
+    def __init__(self, compactor, messages, token_count=None):
+        # type: (ConversationCompactor, List[Message], Optional[int]) -> None
+        self._compactor = compactor
+        self._messages = list(messages)
+        self._token_count = token_count
+        self._result = None  # type: Optional[CompactionResult]
+        self._error = None  # type: Optional[Exception]
+        self._cancelled = False
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # type: () -> None
+        try:
+            self._result = self._compactor.compact(
+                self._messages,
+                self._token_count,
+                is_aborted=lambda: self._cancelled,
+            )
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def messageCount(self):
+        # type: () -> int
+        """Number of messages being summarized."""
+        return len(self._messages)
+
+    def isDone(self):
+        # type: () -> bool
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        # type: (Optional[float]) -> bool
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        # type: () -> None
+        self._cancelled = True
+        # the thread may be waiting for the summary, not for the next event
+        self._compactor.abort()
+
+    def isCancelled(self):
+        # type: () -> bool
+        return self._cancelled
+
+    def result(self):
+        # type: () -> Optional[CompactionResult]
+        """The compaction result, None if it failed or is not done."""
+        if not self._done.is_set() or self._cancelled:
+            return None
+        return self._result
+
+    def error(self):
+        # type: () -> Optional[Exception]
+        return self._error
+
+    def apply(self, messages):
+        # type: (List[Message]) -> List[Message]
+        """Return @messages with the summarized prefix replaced."""
+        result = self.result()
+        if result is None:
+            raise RuntimeError("Compaction is not available")
+        return [result.boundary, result.summary] + \
+            list(messages[len(self._messages):])
@@ -55,3 +55,8 @@ class ModelProvider(ABC):
     ):
         # type: (...) -> int
         ...
+
+    def abort(self):
+        # type: () -> None
+        """Stop the stream in progress, called from any thread."""
+        pass
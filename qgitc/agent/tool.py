@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import os
+import posixpath
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional
 
 
 @dataclass
@@ -18,6 +20,72 @@ class ToolContext:
     extra: Dict[str, Any] = field(default_factory=dict)
 
 
+# Resources of a `ToolFootprint`, other resources are repo relative paths
+ALL_RESOURCES = "*"
+# HEAD, the refs and the index
+GIT_STATE = "git:"
+# Every file of the working tree
+WORKTREE = ""
+
+
+def footprintPath(path: Optional[str], repoDir: Optional[str] = None) -> str:
+    """Return the footprint resource of @path (absolute or relative to
+    @repoDir), paths that can't be resolved cover the whole working tree"""
+    p = (path or "").strip().strip('"').strip("'")
+    if not p:
+        return WORKTREE
+
+    if os.path.isabs(p):
+        if not repoDir:
+            return WORKTREE
+        try:
+            p = os.path.relpath(p, repoDir)
+        except ValueError:
+            return WORKTREE
+
+    p = posixpath.normpath(p.replace("\\", "/"))
+    if p == "." or p == ".." or p.startswith("../"):
+        return WORKTREE
+    return p
+
+
+def _resourcesOverlap(a: str, b: str) -> bool:
+    if a == ALL_RESOURCES or b == ALL_RESOURCES or a == b:
+        return True
+    if a == GIT_STATE or b == GIT_STATE:
+        return False
+    if a == WORKTREE or b == WORKTREE:
+        return True
+    return b.startswith(a + "/") or a.startswith(b + "/")
+
+
+@dataclass(frozen=True)
+class ToolFootprint:
+    """Resources a tool call reads and writes, calls whose footprints don't
+    conflict may run concurrently."""
+    reads: FrozenSet[str] = frozenset()
+    writes: FrozenSet[str] = frozenset()
+
+    @staticmethod
+    def make(reads: Iterable[str] = (), writes: Iterable[str] = ()):
+        return ToolFootprint(frozenset(reads), frozenset(writes))
+
+    def isExclusive(self) -> bool:
+        """Whether the call must run alone"""
+        return ALL_RESOURCES in self.writes
+
+    def conflicts(self, other: "ToolFootprint") -> bool:
+        for write in self.writes:
+            for resource in other.reads | other.writes:
+                if _resourcesOverlap(write, resource):
+                    return True
+        for write in other.writes:
+            for resource in self.reads:
+                if _resourcesOverlap(write, resource):
+                    return True
+        return False
+
+
 class Tool(ABC):
     name: str = ""
     description: str = ""
@@ -28,6 +96,23 @@ class Tool(ABC):
     def isDestructive(self) -> bool:
         return False
 
+    def footprint(self, input_data: Dict[str, Any], context: "ToolContext") -> ToolFootprint:
+        """Resources used by a call, by default read-only tools may read
+        anything and other tools run alone"""
+        if self.isReadOnly():
+            return ToolFootprint.make(reads=[ALL_RESOURCES])
+        return ToolFootprint.make(writes=[ALL_RESOURCES])
+
+    def isCacheable(self) -> bool:
+        """Whether the result only depends on the input and the repository
+        state, so that repeated calls can be served by `ToolResultCache`"""
+        return False
+
+    def readsWorktree(self, input_data: Dict[str, Any]) -> bool:
+        """Whether the result of a cacheable call also depends on the
+        working tree, such results are only cached briefly"""
+        return False
+
     @abstractmethod
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         ...
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tools.utils import findGitDir
+from qgitc.gitutils import Git
+
+# Key of the cache in `ToolContext.extra`
+TOOL_RESULT_CACHE_KEY = "tool_result_cache"
+
+
+def _fileStamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _readSmallFile(path: str):
+    try:
+        with open(path, "rb") as f:
+            return f.read(4096)
+    except OSError:
+        return None
+
+
+def repoStateKey(repoDir: str) -> Optional[Tuple]:
+    """Snapshot of HEAD, the index and the refs (see `Git.refsStamp`) of
+    the repo at @repoDir, read from the git dir without running git. None
+    if not a repo."""
+    gitDir = findGitDir(repoDir) if repoDir else None
+    if not gitDir or not os.path.isdir(gitDir):
+        return None
+
+    # linked worktrees share the refs of the main repo
+    commonDir = gitDir
+    data = _readSmallFile(os.path.join(gitDir, "commondir"))
+    if data:
+        commonDir = os.path.normpath(os.path.join(
+            gitDir, data.decode("utf-8", errors="replace").strip()))
+
+    head = _readSmallFile(os.path.join(gitDir, "HEAD"))
+    headRef = None
+    if head and head.startswith(b"ref:"):
+        ref = head[4:].decode("utf-8", errors="replace").strip()
+        headRef = _readSmallFile(os.path.join(commonDir, ref))
+
+    return (
+        head,
+        headRef,
+        _fileStamp(os.path.join(gitDir, "index")),
+        # the stamps of the ref directories are hashed to keep the key
+        # small, whatever the number of refs
+        hash(Git.refsStamp(repoDir)),
+    )
+
+
+class ToolResultCache:
+    """Results of cacheable read-only tools (see `Tool.isCacheable`) for an
+    agent session.
+
+    Entries are keyed by the tool name, the input without its default
+    values and the repository state, so commits, checkouts, staging and
+    ref updates made outside of the agent are never served from the cache.
+    Results that also depend on the working tree (`Tool.readsWorktree`)
+    expire after `WORKTREE_TTL` seconds. The agent invalidates the whole
+    cache after running any tool that is not read-only.
+    """
+
+    MAX_ENTRIES = 256
+    MAX_BYTES = 4 * 1024 * 1024
+    WORKTREE_TTL = 5.0
+
+    def __init__(self, maxEntries: int = MAX_ENTRIES, maxBytes: int = MAX_BYTES):
+        self._max_entries = maxEntries
+        self._max_bytes = maxBytes
+        # key -> (result, size, expiry or None)
+        self._entries = OrderedDict()  # type: OrderedDict[Tuple, Tuple[ToolResult, int, Optional[float]]]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalizeInput(tool: Tool, input_data: Dict[str, Any]) -> str:
+        try:
+            properties = tool.inputSchema().get("properties", {})
+        except Exception:
+            properties = {}
+
+        normalized = {}
+        for name, value in (input_data or {}).items():
+            if value is None:
+                continue
+            schema = properties.get(name)
+            if isinstance(schema, dict) and "default" in schema \
+                    and schema["default"] == value:
+                continue
+            normalized[name] = value
+        return json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+    def makeKey(self, tool: Tool, input_data: Dict[str, Any], repoDir: str) -> Optional[Tuple]:
+        """Cache key of a call, None if the call can't be cached"""
+        if not tool.isCacheable():
+            return None
+        state = repoStateKey(repoDir)
+        if state is None:
+            return None
+        return (tool.name, self._normalizeInput(tool, input_data),
+                os.path.normcase(os.path.abspath(repoDir)), state)
+
+    def get(self, key: Tuple) -> Optional[ToolResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None \
+                    and entry[2] < time.monotonic():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple, result: ToolResult, ttl: Optional[float] = None):
+        # errors may be transient
+        if key is None or result.is_error:
+            return
+
+        size = len(result.content or "")
+        if size > self._max_bytes:
+            return
+
+        expiry = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, size, expiry)
+            self._bytes += size
+
+            while len(self._entries) > self._max_entries or \
+                    self._bytes > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+def toolResultCache(context: ToolContext) -> Optional[ToolResultCache]:
+    return context.extra.get(TOOL_RESULT_CACHE_KEY)
+
+
+def executeCached(tool: Tool, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
+    """Execute @tool through the result cache of @context (if any)"""
+    cache = toolResultCache(context)
+    if cache is None:
+        return tool.execute(input_data, context)
+
+    key = cache.makeKey(tool, input_data, context.working_directory)
+    if key is not None:
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    try:
+        result = tool.execute(input_data, context)
+    finally:
+        # the tool may have changed the repo even if it failed
+        if not tool.isReadOnly():
+            cache.invalidate()
+
+    if key is not None:
+        ttl = ToolResultCache.WORKTREE_TTL if tool.readsWorktree(input_data) else None
+        cache.put(key, result, ttl)
+    return result
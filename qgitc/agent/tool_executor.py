@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 
-from concurrent.futures import Future, ThreadPoolExecutor
-from dataclasses import dataclass, field
-from typing import Callable, List, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from qgitc.agent.permissions import PermissionAsk, PermissionDeny, PermissionEngine
-from qgitc.agent.tool import ToolContext, ToolResult
+from qgitc.agent.tool import ALL_RESOURCES, ToolContext, ToolFootprint, ToolResult
+from qgitc.agent.tool_cache import executeCached
 from qgitc.agent.tool_registry import ToolRegistry
 from qgitc.agent.types import ToolResultBlock, ToolUseBlock
 
@@ -13,12 +15,6 @@ TOOL_ABORTED_MESSAGE = "Tool execution aborted"
 TOOL_SKIPPED_MESSAGE = "The user chose to skip the tool call, they want to proceed without running it"
 
 
-@dataclass
-class ToolBatch:
-    is_parallel: bool = False
-    blocks: List[ToolUseBlock] = field(default_factory=list)
-
-
 @dataclass
 class _PreparedExecution:
     block: ToolUseBlock
@@ -85,7 +81,7 @@ def _prepare_block_execution(
 
 def _execute_tool(block: ToolUseBlock, tool: object, block_context: ToolContext) -> ToolResultBlock:
     try:
-        result = tool.execute(block.input, block_context)
+        result = executeCached(tool, block.input, block_context)
     except Exception as e:
         result = ToolResult(content=str(e), is_error=True)
 
@@ -96,39 +92,50 @@ def _execute_tool(block: ToolUseBlock, tool: object, block_context: ToolContext)
     )
 
 
-def _execute_one_block(
-    block: ToolUseBlock,
-    registry: ToolRegistry,
-    permission_engine: PermissionEngine,
-    context: ToolContext,
-    is_aborted: Callable[[], bool],
-    requestPermission: Callable[[str, object, dict], bool],
-    onToolStart: Callable[[str, str, dict], None],
-    onToolResult: Callable[[str, str, bool], None],
-) -> Optional[ToolResultBlock]:
-    prepared = _prepare_block_execution(
-        block,
-        registry,
-        permission_engine,
-        context,
-        is_aborted,
-        requestPermission,
-    )
+# Workers shared by the tool calls of all agents
+_POOL_WORKERS = 8
+_pool = None  # type: Optional[ThreadPoolExecutor]
+_pool_lock = Lock()
 
-    if prepared.immediate_result is not None:
-        onToolResult(block.id, block.name,
-                       prepared.immediate_result.content, True)
-        return prepared.immediate_result
 
-    onToolStart(block.id, block.name, block.input)
-    block_context = ToolContext(
-        working_directory=context.working_directory,
-        abort_requested=context.abort_requested,
-        extra=context.extra,
-    )
-    result = _execute_tool(block, prepared.tool, block_context)
-    onToolResult(block.id, block.name, result.content, result.is_error)
-    return result
+def _shared_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=_POOL_WORKERS, thread_name_prefix="AgentTool")
+        return _pool
+
+
+def _block_footprint(block: ToolUseBlock, registry: ToolRegistry, context: ToolContext) -> ToolFootprint:
+    if block.name == "Skill":
+        # a skill changes the tools allowed for the calls after it
+        return ToolFootprint.make(writes=[ALL_RESOURCES])
+
+    tool = registry.get(block.name)
+    if tool is None:
+        return ToolFootprint()
+
+    try:
+        return tool.footprint(block.input or {}, context)
+    except Exception:
+        return ToolFootprint.make(writes=[ALL_RESOURCES])
+
+
+def _build_dependencies(
+    tool_blocks: List[ToolUseBlock],
+    registry: ToolRegistry,
+    context: ToolContext,
+) -> Tuple[List[ToolFootprint], List[Set[int]]]:
+    """Return the footprint of each block and the indexes of the earlier
+    blocks it conflicts with, which must finish before it starts."""
+    footprints = [_block_footprint(block, registry, context)
+                  for block in tool_blocks]
+    dependencies: List[Set[int]] = []
+    for i, footprint in enumerate(footprints):
+        dependencies.append({j for j in range(i)
+                             if footprint.conflicts(footprints[j])})
+    return footprints, dependencies
 
 
 def executeToolBlocks(
@@ -142,93 +149,92 @@ def executeToolBlocks(
     onToolResult: Callable[[str, str, str, bool], None],
     max_workers: int = 4,
 ) -> Optional[List[ToolResultBlock]]:
-    batches = _partition_tool_calls(tool_blocks, registry)
-    ordered_results: List[ToolResultBlock] = []
-
-    for batch in batches:
-        if batch.is_parallel and len(batch.blocks) > 1:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                parallel_futures: List[Optional[Future]] = []
-                for block in batch.blocks:
-                    prepared = _prepare_block_execution(
-                        block,
-                        registry,
-                        permission_engine,
-                        context,
-                        is_aborted,
-                        requestPermission,
-                    )
-
-                    if prepared.immediate_result is not None:
-                        onToolResult(
-                            prepared.block.id,
-                            block.name,
-                            prepared.immediate_result.content,
-                            True,
-                        )
-                        ordered_results.append(prepared.immediate_result)
-                        parallel_futures.append(None)
-                        continue
-
-                    onToolStart(prepared.block.id,
-                                  prepared.block.name, prepared.block.input)
-                    block_context = ToolContext(
-                        working_directory=context.working_directory,
-                        abort_requested=context.abort_requested,
-                        extra=context.extra.copy(),
-                    )
-                    parallel_futures.append(
-                        executor.submit(
-                            _execute_tool,
-                            prepared.block,
-                            prepared.tool,
-                            block_context,
-                        )
-                    )
-
-                id_to_name = {block.id: block.name for block in batch.blocks}
-                for future in parallel_futures:
-                    result = future.result()
-                    onToolResult(result.tool_use_id,
-                                   id_to_name[result.tool_use_id],
-                                   result.content, result.is_error)
-                    ordered_results.append(result)
-        else:
-            for block in batch.blocks:
-                result = _execute_one_block(
-                    block,
-                    registry,
-                    permission_engine,
-                    context,
-                    is_aborted,
-                    requestPermission,
-                    onToolStart,
-                    onToolResult,
-                )
-                if result is not None:
-                    ordered_results.append(result)
-
-    return ordered_results
-
-
-def _is_parallel_safe(block: ToolUseBlock, registry: ToolRegistry) -> bool:
-    if block.name == "Skill":
-        return False
-    tool = registry.get(block.name)
-    return tool is not None and tool.isReadOnly()
-
-
-def _partition_tool_calls(
-    tool_blocks: List[ToolUseBlock],
-    registry: ToolRegistry,
-) -> List[ToolBatch]:
-    batches: List[ToolBatch] = []
-
-    for block in tool_blocks:
-        is_parallel = _is_parallel_safe(block, registry)
-        if is_parallel and batches and batches[-1].is_parallel:
-            batches[-1].blocks.append(block)
+    """Execute @tool_blocks, returning their results in the same order.
+
+    Calls whose footprints don't conflict run concurrently on a shared pool
+    (at most @max_workers at a time), a call starts as soon as the earlier
+    calls it conflicts with are done, even if an earlier call still waits
+    for its own. Calls are prepared (and permissions asked) in order, and
+    `onToolResult` is reported as soon as a call finishes. Exclusive calls
+    run on the calling thread with the shared `context.extra`, before the
+    later calls are prepared; the others get a copy of it. Callbacks are
+    always invoked on the calling thread.
+    """
+    footprints, dependencies = _build_dependencies(
+        tool_blocks, registry, context)
+    results: List[Optional[ToolResultBlock]] = [None] * len(tool_blocks)
+    finished: Set[int] = set()
+    running: Dict[Future, int] = {}
+    # prepared calls waiting for their dependencies, in order
+    waiting: List[Tuple[int, object]] = []
+    next_index = 0
+    max_workers = max(1, max_workers)
+
+    def _finish(index: int, result: ToolResultBlock):
+        results[index] = result
+        finished.add(index)
+        onToolResult(result.tool_use_id, tool_blocks[index].name,
+                     result.content, result.is_error)
+
+    def _start(index: int, tool: object):
+        block = tool_blocks[index]
+        if is_aborted():
+            _finish(index, _build_error_result(block.id, TOOL_ABORTED_MESSAGE))
+            return
+
+        onToolStart(block.id, block.name, block.input)
+        if footprints[index].isExclusive():
+            block_context = ToolContext(
+                working_directory=context.working_directory,
+                abort_requested=context.abort_requested,
+                extra=context.extra,
+            )
+            _finish(index, _execute_tool(block, tool, block_context))
         else:
-            batches.append(ToolBatch(is_parallel=is_parallel, blocks=[block]))
-
-    return batches
+            block_context = ToolContext(
+                working_directory=context.working_directory,
+                abort_requested=context.abort_requested,
+                extra=context.extra.copy(),
+            )
+            future = _shared_pool().submit(
+                _execute_tool, block, tool, block_context)
+            running[future] = index
+
+    while next_index < len(tool_blocks) or waiting or running:
+        while next_index < len(tool_blocks):
+            index = next_index
+            # an exclusive call may change how the later calls are prepared
+            exclusive = footprints[index].isExclusive()
+            if exclusive and not dependencies[index] <= finished:
+                break
+            next_index += 1
+
+            prepared = _prepare_block_execution(
+                tool_blocks[index],
+                registry,
+                permission_engine,
+                context,
+                is_aborted,
+                requestPermission,
+            )
+            if prepared.immediate_result is not None:
+                _finish(index, prepared.immediate_result)
+            elif exclusive:
+                _start(index, prepared.tool)
+            else:
+                waiting.append((index, prepared.tool))
+
+        for item in list(waiting):
+            if len(running) >= max_workers:
+                break
+            index, tool = item
+            if dependencies[index] <= finished:
+                waiting.remove(item)
+                _start(index, tool)
+
+        if running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=running.get):
+                _finish(running.pop(future), future.result())
+
+    return results
@@ -2,11 +2,20 @@
 
 import os
 import pathlib
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import (
+    WORKTREE,
+    Tool,
+    ToolContext,
+    ToolFootprint,
+    ToolResult,
+    footprintPath,
+)
 from qgitc.agent.tools.utils import detectBom
 from qgitc.common import decodeFileData
 
@@ -82,6 +91,8 @@ class FileChange:
     old_content: Optional[str] = None
     new_content: Optional[str] = None
     move_path: Optional[str] = None
+    # content of the existing file an ADD or a move writes over
+    replaced_content: Optional[str] = None
 
 
 @dataclass
@@ -117,6 +128,8 @@ class PatchAction:
 @dataclass
 class Patch:
     actions: Dict[str, PatchAction] = field(default_factory=dict)
+    # Hunks that only matched with fuzz, reported back to the model
+    fuzzy_matches: List[str] = field(default_factory=list)
 
 
 # --------------------------------------------------------------------------- #
@@ -188,7 +201,7 @@ class Parser:
                     raise DiffError(
                         f"Update File Error - missing file: {path}")
                 text = self.current_files[path]
-                action = self._parse_update_file(text)
+                action = self._parse_update_file(text, path)
                 action.move_path = move_to or None
                 self.patch.actions[path] = action
                 continue
@@ -222,10 +235,12 @@ class Parser:
         self.index += 1  # consume sentinel
 
     # ------------- section parsers ---------------------------------------- #
-    def _parse_update_file(self, text: str) -> PatchAction:
+    def _parse_update_file(self, text: str, path: str) -> PatchAction:
         action = PatchAction(type=ActionType.UPDATE)
         lines = text.split("\n")
+        line_index = LineIndex(lines)
         index = 0
+        hunk = 0
         while not self.isDone(
             (
                 "*** End Patch",
@@ -251,31 +266,37 @@ class Parser:
 
             if def_str.strip():
                 found = False
-                if def_str not in lines[:index]:
-                    for i, s in enumerate(lines[index:], index):
-                        if s == def_str:
-                            index = i + 1
-                            found = True
-                            break
-                if not found and def_str.strip() not in [
-                    s.strip() for s in lines[:index]
-                ]:
-                    for i, s in enumerate(lines[index:], index):
-                        if s.strip() == def_str.strip():
-                            index = i + 1
-                            self.fuzz += 1
-                            found = True
-                            break
+                if not line_index.occursBefore(def_str, index):
+                    i = line_index.find([def_str], index)
+                    if i != -1:
+                        index = i + 1
+                        found = True
+                if not found and not line_index.occursBefore(
+                        def_str, index, STRIP):
+                    i = line_index.find([def_str], index, STRIP)
+                    if i != -1:
+                        index = i + 1
+                        self.fuzz += 1
+                        found = True
 
             next_ctx, chunks, end_idx, eof = peekNextSection(
                 self.lines, self.index)
-            new_index, fuzz = findContext(lines, next_ctx, index, eof)
+            hunk += 1
+            new_index, fuzz = findContext(
+                lines, next_ctx, index, eof, line_index)
+            if new_index == -1:
+                new_index, fuzz = findFuzzyContext(
+                    lines, next_ctx, chunks, index, eof, line_index)
             if new_index == -1:
                 ctx_txt = "\n".join(next_ctx)
                 raise DiffError(
                     f"Invalid {'EOF ' if eof else ''}context at {index}:\n{ctx_txt}"
                 )
             self.fuzz += fuzz
+            note = describeFuzz(fuzz)
+            if note:
+                self.patch.fuzzy_matches.append(
+                    f"{path}: hunk {hunk} applied at line {new_index + 1} {note}")
             for ch in chunks:
                 ch.orig_index += new_index
                 action.chunks.append(ch)
@@ -299,39 +320,159 @@ class Parser:
 # --------------------------------------------------------------------------- #
 #  Helper functions
 # --------------------------------------------------------------------------- #
+# Line comparison levels, the value is the fuzz of a match
+EXACT = 0
+RSTRIP = 1
+STRIP = 100
+
+_NORMALIZERS = {
+    EXACT: None,
+    RSTRIP: str.rstrip,
+    STRIP: str.strip,
+}
+
+# Fuzz of an EOF hunk that did not match at the end of the file
+EOF_FUZZ = 10_000
+
+# Fuzz of each outer context line ignored to match a hunk, at most
+# MAX_CONTEXT_FUZZ lines on each side of the changes (like `patch -F2`)
+CONTEXT_FUZZ = 100_000
+MAX_CONTEXT_FUZZ = 2
+
+
+class LineIndex:
+    """Positions of the lines of a file by their (normalized) content.
+
+    Context is anchored on its rarest line with a single lookup instead of
+    comparing it at every position of the file.
+    """
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        # level -> (normalized lines, line -> sorted positions)
+        self._levels = {}  # type: Dict[int, Tuple[List[str], Dict[str, List[int]]]]
+
+    def _level(self, level: int) -> Tuple[List[str], Dict[str, List[int]]]:
+        entry = self._levels.get(level)
+        if entry is None:
+            norm = _NORMALIZERS[level]
+            lines = self.lines if norm is None else [norm(s) for s in self.lines]
+            positions = {}  # type: Dict[str, List[int]]
+            for i, s in enumerate(lines):
+                positions.setdefault(s, []).append(i)
+            entry = (lines, positions)
+            self._levels[level] = entry
+        return entry
+
+    @staticmethod
+    def _normalize(lines: List[str], level: int) -> List[str]:
+        norm = _NORMALIZERS[level]
+        return lines if norm is None else [norm(s) for s in lines]
+
+    def occursBefore(self, line: str, end: int, level: int = EXACT) -> bool:
+        _, positions = self._level(level)
+        found = positions.get(self._normalize([line], level)[0])
+        return bool(found) and found[0] < end
+
+    def find(self, context: List[str], start: int, level: int = EXACT) -> int:
+        """First position >= @start where @context matches, -1 if none"""
+        lines, positions = self._level(level)
+        context = self._normalize(context, level)
+
+        offset, candidates = 0, None
+        for i, s in enumerate(context):
+            found = positions.get(s)
+            if not found:
+                return -1
+            if candidates is None or len(found) < len(candidates):
+                offset, candidates = i, found
+                if len(found) == 1:
+                    break
+
+        count = len(context)
+        for pos in candidates[bisect_left(candidates, start + offset):]:
+            i = pos - offset
+            if i < 0:
+                continue
+            if i + count > len(lines):
+                break
+            if lines[i: i + count] == context:
+                return i
+        return -1
+
+
 def findContextCore(
-    lines: List[str], context: List[str], start: int
+    lines: List[str], context: List[str], start: int,
+    index: Optional[LineIndex] = None
 ) -> Tuple[int, int]:
     if not context:
         return start, 0
 
-    for i in range(start, len(lines)):
-        if lines[i: i + len(context)] == context:
-            return i, 0
-    for i in range(start, len(lines)):
-        if [s.rstrip() for s in lines[i: i + len(context)]] == [
-            s.rstrip() for s in context
-        ]:
-            return i, 1
-    for i in range(start, len(lines)):
-        if [s.strip() for s in lines[i: i + len(context)]] == [
-            s.strip() for s in context
-        ]:
-            return i, 100
+    if index is None:
+        index = LineIndex(lines)
+    for level in (EXACT, RSTRIP, STRIP):
+        i = index.find(context, start, level)
+        if i != -1:
+            return i, level
     return -1, 0
 
 
 def findContext(
-    lines: List[str], context: List[str], start: int, eof: bool
+    lines: List[str], context: List[str], start: int, eof: bool,
+    index: Optional[LineIndex] = None
 ) -> Tuple[int, int]:
+    if index is None:
+        index = LineIndex(lines)
     if eof:
         new_index, fuzz = findContextCore(
-            lines, context, len(lines) - len(context))
+            lines, context, len(lines) - len(context), index)
         if new_index != -1:
             return new_index, fuzz
-        new_index, fuzz = findContextCore(lines, context, start)
-        return new_index, fuzz + 10_000
-    return findContextCore(lines, context, start)
+        new_index, fuzz = findContextCore(lines, context, start, index)
+        return new_index, fuzz + EOF_FUZZ
+    return findContextCore(lines, context, start, index)
+
+
+def findFuzzyContext(
+    lines: List[str], context: List[str], chunks: List[Chunk], start: int,
+    eof: bool, index: Optional[LineIndex] = None
+) -> Tuple[int, int]:
+    """Match @context ignoring up to MAX_CONTEXT_FUZZ of its outer lines
+    that are not changed by @chunks, for context that drifted slightly."""
+    if not chunks:
+        return -1, 0
+
+    head = chunks[0].orig_index
+    tail = len(context) - chunks[-1].orig_index - len(chunks[-1].del_lines)
+    # the end of the file can't be matched without the last lines
+    if eof:
+        tail = 0
+
+    for fuzz in range(1, 2 * MAX_CONTEXT_FUZZ + 1):
+        for lead in range(min(fuzz, head, MAX_CONTEXT_FUZZ) + 1):
+            trail = fuzz - lead
+            if trail > min(tail, MAX_CONTEXT_FUZZ):
+                continue
+            sub = context[lead: len(context) - trail]
+            if not sub:
+                continue
+            i, level = findContext(lines, sub, start + lead, eof, index)
+            if i != -1:
+                return i - lead, level + fuzz * CONTEXT_FUZZ
+    return -1, 0
+
+
+def describeFuzz(fuzz: int) -> Optional[str]:
+    """Why a hunk matched with @fuzz, None for trivial differences"""
+    notes = []
+    lines = fuzz // CONTEXT_FUZZ
+    if lines:
+        notes.append(f"ignoring {lines} mismatched context line(s)")
+    if fuzz % CONTEXT_FUZZ >= EOF_FUZZ:
+        notes.append("before the end of the file")
+    if fuzz % EOF_FUZZ >= STRIP:
+        notes.append("ignoring indentation")
+    return ", ".join(notes) if notes else None
 
 
 def peekNextSection(
@@ -470,7 +611,11 @@ def _get_updated_file(text: str, action: PatchAction, path: str) -> str:
     return "\n".join(dest_lines)
 
 
-def patchToCommit(patch: Patch, orig: Dict[str, str]) -> Commit:
+def patchToCommit(patch: Patch, orig: Dict[str, str],
+                  replaced: Optional[Dict[str, str]] = None) -> Commit:
+    """@replaced holds the content of the existing files that an ADD or a
+    move writes over"""
+    replaced = replaced or {}
     commit = Commit()
     for path, action in patch.actions.items():
         if action.type is ActionType.DELETE:
@@ -481,7 +626,8 @@ def patchToCommit(patch: Patch, orig: Dict[str, str]) -> Commit:
             if action.new_file is None:
                 raise DiffError("ADD action without file content")
             commit.changes[path] = FileChange(
-                type=ActionType.ADD, new_content=action.new_file
+                type=ActionType.ADD, new_content=action.new_file,
+                replaced_content=replaced.get(path),
             )
         elif action.type is ActionType.UPDATE:
             new_content = _get_updated_file(orig[path], action, path)
@@ -490,6 +636,8 @@ def patchToCommit(patch: Patch, orig: Dict[str, str]) -> Commit:
                 old_content=orig[path],
                 new_content=new_content,
                 move_path=action.move_path,
+                replaced_content=replaced.get(action.move_path)
+                if action.move_path else None,
             )
     return commit
 
@@ -510,6 +658,22 @@ def textToPatch(lines: List[str], orig: Dict[str, str]) -> Tuple[Patch, int]:
     return parser.patch, parser.fuzz
 
 
+# Lines naming the files a patch touches
+_FILE_OPS = ("*** Update File: ", "*** Delete File: ",
+             "*** Add File: ", "*** Move to: ")
+
+
+def identifyFilesReplaced(lines: List[str]) -> List[str]:
+    """The files a patch writes without reading them first, which may
+    exist already"""
+    return [
+        line[len(prefix):]
+        for line in lines
+        for prefix in ("*** Add File: ", "*** Move to: ")
+        if line.startswith(prefix)
+    ]
+
+
 def identifyFilesNeeded(lines: List[str]) -> List[str]:
     return [
         line[len("*** Update File: "):]
@@ -525,8 +689,88 @@ def identifyFilesNeeded(lines: List[str]) -> List[str]:
 # --------------------------------------------------------------------------- #
 #  File-system helpers
 # --------------------------------------------------------------------------- #
+# Files of a patch are read and written in parallel
+MAX_IO_WORKERS = 8
+
+
+def _ioExecutor(count: int) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=min(count, MAX_IO_WORKERS))
+
+
 def loadFiles(paths: List[str], open_fn: Callable[[str], str]) -> Dict[str, str]:
-    return {path: open_fn(path) for path in paths}
+    paths = list(dict.fromkeys(paths))
+    if len(paths) < 2:
+        return {path: open_fn(path) for path in paths}
+    with _ioExecutor(len(paths)) as executor:
+        return dict(zip(paths, executor.map(open_fn, paths)))
+
+
+def loadExistingFiles(paths: List[str], open_fn: Callable[[str], str]) -> Dict[str, str]:
+    """Like `loadFiles`, skipping the files that can't be opened"""
+    def _open(path):
+        try:
+            return open_fn(path)
+        except (OSError, DiffError):
+            return None
+
+    files = loadFiles(paths, _open)
+    return {path: content for path, content in files.items()
+            if content is not None}
+
+
+def _restoreFile(
+    path: str,
+    content: Optional[str],
+    write_fn: Callable[[str, str, Optional[str]], None],
+    remove_fn: Callable[[str], None],
+) -> None:
+    if content is None:
+        remove_fn(path)
+    else:
+        write_fn(path, content, path)
+
+
+def _applyChange(
+    path: str,
+    change: FileChange,
+    write_fn: Callable[[str, str, Optional[str]], None],
+    remove_fn: Callable[[str], None],
+    undo: List[Callable[[], None]],
+) -> None:
+    # every step records how to revert it in @undo before it starts, a
+    # write failing part-way may have truncated the file already
+    def _recordUndo(path, content):
+        undo.append(lambda: _restoreFile(path, content, write_fn, remove_fn))
+
+    if change.type is ActionType.DELETE:
+        _recordUndo(path, change.old_content)
+        remove_fn(path)
+    elif change.type is ActionType.ADD:
+        _recordUndo(path, change.replaced_content)
+        write_fn(path, change.new_content, None)
+    elif change.type is ActionType.UPDATE:
+        target = change.move_path or path
+        if change.move_path:
+            _recordUndo(target, change.replaced_content)
+        else:
+            _recordUndo(path, change.old_content)
+        write_fn(target, change.new_content, path)
+        if change.move_path:
+            _recordUndo(path, change.old_content)
+            remove_fn(path)
+
+
+def _independentChanges(commit: Commit) -> bool:
+    paths = set()
+    for path, change in commit.changes.items():
+        for p in (path, change.move_path):
+            if not p:
+                continue
+            p = os.path.normcase(os.path.normpath(p))
+            if p in paths:
+                return False
+            paths.add(p)
+    return True
 
 
 def applyCommit(
@@ -534,20 +778,35 @@ def applyCommit(
     write_fn: Callable[[str, str, Optional[str]], None],
     remove_fn: Callable[[str], None],
 ) -> None:
+    """Apply all the changes of @commit or none of them: if any write
+    fails, the files already changed are restored."""
     for path, change in commit.changes.items():
-        if change.type is ActionType.DELETE:
-            remove_fn(path)
-        elif change.type is ActionType.ADD:
-            if change.new_content is None:
-                raise DiffError(f"ADD change for {path} has no content")
-            write_fn(path, change.new_content, None)
-        elif change.type is ActionType.UPDATE:
-            if change.new_content is None:
-                raise DiffError(f"UPDATE change for {path} has no new content")
-            target = change.move_path or path
-            write_fn(target, change.new_content, path)
-            if change.move_path:
-                remove_fn(path)
+        if change.type is ActionType.ADD and change.new_content is None:
+            raise DiffError(f"ADD change for {path} has no content")
+        if change.type is ActionType.UPDATE and change.new_content is None:
+            raise DiffError(f"UPDATE change for {path} has no new content")
+
+    undo = []  # type: List[Callable[[], None]]
+    try:
+        if len(commit.changes) > 1 and _independentChanges(commit):
+            with _ioExecutor(len(commit.changes)) as executor:
+                futures = [
+                    executor.submit(_applyChange, path, change,
+                                    write_fn, remove_fn, undo)
+                    for path, change in commit.changes.items()
+                ]
+            for future in futures:
+                future.result()
+        else:
+            for path, change in commit.changes.items():
+                _applyChange(path, change, write_fn, remove_fn, undo)
+    except BaseException:
+        for revert in reversed(undo):
+            try:
+                revert()
+            except Exception:
+                pass
+        raise
 
 
 def processPatch(
@@ -562,9 +821,13 @@ def processPatch(
     paths = identifyFilesNeeded(text_lines)
     orig = loadFiles(paths, open_fn)
     patch, _fuzz = textToPatch(text_lines, orig)
-    commit = patchToCommit(patch, orig)
+    replaced = loadExistingFiles(identifyFilesReplaced(text_lines), open_fn)
+    commit = patchToCommit(patch, orig, replaced)
     applyCommit(commit, write_fn, remove_fn)
-    return "Done!"
+    if not patch.fuzzy_matches:
+        return "Done!"
+    report = "\n".join("- " + note for note in patch.fuzzy_matches)
+    return f"Done! Some hunks did not match the file exactly:\n{report}"
 
 
 # --------------------------------------------------------------------------- #
@@ -593,6 +856,15 @@ class ApplyPatchTool(Tool):
     def isReadOnly(self):
         return False
 
+    def footprint(self, input_data, context):
+        paths = []
+        for line in (input_data.get("input") or "").splitlines():
+            for prefix in _FILE_OPS:
+                if line.startswith(prefix):
+                    paths.append(footprintPath(
+                        line[len(prefix):], context.working_directory))
+        return ToolFootprint.make(writes=paths or [WORKTREE])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         patch_input = input_data.get("input")
         if not patch_input:
@@ -697,11 +969,13 @@ class ApplyPatchTool(Tool):
             parent = os.path.dirname(absPath)
             os.makedirs(parent, exist_ok=True)
 
-            # Determine target format.
-            fmt = file_format.get(filePath)
-            if fmt is None and source_path:
-                src = _normalize_path(source_path)
-                fmt = file_format.get(src)
+            # Determine target format, a moved file keeps the one of its
+            # source, not the one of the file it replaces.
+            fmt = None
+            if source_path:
+                fmt = file_format.get(_normalize_path(source_path))
+            if fmt is None:
+                fmt = file_format.get(filePath)
 
             if fmt is None and os.path.isfile(absPath):
                 # Patch may write without ever having opened the file.
@@ -731,8 +1005,9 @@ class ApplyPatchTool(Tool):
                     f.write(bom)
                 f.write(payload)
 
-            # Update cache to reflect what we just wrote.
-            file_format[filePath] = (bom, encoding)
+            # Cache the format of a new file, a replaced one is restored
+            # with its own format on rollback.
+            file_format.setdefault(filePath, (bom, encoding))
 
         def _remove_file(path):
             # type: (str) -> None
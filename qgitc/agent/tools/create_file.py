@@ -3,7 +3,7 @@
 import os
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import Tool, ToolContext, ToolFootprint, ToolResult, footprintPath
 
 
 class CreateFileTool(Tool):
@@ -17,6 +17,10 @@ class CreateFileTool(Tool):
     def isReadOnly(self):
         return False
 
+    def footprint(self, input_data, context):
+        return ToolFootprint.make(writes=[footprintPath(
+            input_data.get("filePath"), context.working_directory)])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         filePath = input_data.get("filePath")
         if not filePath:
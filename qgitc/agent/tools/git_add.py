@@ -2,7 +2,15 @@
 
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import (
+    GIT_STATE,
+    WORKTREE,
+    Tool,
+    ToolContext,
+    ToolFootprint,
+    ToolResult,
+    footprintPath,
+)
 from qgitc.agent.tools.utils import runGit
 
 
@@ -10,6 +18,12 @@ class GitAddTool(Tool):
     name = "git_add"
     description = "Add file contents to the index"
 
+    def footprint(self, input_data, context):
+        files = input_data.get("files") or [WORKTREE]
+        return ToolFootprint.make(
+            reads=[footprintPath(f, context.working_directory) for f in files],
+            writes=[GIT_STATE])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         files = input_data.get("files")
         if not files:
@@ -2,7 +2,14 @@
 
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import (
+    GIT_STATE,
+    Tool,
+    ToolContext,
+    ToolFootprint,
+    ToolResult,
+    footprintPath,
+)
 from qgitc.agent.tools.utils import runGit
 
 
@@ -16,6 +23,20 @@ class GitBlameTool(Tool):
     def isReadOnly(self):
         return True
 
+    def isCacheable(self):
+        return True
+
+    def readsWorktree(self, input_data):
+        # without a revision, local changes are blamed too
+        return not input_data.get("rev")
+
+    def footprint(self, input_data, context):
+        reads = [GIT_STATE]
+        if self.readsWorktree(input_data):
+            reads.append(footprintPath(
+                input_data.get("path"), context.working_directory))
+        return ToolFootprint.make(reads=reads)
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         path = input_data.get("path")
         if not path:
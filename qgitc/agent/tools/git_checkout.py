@@ -2,7 +2,14 @@
 
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import (
+    GIT_STATE,
+    WORKTREE,
+    Tool,
+    ToolContext,
+    ToolFootprint,
+    ToolResult,
+)
 from qgitc.agent.tools.utils import runGit
 
 
@@ -10,6 +17,9 @@ class GitCheckoutTool(Tool):
     name = "git_checkout"
     description = "Switch branches"
 
+    def footprint(self, input_data, context):
+        return ToolFootprint.make(writes=[GIT_STATE, WORKTREE])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         branch = input_data.get("branch")
         if not branch:
@@ -2,7 +2,7 @@
 
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import GIT_STATE, Tool, ToolContext, ToolFootprint, ToolResult
 from qgitc.agent.tools.utils import runGit
 
 
@@ -10,6 +10,9 @@ class GitCommitTool(Tool):
     name = "git_commit"
     description = "Record changes to the repository"
 
+    def footprint(self, input_data, context):
+        return ToolFootprint.make(writes=[GIT_STATE])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         message = input_data.get("message")
         if not message:
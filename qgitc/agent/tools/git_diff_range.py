@@ -2,7 +2,15 @@
 
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import (
+    GIT_STATE,
+    WORKTREE,
+    Tool,
+    ToolContext,
+    ToolFootprint,
+    ToolResult,
+    footprintPath,
+)
 from qgitc.agent.tools.utils import runGit
 
 
@@ -16,6 +24,20 @@ class GitDiffRangeTool(Tool):
     def isReadOnly(self):
         return True
 
+    def isCacheable(self):
+        return True
+
+    def readsWorktree(self, input_data):
+        # a single revision is compared with the working tree
+        return ".." not in (input_data.get("rev") or "")
+
+    def footprint(self, input_data, context):
+        reads = [GIT_STATE]
+        if self.readsWorktree(input_data):
+            files = input_data.get("files") or [WORKTREE]
+            reads += [footprintPath(f, context.working_directory) for f in files]
+        return ToolFootprint.make(reads=reads)
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         rev = input_data.get("rev", "")
         files = input_data.get("files")
@@ -2,7 +2,7 @@
 
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import GIT_STATE, Tool, ToolContext, ToolFootprint, ToolResult
 from qgitc.agent.tools.utils import runGit
 
 
@@ -13,6 +13,9 @@ class GitDiffStagedTool(Tool):
     def isReadOnly(self):
         return True
 
+    def footprint(self, input_data, context):
+        return ToolFootprint.make(reads=[GIT_STATE])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         name_only = input_data.get("nameOnly", False)
         files = input_data.get("files")
@@ -2,7 +2,15 @@
 
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import (
+    GIT_STATE,
+    WORKTREE,
+    Tool,
+    ToolContext,
+    ToolFootprint,
+    ToolResult,
+    footprintPath,
+)
 from qgitc.agent.tools.utils import runGit
 
 
@@ -13,6 +21,11 @@ class GitDiffUnstagedTool(Tool):
     def isReadOnly(self):
         return True
 
+    def footprint(self, input_data, context):
+        files = input_data.get("files") or [WORKTREE]
+        return ToolFootprint.make(
+            reads=[GIT_STATE] + [footprintPath(f, context.working_directory) for f in files])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         name_only = input_data.get("nameOnly", False)
         files = input_data.get("files")
@@ -2,7 +2,14 @@
 
 from typing import Any, Dict
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import (
+    GIT_STATE,
+    WORKTREE,
+    Tool,
+    ToolContext,
+    ToolFootprint,
+    ToolResult,
+)
 from qgitc.agent.tools.utils import runGit
 
 
@@ -13,6 +20,15 @@ class GitStatusTool(Tool):
     def isReadOnly(self):
         return True
 
+    def isCacheable(self):
+        return True
+
+    def readsWorktree(self, input_data):
+        return True
+
+    def footprint(self, input_data, context):
+        return ToolFootprint.make(reads=[GIT_STATE, WORKTREE])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         args = ["status", "--porcelain=v1", "-b"]
 
@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 
+import mmap
 import os
 import re
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Tuple
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import WORKTREE, Tool, ToolContext, ToolFootprint, ToolResult
 from qgitc.agent.tools.utils import detectBom, runGitRaw
-from qgitc.common import decodeFileData
+from qgitc.common import decodeFileData, logger
+from qgitc.gitutils import GitProcess
 
 
 def _isGitRepo(repoDir: str) -> bool:
@@ -157,127 +163,558 @@ def _iterRepoFiles(repoDir: str, includePattern: Optional[str], includeIgnoredFi
     return True, "", files
 
 
-def grepSearch(
-    *,
-    repoDir: str,
-    query: str,
-    isRegexp: bool,
-    includeIgnoredFiles: bool = False,
-    includePattern: Optional[str] = None,
-    maxResults: int = 30,
-) -> str:
-    """Search for text across files in a repository.
+# Skip very large files for responsiveness
+_MAX_FILE_BYTES = 5 * 1024 * 1024
 
-    Returns a human-readable multi-line string:
-    - Each match line: `path/to/file:line: <line text>`
-    - Summary footer with counts and truncation flag.
+# Max line length shown in the results
+_MAX_LINE_CHARS = 400
 
-    Notes:
-    - Search is case-insensitive for both plain and regexp.
-    - Skips obvious binary files and very large files for responsiveness.
-    """
+_regexSpecial_re = re.compile(r"[.^$*+?{}\[\]\\|()]")
 
-    if not query:
-        raise ValueError("query must be a non-empty string")
 
-    ok, msg, files = _iterRepoFiles(
-        repoDir, includePattern, includeIgnoredFiles)
-    if not ok:
-        raise ValueError(msg)
+class _Matcher:
+    """Line matcher shared by the git grep and the fallback scanner."""
 
-    if maxResults < 1:
-        maxResults = 1
+    def __init__(self, query: str, isRegexp: bool):
+        self.query = query
+        self.isRegexp = isRegexp
+        self.regex = None
+        self.needle = None
+        if isRegexp:
+            try:
+                self.regex = re.compile(query, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid regex: {e}")
+        else:
+            self.needle = query.casefold()
+
+        # A regex without special chars is a plain string as well
+        literal = query
+        if isRegexp and _regexSpecial_re.search(query):
+            literal = None
+
+        # ASCII literals can be checked on the raw bytes (ASCII case folding)
+        self.literalBytes = None
+        self.bytesFilter = None
+        if literal and literal.isascii() and "\n" not in literal:
+            self.literalBytes = literal.lower().encode("ascii")
+            self.bytesFilter = re.compile(
+                re.escape(self.literalBytes), re.IGNORECASE)
+
+    def match(self, line: str) -> bool:
+        if self.regex is not None:
+            return self.regex.search(line) is not None
+        return self.needle in line.casefold()
+
+
+def _shownLine(line: str):
+    if len(line) > _MAX_LINE_CHARS:
+        return line[:_MAX_LINE_CHARS] + "…"
+    return line
+
+
+def _trigrams(data: bytes) -> Set[int]:
+    return {(a << 16) | (b << 8) | c
+            for a, b, c in zip(data, data[1:], data[2:])}
+
+
+_TRIGRAM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trigrams (
+    root TEXT NOT NULL,
+    rel TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    nbits INTEGER NOT NULL,
+    bits BLOB NOT NULL,
+    PRIMARY KEY (root, rel)
+) WITHOUT ROWID;
+"""
+
+
+class TrigramIndex:
+    """Per file trigram bloom filters of a directory tree.
+
+    An entry is only valid for the (mtime, size) of the file it was built
+    from, so any modification invalidates it. Entries are kept in memory
+    across searches and persisted, keyed by the tree root, to the SQLite
+    database at @path (if any), they let the scanner skip files that cannot
+    contain a literal query without reading them.
+    """
 
-    regex = None
-    needle = None
-    if isRegexp:
+    VERSION = 1
+
+    # Bloom filter bits per trigram and the filter size bounds
+    BITS_PER_TRIGRAM = 4
+    MIN_BITS = 64
+    MAX_BITS = 1 << 16
+
+    def __init__(self, root: str, path: Optional[str] = None):
+        self._root = root
+        self._path = path
+        # rel path -> (mtime_ns, size, nbits, bits), nbits is 0 for files
+        # that are always scanned and -1 for binary files
+        self._entries: Dict[str, Tuple[int, int, int, int]] = {}
+        self._lock = threading.Lock()
+        # entries to write to or delete from the database
+        self._changed: Set[str] = set()
+        self._removed: Set[str] = set()
+        # files to index in the background, rel path -> abs path
+        self._pending: Dict[str, str] = {}
+        self._builder: threading.Thread = None
+        self._load()
+
+    @staticmethod
+    def _hash(trigram: int, shift: int):
+        return ((trigram * 0x9E3779B1) & 0xFFFFFFFF) >> shift
+
+    @staticmethod
+    def _shift(nbits: int):
+        return 32 - (nbits.bit_length() - 1)
+
+    @staticmethod
+    def makeFilter(data: bytes) -> Tuple[int, int]:
+        """Return (nbits, bits) of the bloom filter for @data"""
+        trigrams = _trigrams(data.lower())
+        nbits = TrigramIndex.MIN_BITS
+        while nbits < len(trigrams) * TrigramIndex.BITS_PER_TRIGRAM \
+                and nbits < TrigramIndex.MAX_BITS:
+            nbits <<= 1
+
+        shift = TrigramIndex._shift(nbits)
+        bitmap = bytearray(nbits // 8)
+        for trigram in trigrams:
+            h = TrigramIndex._hash(trigram, shift)
+            bitmap[h >> 3] |= 1 << (h & 7)
+        return nbits, int.from_bytes(bitmap, "little")
+
+    def lookup(self, rel: str, mtime: int, size: int):
+        """Return the valid entry (nbits, bits) of @rel or None"""
+        entry = self._entries.get(rel)
+        if entry is None or entry[0] != mtime or entry[1] != size:
+            return None
+        return entry[2], entry[3]
+
+    def update(self, rel: str, mtime: int, size: int, nbits: int, bits: int = 0):
+        with self._lock:
+            self._entries[rel] = (mtime, size, nbits, bits)
+            self._changed.add(rel)
+            self._removed.discard(rel)
+
+    def schedule(self, rel: str, absPath: str):
+        """Build the entry of @rel later, see `buildPending`"""
+        with self._lock:
+            self._pending[rel] = absPath
+
+    def buildPending(self):
+        """Build the scheduled entries in a background thread so that the
+        search that found them isn't slowed down, then save the index"""
+        with self._lock:
+            if self._builder is not None:
+                return
+            if not self._pending and not self._changed and not self._removed:
+                return
+            self._builder = threading.Thread(
+                target=self._build, name="TrigramIndexBuilder", daemon=True)
+            self._builder.start()
+
+    def waitForBuilder(self, timeout: float = None):
+        builder = self._builder
+        if builder is not None:
+            builder.join(timeout)
+
+    def _build(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._builder = None
+                    break
+                rel, absPath = self._pending.popitem()
+            try:
+                st = os.stat(absPath)
+                with open(absPath, "rb") as f:
+                    data = f.read(_MAX_FILE_BYTES + 1)
+            except OSError:
+                continue
+            if len(data) != st.st_size:
+                continue
+            self.update(rel, st.st_mtime_ns, st.st_size,
+                        *TrigramIndex.makeFilter(data))
+
+        self.save()
+
+    def makeQuery(self, literal: bytes):
+        """Return a predicate telling if a filter may contain @literal"""
+        trigrams = _trigrams(literal)
+        masks: Dict[int, int] = {}
+
+        def _mayContain(nbits: int, bits: int):
+            mask = masks.get(nbits)
+            if mask is None:
+                shift = TrigramIndex._shift(nbits)
+                mask = 0
+                for trigram in trigrams:
+                    mask |= 1 << TrigramIndex._hash(trigram, shift)
+                masks[nbits] = mask
+            return (bits & mask) == mask
+
+        return _mayContain
+
+    def prune(self, listed: Set[str]):
+        """Drop the entries of deleted files, @listed ones are known to exist"""
+        with self._lock:
+            stale = [rel for rel in self._entries if rel not in listed
+                     and not os.path.isfile(os.path.join(self._root, rel))]
+            for rel in stale:
+                del self._entries[rel]
+                self._changed.discard(rel)
+                self._removed.add(rel)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        conn = sqlite3.connect(self._path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != TrigramIndex.VERSION:
+            conn.execute("DROP TABLE IF EXISTS trigrams")
+            conn.execute(f"PRAGMA user_version = {TrigramIndex.VERSION}")
+        conn.executescript(_TRIGRAM_SCHEMA)
+        return conn
+
+    def _load(self):
+        if not self._path or not os.path.isfile(self._path):
+            return
         try:
-            regex = re.compile(query, re.IGNORECASE)
-        except re.error as e:
-            raise ValueError(f"Invalid regex: {e}")
-    else:
-        needle = query.casefold()
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT rel, mtime, size, nbits, bits FROM trigrams"
+                    " WHERE root = ?", (self._root,)).fetchall()
+            finally:
+                conn.close()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Failed to load the trigram index %s: %s",
+                           self._path, e)
+            return
+
+        self._entries = {rel: (mtime, size, nbits, int.from_bytes(bits, "little"))
+                         for rel, mtime, size, nbits, bits in rows}
+
+    def save(self):
+        with self._lock:
+            if not self._path or not (self._changed or self._removed):
+                return
+            rows = []
+            for rel in self._changed:
+                mtime, size, nbits, bits = self._entries[rel]
+                data = bits.to_bytes(nbits // 8, "little") if nbits > 0 else b""
+                rows.append((self._root, rel, mtime, size, nbits, data))
+            removed = [(self._root, rel) for rel in self._removed]
+            self._changed = set()
+            self._removed = set()
 
-    results: List[str] = []
-    matched_files: Set[str] = set()
-    scannedFiles = 0
-    skippedFiles = 0
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "DELETE FROM trigrams WHERE root = ? AND rel = ?", removed)
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO trigrams"
+                        " (root, rel, mtime, size, nbits, bits)"
+                        " VALUES (?, ?, ?, ?, ?, ?)", rows)
+            finally:
+                conn.close()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Failed to save the trigram index %s: %s",
+                           self._path, e)
+
+
+_indexes: Dict[str, TrigramIndex] = {}
+_indexesLock = threading.Lock()
+
+
+# Database of the trigram indexes, see `setTrigramIndexFile`
+_indexFile: Optional[str] = None
+
+
+def setTrigramIndexFile(path: Optional[str]):
+    """Persist the trigram indexes of the git repos to the database at
+    @path, they are only kept in memory without it"""
+    global _indexFile
+    _indexFile = path if path != ":memory:" else None
+
+
+def _indexPath(repoDir: str) -> Optional[str]:
+    """The trigram index of a git repo is persisted, other trees only get
+    an in-memory one"""
+    if not _indexFile or not _isGitRepo(repoDir):
+        return None
+    return _indexFile
+
+
+def trigramIndex(repoDir: str) -> TrigramIndex:
+    """Return the shared trigram index of @repoDir"""
+    root = os.path.abspath(repoDir)
+    with _indexesLock:
+        index = _indexes.get(root)
+        if index is None:
+            index = TrigramIndex(root, _indexPath(root))
+            _indexes[root] = index
+    return index
+
+
+def _gitPathspec(repoDir: str, includePattern: Optional[str]):
+    """Return ([pathspec], ok), ok is False when git can't express it"""
+    pattern = (includePattern or "").strip()
+    if not pattern:
+        return [], True
+
+    pat = pattern.lstrip("/\\")
+    if os.path.isabs(pat):
+        try:
+            pat = os.path.relpath(pat, repoDir)
+        except Exception:
+            return [], False
 
-    maxFileBytes = 5 * 1024 * 1024  # 5MB
-    repoRoot = os.path.abspath(repoDir)
+    pat = pat.replace("\\", "/")
+    if pat == ".." or pat.startswith("../"):
+        return [], False
+    return [f":(glob){pat}"], True
 
-    for absPath in files:
-        if len(results) >= maxResults:
-            break
 
-        try:
-            absPath2 = os.path.abspath(absPath)
-            if os.path.commonpath([repoRoot, absPath2]) != repoRoot:
-                skippedFiles += 1
-                continue
+def _gitGrep(repoDir: str, matcher: _Matcher, pathspec: List[str], maxResults: int):
+    """Search with `git grep` (tracked and untracked, not ignored files).
 
-            if not os.path.isfile(absPath2):
+    Returns the list of (rel, lineNo, line) or None if git can't run the
+    search, the output is streamed and git is stopped at @maxResults."""
+    args = ["grep", "-z", "-n", "-I", "-i", "--untracked", "--no-color"]
+    if not matcher.isRegexp:
+        args.append("-F")
+    else:
+        # Closest to the Python regex syntax
+        args.append("-P")
+    args += ["-e", matcher.query, "--"] + pathspec
+
+    try:
+        # stderr is not read until git exits, it must not fill up a pipe
+        process = GitProcess(repoDir, args, stderr=subprocess.DEVNULL)
+    except Exception:
+        return None
+
+    results: List[Tuple[str, int, str]] = []
+    stopped = False
+    try:
+        for raw in process.process.stdout:
+            parts = raw.rstrip(b"\n").split(b"\x00", 2)
+            if len(parts) != 3:
                 continue
-
+            rel = parts[0].decode("utf-8", errors="replace")
             try:
-                size = os.path.getsize(absPath2)
-            except Exception:
-                size = 0
-
-            if size and size > maxFileBytes:
-                skippedFiles += 1
+                lineNo = int(parts[1])
+            except ValueError:
                 continue
+            data = parts[2].rstrip(b"\r")
+            try:
+                line = data.decode("utf-8")
+            except UnicodeDecodeError:
+                line = decodeFileData(data)[0]
+            results.append((rel, lineNo, line))
+            if len(results) >= maxResults:
+                stopped = True
+                process.process.kill()
+                break
+    finally:
+        process.communicate()
+
+    # 1 means no match
+    if not stopped and process.returncode not in (0, 1):
+        logger.debug("git grep failed with exit code %s", process.returncode)
+        return None
+    return results
+
+
+def _scanFile(absPath: str, rel: str, matcher: _Matcher, index: TrigramIndex, mayContain, maxResults: int):
+    """Search a single file, returns (scanned, skipped, matches)"""
+    try:
+        st = os.stat(absPath)
+    except OSError:
+        return False, True, []
+
+    if st.st_size > _MAX_FILE_BYTES:
+        return False, True, []
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    entry = index.lookup(rel, *stamp)
+    if entry is not None:
+        nbits, bits = entry
+        if nbits < 0:
+            return False, True, []
+        if nbits > 0 and mayContain is not None and not mayContain(nbits, bits):
+            return True, False, []
+
+    bom, preferEncoding = detectBom(absPath)
+    # Byte level checks need an ASCII compatible encoding
+    asciiCompatible = bom is None or bom == b"\xef\xbb\xbf"
+
+    with open(absPath, "rb") as f:
+        if st.st_size == 0:
+            data = b""
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm.find(b"\x00", 0, 8192) != -1:
+                    index.update(rel, *stamp, -1)
+                    return False, True, []
+                if entry is None:
+                    if asciiCompatible:
+                        index.schedule(rel, absPath)
+                    else:
+                        index.update(rel, *stamp, 0)
+                if asciiCompatible and matcher.bytesFilter is not None \
+                        and not matcher.bytesFilter.search(mm):
+                    return True, False, []
+                data = mm[:]
+
+    text, _ = decodeFileData(data, preferEncoding)
+    matches: List[Tuple[str, int, str]] = []
+    # number the lines as git grep and read_file do, splitting on LF only
+    lines = text.split("\n")
+    if not lines[-1]:
+        lines.pop()
+    for idx, line in enumerate(lines, start=1):
+        line = line.rstrip("\r")
+        if matcher.match(line):
+            matches.append((rel, idx, line))
+            if len(matches) >= maxResults:
+                break
+    return True, False, matches
+
+
+def _scanFiles(repoDir: str, files: List[str], matcher: _Matcher, maxResults: int):
+    """Scan @files concurrently, in order, stopping at @maxResults.
+
+    Returns (results, scannedFiles, skippedFiles)"""
+    repoRoot = os.path.abspath(repoDir)
+    index = trigramIndex(repoRoot)
+    mayContain = None
+    if matcher.literalBytes is not None and len(matcher.literalBytes) >= 3:
+        mayContain = index.makeQuery(matcher.literalBytes)
 
-            with open(absPath2, 'rb') as f:
-                data = f.read()
-
-            if b'\x00' in data[:8192]:
+    candidates: List[Tuple[str, str]] = []
+    skippedFiles = 0
+    for absPath in files:
+        absPath = os.path.abspath(absPath)
+        try:
+            if os.path.commonpath([repoRoot, absPath]) != repoRoot:
                 skippedFiles += 1
                 continue
+        except ValueError:
+            skippedFiles += 1
+            continue
+        if not os.path.isfile(absPath):
+            continue
+        rel = os.path.relpath(absPath, repoRoot).replace('\\', '/')
+        candidates.append((absPath, rel))
 
-            preferEncoding = detectBom(absPath2)[1]
-            text, _ = decodeFileData(data, preferEncoding)
-            scannedFiles += 1
-
-            rel = os.path.relpath(absPath2, repoRoot).replace('\\', '/')
+    results: List[Tuple[str, int, str]] = []
+    scannedFiles = 0
 
-            for idx, line in enumerate(text.splitlines(), start=1):
+    def _scan(candidate):
+        try:
+            return _scanFile(candidate[0], candidate[1], matcher,
+                             index, mayContain, maxResults)
+        except Exception:
+            return False, True, []
+
+    # Files are submitted in small windows so that we can stop early
+    workers = min(8, (os.cpu_count() or 1) * 2)
+    window = workers * 4
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(candidates), window):
+            batch = candidates[start:start + window]
+            for scanned, skipped, matches in executor.map(_scan, batch):
+                scannedFiles += scanned
+                skippedFiles += skipped
+                results.extend(matches[:maxResults - len(results)])
                 if len(results) >= maxResults:
                     break
+            if len(results) >= maxResults:
+                break
 
-                if regex is not None:
-                    found = regex.search(line) is not None
-                else:
-                    found = needle in line.casefold()
+    if len(results) < maxResults:
+        index.prune({rel for _, rel in candidates})
+    index.buildPending()
+    return results, scannedFiles, skippedFiles
 
-                if not found:
-                    continue
 
-                matched_files.add(rel)
+def grepSearch(
+    *,
+    repoDir: str,
+    query: str,
+    isRegexp: bool,
+    includeIgnoredFiles: bool = False,
+    includePattern: Optional[str] = None,
+    maxResults: int = 30,
+) -> str:
+    """Search for text across files in a repository.
 
-                shown = line
-                if len(shown) > 400:
-                    shown = shown[:400] + "…"
+    Returns a human-readable multi-line string:
+    - Each match line: `path/to/file:line: <line text>`
+    - Summary footer with counts and truncation flag.
 
-                results.append(f"{rel}:{idx}: {shown}")
+    Notes:
+    - Search is case-insensitive for both plain and regexp.
+    - Git repos are searched with `git grep`, other trees (or searches
+      git can't run) by a multi-threaded scanner using a trigram index.
+    - Skips obvious binary files and very large files for responsiveness.
+    """
 
-        except Exception:
-            skippedFiles += 1
-            continue
+    if not query:
+        raise ValueError("query must be a non-empty string")
+
+    if not repoDir:
+        raise ValueError("No repository is currently opened.")
+    if not os.path.isdir(repoDir):
+        raise ValueError(f"Invalid repoDir: {repoDir}")
+
+    if maxResults < 1:
+        maxResults = 1
+
+    matcher = _Matcher(query, isRegexp)
+
+    results = None
+    scannedFiles = None
+    skippedFiles = None
+    if not includeIgnoredFiles and _isGitRepo(repoDir):
+        pathspec, ok = _gitPathspec(repoDir, includePattern)
+        if ok:
+            results = _gitGrep(repoDir, matcher, pathspec, maxResults)
+
+    if results is None:
+        ok, msg, files = _iterRepoFiles(
+            repoDir, includePattern, includeIgnoredFiles)
+        if not ok:
+            raise ValueError(msg)
+        results, scannedFiles, skippedFiles = _scanFiles(
+            repoDir, files, matcher, maxResults)
 
     if not results:
         return "No matches found."
 
+    lines = [f"{rel}:{idx}: {_shownLine(line)}" for rel, idx, line in results]
+    matchedFiles = {rel for rel, _, _ in results}
+
     truncated = len(results) >= maxResults
-    summary = (
-        f"\n\nMatches: {len(results)}"
-        f" | Files: {len(matched_files)}"
-        f" | Scanned files: {scannedFiles}"
-        f" | Skipped files: {skippedFiles}"
-        + (" | Truncated: true" if truncated else "")
-    )
+    summary = f"\n\nMatches: {len(results)} | Files: {len(matchedFiles)}"
+    # Unknown when git did the search
+    if scannedFiles is not None:
+        summary += f" | Scanned files: {scannedFiles}" \
+            f" | Skipped files: {skippedFiles}"
+    if truncated:
+        summary += " | Truncated: true"
 
-    return "\n".join(results) + summary
+    return "\n".join(lines) + summary
 
 
 class GrepSearchTool(Tool):
@@ -295,6 +732,9 @@ class GrepSearchTool(Tool):
     def isReadOnly(self):
         return True
 
+    def footprint(self, input_data, context):
+        return ToolFootprint.make(reads=[WORKTREE])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         query = input_data.get("query")
         if not query:
@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import bisect
 import json
+import mmap
 import os
-from typing import Any, Dict, Optional, Tuple
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import Tool, ToolContext, ToolFootprint, ToolResult, footprintPath
 from qgitc.agent.tools.utils import detectBom
 from qgitc.common import decodeFileData
 
@@ -59,20 +63,182 @@ def resolveRepoPath(repoDir: str, filePath: str) -> Tuple[bool, str]:
     return True, absPath
 
 
+# Files from this size on are read by line ranges through a `LineIndex`
+LINE_INDEX_MIN_BYTES = 1024 * 1024
+
+# Bytes sampled to detect the encoding of an indexed file
+_ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# Line indexes kept for the session
+_MAX_LINE_INDEXES = 32
+
+
+def _isAsciiCompatible(encoding: str):
+    name = (encoding or "").lower().replace("_", "-")
+    return not name.startswith(("utf-16", "utf16", "utf-32", "utf32"))
+
+
+class LineIndex:
+    """Sparse line offsets of a file, to read line ranges without decoding
+    (or even reading) the whole file.
+
+    The number of line breaks before every `CHECKPOINT_BYTES` block is
+    recorded, a line is then located by scanning a single block. Lines are
+    split on LF only, as `_splitLines` does for the smaller files.
+    """
+
+    CHECKPOINT_BYTES = 256 * 1024
+
+    def __init__(self, path: str, mtime: int, size: int, encoding: str, bomSize: int):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.encoding = encoding
+        self.bomSize = bomSize
+        # line breaks before each block
+        self.checkpoints: List[int] = []
+        self.totalLines = 0
+
+    @staticmethod
+    def build(path: str) -> Optional["LineIndex"]:
+        """Index @path, None if its encoding is not ASCII compatible"""
+        st = os.stat(path)
+        bom, preferEncoding = detectBom(path)
+        if not _isAsciiCompatible(preferEncoding):
+            return None
+
+        bomSize = len(bom) if bom else 0
+        if preferEncoding == "utf-8-sig":
+            preferEncoding = "utf-8"
+
+        with open(path, "rb") as f:
+            if st.st_size == 0:
+                return LineIndex(path, st.st_mtime_ns, 0, preferEncoding, 0)
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # cut the sample at a line break to not split a character
+                sample = mm[bomSize:_ENCODING_SAMPLE_BYTES]
+                pos = sample.rfind(b"\n")
+                if pos != -1 and len(mm) > _ENCODING_SAMPLE_BYTES:
+                    sample = sample[:pos + 1]
+                _, encoding = decodeFileData(sample, preferEncoding)
+                encoding = encoding or preferEncoding
+                if not _isAsciiCompatible(encoding):
+                    return None
+
+                index = LineIndex(path, st.st_mtime_ns,
+                                  len(mm), encoding, bomSize)
+                lineBreaks = 0
+                for offset in range(0, len(mm), LineIndex.CHECKPOINT_BYTES):
+                    index.checkpoints.append(lineBreaks)
+                    lineBreaks += mm[offset:offset +
+                                     LineIndex.CHECKPOINT_BYTES].count(b"\n")
+
+                index.totalLines = lineBreaks
+                if mm[-1:] != b"\n":
+                    index.totalLines += 1
+        return index
+
+    def isValid(self, st: os.stat_result):
+        return self.mtime == st.st_mtime_ns and self.size == st.st_size
+
+    def _lineOffset(self, mm: mmap.mmap, lineNo: int):
+        """Byte offset where the 1-based @lineNo starts"""
+        if lineNo <= 1:
+            return self.bomSize
+        if lineNo > self.totalLines:
+            return self.size
+
+        # the (lineNo - 1)th line break ends the previous line
+        lineBreak = lineNo - 1
+        block = bisect.bisect_left(self.checkpoints, lineBreak) - 1
+        offset = block * LineIndex.CHECKPOINT_BYTES
+        for _ in range(lineBreak - self.checkpoints[block]):
+            offset = mm.find(b"\n", offset) + 1
+        return offset
+
+    def read(self, startLine: int, endLine: int) -> str:
+        """Return the lines [@startLine, @endLine] (1-based) with their
+        line endings"""
+        if self.size == 0 or endLine < startLine:
+            return ""
+
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                begin = self._lineOffset(mm, startLine)
+                end = self._lineOffset(mm, endLine + 1)
+                data = mm[begin:end]
+        return data.decode(self.encoding, errors="replace")
+
+
+_lineIndexes: "OrderedDict[str, LineIndex]" = OrderedDict()
+_lineIndexesLock = threading.Lock()
+
+
+def lineIndex(absPath: str) -> Optional[LineIndex]:
+    """Return the cached line index of @absPath, rebuilt when the file
+    changed"""
+    st = os.stat(absPath)
+    with _lineIndexesLock:
+        index = _lineIndexes.get(absPath)
+        if index is not None and index.isValid(st):
+            _lineIndexes.move_to_end(absPath)
+            return index
+
+    index = LineIndex.build(absPath)
+    if index is None:
+        return None
+
+    with _lineIndexesLock:
+        _lineIndexes[absPath] = index
+        _lineIndexes.move_to_end(absPath)
+        while len(_lineIndexes) > _MAX_LINE_INDEXES:
+            _lineIndexes.popitem(last=False)
+    return index
+
+
+def _splitLines(text: str) -> List[str]:
+    """Split @text on LF only, keeping the line endings.
+
+    Unlike `str.splitlines`, CR, form feeds and the Unicode line separators
+    do not end a line, so a file has the same lines as with `LineIndex`.
+    """
+    lines = [line + "\n" for line in text.split("\n")]
+    # the last line has no LF, it is empty if the text ends with one
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def _readLines(absPath: str, startLine: int, endLine: Optional[int]) -> Tuple[int, str]:
+    """Return (totalLines, content of lines [startLine, endLine])"""
+    index = None
+    if os.path.getsize(absPath) >= LINE_INDEX_MIN_BYTES:
+        index = lineIndex(absPath)
+
+    if index is not None:
+        totalLines = index.totalLines
+        if endLine is None or endLine > totalLines:
+            endLine = totalLines
+        return totalLines, index.read(startLine, endLine)
+
+    with open(absPath, 'rb') as f:
+        data = f.read()
+
+    preferEncoding = detectBom(absPath)[1]
+    text, _ = decodeFileData(data, preferEncoding)
+    lines = _splitLines(text)
+    return len(lines), ''.join(lines[startLine - 1:endLine])
+
+
 def buildReadFileOutput(absPath: str, startLine: Optional[int], endLine: Optional[int]) -> Tuple[bool, str]:
     """Read a file and return tool output with metadata delimiters.
 
-    startLine/endLine are 1-based; endLine is inclusive.
+    startLine/endLine are 1-based; endLine is inclusive. Large files are
+    read by line ranges, see `LineIndex`.
     """
     try:
-        with open(absPath, 'rb') as f:
-            data = f.read()
-
-        preferEncoding = detectBom(absPath)[1]
-        text, _ = decodeFileData(data, preferEncoding)
-        lines = text.splitlines(keepends=True)
-
-        totalLines = len(lines)
         requestedStartLine = startLine
         requestedEndLine = endLine
 
@@ -85,17 +251,19 @@ def buildReadFileOutput(absPath: str, startLine: Optional[int], endLine: Optiona
         if effectiveStartLine < 1:
             effectiveStartLine = 1
 
+        readEndLine = requestedEndLine
+        if readEndLine is not None and readEndLine < 0:
+            readEndLine = 0
+
+        totalLines, content = _readLines(
+            absPath, effectiveStartLine, readEndLine)
+
         effectiveEndLine = requestedEndLine if requestedEndLine is not None else totalLines
         if effectiveEndLine < 0:
             effectiveEndLine = 0
         if effectiveEndLine > totalLines:
             effectiveEndLine = totalLines
 
-        startIndex = max(effectiveStartLine - 1, 0)
-        endIndex = max(effectiveEndLine, 0)
-        selectedLines = lines[startIndex:endIndex]
-        content = ''.join(selectedLines)
-
         meta = {
             "path": absPath,
             "totalLines": totalLines,
@@ -121,6 +289,11 @@ class ReadFileTool(Tool):
     def isReadOnly(self):
         return True
 
+    def footprint(self, input_data, context):
+        return ToolFootprint.make(reads=[footprintPath(
+            normalizeToolFilePath(input_data.get("filePath", "")),
+            context.working_directory)])
+
     def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
         filePath = normalizeToolFilePath(input_data.get("filePath", ""))
         if not filePath:
@@ -28,6 +28,23 @@ def detectBom(path: str) -> Tuple[Optional[bytes], str]:
     return None, 'utf-8'
 
 
+def findGitDir(repoDir: str) -> Optional[str]:
+    """Return the git dir of the repo rooted at repoDir, following the
+    `.git` file of worktrees and submodules."""
+    gitPath = os.path.join(repoDir, ".git")
+    if os.path.isdir(gitPath):
+        return gitPath
+    try:
+        with open(gitPath, "r", encoding="utf-8") as f:
+            line = f.readline().strip()
+    except Exception:
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    gitDir = line[len("gitdir:"):].strip()
+    return os.path.normpath(os.path.join(repoDir, gitDir))
+
+
 def _makeError(msg: str, text: bool) -> Union[bytes, str]:
     if text:
         return msg
@@ -3,7 +3,7 @@
 import re
 from typing import Dict, List, Optional, Tuple
 
-from PySide6.QtCore import QEvent, QPoint, QPointF, QRectF, Qt, Signal
+from PySide6.QtCore import QEvent, QPoint, QPointF, QRectF, Qt, QTimer, Signal
 from PySide6.QtGui import (
     QColor,
     QFont,
@@ -95,11 +95,23 @@ class AiChatbot(QPlainTextEdit):
     toolConfirmationApproved = Signal(str, dict, str)
     toolConfirmationRejected = Signal(str, str)  # tool_name, tool_call_id
 
+    # Emitted after buffered stream deltas were rendered
+    deltasFlushed = Signal()
+
+    # Max delay (ms) before buffered stream deltas are rendered
+    FLUSH_INTERVAL = 30
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self._highlighter = AiChatBotHighlighter(self.document())
         self.setReadOnly(True)
 
+        self._pendingDeltas: List[str] = []
+        self._flushTimer = QTimer(self)
+        self._flushTimer.setSingleShot(True)
+        self._flushTimer.setInterval(AiChatbot.FLUSH_INTERVAL)
+        self._flushTimer.timeout.connect(self.flushDeltas)
+
         # Register text object interface for tool confirmations
         self._toolConfirmInterface = ToolConfirmationInterface(self)
         self.document().documentLayout().registerHandler(
@@ -149,12 +161,46 @@ class AiChatbot(QPlainTextEdit):
         super().keyPressEvent(event)
 
     def appendResponse(self, response: AiResponse, collapsed=False):
+        # Stream deltas arrive per token, buffer them and render at most
+        # once per `FLUSH_INTERVAL` so that the layout, the highlighter and
+        # the find results are updated once for a batch of tokens.
+        if response.is_delta and not response.first_delta:
+            if response.message:
+                self._pendingDeltas.append(response.message)
+                if not self._flushTimer.isActive():
+                    self._flushTimer.start()
+            return
+
+        self.flushDeltas()
+        self._appendResponse(response, collapsed)
+
+    def flushDeltas(self):
+        """Render the buffered stream deltas now"""
+        self._flushTimer.stop()
+        if not self._pendingDeltas:
+            return
+
+        response = AiResponse(message="".join(self._pendingDeltas))
+        response.is_delta = True
+        self._pendingDeltas.clear()
+
+        self._appendResponse(response)
+        self.deltasFlushed.emit()
+
+    def hasPendingDeltas(self):
+        return bool(self._pendingDeltas)
+
+    def _appendResponse(self, response: AiResponse, collapsed=False):
         cursor = self.textCursor()
         selectionStart = cursor.selectionStart()
         selectionEnd = cursor.selectionEnd()
         docLength = self.document().characterCount() - 1
         cursor.movePosition(QTextCursor.End)
 
+        # A single content change, the highlighter only goes through the
+        # blocks touched by this batch
+        startBlockNumber = cursor.blockNumber()
+        cursor.beginEditBlock()
         headerBlock = None
         if not response.is_delta or response.first_delta:
             headerBlock = self._insertHeaderBlock(
@@ -162,6 +208,7 @@ class AiChatbot(QPlainTextEdit):
             cursor.insertBlock()
 
         cursor.insertText(response.message)
+        cursor.endEditBlock()
 
         # If collapsed, hide all blocks that belong to this header
         if collapsed and headerBlock:
@@ -173,7 +220,11 @@ class AiChatbot(QPlainTextEdit):
             if activeHeader is not None:
                 headerData = self._headerData(activeHeader)
                 if headerData and headerData.collapsed:
-                    self._setBlockVisible(cursor.block(), False)
+                    # a batch of deltas may span several blocks
+                    block = cursor.block()
+                    while block.isValid() and block.blockNumber() >= startBlockNumber:
+                        self._setBlockVisible(block, False)
+                        block = block.previous()
 
         if selectionStart != selectionEnd and selectionEnd == docLength:
             newCursor = self.textCursor()
@@ -186,6 +237,7 @@ class AiChatbot(QPlainTextEdit):
             self._refreshFindResults(preserveSelection=True)
 
     def appendServiceUnavailable(self, errorMsg: str = None):
+        self.flushDeltas()
         cursor = self.textCursor()
         selectionStart = cursor.selectionStart()
         selectionEnd = cursor.selectionEnd()
@@ -219,7 +271,10 @@ class AiChatbot(QPlainTextEdit):
         return block
 
     def clear(self):
-        self._highlighter.clearDirtyBlocks()
+        self._flushTimer.stop()
+        self._pendingDeltas.clear()
+        if self._highlighter:
+            self._highlighter.clearDirtyBlocks()
         self._confirmations.clear()
         self._hoveredConfirmation = None
         self._hoveredHeaderPos = None
@@ -228,6 +283,7 @@ class AiChatbot(QPlainTextEdit):
         super().clear()
 
     def executeFind(self):
+        self.flushDeltas()
         if not self._findPanel:
             self._findPanel = FindPanel(self.viewport(), self)
             self._findPanel.findRequested.connect(self._onFindRequested)
@@ -651,6 +707,7 @@ class AiChatbot(QPlainTextEdit):
         Returns:
             Position where the confirmation was inserted
         """
+        self.flushDeltas()
         cursor = self.textCursor()
         selectionStart = cursor.selectionStart()
         selectionEnd = cursor.selectionEnd()
@@ -831,6 +888,7 @@ class AiChatbot(QPlainTextEdit):
         return block.position(), toggleRect.contains(pos)
 
     def _toggleCollapsed(self, headerPos: int):
+        self.flushDeltas()
         headerBlock = self.document().findBlock(headerPos)
         if not headerBlock.isValid() or self._headerRole(headerBlock) is None:
             return
@@ -934,6 +992,7 @@ class AiChatbot(QPlainTextEdit):
 
     def collapseLatestReasoningBlock(self):
         """Collapse the most recent assistant reasoning block (🧠 ...)."""
+        self.flushDeltas()
 
         doc = self.document()
         block = doc.lastBlock()
@@ -2,19 +2,37 @@
 
 import uuid
 from datetime import datetime
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 
 
 class AiChatHistory:
     def __init__(self, historyId: str = None, title: str = "", modelKey: str = "",
-                 modelId: str = "", messages: List[Dict] = None, timestamp: str = None):
+                 modelId: str = "", messages: List[Dict] = None, timestamp: str = None,
+                 loader: Callable[[str], List[Dict]] = None):
         self.historyId = historyId or str(uuid.uuid4())
         self.title = title
         self.modelKey = modelKey
         self.modelId = modelId
-        self.messages = messages or []
+        # messages are loaded by @loader on first access if not given
+        self._messages: Optional[List[Dict]] = messages
+        self._loader = loader if messages is None else None
         self.timestamp = timestamp or datetime.now().isoformat()
 
+    @property
+    def messages(self) -> List[Dict]:
+        if self._messages is None:
+            loader, self._loader = self._loader, None
+            self._messages = (loader(self.historyId) if loader else None) or []
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages: List[Dict]):
+        self._messages = messages or []
+        self._loader = None
+
+    def isLoaded(self) -> bool:
+        return self._messages is not None or self._loader is None
+
     def toDict(self):
         return {
             'historyId': self.historyId,
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional, Set
+
+from qgitc.aichathistory import AiChatHistory
+from qgitc.common import logger
+
+# Path of an in-memory database, used by tests
+MEMORY_DB = ":memory:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS histories (
+    historyId TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    modelKey TEXT NOT NULL DEFAULT '',
+    modelId TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL DEFAULT '',
+    messageCount INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    historyId TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (historyId, seq)
+) WITHOUT ROWID;
+"""
+
+
+def _dumpMessage(message: Dict) -> str:
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+class AiChatHistoryDb:
+    """SQLite storage of the chat histories.
+
+    Only the title, model and timestamp of the conversations are read when
+    listing them, the messages are loaded when a conversation is opened.
+    Saving a conversation only writes the messages that changed since the
+    last save, which usually means appending the new ones.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._conn = None  # type: Optional[sqlite3.Connection]
+        # historyId -> serialized messages as stored in the database
+        self._stored = {}  # type: Dict[str, List[str]]
+
+    def path(self) -> str:
+        return self._path
+
+    def isPersistent(self) -> bool:
+        return self._connection() is not None and self._path != MEMORY_DB
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None:
+            return self._conn
+
+        try:
+            if self._path != MEMORY_DB:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            conn = sqlite3.connect(self._path)
+            if self._path != MEMORY_DB:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Failed to open chat history database %s: %s",
+                           self._path, e)
+            # keep the histories of this session at least
+            self._path = MEMORY_DB
+            conn = sqlite3.connect(MEMORY_DB)
+            conn.executescript(_SCHEMA)
+
+        self._conn = conn
+        return conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._stored.clear()
+
+    def histories(self) -> List[AiChatHistory]:
+        """Non-empty histories, with their messages loaded on demand"""
+        rows = self._connection().execute(
+            "SELECT historyId, title, modelKey, modelId, timestamp"
+            " FROM histories WHERE messageCount > 0")
+        return [AiChatHistory(historyId=historyId, title=title,
+                              modelKey=modelKey, modelId=modelId,
+                              timestamp=timestamp or None,
+                              loader=self.messages)
+                for historyId, title, modelKey, modelId, timestamp in rows]
+
+    def historyIds(self) -> Set[str]:
+        """Ids of all the saved histories, empty ones included"""
+        rows = self._connection().execute("SELECT historyId FROM histories")
+        return {row[0] for row in rows}
+
+    def messages(self, historyId: str) -> List[Dict]:
+        stored = self._storedMessages(historyId)
+        messages = []
+        for data in stored:
+            try:
+                messages.append(json.loads(data))
+            except ValueError:
+                logger.warning("Invalid message in chat history %s",
+                               historyId)
+        return messages
+
+    def _storedMessages(self, historyId: str) -> List[str]:
+        stored = self._stored.get(historyId)
+        if stored is None:
+            rows = self._connection().execute(
+                "SELECT data FROM messages WHERE historyId = ? ORDER BY seq",
+                (historyId,))
+            stored = [row[0] for row in rows]
+            self._stored[historyId] = stored
+        return stored
+
+    def save(self, history: AiChatHistory):
+        """Save @history, its messages only if they were loaded"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO histories (historyId, title, modelKey, modelId, timestamp)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(historyId) DO UPDATE SET title = excluded.title,"
+                " modelKey = excluded.modelKey, modelId = excluded.modelId,"
+                " timestamp = excluded.timestamp",
+                (history.historyId, history.title or "", history.modelKey or "",
+                 history.modelId or "", history.timestamp or ""))
+            if history.isLoaded():
+                self._saveMessages(conn, history.historyId, history.messages)
+
+    def _saveMessages(self, conn: sqlite3.Connection, historyId: str, messages: List[Dict]):
+        stored = self._storedMessages(historyId)
+        data = [_dumpMessage(message) for message in messages]
+
+        # the messages of a conversation usually only grow
+        common = 0
+        end = min(len(stored), len(data))
+        while common < end and stored[common] == data[common]:
+            common += 1
+
+        if common < len(stored):
+            conn.execute(
+                "DELETE FROM messages WHERE historyId = ? AND seq >= ?",
+                (historyId, common))
+        if common < len(data):
+            conn.executemany(
+                "INSERT INTO messages (historyId, seq, data) VALUES (?, ?, ?)",
+                ((historyId, seq, data[seq]) for seq in range(common, len(data))))
+        conn.execute(
+            "UPDATE histories SET messageCount = ? WHERE historyId = ?",
+            (len(data), historyId))
+        self._stored[historyId] = data
+
+    def saveMany(self, histories: List[AiChatHistory]):
+        for history in histories:
+            self.save(history)
+
+    def remove(self, historyId: str):
+        self.removeMany([historyId])
+
+    def removeMany(self, historyIds: List[str]):
+        conn = self._connection()
+        with conn:
+            for historyId in historyIds:
+                conn.execute("DELETE FROM messages WHERE historyId = ?",
+                             (historyId,))
+                conn.execute("DELETE FROM histories WHERE historyId = ?",
+                             (historyId,))
+                self._stored.pop(historyId, None)
@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
+import sqlite3
 from datetime import datetime
 from typing import Dict, List, Optional
 
 from PySide6.QtCore import QObject, Qt, QTimer, Signal
 
 from qgitc.aichathistory import AiChatHistory
+from qgitc.aichathistorydb import AiChatHistoryDb
 from qgitc.aichathistorymodel import AiChatHistoryModel
 from qgitc.applicationbase import ApplicationBase
+from qgitc.common import logger
 from qgitc.llm import AiModelBase, AiModelFactory
 from qgitc.settings import Settings
 
@@ -17,7 +20,8 @@ from qgitc.settings import Settings
 class AiChatHistoryStore(QObject):
     """Shared, non-UI chat history store.
 
-    Owns a single in-memory list/model of histories and persists them to Settings.
+    Owns a single in-memory list/model of histories and persists them to a
+    database (see `AiChatHistoryDb`), messages being loaded on demand.
     Multiple panels can share the same model instance to avoid duplicated loads
     and manual synchronization.
     """
@@ -31,12 +35,13 @@ class AiChatHistoryStore(QObject):
     def __init__(self, settings: Settings, parent=None):
         super().__init__(parent)
         self._settings = settings
+        self._db = AiChatHistoryDb(settings.chatHistoryFile())
         self._model = AiChatHistoryModel(self)
         self._loaded = False
 
-        # Debounced persistence to avoid hammering QSettings when multiple
+        # Debounced persistence to avoid hammering the database when multiple
         # windows/widgets update history frequently.
-        self._pendingSaves: Dict[str, dict] = {}
+        self._pendingSaves: Dict[str, AiChatHistory] = {}
         self._saveTimer = QTimer(self)
         self._saveTimer.setSingleShot(True)
         self._saveTimer.timeout.connect(self._flushPendingSaves)
@@ -48,6 +53,9 @@ class AiChatHistoryStore(QObject):
     def model(self) -> AiChatHistoryModel:
         return self._model
 
+    def database(self) -> AiChatHistoryDb:
+        return self._db
+
     def isLoaded(self) -> bool:
         return self._loaded
 
@@ -57,15 +65,9 @@ class AiChatHistoryStore(QObject):
 
         existing = self._model.histories()
 
-        histories = []
-        newHistories = self._settings.chatHistories()
-        for historyData in newHistories:
-            if isinstance(historyData, dict):
-                history = AiChatHistory.fromDict(historyData)
-                # Skip empty conversations that were previously persisted.
-                if not history.messages:
-                    continue
-                histories.append(history)
+        self._migrateSettings()
+        # Empty conversations are never listed.
+        histories = self._db.histories()
 
         byId: Dict[str, AiChatHistory] = {h.historyId: h for h in histories}
         for h in existing:
@@ -78,6 +80,32 @@ class AiChatHistoryStore(QObject):
         self._loaded = True
         self.historiesLoaded.emit()
 
+    def _migrateSettings(self):
+        """Move the histories saved in Settings by older versions to the database"""
+        historiesData = self._settings.chatHistories()
+        if not historiesData:
+            return
+
+        # A copy left in Settings is older than the database one, saving it
+        # would drop the messages added since.
+        existing = self._db.historyIds()
+        legacy = []
+        for historyData in historiesData:
+            if isinstance(historyData, dict):
+                history = AiChatHistory.fromDict(historyData)
+                # Skip empty conversations that were previously persisted.
+                if history.messages and history.historyId not in existing:
+                    legacy.append(history)
+
+        try:
+            self._db.saveMany(legacy)
+        except sqlite3.Error as e:
+            logger.warning("Failed to migrate chat histories: %s", e)
+            return
+
+        if self._db.isPersistent():
+            self._settings.clearChatHistories()
+
     def get(self, historyId: str) -> Optional[AiChatHistory]:
         return self._model.getHistoryById(historyId)
 
@@ -89,8 +117,8 @@ class AiChatHistoryStore(QObject):
     def setSaveDebounceMs(self, debounceMs: int):
         self._saveDebounceMs = max(0, int(debounceMs))
 
-    def _scheduleSave(self, historyId: str, historyData: dict):
-        self._pendingSaves[historyId] = historyData
+    def _scheduleSave(self, historyId: str, history: AiChatHistory):
+        self._pendingSaves[historyId] = history
         if self._saveDebounceMs <= 0:
             self._flushPendingSaves()
             return
@@ -101,8 +129,12 @@ class AiChatHistoryStore(QObject):
             return
         pending = self._pendingSaves
         self._pendingSaves = {}
-        for historyId, data in pending.items():
-            self._settings.saveChatHistory(historyId, data)
+        for history in pending.values():
+            try:
+                self._db.save(history)
+            except sqlite3.Error as e:
+                logger.warning("Failed to save chat history %s: %s",
+                               history.historyId, e)
 
     def flush(self):
         """Force any pending debounced saves to be written."""
@@ -124,7 +156,7 @@ class AiChatHistoryStore(QObject):
         if history.title != newTitle:
             history.title = newTitle
             self._model.setData(idx, history, Qt.UserRole)
-            self._scheduleSave(historyId, history.toDict())
+            self._scheduleSave(historyId, history)
             self.historyUpdated.emit(history)
 
         return history
@@ -144,9 +176,9 @@ class AiChatHistoryStore(QObject):
             history.modelId = modelId
             self._model.setData(idx, history, Qt.UserRole)
             # Only persist if the history has messages; empty conversations
-            # are transient and should not be saved to settings.
+            # are transient and should not be saved.
             if history.messages:
-                self._scheduleSave(historyId, history.toDict())
+                self._scheduleSave(historyId, history)
             self.historyUpdated.emit(history)
 
         return history
@@ -187,7 +219,7 @@ class AiChatHistoryStore(QObject):
             # Recompute idx for save signal semantics.
             idx = self._model.index(newRow, 0)
 
-        self._scheduleSave(historyId, history.toDict())
+        self._scheduleSave(historyId, history)
         self.historyUpdated.emit(history)
         return history
 
@@ -220,7 +252,7 @@ class AiChatHistoryStore(QObject):
 
         # Only persist histories that have actual messages.
         if history.messages:
-            self._scheduleSave(historyId, history.toDict())
+            self._scheduleSave(historyId, history)
         self.historyUpdated.emit(history)
         return history
 
@@ -232,10 +264,16 @@ class AiChatHistoryStore(QObject):
 
         self._pendingSaves.pop(historyId, None)
         self._model.removeHistory(row)
-        self._settings.removeChatHistory(historyId)
+        self._removeFromDb([historyId])
         self.historyRemoved.emit(historyId)
         return True
 
+    def _removeFromDb(self, historyIds: List[str]):
+        try:
+            self._db.removeMany(historyIds)
+        except sqlite3.Error as e:
+            logger.warning("Failed to remove chat histories: %s", e)
+
     def removeMany(self, historyIds: List[str]):
         self.ensureLoaded()
         # Remove by row descending to keep indices stable.
@@ -246,10 +284,10 @@ class AiChatHistoryStore(QObject):
                 rows.append((row, hid))
         rows.sort(key=lambda x: x[0], reverse=True)
 
+        self._removeFromDb([hid for _, hid in rows])
         for row, hid in rows:
             self._pendingSaves.pop(hid, None)
             self._model.removeHistory(row)
-            self._settings.removeChatHistory(hid)
             self.historyRemoved.emit(hid)
 
     def clearAll(self):
@@ -258,7 +296,7 @@ class AiChatHistoryStore(QObject):
         self._model.clear()
         for hid in ids:
             self._pendingSaves.pop(hid, None)
+        self._removeFromDb(ids)
         for hid in ids:
-            self._settings.removeChatHistory(hid)
             self.historyRemoved.emit(hid)
         self.historiesCleared.emit()
@@ -37,13 +37,15 @@ from qgitc.agent.skills.types import SkillDefinition
 from qgitc.agent.slash_commands import CommandRegistry
 from qgitc.agent.tool import ToolType
 from qgitc.agent.tool_executor import TOOL_ABORTED_MESSAGE, TOOL_SKIPPED_MESSAGE
-from qgitc.agent.types import TextBlock, UserMessage
+from qgitc.agent.tools.grep_search import setTrigramIndexFile
+from qgitc.agent.types import AssistantMessage, TextBlock, UserMessage
 from qgitc.aichatbot import AiChatbot
 from qgitc.aichatcontextpanel import AiChatContextPanel
 from qgitc.aichatcontextprovider import AiChatContextProvider
 from qgitc.aichathistory import AiChatHistory
 from qgitc.aichathistorypanel import AiChatHistoryPanel
 from qgitc.aichattitlegenerator import AiChatTitleGenerator
+from qgitc.aicodereview import AiCodeReview, chunkTokenBudget, estimateTokens
 from qgitc.airesolve import ResolveConflictJob
 from qgitc.aitoolconfirmation import ConfirmationStatus
 from qgitc.applicationbase import ApplicationBase
@@ -101,6 +103,18 @@ class CodeReviewSceneEvent(QEvent):
         self.scene_line = scene_line
 
 
+class CommitDiffAvailableEvent(QEvent):
+
+    Type = QEvent.registerEventType()
+
+    def __init__(self, reviewId: int, index: int, diff: str, subject: str = None):
+        super().__init__(QEvent.Type(CommitDiffAvailableEvent.Type))
+        self.reviewId = reviewId
+        self.index = index
+        self.diff = diff
+        self.subject = subject
+
+
 class AiChatWidget(QWidget):
 
     initialized = Signal()
@@ -143,15 +157,26 @@ class AiChatWidget(QWidget):
         settings.toolExecutionStrategyChanged.connect(
             self._onToolExecutionStrategyChanged)
         settings.llmProvidersChanged.connect(self._onLlmProvidersChanged)
+        setTrigramIndexFile(settings.grepIndexFile())
         self._firstTextDelta = True
         self._firstReasoningDelta = True
 
         # Code review diff collection (staged/local changes)
         self._codeReviewExecutor: Optional[SubmoduleExecutor] = None
         self._codeReviewDiffs: List[str] = []
+        # Commit review: (repoLabel, sha1) per fetched commit, main one first
+        self._commitReviewId = 0
+        self._commitReviewRepos: List[Tuple[str, str]] = None
+        self._commitReviewDiffs: Dict[int, str] = {}
+        self._commitReviewSubject: str = ""
+        # Map-reduce review of diffs too large for a single request
+        self._chunkedReview: Optional[AiCodeReview] = None
+        self._chunkedReviewPrompt: str = None
         self._injectedContext: str = None
         self._restrictedToolNames: Optional[List[str]] = None
         self._activeRequestModelId: Optional[str] = None
+        # Model streaming the background compactions of the agent loop
+        self._compactionModel: Optional[AiModelBase] = None
 
         self._isInitialized = False
         QTimer.singleShot(100, self._onDelayInit)
@@ -165,6 +190,13 @@ class AiChatWidget(QWidget):
             if event.diff:
                 self._codeReviewDiffs.append(event.diff)
             return True
+        if event.type() == CommitDiffAvailableEvent.Type:
+            if event.reviewId == self._commitReviewId:
+                if event.diff:
+                    self._commitReviewDiffs[event.index] = event.diff
+                if event.subject is not None:
+                    self._commitReviewSubject = event.subject
+            return True
         if event.type() == CodeReviewSceneEvent.Type:
             if event.scene_line:
                 if not self._injectedContext:
@@ -176,6 +208,8 @@ class AiChatWidget(QWidget):
 
     def isGenerating(self) -> bool:
         """True if the current model is actively generating a response."""
+        if self._chunkedReview is not None:
+            return True
         return self._agentLoop is not None and self._agentLoop.isRunning()
 
     def isHistoryReady(self) -> bool:
@@ -288,6 +322,7 @@ class AiChatWidget(QWidget):
             self._onTextBrowserScrollbarChanged)
         self._chatBot.toolConfirmationApproved.connect(self._onToolApproved)
         self._chatBot.toolConfirmationRejected.connect(self._onToolRejected)
+        self._chatBot.deltasFlushed.connect(self._onChatDeltasFlushed)
         layout.addWidget(self._chatBot)
         self._chatBot.setSizePolicy(
             QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -495,6 +530,10 @@ class AiChatWidget(QWidget):
                 model.requestInterruption()
 
         self._resetAgentLoop()
+        self._releaseCompactionModel()
+        if self._chunkedReview is not None:
+            self._chunkedReview.cancel()
+            self._chunkedReview = None
 
         for model in models:
             model.cleanup()
@@ -541,6 +580,10 @@ class AiChatWidget(QWidget):
         if self._agentLoop is not None:
             self._agentLoop.abort()
 
+        if self._chunkedReview is not None:
+            self._chunkedReview.cancel()
+            self._onChunkedReviewFinished()
+
     def _doRequest(
         self,
         prompt: str,
@@ -845,10 +888,19 @@ class AiChatWidget(QWidget):
             raise ValueError("No chat model selected")
         caps = self._getModelCapabilities(model)
         temperature = settings.llmTemperature()
+        modelId = self._contextPanel.currentModelId()
+        maxTokens = caps.max_output_tokens if model.isLocal() else None
         adapter = AiModelBaseAdapter(
             model,
-            self._contextPanel.currentModelId(),
-            max_tokens=(caps.max_output_tokens if model.isLocal() else None),
+            modelId,
+            max_tokens=maxTokens,
+            temperature=temperature,
+            chat_mode=chatMode,
+        )
+        compactionAdapter = AiModelBaseAdapter(
+            self._ensureCompactionModel(model, modelId),
+            modelId,
+            max_tokens=maxTokens,
             temperature=temperature,
             chat_mode=chatMode,
         )
@@ -857,8 +909,36 @@ class AiChatWidget(QWidget):
             context_window=caps.context_window,
             max_output_tokens=caps.max_output_tokens,
             skill_registry=self._ensureSkillRegistry(),
+            compaction_provider=compactionAdapter,
         )
 
+    def _ensureCompactionModel(self, model: AiModelBase, modelId: str):
+        """A second instance of @model, so that the conversation can be
+        compacted while the agent keeps streaming"""
+        modelKey = AiModelFactory.modelKey(model)
+        current = self._compactionModel
+        if current is not None:
+            if AiModelFactory.modelKey(current) == modelKey and current.modelId == modelId:
+                return current
+            self._releaseCompactionModel()
+
+        self._compactionModel = AiModelProvider.createSpecificModel(
+            modelKey, modelId=modelId, parent=self)
+        return self._compactionModel
+
+    def _releaseCompactionModel(self):
+        model = self._compactionModel
+        if model is None:
+            return
+        self._compactionModel = None
+        # the compaction thread must not stream from a deleted model
+        if self._agentLoop is not None:
+            self._agentLoop.cancelCompaction()
+        if model.isRunning():
+            model.requestInterruption()
+        model.cleanup()
+        model.deleteLater()
+
     def _ensureSkillRegistry(self):
         # type: () -> SkillRegistry
         if self._skillRegistry is None:
@@ -898,6 +978,7 @@ class AiChatWidget(QWidget):
         if self._agentLoop is not None:
             self._agentLoop.abort()
             self._agentLoop.wait(3000)
+            self._agentLoop.cancelCompaction()
             self._disconnectAgentLoop()
             self._agentLoop = None
             self._toolRegistry = None
@@ -910,7 +991,8 @@ class AiChatWidget(QWidget):
         self._firstTextDelta = False
         self._chatBot.appendResponse(response)
         self._firstReasoningDelta = True
-        if not self._disableAutoScroll:
+        # Following deltas are buffered, scrolled once they are rendered
+        if response.first_delta and not self._disableAutoScroll:
             self._scrollToBottom()
 
     def _onAgentReasoningDelta(self, text):
@@ -923,6 +1005,10 @@ class AiChatWidget(QWidget):
         self._firstReasoningDelta = False
         self._chatBot.appendResponse(response)
         self._firstTextDelta = True
+        if response.first_delta and not self._disableAutoScroll:
+            self._scrollToBottom()
+
+    def _onChatDeltasFlushed(self):
         if not self._disableAutoScroll:
             self._scrollToBottom()
 
@@ -956,6 +1042,7 @@ class AiChatWidget(QWidget):
         self._firstReasoningDelta = True
 
     def _onAgentFinished(self):
+        self._chatBot.flushDeltas()
         self._saveChatHistoryFromLoop()
         self._activeRequestModelId = None
         self._updateStatus()
@@ -1099,40 +1186,62 @@ class AiChatWidget(QWidget):
         return files
 
     def codeReview(self, commit: Commit):
-        repoDir = commitRepoDir(commit)
-        commitDiffData: bytes = Git.commitRawDiff(commit.sha1, repoDir=repoDir)
-        if not commitDiffData:
+        """Review @commit and its sub commits, the diffs are fetched in parallel"""
+        self._ensureCodeReviewExecutor()
+        self._commitReviewId += 1
+        self._commitReviewDiffs.clear()
+        self._commitReviewSubject = ""
+
+        commits = [commit] + list(commit.subCommits)
+        self._commitReviewRepos = [
+            ((c.repoDir or ".").replace("\\", "/"), c.sha1) for c in commits]
+        # index as the key since the same repo may be listed more than once
+        tasks = {str(i): (self._commitReviewId, commitRepoDir(c), c.sha1)
+                 for i, c in enumerate(commits)}
+        self._codeReviewExecutor.submit(tasks, self._fetchCommitDiff)
+
+    def _fetchCommitDiff(self, index: str, userData: Tuple[int, str, str], cancelEvent: CancelEvent):
+        reviewId, repoDir, sha1 = userData
+        data: bytes = Git.commitRawDiff(sha1, repoDir=repoDir)
+        if cancelEvent.isSet():
             return
 
-        commitDiff = commitDiffData.decode("utf-8", errors="replace")
+        subject = None
+        # the main commit carries the subject of the review
+        if index == "0" and data:
+            subject = Git.commitSubject(sha1, repoDir=repoDir).decode(
+                "utf-8", errors="replace")
+            if cancelEvent.isSet():
+                return
+
+        diff = data.decode("utf-8", errors="replace") if data else ""
+        ApplicationBase.instance().postEvent(
+            self, CommitDiffAvailableEvent(reviewId, int(index), diff, subject))
 
-        subDiffs: List[Tuple[str, str, str]] = []  # (repoLabel, sha1, diff)
-        for subCommit in commit.subCommits:
-            subRepoDir = commitRepoDir(subCommit)
-            subData = Git.commitRawDiff(subCommit.sha1, repoDir=subRepoDir)
-            if not subData:
-                continue
-            subRepoLabel = subCommit.repoDir or "."
-            subDiffs.append((subRepoLabel, subCommit.sha1,
-                            subData.decode("utf-8", errors="replace")))
-        parts = [commitDiff]
-        parts.extend([d for _, _, d in subDiffs])
-        diff = "\n".join([p for p in parts if p])
+    def _onCommitDiffFetchFinished(self):
+        repos = self._commitReviewRepos
+        self._commitReviewRepos = None
 
-        sha1 = commit.sha1
-        subject = Git.commitSubject(sha1, repoDir=repoDir).decode(
-            "utf-8", errors="replace")
+        commitDiff = self._commitReviewDiffs.get(0)
+        if not commitDiff:
+            return
+
+        diffs = [(i, self._commitReviewDiffs[i])
+                 for i in range(len(repos)) if self._commitReviewDiffs.get(i)]
+        self._commitReviewDiffs.clear()
+        diff = "\n".join([d for _, d in diffs])
 
         sceneLines = [
             "type: commit  ",
-            f"subject: {subject.strip()}  ",
+            f"subject: {self._commitReviewSubject.strip()}  ",
         ]
 
-        def _appendRepoFileSummary(repoLabel: str, sha1: str, repoDiff: str):
+        for i, repoDiff in diffs:
             files = self._extractDiffFilePaths(repoDiff)
             if not files:
-                return
+                continue
 
+            repoLabel, sha1 = repos[i]
             sceneLines.extend([
                 "",
                 "---",
@@ -1141,12 +1250,6 @@ class AiChatWidget(QWidget):
                 f"files_changed:\n{self._makeFileList(files)}",
             ])
 
-        _appendRepoFileSummary((commit.repoDir or ".").replace(
-            "\\", "/"), commit.sha1, commitDiff)
-        for subRepo, subSha1, subDiff in subDiffs:
-            _appendRepoFileSummary(
-                subRepo.replace("\\", "/"), subSha1, subDiff)
-
         scene = "\n".join(sceneLines)
 
         self._waitForInitialization()
@@ -1155,7 +1258,7 @@ class AiChatWidget(QWidget):
         if not curHistory or curHistory.messages:
             self._createNewConversation()
         self._injectedContext = scene
-        self._executeSkillDirectly("patch-review", f"```diff\n{diff}\n```\n")
+        self._reviewDiff(diff)
 
         self._scrollToBottom()
 
@@ -1178,12 +1281,87 @@ class AiChatWidget(QWidget):
         curHistory = self._historyPanel.currentHistory()
         if not curHistory or curHistory.messages:
             self._createNewConversation()
-        self._executeSkillDirectly("patch-review", f"```diff\n{diff}\n```\n")
+        self._reviewDiff(diff)
         self._scrollToBottom()
 
+    def _reviewDiff(self, diff: str):
+        """Review @diff with the patch-review skill, diffs that don't fit in
+        the model context are reviewed in chunks by `AiCodeReview`"""
+        model = self.currentChatModel()
+        if model is None:
+            return
+
+        settings = ApplicationBase.instance().settings()
+        budget = chunkTokenBudget(self._getModelCapabilities(model),
+                                  settings.llmMaxTokens())
+        if estimateTokens(diff) <= budget:
+            self._executeSkillDirectly(
+                "patch-review", f"```diff\n{diff}\n```\n")
+            return
+
+        modelKey = AiModelFactory.modelKey(model)
+        modelId = self._contextPanel.currentModelId() or model.modelId
+
+        def _createModel(parent):
+            return AiModelProvider.createSpecificModel(modelKey, modelId, parent)
+
+        self._onButtonStop()
+        self._activeRequestModelId = modelId
+        self._chunkedReview = AiCodeReview(_createModel, parent=self)
+        self._chunkedReview.reviewAvailable.connect(
+            self._onChunkedReviewAvailable)
+        self._chunkedReview.errorOccurred.connect(self._onAgentError)
+        self._chunkedReview.finished.connect(self._onChunkedReviewFinished)
+
+        context = self._injectedContext
+        self._injectedContext = None
+        count = self._chunkedReview.start(diff, budget, context)
+
+        prompt = self.tr("Review the change ({0} files, in {1} parts)").format(
+            len(self._extractDiffFilePaths(diff)), count)
+        if context:
+            prompt = f"<context>\n{context.rstrip()}\n</context>\n\n" + prompt
+        self._chunkedReviewPrompt = prompt
+
+        self._chatBot.appendResponse(AiResponse(AiRole.User, prompt))
+        self._contextPanel.btnSend.setVisible(False)
+        self._contextPanel.btnStop.setVisible(True)
+        self._historyPanel.setEnabled(False)
+        self._contextPanel.cbBots.setEnabled(False)
+        self._setGenerating(True)
+
+    def _onChunkedReviewAvailable(self, review: str):
+        self._chatBot.appendResponse(AiResponse(AiRole.Assistant, review))
+        if not self._disableAutoScroll:
+            self._scrollToBottom()
+
+        # Keep the review in the conversation for follow-up requests
+        loop = self._ensureAgentLoop(chatMode=AiChatMode.Agent)
+        isNewConversation = len(loop.messages()) == 0
+        loop.setMessages(loop.messages() + [
+            UserMessage(content=[TextBlock(text=self._chunkedReviewPrompt)]),
+            AssistantMessage(content=[TextBlock(text=review)]),
+        ])
+        self._saveChatHistoryFromLoop()
+
+        if isNewConversation and not ApplicationBase.instance().testing:
+            self._generateChatTitle(
+                self._historyPanel.currentHistory().historyId, self._chunkedReviewPrompt)
+
+    def _onChunkedReviewFinished(self):
+        if self._chunkedReview is None:
+            return
+
+        self._chunkedReview.deleteLater()
+        self._chunkedReview = None
+        self._chunkedReviewPrompt = None
+        self._activeRequestModelId = None
+        self._updateStatus()
+
     def codeReviewForStagedFiles(self, submodules):
         """Start a code review for staged/local changes across submodules."""
         self._ensureCodeReviewExecutor()
+        self._commitReviewRepos = None
         self._codeReviewDiffs.clear()
         self._injectedContext = "type: staged changes (index)"
         self._codeReviewExecutor.submit(submodules, self._fetchStagedDiff)
@@ -1195,6 +1373,10 @@ class AiChatWidget(QWidget):
                 self._onCodeReviewDiffFetchFinished)
 
     def _onCodeReviewDiffFetchFinished(self):
+        if self._commitReviewRepos is not None:
+            self._onCommitDiffFetchFinished()
+            return
+
         if self._codeReviewDiffs:
             diff = "\n".join(self._codeReviewDiffs)
             self.codeReviewForDiff(diff)
@@ -1454,9 +1636,6 @@ class AiChatWidget(QWidget):
         if not chatHistory:
             return
 
-        # Save to settings
-        settings = ApplicationBase.instance().settings()
-        settings.saveChatHistory(historyId, chatHistory.toDict())
         self.chatTitleReady.emit()
 
         # Refresh embedded header if this is the currently active conversation.
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+
+import re
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from PySide6.QtCore import QObject, Signal
+
+from qgitc.agent.compaction import roughEstimateTokens
+from qgitc.agent.types import TextBlock, UserMessage
+from qgitc.applicationbase import ApplicationBase
+from qgitc.common import logger
+from qgitc.llm import AiModelBase, AiModelCapabilities, AiParameters, AiResponse
+from qgitc.llmprovider import AiModelProvider
+
+REVIEW_SYS_PROMPT = \
+    """You are an expert code reviewer inside QGitc. You review unified diffs for definite bugs and plausible, impactful potential bugs (edge cases, None handling, off-by-one, wrong API usage, exception paths, concurrency hazards) and typos that can cause problems.
+Do NOT report style nits, refactors, architecture opinions or micro-optimizations.
+Respond in the language of the user interface.
+"""
+
+
+REVIEW_CHUNK_PROMPT = \
+    """The change is too large to review at once, this is part {index} of {count}.
+Review ONLY the diff below and list the issues you found, one `###` section per issue:
+`### <file>#lineNo: <short issue title>` followed by the problem, why it matters and the fix.
+If there is no issue, reply with exactly `NO ISSUES`.
+{context}
+```diff
+{diff}
+```
+"""
+
+
+REVIEW_SUMMARY_PROMPT = \
+    """A large change was reviewed in {count} parts. Merge the findings of all parts below into the final review.
+- Drop duplicates and findings contradicted by another part.
+- Keep the `### <file>#lineNo: <short issue title>` sections, each issue separated by an empty line.
+- Keep it short: the problem, why it matters and the fix for each issue.
+- If no part found an issue, say the change looks good.
+{context}
+{findings}
+"""
+
+REVIEW_MERGE_PROMPT = \
+    """A large change was reviewed in parts, the findings are too long to be merged at once. Merge the findings of the parts below, they will be merged with the other ones later.
+- Drop duplicates and findings contradicted by another part.
+- Keep the `### <file>#lineNo: <short issue title>` sections, each issue separated by an empty line.
+- If no part found an issue, reply with exactly `NO ISSUES`.
+{context}
+{findings}
+"""
+
+NO_ISSUES = "NO ISSUES"
+
+# Tokens kept aside for the review prompt and the system prompt
+REVIEW_PROMPT_RESERVE_TOKENS = 2000
+
+# Never split smaller than this, even for models with tiny windows
+MIN_CHUNK_TOKENS = 1000
+
+_fileHeader_re = re.compile(r"(diff --git |diff --cc |diff --combined |Submodule )")
+
+
+def estimateTokens(text: str) -> int:
+    """Token estimate of @text, see `roughEstimateTokens`"""
+    if not text:
+        return 0
+    return roughEstimateTokens([UserMessage(content=[TextBlock(text=text)])])
+
+
+def chunkTokenBudget(caps: AiModelCapabilities, maxTokens: int = None) -> int:
+    """Max diff tokens of a chunk so that a chunk review fits in the model
+    window, with @maxTokens the output tokens requested"""
+    # the models with a huge max output would leave no room for the diff
+    outputReserve = min(caps.max_output_tokens, caps.context_window // 4)
+    if maxTokens:
+        outputReserve = min(outputReserve, maxTokens)
+    budget = caps.context_window - outputReserve - \
+        REVIEW_PROMPT_RESERVE_TOKENS
+    return max(MIN_CHUNK_TOKENS, budget)
+
+
+def splitDiffFiles(diff: str) -> List[str]:
+    """Split a unified diff into per file diffs"""
+    files: List[str] = []
+    lines: List[str] = []
+    for line in diff.splitlines(keepends=True):
+        if lines and _fileHeader_re.match(line):
+            files.append("".join(lines))
+            lines = []
+        lines.append(line)
+
+    if lines:
+        files.append("".join(lines))
+    return files
+
+
+def _splitHunks(fileDiff: str):
+    """Return the file header and the hunks of @fileDiff"""
+    header: List[str] = []
+    hunks: List[List[str]] = []
+    for line in fileDiff.splitlines(keepends=True):
+        if line.startswith("@@"):
+            hunks.append([line])
+        elif hunks:
+            hunks[-1].append(line)
+        else:
+            header.append(line)
+
+    return "".join(header), hunks
+
+
+def _splitLines(lines: List[str], maxTokens: int) -> List[str]:
+    parts: List[str] = []
+    part: List[str] = []
+    partTokens = 0
+    for line in lines:
+        tokens = estimateTokens(line)
+        if part and partTokens + tokens > maxTokens:
+            parts.append("".join(part))
+            part = []
+            partTokens = 0
+        part.append(line)
+        partTokens += tokens
+
+    if part:
+        parts.append("".join(part))
+    return parts
+
+
+def _splitFile(fileDiff: str, maxTokens: int) -> List[str]:
+    """Split a file diff that is over budget by hunk, each part keeps the
+    file header so that it can be reviewed on its own"""
+    header, hunks = _splitHunks(fileDiff)
+    if not hunks:
+        return _splitLines(fileDiff.splitlines(keepends=True), maxTokens)
+
+    headerTokens = estimateTokens(header)
+    budget = max(1, maxTokens - headerTokens)
+
+    pieces: List[str] = []
+    for hunk in hunks:
+        text = "".join(hunk)
+        if estimateTokens(text) <= budget:
+            pieces.append(text)
+            continue
+
+        # a single huge hunk: cut it by lines, repeating the hunk header
+        hunkHeader = hunk[0]
+        lineBudget = max(1, budget - estimateTokens(hunkHeader))
+        for part in _splitLines(hunk[1:], lineBudget):
+            pieces.append(hunkHeader + part)
+
+    parts: List[str] = []
+    part = header
+    partTokens = headerTokens
+    for piece in pieces:
+        tokens = estimateTokens(piece)
+        if part != header and partTokens + tokens > maxTokens:
+            parts.append(part)
+            part = header
+            partTokens = headerTokens
+        part += piece
+        partTokens += tokens
+
+    if part != header:
+        parts.append(part)
+    return parts
+
+
+def splitDiff(diff: str, maxTokens: int) -> List[str]:
+    """Split @diff by file and hunk into chunks of at most @maxTokens
+    estimated tokens (unless a single line is larger), small files are
+    packed together"""
+    chunks: List[str] = []
+    chunk = ""
+    chunkTokens = 0
+    for fileDiff in splitDiffFiles(diff or ""):
+        tokens = estimateTokens(fileDiff)
+        if tokens > maxTokens:
+            if chunk:
+                chunks.append(chunk)
+                chunk = ""
+                chunkTokens = 0
+            chunks.extend(_splitFile(fileDiff, maxTokens))
+            continue
+
+        if chunk and chunkTokens + tokens > maxTokens:
+            chunks.append(chunk)
+            chunk = ""
+            chunkTokens = 0
+        chunk += fileDiff
+        chunkTokens += tokens
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def groupFindings(parts: List[str], maxTokens: int) -> List[List[str]]:
+    """Pack @parts in order into groups of at most @maxTokens estimated
+    tokens (unless a single part is larger)"""
+    groups: List[List[str]] = []
+    group: List[str] = []
+    groupTokens = 0
+    for part in parts:
+        tokens = estimateTokens(part)
+        if group and groupTokens + tokens > maxTokens:
+            groups.append(group)
+            group = []
+            groupTokens = 0
+        group.append(part)
+        groupTokens += tokens
+
+    if group:
+        groups.append(group)
+    return groups
+
+
+class AiCodeReview(QObject):
+    """Map-reduce review of diffs too large for a single request.
+
+    The diff is split into token budgeted chunks that are reviewed
+    concurrently (at most `maxInFlight` requests at a time), then the
+    findings are merged by a final summarization request. Findings over
+    the budget are first merged by groups, as many rounds as needed.
+    """
+
+    # reviewed chunks, total chunks
+    progressChanged = Signal(int, int)
+    reviewAvailable = Signal(str)
+    errorOccurred = Signal(str)
+    finished = Signal()
+
+    def __init__(self, modelFactory: Callable[[QObject], AiModelBase] = None, maxInFlight: int = None, parent=None):
+        super().__init__(parent)
+        self._modelFactory = modelFactory or AiModelProvider.createModel
+        if maxInFlight is None:
+            maxInFlight = ApplicationBase.instance().settings().codeReviewMaxInFlight()
+        self._maxInFlight = max(1, maxInFlight)
+
+        self._context = ""
+        self._chunks: List[str] = []
+        self._maxTokens = 0
+        # prompts of the current round, chunk reviews or merges
+        self._prompts: List[str] = []
+        self._merging = False
+        self._pending = deque()
+        self._models: Dict[AiModelBase, int] = {}
+        self._responses: Dict[AiModelBase, str] = {}
+        self._findings: List[Optional[str]] = []
+        self._reviewed = 0
+        self._summaryModel: AiModelBase = None
+        self._summary = ""
+        self._error: str = None
+
+    def start(self, diff: str, maxChunkTokens: int, context: str = None) -> int:
+        """Start reviewing @diff, returns the number of chunks"""
+        self.cancel()
+
+        self._context = context or ""
+        self._chunks = splitDiff(diff, maxChunkTokens)
+        # the findings are sent instead of the diff, in the same budget
+        self._maxTokens = max(MIN_CHUNK_TOKENS, maxChunkTokens)
+        self._prompts = [
+            REVIEW_CHUNK_PROMPT.format(
+                index=i + 1,
+                count=len(self._chunks),
+                context=self._contextBlock(),
+                diff=chunk)
+            for i, chunk in enumerate(self._chunks)]
+        self._merging = False
+        self._pending = deque(range(len(self._chunks)))
+        self._findings = [None] * len(self._chunks)
+        self._reviewed = 0
+        self._summary = ""
+        self._error = None
+
+        logger.info("Reviewing diff in %d chunks", len(self._chunks))
+        if not self._chunks:
+            self.finished.emit()
+        else:
+            self._startRequests()
+        return len(self._chunks)
+
+    def isRunning(self):
+        return bool(self._models) or self._summaryModel is not None
+
+    def chunkCount(self):
+        return len(self._chunks)
+
+    def cancel(self):
+        models = list(self._models.keys())
+        if self._summaryModel:
+            models.append(self._summaryModel)
+
+        self._pending.clear()
+        self._models.clear()
+        self._responses.clear()
+        self._summaryModel = None
+
+        for model in models:
+            self._disconnectModel(model)
+            model.requestInterruption()
+            model.deleteLater()
+
+    def _startRequests(self):
+        while self._pending and len(self._models) < self._maxInFlight:
+            index = self._pending.popleft()
+            model = self._createModel()
+            self._models[model] = index
+            model.queryAsync(self._makeParams(self._prompts[index]))
+
+    def _createModel(self) -> AiModelBase:
+        model = self._modelFactory(self)
+        self._responses[model] = ""
+        model.responseAvailable.connect(self._onResponseAvailable)
+        model.serviceUnavailable.connect(self._onServiceUnavailable)
+        model.networkError.connect(self._onNetworkError)
+        model.finished.connect(self._onModelFinished)
+        return model
+
+    def _disconnectModel(self, model: AiModelBase):
+        model.responseAvailable.disconnect(self._onResponseAvailable)
+        model.serviceUnavailable.disconnect(self._onServiceUnavailable)
+        model.networkError.disconnect(self._onNetworkError)
+        model.finished.disconnect(self._onModelFinished)
+
+    def _makeParams(self, prompt: str):
+        settings = ApplicationBase.instance().settings()
+        params = AiParameters()
+        params.prompt = prompt
+        params.sys_prompt = REVIEW_SYS_PROMPT
+        params.temperature = settings.llmTemperature()
+        params.max_tokens = settings.llmMaxTokens()
+        params.reasoning = False
+        return params
+
+    def _contextBlock(self):
+        if not self._context:
+            return ""
+        return f"<context>\n{self._context.rstrip()}\n</context>\n"
+
+    def _onResponseAvailable(self, response: AiResponse):
+        model = self.sender()
+        if model in self._responses and response.message:
+            self._responses[model] += response.message
+
+    def _onServiceUnavailable(self):
+        self._error = self.tr("AI service unavailable")
+
+    def _onNetworkError(self, errorString: str):
+        self._error = errorString
+
+    def _onModelFinished(self):
+        model: AiModelBase = self.sender()
+        response = self._responses.pop(model, "")
+        self._disconnectModel(model)
+        model.deleteLater()
+
+        if model is self._summaryModel:
+            self._summaryModel = None
+            self._onSummaryFinished(response)
+            return
+
+        index = self._models.pop(model, None)
+        if index is None:
+            return
+
+        if self._error:
+            self._failed()
+            return
+
+        self._findings[index] = response.strip()
+        if not self._merging:
+            self._reviewed += 1
+            self.progressChanged.emit(self._reviewed, len(self._chunks))
+
+        if self._pending:
+            self._startRequests()
+        elif not self._models:
+            self._startSummary()
+
+    def _failed(self):
+        error = self._error
+        self.cancel()
+        self.errorOccurred.emit(error)
+        self.finished.emit()
+
+    def _startSummary(self):
+        findings = []
+        for i, finding in enumerate(self._findings):
+            if not finding or finding.upper().startswith(NO_ISSUES):
+                finding = NO_ISSUES
+            findings.append(
+                f"<part index=\"{i + 1}\">\n{finding}\n</part>")
+
+        budget = self._maxTokens - estimateTokens(self._contextBlock())
+        groups = groupFindings(findings, budget)
+        if len(groups) > 1:
+            if len(groups) == len(findings):
+                # no two parts fit together, merge them by pairs anyway so
+                # that the round still shrinks the findings
+                groups = [findings[i:i + 2]
+                          for i in range(0, len(findings), 2)]
+            self._startMerges(groups)
+            return
+
+        prompt = REVIEW_SUMMARY_PROMPT.format(
+            count=len(self._chunks),
+            context=self._contextBlock(),
+            findings="\n".join(findings))
+
+        self._summaryModel = self._createModel()
+        self._summaryModel.queryAsync(self._makeParams(prompt))
+
+    def _startMerges(self, groups: List[List[str]]):
+        logger.info("Merging review findings in %d groups", len(groups))
+        self._merging = True
+        self._prompts = [
+            REVIEW_MERGE_PROMPT.format(
+                context=self._contextBlock(),
+                findings="\n".join(group))
+            for group in groups]
+        self._pending = deque(range(len(groups)))
+        self._findings = [None] * len(groups)
+        self._startRequests()
+
+    def _onSummaryFinished(self, response: str):
+        if self._error:
+            self._failed()
+            return
+
+        self._summary = response.strip()
+        self.reviewAvailable.emit(self._summary)
+        self.finished.emit()
@@ -23,13 +23,8 @@ from PySide6.QtGui import QDesktopServices, QIcon, QPalette
 from PySide6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
 from PySide6.QtWidgets import QMessageBox
 
-from qgitc.aichathistorystore import AiChatHistoryStore
-from qgitc.aichatwindow import AiChatWindow
 from qgitc.applicationbase import ApplicationBase, qtVersion
-from qgitc.blamewindow import BlameWindow
-from qgitc.branchcomparewindow import BranchCompareWindow
 from qgitc.colorschema import ColorSchemaDark, ColorSchemaLight, ColorSchemaMode
-from qgitc.commitwindow import CommitWindow
 from qgitc.common import dataDirPath, logger
 from qgitc.events import (
     BlameEvent,
@@ -47,16 +42,11 @@ from qgitc.events import (
 )
 from qgitc.findsubmodules import FindSubmoduleThread
 from qgitc.findwidget import FindWidget
-from qgitc.githubcopilotlogindialog import GithubCopilotLoginDialog
 from qgitc.gitutils import Git
-from qgitc.mainwindow import MainWindow
-from qgitc.newversiondialog import NewVersionDialog
-from qgitc.otelimpl import OTelService
-from qgitc.pickbranchwindow import PickBranchWindow
+from qgitc.otelservice import OTelService
 from qgitc.settings import Settings
 from qgitc.textline import Link
 from qgitc.version import __version__
-from qgitc.versionchecker import VersionChecker
 from qgitc.windowtype import WindowType
 
 
@@ -113,12 +103,15 @@ class Application(ApplicationBase):
             self.overrideColorSchema)
 
         self.aboutToQuit.connect(self._onAboutToQuit)
-        self._aiChatHistoryStore = AiChatHistoryStore(self._settings, self)
+        self._aiChatHistoryStore = None
 
     def settings(self):
         return self._settings
 
     def aiChatHistoryStore(self):
+        if self._aiChatHistoryStore is None:
+            from qgitc.aichathistorystore import AiChatHistoryStore
+            self._aiChatHistoryStore = AiChatHistoryStore(self._settings, self)
         return self._aiChatHistoryStore
 
     def setupTranslator(self):
@@ -146,33 +139,39 @@ class Application(ApplicationBase):
             translator = None
 
     def getWindow(self, type, ensureCreated=True):
+        # windows are imported on first use to keep the startup fast
         window = None
         if type == WindowType.LogWindow:
             if not self._logWindow and ensureCreated:
+                from qgitc.mainwindow import MainWindow
                 self._logWindow = MainWindow()
                 self._logWindow.destroyed.connect(
                     self._onLogWindowDestroyed)
             window = self._logWindow
         elif type == WindowType.BlameWindow:
             if not self._blameWindow and ensureCreated:
+                from qgitc.blamewindow import BlameWindow
                 self._blameWindow = BlameWindow()
                 self._blameWindow.destroyed.connect(
                     self._onBlameWindowDestroyed)
             window = self._blameWindow
         elif type == WindowType.AiAssistant:
             if not self._aiChatWindow and ensureCreated:
+                from qgitc.aichatwindow import AiChatWindow
                 self._aiChatWindow = AiChatWindow()
                 self._aiChatWindow.destroyed.connect(
                     self._onAiChatWindowDestroyed)
             window = self._aiChatWindow
         elif type == WindowType.CommitWindow:
             if not self._commitWindow and ensureCreated:
+                from qgitc.commitwindow import CommitWindow
                 self._commitWindow = CommitWindow()
                 self._commitWindow.destroyed.connect(
                     self._onCommitWindowDestroyed)
             window = self._commitWindow
         elif type == WindowType.BranchCompareWindow:
             if not self._branchCompareWindow and ensureCreated:
+                from qgitc.branchcomparewindow import BranchCompareWindow
                 self._branchCompareWindow = BranchCompareWindow()
                 self._branchCompareWindow.destroyed.connect(
                     self._onBranchCompareWindowDestroyed)
@@ -180,6 +179,7 @@ class Application(ApplicationBase):
 
         elif type == WindowType.PickBranchWindow:
             if not self._pickBranchWindow and ensureCreated:
+                from qgitc.pickbranchwindow import PickBranchWindow
                 self._pickBranchWindow = PickBranchWindow()
                 self._pickBranchWindow.destroyed.connect(
                     self._onPickBranchWindowDestroyed)
@@ -261,6 +261,7 @@ class Application(ApplicationBase):
             return True
 
         if type == RequestLoginGithubCopilot.Type:
+            from qgitc.githubcopilotlogindialog import GithubCopilotLoginDialog
             dialog = GithubCopilotLoginDialog(self.activeWindow())
             dialog.setAutoClose(event.autoClose)
             dialog.exec()
@@ -318,6 +319,7 @@ class Application(ApplicationBase):
         if ignoredVersion == version:
             return
 
+        from qgitc.newversiondialog import NewVersionDialog
         parent = self.activeWindow()
         versionDlg = NewVersionDialog(version, parent)
         versionDlg.exec()
@@ -340,6 +342,7 @@ class Application(ApplicationBase):
                 haveToCheck = diff.days >= days
 
             if haveToCheck and not self.testing:
+                from qgitc.versionchecker import VersionChecker
                 self._checker = VersionChecker(self)
                 self._checker.newVersionAvailable.connect(
                     self._onNewVersionAvailable)
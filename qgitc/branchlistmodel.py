@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+from typing import List
+
+from PySide6.QtCore import QAbstractListModel, QAbstractProxyModel, QModelIndex, Qt
+
+
+class BranchListModel(QAbstractListModel):
+    """Branches of the branch combobox, replaced at once on reload"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._branches: List[str] = []
+        self._lowerBranches: List[str] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._branches)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._branches):
+            return None
+
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._branches[index.row()]
+
+        return None
+
+    def setBranches(self, branches: List[str]):
+        self.beginResetModel()
+        self._branches = list(branches)
+        self._lowerBranches = [branch.lower() for branch in self._branches]
+        self.endResetModel()
+
+    def clear(self):
+        self.setBranches([])
+
+    def lowerBranches(self) -> List[str]:
+        return self._lowerBranches
+
+    def indexOf(self, branch: str) -> int:
+        try:
+            return self._branches.index(branch)
+        except ValueError:
+            return -1
+
+    def findBranch(self, branch: str) -> int:
+        """Row of @branch, or of the first branch ending with it"""
+        row = self.indexOf(branch)
+        if row != -1:
+            return row
+
+        for i, name in enumerate(self._branches):
+            if name.endswith(branch):
+                return i
+        return -1
+
+
+class BranchFilterModel(QAbstractProxyModel):
+    """Branches containing a text, case insensitively.
+
+    Used as the completion model of the branch combobox: the completer of
+    Qt would call `data` for every branch on each key stroke. Typing more
+    characters only filters the branches matched by the previous text.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._filterText = ""
+        # source rows of the matched branches
+        self._rows: List[int] = []
+
+    def setSourceModel(self, model: BranchListModel):
+        oldModel = self.sourceModel()
+        if oldModel:
+            oldModel.modelReset.disconnect(self._onSourceReset)
+
+        self.beginResetModel()
+        super().setSourceModel(model)
+        model.modelReset.connect(self._onSourceReset)
+        self._rows = self._filter(self._filterText, None)
+        self.endResetModel()
+
+    def filterText(self):
+        return self._filterText
+
+    def setFilterText(self, text: str):
+        text = text.lower()
+        if text == self._filterText:
+            return
+
+        rows = self._rows if self._filterText in text else None
+        self.beginResetModel()
+        self._filterText = text
+        self._rows = self._filter(text, rows)
+        self.endResetModel()
+
+    def _filter(self, text: str, rows: List[int]):
+        model: BranchListModel = self.sourceModel()
+        if model is None:
+            return []
+
+        branches = model.lowerBranches()
+        if not text:
+            return list(range(len(branches)))
+
+        if rows is None:
+            return [i for i, name in enumerate(branches) if text in name]
+        return [i for i in rows if text in branches[i]]
+
+    def _onSourceReset(self):
+        self.beginResetModel()
+        self._rows = self._filter(self._filterText, None)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or row < 0 or row >= len(self._rows):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxyIndex):
+        if not proxyIndex.isValid() or proxyIndex.row() >= len(self._rows):
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxyIndex.row()], 0)
+
+    def mapFromSource(self, sourceIndex):
+        if not sourceIndex.isValid():
+            return QModelIndex()
+        try:
+            row = self._rows.index(sourceIndex.row())
+        except ValueError:
+            return QModelIndex()
+        return self.createIndex(row, 0)
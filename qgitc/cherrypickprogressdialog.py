@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Callable, List, Optional
+from typing import TYPE_CHECKING, Callable, List, Optional
 
 from PySide6.QtCore import Qt, QUrl
 from PySide6.QtGui import QDesktopServices
@@ -22,7 +22,6 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
-from qgitc.aichatwidget import AiChatWidget
 from qgitc.applicationbase import ApplicationBase
 from qgitc.cherrypickcontextprovider import CherryPickContextProvider
 from qgitc.cherrypicksession import (
@@ -34,6 +33,9 @@ from qgitc.resolutionreport import defaultResolutionReportFile
 from qgitc.resolver.enums import ResolveOperation
 from qgitc.resolver.resolvepanel import ResolvePanel
 
+if TYPE_CHECKING:
+    from qgitc.aichatwidget import AiChatWidget
+
 
 class CherryPickProgressDialog(QDialog):
     def __init__(self, parent=None):
@@ -188,6 +190,7 @@ class CherryPickProgressDialog(QDialog):
             if self._aiContainer is None or self._aiContainerLayout is None:
                 return
 
+            from qgitc.aichatwidget import AiChatWidget
             self._aiChatWidget = AiChatWidget(
                 self._aiContainer, embedded=True, hideHistoryPanel=True)
             self._aiChatWidget.setContextProvider(self._aiContextProvider)
@@ -3,7 +3,7 @@
 import os
 import re
 from enum import Enum
-from typing import Callable, Dict, List, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
 
 from PySide6.QtCore import (
     QAbstractListModel,
@@ -42,7 +42,6 @@ from PySide6.QtWidgets import (
 )
 
 from qgitc.actionrunner import ActionRunner
-from qgitc.aichatdockwidget import AiChatDockWidget
 from qgitc.aicommitmessage import AiCommitMessage
 from qgitc.amendcommitmodel import AmendCommitInfo, AmendCommitListModel
 from qgitc.applicationbase import ApplicationBase
@@ -50,7 +49,6 @@ from qgitc.cancelevent import CancelEvent
 from qgitc.colorediconlabel import ColoredIconLabel
 from qgitc.coloredlabel import ColoredLabel
 from qgitc.commitactiontablemodel import ActionCondition, CommitAction
-from qgitc.commitcontextprovider import CommitContextProvider
 from qgitc.common import dataDirPath, fullRepoDir, logger, pathsEqual, toSubmodulePath
 from qgitc.difffetcher import DiffFetcher
 from qgitc.diffview import DiffView
@@ -67,6 +65,9 @@ from qgitc.submoduleexecutor import SubmoduleExecutor
 from qgitc.templatemanager import TemplateManageDialog, TemplateScope, loadTemplates
 from qgitc.ui_commitwindow import Ui_CommitWindow
 
+if TYPE_CHECKING:
+    from qgitc.aichatdockwidget import AiChatDockWidget
+
 
 class FileStatus(Enum):
 
@@ -183,6 +184,7 @@ class CommitWindow(StateWindow):
         self._statusFetcher.finished.connect(self._onStatusFetchFinished)
         self._statusFetcher.branchInfoAvailable.connect(
             self._onBranchInfoAvailable)
+        self._statusFetcher.deltaAvailable.connect(self._onStatusDeltaAvailable)
 
         self._repoBranch = {}
 
@@ -299,6 +301,7 @@ class CommitWindow(StateWindow):
             self._onNonUITaskFinished)
 
         self._committedActions = []
+        self._reloadAfterCommit = False
         self._commitExecutor = SubmoduleExecutor(self)
         self._commitExecutor.finished.connect(
             self._onCommitFinished)
@@ -386,9 +389,10 @@ class CommitWindow(StateWindow):
         self.ui.btnChat.setToolTip(self.tr("Chat"))
         self.ui.btnChat.clicked.connect(self._onChatClicked)
 
-        # Setup AI Chat dock widget
-        self._aiChat: AiChatDockWidget = None
-        self._setupAiChatDock()
+        # Setup AI Chat dock widget once the window is up, the AI stack is
+        # slow to import
+        self._aiChatDock: "AiChatDockWidget" = None
+        QTimer.singleShot(0, self._setupAiChatDock)
 
         icon = QIcon(iconsPath + "/commit.svg")
         self.ui.btnShowLog.setIcon(icon)
@@ -417,18 +421,31 @@ class CommitWindow(StateWindow):
         spinner.setInnerRadius(height)
         spinner.setNumberOfLines(14)
 
+    @property
+    def _aiChat(self) -> "AiChatDockWidget":
+        self._setupAiChatDock()
+        return self._aiChatDock
+
     def _setupAiChatDock(self):
         """Setup AI Chat dock widget with embedded mode"""
-        self._aiChat = AiChatDockWidget(self)
+        if self._aiChatDock is not None:
+            return
+
+        from qgitc.aichatdockwidget import AiChatDockWidget
+        from qgitc.commitcontextprovider import CommitContextProvider
+
+        self._aiChatDock = AiChatDockWidget(self)
 
         # Setup context provider for commit window
         aiChatContextProvider = CommitContextProvider(
             self, parent=self)
-        self._aiChat.chatWidget().setContextProvider(aiChatContextProvider)
+        self._aiChatDock.chatWidget().setContextProvider(aiChatContextProvider)
 
         # Add dock widget to commit window
-        self.addDockWidget(Qt.RightDockWidgetArea, self._aiChat)
-        self._aiChat.hide()
+        self.addDockWidget(Qt.RightDockWidgetArea, self._aiChatDock)
+        self._aiChatDock.hide()
+        # the window state may have been restored before
+        self.restoreDockWidget(self._aiChatDock)
 
     def _onChatClicked(self):
         """Toggle the AI chat dock visibility"""
@@ -483,6 +500,27 @@ class CommitWindow(StateWindow):
 
     def _onStatusAvailable(self, repoDir: str, fileList: List[Tuple[str, str, str]]):
         logger.debug("Status available %s -> %s", repoDir, fileList)
+        stagedFiles, files = self._splitStatusFiles(fileList)
+        for file, status, oldFile in stagedFiles:
+            self._stagedModel.addFile(file, repoDir, status, oldFile)
+        for file, status, _ in files:
+            self._filesModel.addFile(file, repoDir, status)
+
+        self._updateAmendCommitsIfNeeded()
+
+    def _onStatusDeltaAvailable(self, repoDir: str, fileList: List[Tuple[str, str, str]]):
+        logger.debug("Status delta available %s -> %s", repoDir, fileList)
+        stagedFiles, files = self._splitStatusFiles(fileList)
+        self._stagedModel.updateRepoFiles(repoDir, stagedFiles)
+        self._filesModel.updateRepoFiles(repoDir, files)
+
+        self._updateAmendCommitsIfNeeded()
+
+    def _splitStatusFiles(self, fileList: List[Tuple[str, str, str]]):
+        """ Split the status result into (stagedFiles, files),
+        each item is (file, statusCode, oldFile) """
+        stagedFiles = []
+        files = []
         ignoredUntrackedFiles = self._ignoredUntrackedFilesSet()
         hiddenDirs = self._ignoredDirectoriesSet()
         for status, file, oldFile in fileList:
@@ -502,11 +540,11 @@ class CommitWindow(StateWindow):
                     continue
 
             if status[0] != " " and status[0] not in ["?", "!"]:
-                self._stagedModel.addFile(file, repoDir, status[0], oldFile)
+                stagedFiles.append((file, status[0], oldFile))
             if status[1] != " ":
-                self._filesModel.addFile(file, repoDir, status[1])
+                files.append((file, status[1], None))
 
-        self._updateAmendCommitsIfNeeded()
+        return stagedFiles, files
 
     def _onBranchInfoAvailable(self, repoDir: str, branch: str):
         self._repoBranch.setdefault(repoDir, branch)
@@ -783,6 +821,7 @@ class CommitWindow(StateWindow):
 
         self._updateCommitProgress(submodule, out, error, not actions)
         if not actions:
+            self._fetchCommittedStatus(submodule, cancelEvent)
             return
 
         out, error = None, None
@@ -791,6 +830,14 @@ class CommitWindow(StateWindow):
                 return
             self._runCommitAction(submodule, action, cancelEvent)
 
+        self._fetchCommittedStatus(submodule, cancelEvent)
+
+    def _fetchCommittedStatus(self, submodule: str, cancelEvent: CancelEvent):
+        self._statusFetcher.fetchStatusDelta(submodule, cancelEvent)
+        # the submodule pointer of the main repo moved too
+        if submodule and submodule != "." and not cancelEvent.isSet():
+            self._statusFetcher.fetchStatusDelta(".", cancelEvent)
+
     def _collectSectionFiles(self, view: QListView, filter: Callable = None):
         indexes = view.selectionModel().selectedRows()
         if not indexes:
@@ -847,13 +894,9 @@ class CommitWindow(StateWindow):
         if not submoduleFiles:
             return
 
-        self._updateSubmoduleFiles(submoduleFiles, self.ui.lvFiles.model())
-        self._updateSubmoduleFiles(submoduleFiles, self.ui.lvStaged.model())
-
         self._blockUI()
         self.ui.spinnerUnstaged.start()
         self._submoduleExecutor.submit(submoduleFiles, self._doUnstage)
-        self.clearModels()
 
     def _onUnstageAllClicked(self):
         ApplicationBase.instance().trackFeatureUsage("commit.unstage_all")
@@ -861,12 +904,9 @@ class CommitWindow(StateWindow):
         if not submoduleFiles:
             return
 
-        self._updateSubmoduleFiles(submoduleFiles, self.ui.lvFiles.model())
-
         self._blockUI()
         self.ui.spinnerUnstaged.start()
         self._submoduleExecutor.submit(submoduleFiles, self._doUnstage)
-        self.clearModels()
 
     def _onStageClicked(self):
         ApplicationBase.instance().trackFeatureUsage("commit.stage")
@@ -874,13 +914,9 @@ class CommitWindow(StateWindow):
         if not submoduleFiles:
             return
 
-        self._updateSubmoduleFiles(submoduleFiles, self.ui.lvFiles.model())
-        self._updateSubmoduleFiles(submoduleFiles, self.ui.lvStaged.model())
-
         self._blockUI()
         self.ui.spinnerUnstaged.start()
         self._submoduleExecutor.submit(submoduleFiles, self._doStage)
-        self.clearModels()
 
     def _onStageAllClicked(self):
         ApplicationBase.instance().trackFeatureUsage("commit.stage_all")
@@ -888,12 +924,9 @@ class CommitWindow(StateWindow):
         if not submoduleFiles:
             return
 
-        self._updateSubmoduleFiles(submoduleFiles, self.ui.lvStaged.model())
-
         self._blockUI()
         self.ui.spinnerUnstaged.start()
         self._submoduleExecutor.submit(submoduleFiles, self._doStage)
-        self.clearModels()
 
     def _doUnstage(self, submodule: str, files: List[str], cancelEvent: CancelEvent):
         ApplicationBase.instance().trackFeatureUsage("commit.unstage")
@@ -903,7 +936,7 @@ class CommitWindow(StateWindow):
             error, _ = Git.restoreStagedFiles(repoDir, repoFiles)
             if error:
                 ApplicationBase.instance().postEvent(self, GitErrorEvent(error))
-        self._statusFetcher.fetchStatus(submodule, cancelEvent)
+        self._statusFetcher.fetchStatusDelta(submodule, cancelEvent)
 
     def _doStage(self, submodule: str, files: List[str], cancelEvent: CancelEvent):
         repoDir = fullRepoDir(submodule)
@@ -912,7 +945,7 @@ class CommitWindow(StateWindow):
             error = Git.addFiles(repoDir, repoFiles)
             if error:
                 ApplicationBase.instance().postEvent(self, GitErrorEvent(error))
-        self._statusFetcher.fetchStatus(submodule, cancelEvent)
+        self._statusFetcher.fetchStatusDelta(submodule, cancelEvent)
 
     def _onNonUITaskFinished(self):
         self._blockUI(False)
@@ -1478,13 +1511,17 @@ class CommitWindow(StateWindow):
         if self._committedActions:
             submodules = {None: self._committedActions}
             self._committedActions = []
+            # the actions may touch any repo, can't rely on the deltas
+            self._reloadAfterCommit = True
             self._commitExecutor.submit(submodules, self._runCommittedAction)
             return
 
         self._outputBlocks.clear()
         if self.ui.cbAmend.isChecked():
             self.ui.cbAmend.setChecked(False)
-        self.reloadLocalChanges()
+        if self._reloadAfterCommit:
+            self._reloadAfterCommit = False
+            self.reloadLocalChanges()
         self._updateCommitStatus(False)
         ApplicationBase.instance().postEvent(
             ApplicationBase.instance(), LocalChangesCommittedEvent())
@@ -1821,7 +1858,8 @@ class CommitWindow(StateWindow):
         logger.debug("Before cancel")
         self.cancel(True)
         logger.debug("After cancel")
-        self._aiChat.queryClose()
+        if self._aiChatDock:
+            self._aiChatDock.queryClose()
         return super().closeEvent(event)
 
     def _onFilesContextMenuRequested(self, pos):
@@ -84,6 +84,91 @@ class Commit():
     def isValid(self):
         return len(self.sha1) > 0
 
+    def parentSha1s(self) -> List[str]:
+        return self.parents
+
+    def mergeKey(self):
+        """The key of the same commit in the repos of the composite logs"""
+        return (self.committerDateTime.date(), self.comments, self.author)
+
+
+class LazyCommit(Commit):
+    """A commit of the composite logs kept as its raw log record, the fields
+    are read from the record when first used.
+
+    Most of the commits are never shown, so their fields would only take
+    memory. `release` drops the fields read once the commit is out of view.
+    """
+
+    __slots__ = ("_raw",)
+
+    # the fields of the raw record
+    _FIELDS = ("sha1", "comments", "author", "authorDate",
+               "committer", "committerDate", "parents")
+
+    def __init__(self, raw: bytes, repoDir: str = None,
+                 committerDateTime: datetime = None):
+        # the other fields are set when read
+        self._raw = raw
+        self.repoDir = repoDir
+        self.committerDateTime = committerDateTime
+
+    def __getattr__(self, name):
+        # only called for the fields not set yet
+        if name == "sha1":
+            # the sha1 is used for lookups, don't read the others for it
+            end = self._raw.find(b"\x01")
+            self.sha1 = self._raw[:end].decode("utf-8")
+            return self.sha1
+        if name == "children":
+            return None
+        if name == "subCommits":
+            self.subCommits = []
+            return self.subCommits
+        if name in LazyCommit._FIELDS:
+            self._materialize()
+            return object.__getattribute__(self, name)
+        raise AttributeError(name)
+
+    def _materialize(self):
+        commit = Commit.fromRawString(self._raw.decode("utf-8", "replace"))
+        for name in LazyCommit._FIELDS:
+            setattr(self, name, getattr(commit, name))
+
+    def isMaterialized(self):
+        try:
+            object.__getattribute__(self, "comments")
+            return True
+        except AttributeError:
+            return False
+
+    def release(self):
+        """Drop the fields read, the changes made to them are lost"""
+        for name in LazyCommit._FIELDS[1:] + ("children",):
+            try:
+                delattr(self, name)
+            except AttributeError:
+                pass
+
+    def parentSha1s(self) -> List[str]:
+        """The parents, read without the other fields if not read yet"""
+        try:
+            return object.__getattribute__(self, "parents")
+        except AttributeError:
+            pass
+        # the parents are the last field of the record
+        start = self._raw.rfind(b"\x01") + 1
+        return self._raw[start:].decode("utf-8").split()
+
+    def mergeKey(self):
+        if self.isMaterialized():
+            return super().mergeKey()
+
+        # read the key without keeping the fields
+        parts = str_split(self._raw.decode("utf-8", "replace"), "\x01")
+        return (self.committerDateTime.date(), str_strip(parts[1], "\n"),
+                parts[2])
+
 
 class MyProfile():
 
@@ -103,6 +103,7 @@ class DataFetcher(QObject):
             self._dataChunk = None
 
         self._exitCode = exitCode
+        self.finalize(exitCode)
         self.fetchFinished.emit(exitCode)
 
     def cancel(self):
@@ -122,6 +123,10 @@ class DataFetcher(QObject):
         """Implement in subclass"""
         return []
 
+    def finalize(self, exitCode):
+        """Called once all the output is parsed, implement in subclass"""
+        pass
+
     def reset(self):
         self._errorData = b''
 
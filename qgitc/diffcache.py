@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+_sha1_re = re.compile(r"[0-9a-f]{40}(?:[0-9a-f]{24})?")
+
+# Pseudo SHA1s for local changes, their diffs change without the id changing
+_localSha1s = {
+    "0000000000000000000000000000000000000000",
+    "0000000000000000000000000000000000000001",
+}
+
+
+class DiffCache:
+    """Thread-safe LRU of raw `git diff-tree` outputs.
+
+    A commit diff never changes once the commit exists, so entries are keyed
+    by the repository, the full commit SHA and the extra diff options only.
+    Local changes and abbreviated or symbolic revisions are never cached.
+    """
+
+    def __init__(self, maxEntries=64, maxBytes=32 * 1024 * 1024, maxEntryBytes=4 * 1024 * 1024):
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._maxEntries = maxEntries
+        self._maxBytes = maxBytes
+        self._maxEntryBytes = maxEntryBytes
+
+    @property
+    def maxEntryBytes(self):
+        return self._maxEntryBytes
+
+    @staticmethod
+    def isCacheable(sha1: str):
+        return bool(sha1) and sha1 not in _localSha1s and \
+            _sha1_re.fullmatch(sha1) is not None
+
+    @staticmethod
+    def makeKey(repoDir: str, sha1: str, files=None, gitArgs=None) -> Optional[Tuple]:
+        if not repoDir or not DiffCache.isCacheable(sha1):
+            return None
+        repoDir = os.path.normcase(os.path.abspath(repoDir))
+        return (repoDir, sha1, tuple(files or ()), tuple(gitArgs or ()))
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        if key is None:
+            return None
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: Tuple, data: bytes):
+        if key is None or not data or len(data) > self._maxEntryBytes:
+            return
+        with self._lock:
+            oldData = self._entries.pop(key, None)
+            if oldData is not None:
+                self._size -= len(oldData)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._entries and (len(self._entries) > self._maxEntries or self._size > self._maxBytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_diffCache = DiffCache()
+
+
+def diffCache() -> DiffCache:
+    return _diffCache
@@ -2,10 +2,11 @@
 
 from typing import Dict, List
 
-from PySide6.QtCore import Signal
+from PySide6.QtCore import QTimer, Signal
 
 from qgitc.common import toSubmodulePath
 from qgitc.datafetcher import DataFetcher
+from qgitc.diffcache import DiffCache, diffCache
 from qgitc.diffutils import *
 from qgitc.gitutils import Git
 
@@ -28,8 +29,16 @@ class DiffFetcher(DataFetcher):
         # Track current file being processed (for metadata in next chunk)
         self._currentFileA = None
         self._currentFileB = None
+        # Raw output recorded for the diff cache
+        self._cacheKey = None
+        self._cacheChunks: List[bytes] = []
+        self._cacheSize = 0
+        self._cachedFetchId = 0
 
     def parse(self, data: bytes):
+        if self._cacheKey is not None:
+            self._recordChunk(data)
+
         lineItems = []
         fileItems: Dict[str, FileInfo] = {}
 
@@ -200,41 +209,72 @@ class DiffFetcher(DataFetcher):
 
     def cancel(self):
         self._isDiffContent = False
+        self._cacheKey = None
+        self._cacheChunks.clear()
+        # drop any pending cached fetch
+        self._cachedFetchId += 1
         super(DiffFetcher, self).cancel()
 
-    def makeArgs(self, args):
+    def fetch(self, *args):
         sha1: str = args[0]
-        filePaths: List[str] = args[1]
-        gitArgs = args[2]
+        key = DiffCache.makeKey(self.cwd or Git.REPO_DIR, sha1,
+                                self._repoFilePaths(args[1]), args[2])
+        data = diffCache().get(key)
+        if data is None:
+            super(DiffFetcher, self).fetch(*args)
+            self._cacheKey = key
+            self._cacheSize = 0
+            return
+
+        self.cancel()
+        self.reset()
+        fetchId = self._cachedFetchId
+        # keep the asynchronous contract of a real fetch
+        QTimer.singleShot(0, self, lambda: self._onCachedFetch(fetchId, data))
+
+    def _onCachedFetch(self, fetchId: int, data: bytes):
+        if fetchId != self._cachedFetchId:
+            return
+        self.parse(data)
+        self.fetchFinished.emit(0)
+
+    def _recordChunk(self, data: bytes):
+        self._cacheSize += len(data)
+        if self._cacheSize > diffCache().maxEntryBytes:
+            self._cacheKey = None
+            self._cacheChunks.clear()
+        else:
+            self._cacheChunks.append(data)
 
-        git_args = ["-c", "core.quotePath=false"]
+    def finalize(self, exitCode: int):
+        if exitCode == 0 and self._cacheKey is not None:
+            diffCache().put(self._cacheKey, b"".join(self._cacheChunks))
+        self._cacheKey = None
+        self._cacheChunks.clear()
 
-        if sha1 == Git.LCC_SHA1:
-            git_args.extend(["diff-index", "--cached", "HEAD"])
-        elif sha1 == Git.LUC_SHA1:
-            git_args.extend(["diff-files"])
-        elif sha1 == None:  # untracked files
-            assert len(filePaths) == 1
-            git_args.extend(["diff", "-p", "--no-index", "/dev/null"])
-        else:
-            git_args.extend(["diff-tree", "-r", "--root", sha1])
+    def _repoFilePaths(self, filePaths: List[str]):
+        if filePaths and self._repoDir and self._repoDir != ".":
+            return [toSubmodulePath(self._repoDir, path) for path in filePaths]
+        return filePaths
+
+    def makeArgs(self, args):
+        sha1: str = args[0]
+        filePaths: List[str] = self._repoFilePaths(args[1])
+        gitArgs = args[2]
 
         if sha1 is not None:
-            git_args.extend(["-p", "--textconv", "--submodule",
-                             "-C", "--no-commit-id", "-U3"])
-            if Git.supportsCC():
-                git_args.append("--cc")
+            return Git.rawDiffArgs(sha1, filePaths, gitArgs)
+
+        # untracked files
+        assert len(filePaths) == 1
+        git_args = ["-c", "core.quotePath=false",
+                    "diff", "-p", "--no-index", "/dev/null"]
 
         if gitArgs:
             git_args.extend(gitArgs)
 
-        if filePaths:
-            git_args.append("--")
-            if self._repoDir and self._repoDir != ".":
-                for path in filePaths:
-                    git_args.append(toSubmodulePath(self._repoDir, path))
-            else:
-                git_args.extend(filePaths)
+        git_args.append("--")
+        git_args.extend(filePaths)
 
         return git_args
 
@@ -2,7 +2,7 @@
 
 import bisect
 import os
-from typing import List
+from typing import Callable, List
 
 from PySide6.QtCore import SIGNAL, QObject, QProcess, Signal
 
@@ -115,6 +115,56 @@ class FindWorker(QObject):
             self.resultAvailable.emit([p.decode("utf-8") for p in parts])
 
 
+class FindResult:
+    """Row indices of the commits found
+
+    The rows are kept in a set for the membership tests of painting, and in
+    a sorted list for the navigation. The rows found are merged into the
+    sorted list in batches, when it is needed.
+    """
+
+    def __init__(self):
+        self._rows = set()
+        self._sorted: List[int] = []
+        self._pending: List[int] = []
+
+    def add(self, rows: List[int]):
+        for row in rows:
+            if row not in self._rows:
+                self._rows.add(row)
+                self._pending.append(row)
+
+    def clear(self):
+        self._rows.clear()
+        self._sorted.clear()
+        self._pending.clear()
+
+    def sortedRows(self) -> List[int]:
+        if self._pending:
+            # two sorted runs, merged in linear time by sort
+            self._pending.sort()
+            self._sorted.extend(self._pending)
+            self._sorted.sort()
+            self._pending.clear()
+        return self._sorted
+
+    def remap(self, mapIndex: Callable[[int], int]):
+        """Move the rows found, @mapIndex returns the new row of a row, or -1
+        if the row was removed"""
+        rows = [mapIndex(row) for row in self.sortedRows()]
+        self.clear()
+        self.add([row for row in rows if row != -1])
+
+    def __contains__(self, row: int):
+        return row in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self.sortedRows())
+
+
 class DiffFinder(QObject):
 
     resultAvailable = Signal()
@@ -124,7 +174,7 @@ class DiffFinder(QObject):
         super().__init__(parent)
         self._finders: List[FindWorker] = []
         self._source = source
-        self._result = []
+        self._result = FindResult()
         self._param: FindParameter = None
         self._filterPath: List[str] = None
         self._submodules: List[str] = None
@@ -181,30 +231,43 @@ class DiffFinder(QObject):
         self._result.clear()
         self._sha1IndexMap.clear()
 
+    def remapRows(self, mapIndex: Callable[[int], int]):
+        """Update the rows after the commits of the source moved, @mapIndex
+        returns the new row of a row, or -1 if the row was removed"""
+        self._result.remap(mapIndex)
+
+        sha1IndexMap = {}
+        for sha1, row in self._sha1IndexMap.items():
+            newRow = mapIndex(row)
+            if newRow != -1:
+                sha1IndexMap[sha1] = newRow
+        self._sha1IndexMap = sha1IndexMap
+
     def isRunning(self):
         return len(self._finders) > 0
 
     @property
-    def findResult(self):
+    def findResult(self) -> FindResult:
         return self._result
 
     def nextResult(self):
         if not self._param.range or not self._result:
             return FIND_NOTFOUND
 
+        result = self._result.sortedRows()
         x = self._param.range.start
         if self._param.range.start > self._param.range.stop:
-            index = bisect.bisect_left(self._result, x)
-            if index < len(self._result) and self._result[index] <= x:
-                return self._result[index]
-            if index - 1 >= 0 and self._result[index - 1] <= x:
-                return self._result[index - 1]
+            index = bisect.bisect_left(result, x)
+            if index < len(result) and result[index] <= x:
+                return result[index]
+            if index - 1 >= 0 and result[index - 1] <= x:
+                return result[index - 1]
         else:
-            index = bisect.bisect_right(self._result, x)
-            if index - 1 >= 0 and self._result[index - 1] >= x:
-                return self._result[index - 1]
-            if index < len(self._result):
-                return self._result[index]
+            index = bisect.bisect_right(result, x)
+            if index - 1 >= 0 and result[index - 1] >= x:
+                return result[index - 1]
+            if index < len(result):
+                return result[index]
 
         return FIND_NOTFOUND
 
@@ -212,9 +275,9 @@ class DiffFinder(QObject):
         if not self._sha1IndexMap:
             return
 
-        for sha1 in result:
-            index = self._sha1IndexMap[sha1]
-            bisect.insort(self._result, index)
+        # the commits removed by a refresh are gone
+        self._result.add([self._sha1IndexMap[sha1] for sha1 in result
+                          if sha1 in self._sha1IndexMap])
         self.resultAvailable.emit()
 
     def _onFindFinished(self, exitCode, exitStatus):
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from typing import List
+from typing import List, Tuple
 
 from PySide6.QtCore import QAbstractListModel, QModelIndex, QRect, QRectF, Qt
 from PySide6.QtGui import QFont, QPainter, QPen
@@ -9,6 +9,11 @@ from PySide6.QtWidgets import QStyle, QStyledItemDelegate, QStyleOptionViewItem
 from qgitc.applicationbase import ApplicationBase
 
 
+def _repoKey(repoDir: str):
+    # None, "" and "." all refer to the main repo
+    return repoDir if repoDir and repoDir != "." else "."
+
+
 class StatusFileInfo():
 
     def __init__(self, file: str, repoDir: str, statusCode: str, oldFile: str = None):
@@ -176,5 +181,45 @@ class StatusFileListModel(QAbstractListModel):
         self.endRemoveRows()
         return info
 
+    def updateRepoFiles(self, repoDir: str, files: List[Tuple[str, str, str]]):
+        """ Replace the files of @repoDir with @files (file, statusCode, oldFile),
+        only the rows that actually changed are touched """
+        newFiles = {}
+        for file, statusCode, oldFile in files:
+            newFiles[file] = (statusCode, oldFile)
+
+        repoKey = _repoKey(repoDir)
+        rowsToRemove = []
+        for row, fileInfo in enumerate(self._fileList):
+            if _repoKey(fileInfo.repoDir) != repoKey:
+                continue
+
+            status = newFiles.pop(fileInfo.file, None)
+            if status is None:
+                rowsToRemove.append(row)
+            elif status != (fileInfo.statusCode, fileInfo.oldFile):
+                fileInfo.statusCode, fileInfo.oldFile = status
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index)
+
+        # remove from the end, one call per contiguous range
+        end = len(rowsToRemove) - 1
+        while end >= 0:
+            begin = end
+            while begin > 0 and rowsToRemove[begin - 1] == rowsToRemove[begin] - 1:
+                begin -= 1
+            first = rowsToRemove[begin]
+            self.removeRows(first, rowsToRemove[end] - first + 1)
+            end = begin - 1
+
+        if newFiles:
+            rowCount = self.rowCount()
+            self.beginInsertRows(QModelIndex(), rowCount,
+                                 rowCount + len(newFiles) - 1)
+            for file, (statusCode, oldFile) in newFiles.items():
+                self._fileList.append(StatusFileInfo(
+                    file, repoDir, statusCode, oldFile))
+            self.endInsertRows()
+
     def clear(self):
         self.removeRows(0, self.rowCount())
@@ -11,6 +11,8 @@ from typing import Dict, List, Union
 
 from PySide6.QtCore import QCoreApplication, QProcess, QThread
 
+from qgitc.diffcache import DiffCache, diffCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,7 +20,8 @@ class GitProcess():
 
     GIT_BIN = None
 
-    def __init__(self, repoDir, args, text=None, env=None, stdinPipe=False):
+    def __init__(self, repoDir, args, text=None, env=None, stdinPipe=False,
+                 stderr=subprocess.PIPE):
         creationflags = 0
         logger.debug(f"run {args} in {repoDir}")
         if os.name == "nt":
@@ -34,7 +37,7 @@ class GitProcess():
             cwd=repoDir,
             stdin=(subprocess.PIPE if stdinPipe else None),
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stderr=stderr,
             creationflags=creationflags,
             universal_newlines=text,
             encoding="utf-8" if text else None,
@@ -182,10 +185,67 @@ class Ref():
         return cls(_type, _name)
 
 
+class RepoRefs():
+    """Branches and refs of a repository, read by `Git.loadRefs`"""
+
+    def __init__(self):
+        # local branches, then the remote ones, as listed by `git branch -a`
+        self.branches: List[str] = []
+        self.currentBranch: str = None
+        # sha1 -> refs pointing to it, see `Git.REF_MAP`
+        self.refMap: Dict[str, List[Ref]] = defaultdict(list)
+        self.revHead: str = None
+
+    @classmethod
+    def parse(cls, branchData: bytes, tagData: bytes, revHead: str = None):
+        """Parse the output of `Git.FOR_EACH_REF_ARGS` and of
+        `Git.SHOW_TAGS_ARGS`, @revHead is used when HEAD is detached"""
+        refs = cls()
+
+        # refs are sorted by type, tags first
+        for line in tagData.decode("utf-8", errors="replace").split('\n'):
+            ref = Ref.fromRawString(line)
+            if ref:
+                refs.refMap[line[:40]].append(ref)
+
+        # heads are listed before remotes
+        for line in branchData.decode("utf-8", errors="replace").split('\n'):
+            parts = line.split('\0')
+            if len(parts) != 3:
+                continue
+
+            head, sha1, name = parts
+            if name.startswith("refs/heads/"):
+                ref = Ref(Ref.HEAD, name[11:])
+                refs.branches.append(ref.name)
+                if head == "*":
+                    refs.currentBranch = ref.name
+                    refs.revHead = sha1
+            elif name.startswith("refs/remotes/"):
+                # symbolic refs such as `origin/HEAD`
+                if name.endswith("/HEAD"):
+                    continue
+                ref = Ref(Ref.REMOTE, name[13:])
+                refs.branches.append(name[5:])
+            else:
+                continue
+
+            refs.refMap[sha1].append(ref)
+
+        if refs.currentBranch is None and revHead:
+            refs.revHead = revHead
+            refs.currentBranch = "(HEAD detached at {0})".format(revHead[:7])
+            refs.branches.insert(0, refs.currentBranch)
+
+        return refs
+
+
 class Git():
     REPO_DIR = None
     REF_MAP = {}
     REV_HEAD = None
+    # refs of each repo shown in composite mode, REF_MAP is not used then
+    SUBMODULE_REFS: Dict[str, RepoRefs] = {}
 
     # local uncommitted changes
     LUC_SHA1 = "0000000000000000000000000000000000000000"
@@ -198,6 +258,9 @@ class Git():
 
     RUN_SLOW = False
 
+    # keep well below the Windows command line limit (32767)
+    MAX_PATHSPEC_ARGS_LENGTH = 30000
+
     @staticmethod
     def available():
         return GitProcess.GIT_BIN is not None
@@ -294,6 +357,75 @@ class Git():
 
         return refMap
 
+    FOR_EACH_REF_ARGS = ["for-each-ref",
+                         "--format=%(HEAD)%00%(objectname)%00%(refname)",
+                         "refs/heads", "refs/remotes"]
+    # unlike `for-each-ref`, uses the peeled tags of packed-refs
+    SHOW_TAGS_ARGS = ["show-ref", "-d", "--tags"]
+
+    @staticmethod
+    def loadRefs(repoDir=None):
+        """Read the branches, the refs and HEAD of @repoDir.
+        Does not use QProcess, so it can be called from any thread"""
+        branchData = Git.checkOutput(Git.FOR_EACH_REF_ARGS, repoDir=repoDir)
+        if branchData is None:
+            return None
+        # fails without tags
+        tagData = Git.checkOutput(Git.SHOW_TAGS_ARGS, repoDir=repoDir) or b""
+
+        refs = RepoRefs.parse(branchData, tagData)
+        if refs.revHead is None:
+            # detached HEAD or no branch checked out
+            head = Git.checkOutput(["rev-parse", "--verify", "-q", "HEAD"],
+                                   repoDir=repoDir)
+            if head:
+                refs = RepoRefs.parse(
+                    branchData, tagData, head.decode("utf-8").rstrip('\n'))
+        return refs
+
+    @staticmethod
+    def refsStamp(repoDir):
+        """State of the refs and HEAD of @repoDir, read from the file
+        system without running git. It changes whenever a ref is updated,
+        since git writes refs by renaming a lock file into their directory.
+        None if @repoDir is not a repo"""
+        gitDir = os.path.join(repoDir, ".git")
+        if os.path.isfile(gitDir):
+            try:
+                with open(gitDir, "r", encoding="utf-8") as f:
+                    line = f.readline().strip()
+            except OSError:
+                return None
+            if not line.startswith("gitdir:"):
+                return None
+            gitDir = os.path.normpath(os.path.join(repoDir, line[7:].strip()))
+
+        def _stamp(path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            return st.st_mtime_ns, st.st_size
+
+        head = _stamp(os.path.join(gitDir, "HEAD"))
+        if head is None:
+            return None
+
+        # linked worktrees share the refs of the main repo
+        commonDir = gitDir
+        try:
+            with open(os.path.join(gitDir, "commondir"), "r", encoding="utf-8") as f:
+                commonDir = os.path.normpath(
+                    os.path.join(gitDir, f.readline().strip()))
+        except OSError:
+            pass
+
+        refDirs = []
+        for root, _, _ in os.walk(os.path.join(commonDir, "refs")):
+            refDirs.append(_stamp(root))
+
+        return head, _stamp(os.path.join(commonDir, "packed-refs")), tuple(refDirs)
+
     @staticmethod
     def revHead():
         args = ["rev-parse", "HEAD"]
@@ -358,13 +490,16 @@ class Git():
         return not Git.versionEQ(2, 33, 0)
 
     @staticmethod
-    def commitRawDiff(sha1, files=None, gitArgs=None, repoDir=None):
+    def rawDiffArgs(sha1, files=None, gitArgs=None):
+        """git arguments for the raw diff of @sha1, shared with DiffFetcher
+        so that both produce the same output for the diff cache"""
+        args = ["-c", "core.quotePath=false"]
         if sha1 == Git.LCC_SHA1:
-            args = ["diff-index", "--cached", "HEAD"]
+            args.extend(["diff-index", "--cached", "HEAD"])
         elif sha1 == Git.LUC_SHA1:
-            args = ["diff-files"]
+            args.append("diff-files")
         else:
-            args = ["diff-tree", "-r", "--root", sha1]
+            args.extend(["diff-tree", "-r", "--root", sha1])
 
         args.extend(["-p", "--textconv", "--submodule",
                      "-C", "--no-commit-id", "-U3"])
@@ -378,10 +513,22 @@ class Git():
             args.append("--")
             args.extend(files)
 
+        return args
+
+    @staticmethod
+    def commitRawDiff(sha1, files=None, gitArgs=None, repoDir=None):
+        cache = diffCache()
+        key = DiffCache.makeKey(repoDir or Git.REPO_DIR, sha1, files, gitArgs)
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+        args = Git.rawDiffArgs(sha1, files, gitArgs)
         data = Git.checkOutput(args, repoDir=repoDir, reportError=True)
         if not data:
             return None
 
+        cache.put(key, data)
         return data
 
     @staticmethod
@@ -942,6 +1089,59 @@ class Git():
                 Git.VERSION_MINOR == minor and
                 Git.VERSION_PATCH == patch)
 
+    @staticmethod
+    def supportsPathspecFromFile():
+        return Git.versionGE(2, 25, 0)
+
+    @staticmethod
+    def _pathspecChunks(files: List[str]):
+        """split @files so that each chunk fits in a command line"""
+        chunk = []
+        size = 0
+        for file in files:
+            if chunk and size + len(file) + 1 > Git.MAX_PATHSPEC_ARGS_LENGTH:
+                yield chunk
+                chunk = []
+                size = 0
+            chunk.append(file)
+            size += len(file) + 1
+
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def runWithPathspecs(repoDir, args: List[str], files: List[str], text=None):
+        """run git @args with @files as pathspecs
+        the pathspecs are fed through stdin when git supports it,
+        otherwise they are passed in as few command lines as possible
+        return (returncode, output, error)
+        """
+        repoDir = repoDir or Git.REPO_DIR
+        if Git.supportsPathspecFromFile():
+            pathspecArgs = args + ["--pathspec-from-file=-", "--pathspec-file-nul"]
+            process = GitProcess(repoDir, pathspecArgs, text=text, stdinPipe=True)
+            input = "\0".join(files)
+            output, error = process.communicate(
+                input if text else input.encode("utf-8"))
+            return process.returncode, output, error
+
+        outputs = []
+        errors = []
+        returncode = 0
+        for chunk in Git._pathspecChunks(files):
+            process = GitProcess(repoDir, args + ["--"] + chunk, text=text)
+            output, error = process.communicate()
+            if output:
+                outputs.append(output)
+            if error:
+                errors.append(error)
+            if process.returncode != 0:
+                returncode = process.returncode
+                break
+
+        empty = "" if text else b""
+        return returncode, empty.join(outputs), empty.join(errors)
+
     @staticmethod
     def restoreStagedFiles(repoDir, files):
         """restore staged files
@@ -950,13 +1150,11 @@ class Git():
         and can be restored with 'git restore'
         """
         # `restore --staged` is much slower than reset HEAD
-        args = ["reset", "HEAD", "--"]
-        args.extend(files)
-        process = GitProcess(repoDir or Git.REPO_DIR, args, text=True)
-        output, error = process.communicate()
+        returncode, output, error = Git.runWithPathspecs(
+            repoDir, ["reset", "HEAD"], files, text=True)
 
         filesToRestore = []
-        if process.returncode != 0:
+        if returncode != 0:
             if error:
                 return error, filesToRestore
             return None, filesToRestore
@@ -968,6 +1166,7 @@ class Git():
         # M       file2.txt
         # Only include files that were in the original files list
         if output:
+            fileKeys = {Git._fileKey(file) for file in files}
             lines = output.splitlines()
             inUnstagedSection = False
             for line in lines:
@@ -979,34 +1178,17 @@ class Git():
                     parts = line.split(None, 1)
                     if len(parts) >= 2:
                         filename = parts[1].strip()
-                        if Git._isFileInList(filename, files):
+                        if Git._fileKey(filename) in fileKeys:
                             filesToRestore.append(filename)
 
         return None, filesToRestore
 
     @staticmethod
-    def _isSameFile(targetFile: str, file: str):
-        if len(targetFile) != len(file):
-            return False
-
-        for c1, c2 in zip(targetFile, file):
-            if c1 in ('/', '\\') and c2 in ('/', '\\'):
-                continue
-
-            if c1.lower() != c2.lower():
-                return False
-
-        return True
-
-    @staticmethod
-    def _isFileInList(targetFile: str, files: List[str]):
+    def _fileKey(file: str):
         if os.name != "nt":
-            return targetFile in files
+            return file
 
-        for file in files:
-            if Git._isSameFile(targetFile, file):
-                return True
-        return False
+        return file.replace('\\', '/').lower()
 
     @staticmethod
     def restoreFiles(repoDir, files, staged=False):
@@ -1023,11 +1205,9 @@ class Git():
         if not files:
             return None
 
-        args = ["restore", "--"]
-        args.extend(files)
-        process = GitProcess(repoDir or Git.REPO_DIR, args)
-        _, error = process.communicate()
-        if process.returncode != 0 and error is not None:
+        returncode, _, error = Git.runWithPathspecs(
+            repoDir, ["restore"], files)
+        if returncode != 0 and error is not None:
             return error.decode("utf-8")
 
         return None
@@ -1051,11 +1231,9 @@ class Git():
         """add files to the index
         return error message if any
         """
-        args = ["add", "-f", "--"]
-        args.extend(files)
-        process = GitProcess(repoDir or Git.REPO_DIR, args)
-        _, error = process.communicate()
-        if process.returncode != 0 and error is not None:
+        returncode, _, error = Git.runWithPathspecs(
+            repoDir, ["add", "-f"], files)
+        if returncode != 0 and error is not None:
             return error.decode("utf-8")
 
         return None
@@ -1071,8 +1249,12 @@ class Git():
             args.append("--ignore-submodules=dirty")
         if nullFormat:
             args.append("-z")
-        data = Git.checkOutput(args, repoDir=repoDir)
-        if not data:
+        # empty when there is no change, None if git failed
+        process = Git.run(args, repoDir=repoDir)
+        data, error = process.communicate()
+        if process.returncode != 0:
+            logger.warning("git status failed in `%s`: %s", repoDir or Git.REPO_DIR,
+                           error.decode("utf-8", errors="replace").rstrip())
             return None
 
         return data
@@ -1129,6 +1311,41 @@ class Git():
                 repoDir or Git.REPO_DIR, ".git", "shallow")
             return os.path.exists(shallowFile)
 
+    @staticmethod
+    def conflictFileStages(repoDir=None):
+        """return the blob ids of all unmerged files with a single
+        `ls-files -u`, as {path: {stage: blobId}}
+        """
+        data = Git.checkOutput(["ls-files", "-u", "-z"], repoDir=repoDir)
+        if not data:
+            return {}
+
+        stages = {}
+        for entry in data.split(b'\0'):
+            info, _, path = entry.partition(b'\t')
+            parts = info.split()
+            if len(parts) < 3 or not path:
+                continue
+            fileStages = stages.setdefault(path.decode("utf-8"), {})
+            fileStages[int(parts[2])] = parts[1].decode("utf-8")
+
+        return stages
+
+    @staticmethod
+    def resolveFilesBy(ours, files, repoDir=None):
+        """resolve all @files by taking our or their side, same as
+        `resolveBy` but with one checkout and one add
+        return error message if any
+        """
+        returncode, _, error = Git.runWithPathspecs(
+            repoDir, ["checkout", "--ours" if ours else "--theirs"], files)
+        if returncode != 0:
+            if error:
+                return error.decode("utf-8", errors="replace")
+            return "checkout failed"
+
+        return Git.addFiles(repoDir, files)
+
     @staticmethod
     def getConflictFileBlobIds(filePath, repoDir=None):
         args = ["ls-files", "-u", "--", filePath]
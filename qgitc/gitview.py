@@ -6,9 +6,10 @@ from PySide6.QtCore import QTimer, Signal
 from PySide6.QtWidgets import QCompleter, QWidget
 
 from qgitc.applicationbase import ApplicationBase
+from qgitc.branchlistmodel import BranchFilterModel, BranchListModel
 from qgitc.common import *
 from qgitc.events import BlameEvent
-from qgitc.gitutils import Git
+from qgitc.gitutils import Git, RepoRefs
 from qgitc.ui_gitview import *
 
 
@@ -39,9 +40,16 @@ class GitView(QWidget):
         self.ui.cbBranch.setInsertPolicy(QComboBox.NoInsert)
         self.ui.cbBranch.setEditable(True)
 
-        self.ui.cbBranch.completer().setFilterMode(Qt.MatchContains)
-        self.ui.cbBranch.completer().setCompletionMode(
-            QCompleter.PopupCompletion)
+        self._branchModel = BranchListModel(self)
+        self.ui.cbBranch.setModel(self._branchModel)
+        self.ui.cbBranch.view().setUniformItemSizes(True)
+
+        self._branchFilterModel = BranchFilterModel(self)
+        self._branchFilterModel.setSourceModel(self._branchModel)
+        completer = QCompleter(self._branchFilterModel, self)
+        # the filter model does the matching
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.ui.cbBranch.setCompleter(completer)
 
         height = self.ui.lbBranch.height() // 6
         self.ui.branchSpinner.setLineLength(height)
@@ -78,6 +86,8 @@ class GitView(QWidget):
     def __setupSignals(self):
         self.ui.cbBranch.currentIndexChanged.connect(
             self.__onDelayBranchChanged)
+        self.ui.cbBranch.lineEdit().textEdited.connect(
+            self._branchFilterModel.setFilterText)
         self.ui.logView.currentIndexChanged.connect(
             self.__onCommitChanged, Qt.QueuedConnection)
         self.ui.logView.findFinished.connect(self.__onFindFinished)
@@ -110,51 +120,41 @@ class GitView(QWidget):
         if app.submodules:
             self.__onSubmoduleAvailable(app.submodules, True)
 
-    def __updateBranches(self, activeBranch=None):
+    def beginLoadBranches(self):
+        """Clear the view while the branches are being loaded"""
         if self._delayTimer.isActive():
             self._delayTimer.stop()
         self.ui.cbBranch.blockSignals(True)
-        self.ui.cbBranch.clear()
+        self._branchModel.clear()
         self.ui.cbBranch.blockSignals(False)
         self.ui.logView.clear()
         self.ui.diffView.clear()
         self.ui.leSha1.clear()
 
+        if Git.REPO_DIR and Git.available():
+            self.ui.branchSpinner.start()
+
+    def setBranches(self, refs: RepoRefs, activeBranch=None):
+        """Show the branches of @refs and the logs of @activeBranch,
+        or of the current branch if not found"""
+        self.beginLoadBranches()
+        self.ui.branchSpinner.stop()
+
         if not Git.REPO_DIR or not Git.available():
             return
 
-        branches = Git.branches()
-        if not branches:
+        if not refs or not refs.branches:
             self.window().showMessage(self.tr("Can't get branch"))
             return
 
-        curBranchIdx = -1
-        defBranchIdx = -1
         self.ui.cbBranch.blockSignals(True)
+        self._branchModel.setBranches(refs.branches)
 
-        for branch in branches:
-            branch = branch.strip()
-            if branch.startswith("remotes/origin/"):
-                if not branch.startswith("remotes/origin/HEAD"):
-                    self.ui.cbBranch.addItem(branch)
-                    if activeBranch and activeBranch == branch:
-                        curBranchIdx = self.ui.cbBranch.count() - 1
-            elif branch:
-                if branch.startswith("*"):
-                    pure_branch = branch.replace("*", "").strip()
-                    self.ui.cbBranch.addItem(pure_branch)
-                    defBranchIdx = self.ui.cbBranch.count() - 1
-                    if curBranchIdx == -1 and (not activeBranch or activeBranch == pure_branch):
-                        curBranchIdx = defBranchIdx
-                else:
-                    if branch.startswith("+ "):
-                        branch = branch[2:]
-                    self.ui.cbBranch.addItem(branch.strip())
-                    if activeBranch and activeBranch == branch:
-                        curBranchIdx = self.ui.cbBranch.count() - 1
-
-        if curBranchIdx == -1:
-            curBranchIdx = defBranchIdx
+        curBranchIdx = -1
+        if activeBranch:
+            curBranchIdx = self._branchModel.indexOf(activeBranch)
+        if curBranchIdx == -1 and refs.currentBranch:
+            curBranchIdx = self._branchModel.indexOf(refs.currentBranch)
         if curBranchIdx != -1:
             self.ui.cbBranch.setCurrentIndex(curBranchIdx)
 
@@ -327,13 +327,8 @@ class GitView(QWidget):
         self.branchA = False
         self.ui.logView.setBranchB()
 
-    def reloadBranches(self, activeBranch=None):
-        self.__updateBranches(activeBranch)
-
     def setCurrentBranch(self, branch):
-        index = self.ui.cbBranch.findText(branch)
-        if index == -1:
-            index = self.ui.cbBranch.findText(branch, Qt.MatchEndsWith)
+        index = self._branchModel.findBranch(branch)
         if index != -1:
             self.ui.cbBranch.setCurrentIndex(index)
 
@@ -101,6 +101,97 @@ class AiModelCapabilities:
     context_window: int = 100000
 
 
+class SseDecoder:
+    """Incremental splitter of a server-sent events stream.
+
+    Data is appended to a single buffer consumed through a read offset, and
+    the delimiter scan resumes where the previous chunk stopped, so the
+    cost stays linear however the stream is chunked.
+    """
+
+    # Drop the consumed bytes once they reach this size
+    COMPACT_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._readPos = 0
+        self._lineStart = 0
+        self._scanPos = 0
+
+    def clear(self):
+        self._buffer = bytearray()
+        self._readPos = 0
+        self._lineStart = 0
+        self._scanPos = 0
+
+    def pending(self) -> bytes:
+        """Data not yet returned as an event"""
+        return bytes(self._buffer[self._readPos:])
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Append @data and return the events completed by it, an event is
+        terminated by an empty line (either `\n` or `\r\n` line endings)"""
+        buffer = self._buffer
+        buffer += data
+
+        events: List[bytes] = []
+        readPos = self._readPos
+        lineStart = self._lineStart
+        pos = buffer.find(b"\n", self._scanPos)
+        while pos != -1:
+            lineEnd = pos
+            if lineEnd > lineStart and buffer[lineEnd - 1] == 0x0D:
+                lineEnd -= 1
+
+            if lineEnd == lineStart:
+                if lineStart > readPos:
+                    # drop the line break before the empty line
+                    end = lineStart - 1
+                    if end > readPos and buffer[end - 1] == 0x0D:
+                        end -= 1
+                    events.append(bytes(buffer[readPos:end]))
+                readPos = pos + 1
+
+            lineStart = pos + 1
+            pos = buffer.find(b"\n", lineStart)
+
+        self._scanPos = len(buffer)
+        if readPos == len(buffer):
+            buffer.clear()
+            readPos = lineStart = self._scanPos = 0
+        elif readPos >= SseDecoder.COMPACT_SIZE and readPos * 2 >= len(buffer):
+            del buffer[:readPos]
+            lineStart -= readPos
+            self._scanPos -= readPos
+            readPos = 0
+
+        self._readPos = readPos
+        self._lineStart = lineStart
+        return events
+
+
+def decodeJsonBatch(payloads: List[bytes]) -> List[Any]:
+    """Decode @payloads with a single parser call when possible, payloads
+    that are not valid JSON are returned as None"""
+    if len(payloads) > 1:
+        try:
+            values = json.loads(b"[" + b",".join(payloads) + b"]")
+            # a payload like `1,2` is invalid alone but not in an array
+            if len(values) == len(payloads):
+                return values
+        except ValueError:
+            pass
+
+    values = []
+    for payload in payloads:
+        try:
+            values.append(json.loads(payload))
+        except ValueError as e:
+            logger.warning("Failed to decode stream data: %s", e)
+            values.append(None)
+    return values
+
+
 class AiModelBase(QObject):
     responseAvailable = Signal(AiResponse)
     reasoningFinished = Signal()
@@ -120,6 +211,7 @@ class AiModelBase(QObject):
         self._isResponsesApiEnabled = False
 
         self._data: bytes = b""
+        self._sseDecoder = SseDecoder()
         self._isStreaming = False
         self._firstDelta = True
 
@@ -330,6 +422,7 @@ class AiModelBase(QObject):
         logger.debug("_initReply: initializing reply, streaming=%s, responses_api=%s",
                      self._isStreaming, self._isResponsesApiEnabled)
         self._data = b""
+        self._sseDecoder.clear()
         self._firstDelta = True
 
         self._choiceRoles = {}
@@ -399,19 +492,9 @@ class AiModelBase(QObject):
 
     def _handleData(self, data: bytes):
         if self._isStreaming:
-            self._data += data
-            while self._data:
-                pos = self._data.find(b"\n\n")
-                offset = 2
-                if pos == -1:
-                    pos = self._data.find(b"\r\n\r\n")
-                    offset = 4
-                if pos != -1:
-                    line = self._data[:pos]
-                    self._data = self._data[pos+offset:]
-                    self.handleStreamResponse(line)
-                else:
-                    break
+            events = self._sseDecoder.feed(data)
+            if events:
+                self.handleStreamEvents(events)
         else:
             self.handleNonStreamResponse(data)
 
@@ -447,9 +530,10 @@ class AiModelBase(QObject):
             reply: QNetworkReply = self.sender()
             errorString = reply.errorString()
 
-            if self._data and self._data.startswith(b"{"):
+            data = self._data or self._sseDecoder.pending()
+            if data and data.startswith(b"{"):
                 try:
-                    msg = json.loads(self._data.decode("utf-8"))
+                    msg = json.loads(data.decode("utf-8"))
                     error = msg.get("error", {})
                     message = error.get("message")
                     if message:
@@ -470,37 +554,50 @@ class AiModelBase(QObject):
         self._reply.abort()
 
     def handleStreamResponse(self, line: bytes):
+        self.handleStreamEvents([line])
+
+    def handleStreamEvents(self, events: List[bytes]):
+        """Handle the SSE @events of a network chunk, the JSON payloads are
+        decoded in one batch"""
         if self._isResponsesApiEnabled:
-            self._handleStreamResponseResponses(line)
+            self._handleStreamResponseResponses(events)
         else:
-            self._handleStreamResponseChat(line)
+            self._handleStreamResponseChat(events)
 
-    def _handleStreamResponseChat(self, line: bytes):
-        if not line:
-            return
+    def _handleStreamResponseChat(self, events: List[bytes]):
+        payloads = []
+        for line in events:
+            if not line:
+                continue
 
-        if not line.startswith(b"data:"):
-            if not line.startswith(b": ping - "):
-                logger.warning(b"Corrupted chunk: %s", line)
-            return
+            if not line.startswith(b"data:"):
+                if not line.startswith(b": ping - "):
+                    logger.warning(b"Corrupted chunk: %s", line)
+                continue
+
+            lineData = line[5:].strip()
+            if lineData == b"[DONE]":
+                logger.debug("_handleStreamResponseChat: received [DONE]")
+                continue
+
+            payloads.append(lineData)
 
-        lineData = line[5:].strip()
-        if lineData == b"[DONE]":
-            logger.debug("_handleStreamResponseChat: received [DONE]")
+        if not payloads:
             return
 
-        lineContent = lineData.decode("utf-8")
-        data: dict = json.loads(lineContent)
+        for payload, data in zip(payloads, decodeJsonBatch(payloads)):
+            if isinstance(data, dict):
+                self._handleChatStreamData(data, payload)
+
+    def _handleChatStreamData(self, data: dict, payload: bytes):
         choices: list = data.get("choices")
         if choices is None:
             logger.debug("_handleStreamResponseChat: no choices in response")
             error = data.get("error", {})
             if error:
-                self.networkError.emit(lineContent)
+                self.networkError.emit(payload.decode("utf-8"))
             return
 
-        del lineContent
-
         usage = self._parseUsage(data)
 
         # OpenAI can stream multiple choices concurrently.
@@ -595,30 +692,32 @@ class AiModelBase(QObject):
             self.reasoningFinished.emit()
             self._isReasoningFinishedEmitted = True
 
-    def _handleStreamResponseResponses(self, line: bytes):
-        if not line:
-            return
-
-        # Responses streaming can include `event:` lines alongside `data:`.
-        for raw in line.splitlines():
-            raw = raw.strip()
-            if not raw.startswith(b"data:"):
-                if not raw.startswith(b"event:"):
-                    logger.warning(b"Unexpected chunk: %s" % raw)
-                continue
-            payload = raw[5:].strip()
-            if not payload:
+    def _handleStreamResponseResponses(self, events: List[bytes]):
+        payloads = []
+        for line in events:
+            if not line:
                 continue
-            if payload == b"[DONE]":
-                return
 
-            try:
-                evt = json.loads(payload.decode("utf-8"))
-            except Exception as e:
-                logger.warning(
-                    "Failed to decode Responses stream event: %s", e)
-                continue
-            self._handleResponsesStreamEvent(evt)
+            # Responses streaming can include `event:` lines alongside `data:`.
+            for raw in line.splitlines():
+                raw = raw.strip()
+                if not raw.startswith(b"data:"):
+                    if not raw.startswith(b"event:"):
+                        logger.warning(b"Unexpected chunk: %s" % raw)
+                    continue
+                payload = raw[5:].strip()
+                if not payload:
+                    continue
+                if payload == b"[DONE]":
+                    break
+                payloads.append(payload)
+
+        if not payloads:
+            return
+
+        for evt in decodeJsonBatch(payloads):
+            if isinstance(evt, dict):
+                self._handleResponsesStreamEvent(evt)
 
     def handleNonStreamResponse(self, response: bytes):
         if self._isResponsesApiEnabled:
@@ -37,7 +37,7 @@ class LogsFetcher(QObject):
         self._errorData = b''
         # always detect local changes for single repo
         noLocalChanges = len(self._submodules) > 0 and not ApplicationBase.instance(
-        ).settings().detectLocalChanges()
+        ).settings().snapshot().detectLocalChanges
 
         if Git.RUN_SLOW and len(self._submodules) > 50 and os.name == "nt":
             from qgitc.logsfetchergitworker import LogsFetcherGitWorker
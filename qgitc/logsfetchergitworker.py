@@ -257,7 +257,7 @@ class LogsFetcherGitWorker(LogsFetcherWorkerBase):
 
         since = None
         if len(submodules) > 1:
-            days = ApplicationBase.instance().settings().maxCompositeCommitsSince()
+            days = ApplicationBase.instance().settings().snapshot().maxCompositeCommitsSince
             if days > 0:
                 since = (datetime.today() - timedelta(days)).timestamp()
 
@@ -9,6 +9,7 @@ from PySide6.QtCore import Signal
 from qgitc.applicationbase import ApplicationBase
 from qgitc.common import (
     Commit,
+    LazyCommit,
     extractFilePaths,
     isRevisionRange,
     logger,
@@ -32,14 +33,16 @@ class LogsFetcherImpl(DataFetcher):
         self.commits: List[Commit] = []
 
     def parse(self, data: bytes):
-        commits = LogsFetcherImpl.parseLogs(data, self.separator, self.repoDir)
         if self.repoDir:
-            self.commits.extend(commits)
+            # the composite logs are merged once all fetched
+            self.commits.extend(LogsFetcherImpl.parseLazyLogs(
+                data, self.separator, self.repoDir))
         else:
-            self.logsAvailable.emit(commits)
+            self.logsAvailable.emit(
+                LogsFetcherImpl.parseLogs(data, self.separator))
 
     def makeArgs(self, args):
-        days = ApplicationBase.instance().settings().maxCompositeCommitsSince()
+        days = ApplicationBase.instance().settings().snapshot().maxCompositeCommitsSince
         gitArgs, self._branch = LogsFetcherImpl.makeGitArgs(
             args, self.repoDir, days, self._cwd)
         return gitArgs
@@ -57,22 +60,39 @@ class LogsFetcherImpl(DataFetcher):
                 continue
             commit.repoDir = repoDir
             if repoDir:
-                isoDate = ''
-                if version_info < (3, 11):
-                    isoDate = commit.committerDate.replace(
-                        ' ', 'T', 1).replace(' ', '', 1)
-                    isoDate = isoDate[:-2] + ':' + isoDate[-2:]
-                else:
-                    isoDate = commit.committerDate
-                commit.committerDateTime = datetime.fromisoformat(isoDate)
+                commit.committerDateTime = LogsFetcherImpl.parseDate(
+                    commit.committerDate)
             commits.append(commit)
 
         return commits
 
+    @staticmethod
+    def parseLazyLogs(data: bytes, separator: bytes = b'\0', repoDir=None):
+        """Like `parseLogs`, but only the committer date is read"""
+        commits = []
+        for raw in data.rstrip(separator).split(separator):
+            if raw.count(b'\x01') != 6:
+                continue
+            # the committer date is the one before the parents
+            committerDate = raw.rsplit(b'\x01', 2)[1].decode("utf-8")
+            commits.append(LazyCommit(
+                raw, repoDir, LogsFetcherImpl.parseDate(committerDate)))
+
+        return commits
+
+    @staticmethod
+    def parseDate(isoDate: str):
+        if version_info < (3, 11):
+            isoDate = isoDate.replace(' ', 'T', 1).replace(' ', '', 1)
+            isoDate = isoDate[:-2] + ':' + isoDate[-2:]
+        return datetime.fromisoformat(isoDate)
+
     @staticmethod
     def makeGitArgs(args, repoDir=None, maxCompositeCommitsSince=0, cwd=None):
         branch: str = args[0]
         logArgs: List[str] = args[1]
+        # the commits reachable from these are not listed
+        excludes: List[str] = args[2] if len(args) > 2 else None
         _branch = branch.encode("utf-8") if branch else None
 
         hasRevisionRange = LogsFetcherImpl.hasRevisionRange(logArgs)
@@ -101,6 +121,10 @@ class LogsFetcherImpl(DataFetcher):
         if branch:
             git_args.append(branch)
 
+        if excludes:
+            git_args.extend("^" + sha1 for sha1 in excludes)
+            needBoundary = False
+
         if logArgs:
             if repoDir and repoDir != ".":
                 paths = paths or extractFilePaths(logArgs)
@@ -60,8 +60,7 @@ class LogsFetcherWorkerBase(QObject):
             if handleCount % 100 == 0 and self.isInterruptionRequested():
                 return
             # require same day at least
-            key = (log.committerDateTime.date(),
-                   log.comments, log.author)
+            key = log.mergeKey()
             if key in self._mergedLogs.keys():
                 main_commit: Commit = self._mergedLogs[key]
                 # don't merge commits in same repo
@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
+import bisect
 import json
+import math
 import os
 import re
 import tempfile
-from typing import List
+from typing import Callable, Dict, List, Tuple
 
 from PySide6.QtCore import (
     Property,
@@ -26,6 +28,7 @@ from PySide6.QtGui import (
     QDragEnterEvent,
     QDragMoveEvent,
     QDropEvent,
+    QFont,
     QImage,
     QMouseEvent,
     QPainter,
@@ -33,6 +36,8 @@ from PySide6.QtGui import (
     QPalette,
     QPen,
     QPixmap,
+    QStaticText,
+    QTransform,
 )
 from PySide6.QtWidgets import (
     QAbstractScrollArea,
@@ -213,6 +218,34 @@ class Marker():
         if self._changedCallback:
             self._changedCallback()
 
+    def remap(self, mapIndex: Callable[[int], int]):
+        """Move the marks along with their rows, @mapIndex returns the new
+        index of a row, or -1 if the row was removed"""
+        if not self._ranges:
+            return
+
+        newRanges = []
+        for r in self._ranges:
+            begin = end = -1
+            for index in range(r.begin, r.end + 1):
+                newIndex = mapIndex(index)
+                if newIndex == -1:
+                    continue
+                if begin != -1 and newIndex == end + 1:
+                    end = newIndex
+                    continue
+                if begin != -1:
+                    newRanges.append(MarkRange(begin, end, r.markType))
+                begin = end = newIndex
+
+            if begin != -1:
+                newRanges.append(MarkRange(begin, end, r.markType))
+
+        self._ranges = newRanges
+        self._sorted = False
+        if self._changedCallback:
+            self._changedCallback()
+
     def countMarked(self):
         """Efficiently count total number of marked commits"""
         return sum(r.end - r.begin + 1 for r in self._ranges)
@@ -572,6 +605,114 @@ class ResolveResult:
     FAILED = 2
 
 
+def _makeStaticText(text: str, font: QFont):
+    staticText = QStaticText(text)
+    staticText.setTextFormat(Qt.PlainText)
+    staticText.prepare(QTransform(), font)
+    return staticText
+
+
+class _LogRow:
+    """The display data of a row, computed when first painted"""
+
+    __slots__ = ("commit", "comments", "author", "authorDate", "fullMessage",
+                 "authorName", "date", "message", "_subjects", "_highlight")
+
+    def __init__(self, commit: Commit, fullMessage: bool, authorName: str):
+        self.commit = commit
+        self.comments = commit.comments
+        self.author = commit.author
+        self.authorDate = commit.authorDate
+        self.fullMessage = fullMessage
+
+        self.authorName = authorName
+        self.date = commit.authorDate.split(' ')[0]
+        if fullMessage:
+            self.message = commit.comments.replace('\n', ' ')
+        else:
+            self.message = commit.comments.split('\n')[0]
+
+        # bold -> QStaticText
+        self._subjects: Dict[bool, QStaticText] = {}
+        # (pattern, bold, [(QStaticText, isMatch)])
+        self._highlight = None
+
+    def isValid(self, commit: Commit, fullMessage: bool):
+        # the commits of the local changes are updated in place
+        return self.commit is commit and \
+            self.comments is commit.comments and \
+            self.author is commit.author and \
+            self.authorDate is commit.authorDate and \
+            self.fullMessage == fullMessage
+
+    def subject(self, bold: bool, font: QFont):
+        staticText = self._subjects.get(bold)
+        if staticText is None:
+            staticText = _makeStaticText(self.message, font)
+            self._subjects[bold] = staticText
+        return staticText
+
+    def highlightSegments(self, pattern: re.Pattern, bold: bool, font: QFont):
+        """Return the (QStaticText, isMatch) segments of the message"""
+        if self._highlight is not None and \
+                self._highlight[0] is pattern and self._highlight[1] == bold:
+            return self._highlight[2]
+
+        segments: List[Tuple[QStaticText, bool]] = []
+        content = self.message
+        start = 0
+        for m in pattern.finditer(content):
+            if m.start() > start:
+                segments.append(
+                    (_makeStaticText(content[start:m.start()], font), False))
+            if m.end() > m.start():
+                segments.append(
+                    (_makeStaticText(content[m.start():m.end()], font), True))
+            start = m.end()
+
+        if start < len(content):
+            segments.append((_makeStaticText(content[start:], font), False))
+
+        self._highlight = (pattern, bold, segments)
+        return segments
+
+
+class _LogRefresh:
+    """A refresh of the logs, only the commits not reachable from the
+    loaded tip are fetched"""
+
+    __slots__ = ("oldTip", "newTip", "commits", "lccCommit", "lucCommit")
+
+    def __init__(self, oldTip: str, newTip: str):
+        self.oldTip = oldTip
+        self.newTip = newTip
+        self.commits: List[Commit] = []
+        self.lccCommit: Commit = None
+        self.lucCommit: Commit = None
+
+    def keptRows(self, rows: List[Commit]):
+        """Return the indices of the loaded @rows still in the history of the
+        new tip, or None if all of them are"""
+        if self.commits:
+            sha1s = {commit.sha1 for commit in self.commits}
+            reachable = {parent for commit in self.commits
+                         for parent in commit.parents if parent not in sha1s}
+        else:
+            reachable = {self.newTip}
+
+        # the new commits are on top of the loaded tip
+        if self.oldTip in reachable:
+            return None
+
+        # the history was rewritten, the parents come after their children
+        kept = []
+        for i, commit in enumerate(rows):
+            if commit.sha1 in reachable:
+                kept.append(i)
+                reachable.update(commit.parents)
+        return kept
+
+
 class LogView(QAbstractScrollArea, CommitSource):
     currentIndexChanged = Signal(int)
     findFinished = Signal(int)
@@ -601,6 +742,7 @@ class LogView(QAbstractScrollArea, CommitSource):
         self.branchA = True
         self.curBranch = ""
         self.args = None
+        self._refresh: _LogRefresh = None
         self.preferSha1 = None
         self.delayVisible = False
         self.delayUpdateParents = False
@@ -625,6 +767,11 @@ class LogView(QAbstractScrollArea, CommitSource):
 
         self.authorRe = re.compile("(.*) <.*>$")
 
+        # row -> _LogRow of the painted rows
+        self._rows: Dict[int, _LogRow] = {}
+        # (text, bold) -> QStaticText of the tags
+        self._tagTexts: Dict[Tuple[str, bool], QStaticText] = {}
+
         self._finder = DiffFinder(self, self)
         self.needUpdateFindResult = True
 
@@ -661,6 +808,7 @@ class LogView(QAbstractScrollArea, CommitSource):
         app = ApplicationBase.instance()
         app.settings().logViewFontChanged.connect(self.updateSettings)
         app.settings().compositeModeChanged.connect(self.__onCompositeModeChanged)
+        app.settings().colorSchemaModeChanged.connect(self.invalidateRenderCache)
 
         logWindow = self.logWindow()
         if logWindow:
@@ -795,21 +943,64 @@ class LogView(QAbstractScrollArea, CommitSource):
     def showLogs(self, branch, branchDir, args=None):
         self.curBranch = branch
         self.args = args
+        self._refresh = None
         self._finder.reset()
         self._branchDir = branchDir
         self.clear()
 
-        submodules = []
-        app = ApplicationBase.instance()
-        if self._standalone and app.settings().isCompositeMode():
-            submodules = app.submodules
-        self.fetcher.setSubmodules(submodules)
+        self.fetcher.setSubmodules(self.__submodules())
 
         self.fetcher.fetch(branch, args, branchDir=self._branchDir)
         self.beginFetch.emit()
         self.viewport().update()
 
+    def refreshLogs(self):
+        """Fetch only the commits that are not reachable from the loaded tip,
+        and put them on top of the loaded ones once fetched.
+
+        Return False if the logs can't be refreshed, but must be reloaded."""
+        # the composite logs are merged from several repos, and the args
+        # might be a revision range
+        if self.args or self.fetcher._submodules or self.__submodules():
+            return False
+        if not self.curBranch or (self.fetcher.isLoading() and not self._refresh):
+            return False
+
+        oldTip = self.__loadedTip()
+        if not oldTip:
+            return False
+
+        rev = "HEAD" if self.curBranch.startswith("(HEAD detached") \
+            else self.curBranch
+        data = Git.checkOutput(["rev-parse", "--verify", "-q", rev + "^{commit}"],
+                               repoDir=self._branchDir or None)
+        if not data:
+            return False
+
+        self._refresh = _LogRefresh(oldTip, data.decode("utf-8").rstrip())
+        self.fetcher.fetch(self.curBranch, self.args, [oldTip],
+                           branchDir=self._branchDir)
+        self.beginFetch.emit()
+        return True
+
+    def __submodules(self):
+        app = ApplicationBase.instance()
+        if self._standalone and app.settings().isCompositeMode():
+            return app.submodules
+        return []
+
+    def __loadedTip(self):
+        for commit in self.data:
+            if commit.sha1 not in [Git.LCC_SHA1, Git.LUC_SHA1]:
+                return commit.sha1
+        return None
+
     def clear(self):
+        if self._refresh:
+            # the new commits are of no use without the loaded ones
+            self._refresh = None
+            self.fetcher.cancel()
+
         self.data.clear()
         self.curIdx = -1
         self.selectedIndices.clear()
@@ -990,12 +1181,19 @@ class LogView(QAbstractScrollArea, CommitSource):
 
         self.lineHeight = self.fontMetrics().height() + self.lineSpace
 
+        self.invalidateRenderCache()
         self.updateGeometries()
         self.updateView()
 
     def updateView(self):
         return self.viewport().update()
 
+    def invalidateRenderCache(self):
+        """Drop the texts laid out for painting"""
+        self._rows.clear()
+        self._tagTexts.clear()
+        self.viewport().update()
+
     def _createProgressDialog(self, label: str, maxValue: int):
         progress = QProgressDialog(
             label,
@@ -1292,8 +1490,7 @@ class LogView(QAbstractScrollArea, CommitSource):
 
         progress.setValue(len(commits))
 
-        # FIXME: fetch the new one only?
-        self.showLogs(self.curBranch, self._branchDir, self.args)
+        self.reloadLogs()
 
         app = ApplicationBase.instance()
         app.trackFeatureUsage("menu.revert_commit", {
@@ -1433,6 +1630,10 @@ class LogView(QAbstractScrollArea, CommitSource):
         self.findFinished.emit(state)
 
     def __onLogsAvailable(self, logs):
+        if self._refresh:
+            self._refresh.commits.extend(logs)
+            return
+
         self.data.extend(logs)
 
         if self.delayUpdateParents and len(self.data) > 2:
@@ -1459,6 +1660,15 @@ class LogView(QAbstractScrollArea, CommitSource):
         self.updateGeometries()
 
     def __onFetchFinished(self, exitCode):
+        refresh = self._refresh
+        if refresh:
+            self._refresh = None
+            if exitCode != 0:
+                # the loaded tip might be gone
+                self.showLogs(self.curBranch, self._branchDir, self.args)
+                return
+            self.__spliceLogs(refresh)
+
         if self.delayVisible:
             self.ensureVisible(self.curIdx)
             self.delayVisible = False
@@ -1473,6 +1683,29 @@ class LogView(QAbstractScrollArea, CommitSource):
                                  self.fetcher.errorData.decode("utf-8"))
 
     def __onLocalChangesAvailable(self, lccCommit: Commit, lucCommit: Commit):
+        if self._refresh:
+            self._refresh.lccCommit = lccCommit
+            self._refresh.lucCommit = lucCommit
+            return
+
+        hasLCC = lccCommit.isValid()
+        hasLUC = lucCommit.isValid()
+        self.__insertLocalChanges(lccCommit, lucCommit)
+
+        if self.curIdx > 0:
+            self.curIdx += int(hasLCC) + int(hasLUC)
+
+        # FIXME: modified the graphs directly
+        if self.graphs and (hasLUC or hasLCC) and not self.delayUpdateParents:
+            self.__resetGraphs()
+            self.viewport().update()
+
+        if self.curIdx == 0 and (hasLUC or hasLCC):
+            # force update the diff
+            self.currentIndexChanged.emit(0)
+            self.viewport().update()
+
+    def __insertLocalChanges(self, lccCommit: Commit, lucCommit: Commit):
         parent_sha1 = self.data[0].sha1 if self.data else None
 
         self.delayUpdateParents = False
@@ -1500,9 +1733,6 @@ class LogView(QAbstractScrollArea, CommitSource):
 
                 self.data[1].children.append(lccCommit)
 
-            if self.curIdx > 0:
-                self.curIdx += 1
-
         if hasLUC:
             lucCommit.comments = self.tr(
                 "Local uncommitted changes, not checked in to index")
@@ -1521,18 +1751,83 @@ class LogView(QAbstractScrollArea, CommitSource):
                     self.data[1].children = []
                 self.data[1].children.append(lucCommit)
 
-            if self.curIdx > 0:
-                self.curIdx += 1
+    def __spliceLogs(self, refresh: _LogRefresh):
+        """Put the commits of @refresh on top of the loaded ones, the rows
+        marked, selected and found are moved along with their commits"""
+        oldData = self.data
+        localCount = 0
+        while localCount < len(oldData) and \
+                oldData[localCount].sha1 in [Git.LCC_SHA1, Git.LUC_SHA1]:
+            localCount += 1
+
+        rows = oldData[localCount:]
+        keptRows = refresh.keptRows(rows)
+
+        lccCommit = refresh.lccCommit or Commit()
+        lucCommit = refresh.lucCommit or Commit()
+        newLocalRows = {}
+        if lucCommit.isValid():
+            newLocalRows[Git.LUC_SHA1] = 0
+        if lccCommit.isValid():
+            newLocalRows[Git.LCC_SHA1] = len(newLocalRows)
+        offset = len(newLocalRows) + len(refresh.commits)
+
+        if keptRows is None:
+            newRows = None
+            # only the parents of the new commits and the loaded tip (of the
+            # local changes) got new children
+            parents = {parent for commit in refresh.commits
+                       for parent in commit.parents}
+            parents.add(refresh.oldTip)
+            for commit in rows:
+                if commit.sha1 in parents:
+                    commit.children = None
+                    parents.remove(commit.sha1)
+                    if not parents:
+                        break
+            self.data = refresh.commits + rows
+        else:
+            newRows = {row: offset + i for i, row in enumerate(keptRows)}
+            self.data = refresh.commits + [rows[row] for row in keptRows]
+            for commit in self.data:
+                commit.children = None
+
+        def _mapIndex(index: int):
+            if index < localCount:
+                return newLocalRows.get(oldData[index].sha1, -1)
+            if newRows is None:
+                return index - localCount + offset
+            return newRows.get(index - localCount, -1)
+
+        self.__insertLocalChanges(lccCommit, lucCommit)
+        self.__resetGraphs()
 
-        # FIXME: modified the graphs directly
-        if self.graphs and (hasLUC or hasLCC) and not self.delayUpdateParents:
-            self.__resetGraphs()
-            self.viewport().update()
+        oldCommit = oldData[self.curIdx] \
+            if 0 <= self.curIdx < len(oldData) else None
+        if self.curIdx != -1:
+            self.curIdx = _mapIndex(self.curIdx)
+        selectedIndices = [_mapIndex(index) for index in self.selectedIndices]
+        self.selectedIndices.clear()
+        self.selectedIndices.update(
+            index for index in selectedIndices if index != -1)
+        if self.selectionAnchor != -1:
+            self.selectionAnchor = _mapIndex(self.selectionAnchor)
+        self.hoverIdx = -1
+        self.marker.remap(_mapIndex)
+        self._finder.remapRows(_mapIndex)
 
-        if self.curIdx == 0 and (hasLUC or hasLCC):
-            # force update the diff
-            self.currentIndexChanged.emit(0)
-            self.viewport().update()
+        # keep the rows in view, unless the top is shown
+        vScrollBar = self.verticalScrollBar()
+        firstLine = _mapIndex(vScrollBar.value()) \
+            if vScrollBar.value() > 0 else 0
+        self.updateGeometries()
+        if firstLine > 0:
+            vScrollBar.setValue(firstLine)
+
+        if self.curIdx != -1 and self.data[self.curIdx] is not oldCommit:
+            self.__ensureChildren(self.curIdx)
+            self.currentIndexChanged.emit(self.curIdx)
+        self.viewport().update()
 
     def __onFetchTooSlow(self, seconds: int):
         settings = ApplicationBase.instance().settings()
@@ -1675,8 +1970,11 @@ class LogView(QAbstractScrollArea, CommitSource):
             font.setBold(True)
             painter.setFont(font)
 
-        flags = Qt.AlignLeft | Qt.AlignVCenter
-        br = painter.boundingRect(rect, flags, text)
+        staticText = self.__tagText(painter, text, bold)
+        size = staticText.size()
+        w = math.ceil(size.width())
+        h = math.ceil(size.height())
+        br = QRect(rect.x(), rect.y() + (rect.height() - h) // 2, w, h)
         br.adjust(0, -1, 4, 1)
 
         pen = QPen(ApplicationBase.instance().colorSchema().TagBorder)
@@ -1687,7 +1985,10 @@ class LogView(QAbstractScrollArea, CommitSource):
         painter.drawRect(br)
 
         painter.setPen(textColor)
-        painter.drawText(br, Qt.AlignCenter, text)
+        painter.drawStaticText(
+            QPointF(br.x() + (br.width() - size.width()) / 2,
+                    br.y() + (br.height() - size.height()) / 2),
+            staticText)
 
         painter.restore()
         rect.adjust(br.width(), 0, 0, 0)
@@ -1696,8 +1997,10 @@ class LogView(QAbstractScrollArea, CommitSource):
         painter.save()
         painter.setRenderHint(QPainter.Antialiasing, True)
 
-        flags = Qt.AlignLeft | Qt.AlignVCenter
-        br = painter.boundingRect(QRectF(rect), flags, text)
+        staticText = self.__tagText(painter, text)
+        size = staticText.size()
+        br = QRectF(rect.x(), rect.y() + (rect.height() - size.height()) / 2,
+                    size.width(), size.height())
         br.adjust(0, -1, 4, 1)
 
         h = br.height()
@@ -1720,11 +2023,42 @@ class LogView(QAbstractScrollArea, CommitSource):
             ApplicationBase.instance().colorSchema().TagBorder))
 
         painter.setPen(textColor)
-        painter.drawText(br, flags, text)
+        painter.drawStaticText(
+            QPointF(br.x(), br.y() + (br.height() - size.height()) / 2),
+            staticText)
 
         painter.restore()
         rect.adjust(path.boundingRect().width(), 0, 0, 0)
 
+    def __tagText(self, painter: QPainter, text: str, bold=False):
+        key = (text, bold)
+        staticText = self._tagTexts.get(key)
+        if staticText is None:
+            # names, dates and refs, only grows a lot on huge histories
+            if len(self._tagTexts) >= 10000:
+                self._tagTexts.clear()
+            staticText = _makeStaticText(text, painter.font())
+            self._tagTexts[key] = staticText
+        return staticText
+
+    def __row(self, index: int, fullMessage: bool):
+        commit = self.data[index]
+        row = self._rows.get(index)
+        if row is None or not row.isValid(commit, fullMessage):
+            if len(self._rows) >= 4096:
+                self.__releaseRows()
+            authorName = self.authorRe.sub("\\1", commit.author)
+            row = _LogRow(commit, fullMessage, authorName)
+            self._rows[index] = row
+        return row
+
+    def __releaseRows(self):
+        for row in self._rows.values():
+            # keep the composite commits out of view as their raw records
+            if isinstance(row.commit, LazyCommit):
+                row.commit.release()
+        self._rows.clear()
+
     def __laneWidth(self):
         return int(self.lineHeight * 9 / 16)
 
@@ -1951,14 +2285,38 @@ class LogView(QAbstractScrollArea, CommitSource):
 
         painter.restore()
 
+    @staticmethod
+    def __commitRefs(commit: Commit):
+        """Return the refs of @commit and whether it is a HEAD"""
+        if commit.sha1 in Git.REF_MAP:
+            return Git.REF_MAP[commit.sha1], commit.sha1 == Git.REV_HEAD
+
+        if commit.repoDir is None or not Git.SUBMODULE_REFS:
+            return None, False
+
+        # composite commits, show the refs of all the repos once
+        refs: List[Ref] = []
+        names = set()
+        isHead = False
+        for c in [commit] + commit.subCommits:
+            repoRefs = Git.SUBMODULE_REFS.get(c.repoDir)
+            if not repoRefs or c.sha1 not in repoRefs.refMap:
+                continue
+            isHead = isHead or c.sha1 == repoRefs.revHead
+            for ref in repoRefs.refMap[c.sha1]:
+                if (ref.type, ref.name) not in names:
+                    names.add((ref.type, ref.name))
+                    bisect.insort(refs, ref)
+
+        return refs, isHead
+
     def __drawGraphRef(self, painter, rc, commit):
-        if not commit.sha1 in Git.REF_MAP:
+        refs, isHead = self.__commitRefs(commit)
+        if not refs:
             return
 
-        refs: List[Ref] = Git.REF_MAP[commit.sha1]
         painter.save()
 
-        isHead = commit.sha1 == Git.REV_HEAD
         maxWidth = rc.width() * 2 / 3
 
         for ref in refs:
@@ -1968,9 +2326,8 @@ class LogView(QAbstractScrollArea, CommitSource):
             fgColor = ApplicationBase.instance(
             ).colorSchema().TagColorsFg[ref.type]
 
-            br = painter.boundingRect(
-                rc, Qt.AlignLeft | Qt.AlignVCenter, ref.name)
-            if rc.width() - br.width() < maxWidth:
+            width = self.__tagText(painter, ref.name).size().width()
+            if rc.width() - width < maxWidth:
                 self.__drawTag(painter, rc, bgColor, "...", False, fgColor)
                 break
             elif ref.type == Ref.TAG:
@@ -2036,7 +2393,8 @@ class LogView(QAbstractScrollArea, CommitSource):
         commit.children = []
         for i in range(index - 1, -1, -1):
             child = self.data[i]
-            if commit.sha1 in child.parents:
+            # don't read all the fields of the lazy commits above
+            if commit.sha1 in child.parentSha1s():
                 commit.children.append(child)
 
     def invalidateItem(self, index):
@@ -2179,14 +2537,14 @@ class LogView(QAbstractScrollArea, CommitSource):
         if not Git.REPO_DIR:
             return
 
-        settings = ApplicationBase.instance().settings()
+        settings = ApplicationBase.instance().settings().snapshot()
         if self.fetcher.isLoading():
             tips = self.tr("Loading commits, please wait...")
         elif self.args:
             tips = self.tr(
                 "No commits found for the current filter. Try adjusting your filter criteria.")
-        elif settings.isCompositeMode() and \
-                settings.maxCompositeCommitsSince() != 0 and \
+        elif settings.compositeMode and \
+                settings.maxCompositeCommitsSince != 0 and \
                 self.fetcher._submodules:
             tips = self.tr(
                 'No commits found. You may need to increase the "Max Commits" setting or disable "Composite Mode".')
@@ -2228,17 +2586,11 @@ class LogView(QAbstractScrollArea, CommitSource):
             graphPainter.setRenderHints(QPainter.Antialiasing)
 
         app = ApplicationBase.instance()
-        isFullMessage = app.settings().isFullCommitMessage()
-
-        def makeMessage(commit):
-            if isFullMessage:
-                return commit.comments.replace('\n', ' ')
-            return commit.comments.split('\n')[0]
+        isFullMessage = app.settings().snapshot().fullCommitMessage
 
         colorSchema = app.colorSchema()
 
         painter.setFont(self.font())
-        flags = Qt.AlignLeft | Qt.AlignVCenter | Qt.TextSingleLine
 
         # Calculate drop indicator offset for items
         dropOffset = 0
@@ -2264,6 +2616,7 @@ class LogView(QAbstractScrollArea, CommitSource):
             rect.adjust(2, 0, 0, 0)
 
             commit = self.data[i]
+            row = self.__row(i, isFullMessage)
 
             # sub-repo name
             needMargin = False
@@ -2282,13 +2635,13 @@ class LogView(QAbstractScrollArea, CommitSource):
 
             if not commit.sha1 in [Git.LCC_SHA1, Git.LUC_SHA1]:
                 # author
-                text = self.authorRe.sub("\\1", commit.author)
+                text = row.authorName
                 color = colorSchema.AuthorTagBg
                 self.__drawTag(painter, rect, color, text,
                                textColor=colorSchema.AuthorTagFg)
 
                 # date
-                text = commit.authorDate.split(' ')[0]
+                text = row.date
                 color = colorSchema.DateTagBg
                 self.__drawTag(painter, rect, color, text,
                                textColor=colorSchema.DateTagFg)
@@ -2335,42 +2688,40 @@ class LogView(QAbstractScrollArea, CommitSource):
                 else:
                     painter.setPen(palette.color(QPalette.WindowText))
 
-            content = makeMessage(commit)
-
             rect.adjust(4, 0, 0, 0)
 
             # bold find result
             # it seems that *in* already fast, so no bsearch
-            if i in self._finder.findResult:
+            isFound = i in self._finder.findResult
+            if isFound:
                 font = painter.font()
                 font.setBold(True)
                 painter.setFont(font)
 
             if self.highlightPattern:
-                matchs = self.highlightPattern.finditer(content)
-                start = 0
+                segments = row.highlightSegments(
+                    self.highlightPattern, isFound, painter.font())
+                x = rect.x()
                 oldPen = painter.pen()
-                for m in matchs:
-                    if m.start() > start:
-                        br = painter.drawText(
-                            rect, flags, content[start:m.start()])
-                        rect.adjust(br.width(), 0, 0, 0)
-
-                    text = content[m.start():m.end()]
-                    if isSelected:
-                        painter.setPen(colorSchema.HighlightWordSelectedFg)
-                    else:
-                        br = painter.boundingRect(rect, flags, text)
-                        painter.fillRect(br, colorSchema.HighlightWordBg)
-                    br = painter.drawText(rect, flags, text)
-                    rect.adjust(br.width(), 0, 0, 0)
-                    start = m.end()
-                    painter.setPen(oldPen)
-
-                if start < len(content):
-                    painter.drawText(rect, flags, content[start:])
+                for staticText, isMatch in segments:
+                    size = staticText.size()
+                    pos = QPointF(x, rect.y() + (rect.height() - size.height()) / 2)
+                    if isMatch:
+                        if isSelected:
+                            painter.setPen(colorSchema.HighlightWordSelectedFg)
+                        else:
+                            painter.fillRect(QRectF(pos, size),
+                                             colorSchema.HighlightWordBg)
+                    painter.drawStaticText(pos, staticText)
+                    if isMatch:
+                        painter.setPen(oldPen)
+                    x += size.width()
             else:
-                painter.drawText(rect, flags, content)
+                staticText = row.subject(isFound, painter.font())
+                size = staticText.size()
+                painter.drawStaticText(
+                    QPointF(rect.x(), rect.y() + (rect.height() - size.height()) / 2),
+                    staticText)
             painter.restore()
 
             # Restore translation if applied
@@ -2694,7 +3045,8 @@ class LogView(QAbstractScrollArea, CommitSource):
             self.__onCompositeModeChanged()
 
     def reloadLogs(self):
-        self.showLogs(self.curBranch, self._branchDir, self.args)
+        if not self.refreshLogs():
+            self.showLogs(self.curBranch, self._branchDir, self.args)
 
     def logWindow(self):
         return ApplicationBase.instance().getWindow(WindowType.LogWindow, False)
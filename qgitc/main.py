@@ -24,7 +24,6 @@ from qgitc.applicationbase import ApplicationBase
 from qgitc.common import attachConsole, logger
 from qgitc.excepthandler import ExceptHandler
 from qgitc.gitutils import Git, GitProcess
-from qgitc.mainwindow import MainWindow
 from qgitc.shell import setup_shell_args
 from qgitc.windowtype import WindowType
 
@@ -220,6 +219,8 @@ def _detect_and_fix_repo(filterFile):
 
 
 def _do_log(args):
+    from qgitc.mainwindow import MainWindow
+
     app = _init_gui(args.cmd)
 
     merge_mode = args.cmd == "mergetool"
@@ -4,14 +4,13 @@ import os
 import shlex
 import sys
 from datetime import datetime
-from typing import List
+from typing import TYPE_CHECKING, List
 
 from PySide6.QtCore import QEvent, QSize, Qt, QTimer
 from PySide6.QtGui import QActionGroup
 from PySide6.QtWidgets import QComboBox, QCompleter, QFileDialog, QLineEdit, QMessageBox
 
 from qgitc.aboutdialog import AboutDialog
-from qgitc.aichatdockwidget import AiChatDockWidget
 from qgitc.applicationbase import ApplicationBase
 from qgitc.diffview import PatchViewer
 from qgitc.events import (
@@ -22,14 +21,18 @@ from qgitc.events import (
     ShowPickBranchEvent,
 )
 from qgitc.findwidget import FindWidget
-from qgitc.gitutils import Git
+from qgitc.gitutils import Git, RepoRefs
 from qgitc.gitview import GitView
 from qgitc.logview import LogView
-from qgitc.mainwindowcontextprovider import MainWindowContextProvider
 from qgitc.preferences import Preferences
+from qgitc.refsloader import RefsLoader
 from qgitc.statewindow import StateWindow
+from qgitc.submodulerefsloader import SubmoduleRefsLoader
 from qgitc.ui_mainwindow import Ui_MainWindow
 
+if TYPE_CHECKING:
+    from qgitc.aichatdockwidget import AiChatDockWidget
+
 GIT_LOG_SYSTEM_PROMPT = """You are a Git expert assistant. Convert natural language requests into git log command-line options.
 
 Rules:
@@ -81,9 +84,20 @@ class MainWindow(StateWindow):
         self._repoTopDir = None
         self._reloadingRepo = False
 
-        # AI Chat Dock Widget
-        self._aiChat: AiChatDockWidget = None
-        self._setupAiChatDock()
+        # branches and refs of Git.REPO_DIR, loaded in background
+        self._refs: RepoRefs = None
+        self._refsLoader: RefsLoader = None
+        self._updateRefMap = False
+        # active branch of the views to reload once the refs are loaded
+        self._pendingBranches: List[str] = None
+        # refs of the repos in composite mode
+        self._submoduleRefsLoader = SubmoduleRefsLoader(self)
+        self._submoduleRefsLoader.refsChanged.connect(self.__updateLogViews)
+
+        # AI Chat Dock Widget, the AI stack is slow to import so the dock is
+        # created once the window is up
+        self._aiChatDock: "AiChatDockWidget" = None
+        QTimer.singleShot(0, self._setupAiChatDock)
 
         self.ui.cbSubmodule.setVisible(False)
         self.ui.lbSubmodule.setVisible(False)
@@ -206,16 +220,29 @@ class MainWindow(StateWindow):
         self.ui.acChangeCommitAuthor.triggered.connect(
             self._onChangeCommitAuthor)
 
+    @property
+    def _aiChat(self) -> "AiChatDockWidget":
+        self._setupAiChatDock()
+        return self._aiChatDock
+
     def _setupAiChatDock(self):
         """Setup AI Chat dock widget with embedded mode"""
-        self._aiChat = AiChatDockWidget(self)
+        if self._aiChatDock is not None:
+            return
+
+        from qgitc.aichatdockwidget import AiChatDockWidget
+        from qgitc.mainwindowcontextprovider import MainWindowContextProvider
+
+        self._aiChatDock = AiChatDockWidget(self)
 
         aiChatContextProvider = MainWindowContextProvider(
             self, parent=self)
-        self._aiChat.chatWidget().setContextProvider(aiChatContextProvider)
+        self._aiChatDock.chatWidget().setContextProvider(aiChatContextProvider)
 
         # Add dock widget to main window
-        self.addDockWidget(Qt.RightDockWidgetArea, self._aiChat)
+        self.addDockWidget(Qt.RightDockWidgetArea, self._aiChatDock)
+        # the window state may have been restored before
+        self.restoreDockWidget(self._aiChatDock)
 
     def toggleAiChatDock(self):
         """Toggle the AI chat dock visibility"""
@@ -321,6 +348,7 @@ class MainWindow(StateWindow):
             if Git.REF_MAP:
                 Git.REF_MAP.clear()
             Git.REV_HEAD = None
+            updateRefMap = False
         else:
             changed = app.updateRepoDir(topLevelDir)
             self._repoTopDir = topLevelDir
@@ -328,11 +356,9 @@ class MainWindow(StateWindow):
 
             compositeModeEnabled = isCompositeMode and (
                 changed or len(app.submodules) > 0)
-            if not compositeModeEnabled:
-                if changed or not Git.REF_MAP:
-                    Git.REF_MAP = Git.refs()
-                    Git.REV_HEAD = Git.revHead()
-            elif changed:
+            updateRefMap = not compositeModeEnabled and (
+                changed or not Git.REF_MAP)
+            if compositeModeEnabled and changed:
                 Git.REF_MAP = {}
                 Git.REV_HEAD = None
 
@@ -343,17 +369,13 @@ class MainWindow(StateWindow):
             branch = "remotes/" + branch
 
         span.addEvent("reloadBranches.begin")
-        self.ui.gitViewA.reloadBranches(self.ui.gitViewA.currentBranch())
-        if self.gitViewB:
-            self.gitViewB.reloadBranches(
-                branch or self.gitViewB.currentBranch())
+        self.__reloadBranches(
+            self.ui.gitViewA.currentBranch(),
+            branch or (self.gitViewB.currentBranch() if self.gitViewB else None),
+            updateRefMap)
         span.addEvent("reloadBranches.end")
 
-        if self.mergeWidget:
-            # cache in case changed later
-            self.mergeWidget.setBranches(
-                self.ui.gitViewA.currentBranch(),
-                self.gitViewB.currentBranch())
+        self.__loadSubmoduleRefs()
 
         span.end()
 
@@ -409,11 +431,11 @@ class MainWindow(StateWindow):
             ApplicationBase.instance().updateRepoDir(newRepo, False)
 
         if not checked and not Git.REF_MAP:
-            Git.REF_MAP = Git.refs()
-            Git.REV_HEAD = Git.revHead()
+            self.__loadRefs(True)
 
         self.ui.cbSubmodule.setEnabled(not checked)
         ApplicationBase.instance().settings().setCompositeMode(checked)
+        self.__loadSubmoduleRefs()
 
     def __onOptsReturnPressed(self):
         opts = self.ui.leOpts.text().strip()
@@ -512,11 +534,10 @@ class MainWindow(StateWindow):
             return
 
         ApplicationBase.instance().updateRepoDir(newRepo, False)
-        self.ui.gitViewA.reloadBranches(
-            self.ui.gitViewA.currentBranch())
-        if self.gitViewB:
-            self.gitViewB.reloadBranches(
-                self.gitViewB.currentBranch())
+        self.__reloadBranches(
+            self.ui.gitViewA.currentBranch(),
+            self.gitViewB.currentBranch() if self.gitViewB else None,
+            False)
 
     def _onSubmoduleAvailable(self, submodules: List[str], fromCache: bool):
         self.ui.cbSubmodule.blockSignals(True)
@@ -538,11 +559,7 @@ class MainWindow(StateWindow):
 
         settings = ApplicationBase.instance().settings()
         if settings.isCompositeMode() and not hasSubmodule and not Git.REF_MAP:
-            Git.REF_MAP = Git.refs()
-            Git.REV_HEAD = Git.revHead()
-            self.ui.gitViewA.logView.update()
-            if self.gitViewB:
-                self.gitViewB.logView.update()
+            self.__loadRefs(True)
         elif settings.isCompositeMode() and hasSubmodule and Git.REF_MAP:
             # Clear REF_MAP that may have been populated by __onRepoChanged
             # before submodules were discovered (race on Windows where the
@@ -550,6 +567,8 @@ class MainWindow(StateWindow):
             Git.REF_MAP.clear()
             Git.REV_HEAD = None
 
+        self.__loadSubmoduleRefs()
+
     def __onDelayTimeout(self):
         repoDir = self.ui.leRepo.text()
         self.__onRepoChanged(repoDir)
@@ -640,8 +659,8 @@ class MainWindow(StateWindow):
             self.gitViewB.queryClose()
 
         # Clean up AI chat widget if embedded
-        if self._aiChat:
-            self._aiChat.queryClose()
+        if self._aiChatDock:
+            self._aiChatDock.queryClose()
 
         self.cancel(True)
         super().closeEvent(event)
@@ -694,7 +713,11 @@ class MainWindow(StateWindow):
                 branch = "remotes/origin/" + branch
 
             if not self.mergeWidget:
-                self.gitViewB.reloadBranches(branch)
+                if self._refsLoader:
+                    self._pendingBranches = [
+                        self.ui.gitViewA.currentBranch(), branch]
+                else:
+                    self.gitViewB.setBranches(self._refs, branch)
             self.ui.acCompare.setChecked(True)
         elif mode == MainWindow.MergeMode:
             from qgitc.mergewidget import MergeWidget
@@ -750,6 +773,12 @@ class MainWindow(StateWindow):
                 QTimer.singleShot(150, obj.showPopup)
         return super().eventFilter(obj, event)
 
+    def changeEvent(self, event: QEvent):
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow():
+            # refs may have been updated outside
+            self._submoduleRefsLoader.refresh()
+        super().changeEvent(event)
+
     def event(self, event: QEvent):
         if event.type() == DockCodeReviewEvent.Type:
             # Always accept if we decide to handle it here (including user cancel).
@@ -771,6 +800,87 @@ class MainWindow(StateWindow):
 
     def cancel(self, force=False):
         self._delayTimer.stop()
+        if force:
+            self._submoduleRefsLoader.cancel(True)
+            self.__stopRefsLoader()
+            # including the loaders of the previous repos
+            for loader in self.findChildren(RefsLoader):
+                ApplicationBase.instance().terminateThread(loader)
+
+    def isLoadingRefs(self):
+        return self._refsLoader is not None
+
+    def __reloadBranches(self, branchA: str, branchB: str, updateRefMap: bool):
+        self.ui.gitViewA.beginLoadBranches()
+        if self.gitViewB:
+            self.gitViewB.beginLoadBranches()
+
+        self._pendingBranches = [branchA, branchB]
+        if not Git.REPO_DIR or not Git.available():
+            self.__stopRefsLoader()
+            self._refs = None
+            self.__onRefsLoaded()
+        else:
+            self.__loadRefs(updateRefMap)
+
+    def __loadRefs(self, updateRefMap: bool):
+        loader = self._refsLoader
+        if loader and loader.repoDir == Git.REPO_DIR:
+            self._updateRefMap = self._updateRefMap or updateRefMap
+            return
+
+        self.__stopRefsLoader()
+        self._updateRefMap = updateRefMap
+        self._refsLoader = RefsLoader(Git.REPO_DIR, self)
+        self._refsLoader.finished.connect(self.__onRefsLoaded)
+        self._refsLoader.finished.connect(self._refsLoader.deleteLater)
+        self._refsLoader.start()
+
+    def __loadSubmoduleRefs(self):
+        app = ApplicationBase.instance()
+        if app.settings().isCompositeMode() and app.submodules:
+            self._submoduleRefsLoader.load(app.submodules)
+        else:
+            self._submoduleRefsLoader.clear()
+
+    def __updateLogViews(self):
+        self.ui.gitViewA.logView.updateView()
+        if self.gitViewB:
+            self.gitViewB.logView.updateView()
+
+    def __stopRefsLoader(self):
+        if self._refsLoader:
+            self._refsLoader.finished.disconnect(self.__onRefsLoaded)
+            self._refsLoader.requestInterruption()
+            self._refsLoader = None
+
+    def __onRefsLoaded(self):
+        if self._refsLoader:
+            self._refs = self._refsLoader.refs
+            self._refsLoader = None
+
+            app = ApplicationBase.instance()
+            # the refs are not shown in composite mode
+            if self._updateRefMap and not (
+                    app.settings().isCompositeMode() and app.submodules):
+                Git.REF_MAP = self._refs.refMap if self._refs else {}
+                Git.REV_HEAD = self._refs.revHead if self._refs else None
+                self.__updateLogViews()
+
+        if self._pendingBranches is None:
+            return
+
+        branchA, branchB = self._pendingBranches
+        self._pendingBranches = None
+        self.ui.gitViewA.setBranches(self._refs, branchA)
+        if self.gitViewB:
+            self.gitViewB.setBranches(self._refs, branchB)
+
+        if self.mergeWidget:
+            # cache in case changed later
+            self.mergeWidget.setBranches(
+                self.ui.gitViewA.currentBranch(),
+                self.gitViewB.currentBranch())
 
     def _setupRepoPathInput(self):
         # Load recent repositories from settings
@@ -879,6 +989,6 @@ class MainWindow(StateWindow):
         app.postEvent(app, ShowPickBranchEvent(sourceBranch, targetBranch))
         app.trackFeatureUsage("menu.pick_branch")
 
-    def chatDockWidget(self) -> AiChatDockWidget:
+    def chatDockWidget(self) -> "AiChatDockWidget":
         """Get the AI chat dock widget"""
         return self._aiChat
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from typing import Dict
+
+from qgitc.common import logger
+from qgitc.telemetry import TelemetryBase, TraceSpanBase
+
+# The OpenTelemetry SDK (see `qgitc.otelimpl`) takes a while to import, it is
+# only loaded when the service is set up.
+
+
+class OTelTraceSpan(TraceSpanBase):
+
+    def __init__(self, span):
+        self._impl = span
+
+    def addTag(self, key: str, value: object):
+        if self._impl is None:
+            return
+        self._impl.set_attribute(key, value)
+
+    def addEvent(self, name: str, attributes: Dict[str, object] = None):
+        if self._impl is None:
+            return
+        self._impl.add_event(name, attributes)
+
+    def end(self) -> None:
+        if self._impl is None:
+            return
+        self._impl.end()
+
+    def setStatus(self, ok: bool, desc: str = None) -> None:
+        if self._impl is None:
+            return
+
+        from opentelemetry.trace import StatusCode
+        if ok:
+            self._impl.set_status(StatusCode.OK)
+        else:
+            self._impl.set_status(StatusCode.ERROR, desc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end()
+
+
+class OTelService(TelemetryBase):
+
+    def __init__(self):
+        self._isEnabled = False
+        self.inited = False
+
+    def setupService(self, serviceName: str, serviceVersion: str, qtVersion: str, endPoint: str, auth: str = None):
+        from qgitc.otelimpl import setupTelemetry
+
+        self._isEnabled = True
+        self.inited = True
+        self._tracker, self._logger = setupTelemetry(
+            serviceName, serviceVersion, qtVersion, endPoint, auth)
+
+    def startTrace(self, name: str):
+        if not self._isEnabled:
+            return OTelTraceSpan(None)
+
+        span = self._tracker.start_span(name)
+        return OTelTraceSpan(span)
+
+    def logger(self):
+        if not self._isEnabled:
+            return logger
+        return self._logger
+
+    def shutdown(self):
+        if not self._isEnabled:
+            return
+
+        from qgitc.otelimpl import shutdownTelemetry
+        shutdownTelemetry()
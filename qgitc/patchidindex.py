@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QObject, Signal
+
+from qgitc.applicationbase import ApplicationBase
+from qgitc.cancelevent import CancelEvent
+from qgitc.common import logger
+from qgitc.gitutils import Git, GitProcess
+from qgitc.submoduleexecutor import SubmoduleExecutor
+
+# Path of an in-memory database, used by tests
+MEMORY_DB = ":memory:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patchIds (
+    sha1 TEXT PRIMARY KEY,
+    patchId TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Commits given to one `git diff-tree | git patch-id` run
+_BATCH_SIZE = 256
+
+# Below the default limit of the host parameters of a statement
+_QUERY_SIZE = 500
+
+_REVERT_RE = re.compile(r"This reverts commit ([0-9a-f]{40,64})")
+_PICKED_RE = re.compile(r"\(cherry picked from commit ([0-9a-f]{40,64})\)")
+
+
+class PatchIdDb:
+    """SQLite cache of the `git patch-id --stable` of the commits.
+
+    The patch id of a commit never changes, so the ids are kept by sha1 for
+    all the repos. A commit without changes is stored with an empty id, so
+    that it is not computed again.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._conn = None  # type: Optional[sqlite3.Connection]
+        # the ids are read and written by the building thread
+        self._lock = threading.Lock()
+
+    def path(self) -> str:
+        return self._path
+
+    def isPersistent(self) -> bool:
+        with self._lock:
+            return self._connection() is not None and self._path != MEMORY_DB
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None:
+            return self._conn
+
+        try:
+            if self._path != MEMORY_DB:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            conn = sqlite3.connect(self._path, check_same_thread=False)
+            if self._path != MEMORY_DB:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Failed to open patch id database %s: %s",
+                           self._path, e)
+            # cache the ids of this session at least
+            self._path = MEMORY_DB
+            conn = sqlite3.connect(MEMORY_DB, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+
+        self._conn = conn
+        return conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def lookup(self, sha1s: List[str]) -> Dict[str, str]:
+        """The cached patch ids of @sha1s"""
+        patchIds = {}
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(sha1s), _QUERY_SIZE):
+                chunk = sha1s[i:i + _QUERY_SIZE]
+                rows = conn.execute(
+                    "SELECT sha1, patchId FROM patchIds WHERE sha1 IN ({})".format(
+                        ",".join("?" * len(chunk))), chunk)
+                patchIds.update(rows)
+        return patchIds
+
+    def save(self, patchIds: Dict[str, str]):
+        if not patchIds:
+            return
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO patchIds (sha1, patchId) VALUES (?, ?)",
+                    patchIds.items())
+
+
+def _listCommits(repoDir: str, revs: List[str]) -> List[Tuple[str, str]]:
+    """The sha1 and message of the non-merge commits of @revs"""
+    if not revs:
+        return []
+
+    data = Git.checkOutput(
+        ["log", "--no-merges", "--format=%H%x01%B%x00"] + revs,
+        repoDir=repoDir, reportError=True)
+    if not data:
+        return []
+
+    commits = []
+    for record in data.decode("utf-8", errors="replace").split("\0"):
+        sha1, _, message = record.lstrip("\n").partition("\x01")
+        if sha1:
+            commits.append((sha1, message))
+    return commits
+
+
+def _computePatchIds(repoDir: str, sha1s: List[str], cancelEvent: CancelEvent) -> Dict[str, str]:
+    if cancelEvent.isSet():
+        return {}
+
+    process = GitProcess(
+        repoDir, ["diff-tree", "--stdin", "-p", "--root", "--no-color"],
+        stdinPipe=True)
+    diff, error = process.communicate("\n".join(sha1s).encode() + b"\n")
+    if process.returncode != 0:
+        logger.warning("Failed to get the patches of %s: %s",
+                       repoDir, error.decode("utf-8", errors="replace"))
+        return {}
+
+    if cancelEvent.isSet():
+        return {}
+
+    patchIds = dict.fromkeys(sha1s, "")
+    if not diff:
+        return patchIds
+
+    process = GitProcess(repoDir, ["patch-id", "--stable"], stdinPipe=True)
+    data, error = process.communicate(diff)
+    if process.returncode != 0:
+        logger.warning("Failed to get the patch ids of %s: %s",
+                       repoDir, error.decode("utf-8", errors="replace"))
+        return {}
+
+    for line in data.decode("utf-8").splitlines():
+        patchId, _, sha1 = line.partition(" ")
+        if sha1 in patchIds:
+            patchIds[sha1] = patchId
+    return patchIds
+
+
+class PatchIdIndex(QObject):
+    """The patch ids of the commits of a source and a target branch.
+
+    The ids missing from the `PatchIdDb` are computed in the background by
+    `git patch-id --stable`, in parallel batches. Once `ready` is emitted,
+    whether a source commit is already on the target branch or reverted
+    later is looked up without running git.
+    """
+
+    ready = Signal()
+
+    def __init__(self, parent=None, db: PatchIdDb = None):
+        super().__init__(parent)
+        if db is None:
+            settings = ApplicationBase.instance().settings()
+            db = PatchIdDb(settings.patchIdFile())
+        self._db = db
+
+        self._executor = SubmoduleExecutor(self)
+        self._executor.finished.connect(self._onFinished)
+        self._results = {}
+        self._building = False
+        self._ready = False
+        self._resetIndex()
+
+    def _resetIndex(self):
+        self._patchIds: Dict[str, str] = {}
+        self._source = set()
+        self._target = set()
+        # patch id -> sha1s of each side
+        self._sourceIds: Dict[str, List[str]] = {}
+        self._targetIds: Dict[str, List[str]] = {}
+        # source sha1 -> target sha1s recorded as picked from it
+        self._pickedTo: Dict[str, List[str]] = {}
+        # reverted sha1 -> sha1 of the revert, for each side
+        self._sourceReverts: Dict[str, str] = {}
+        self._targetReverts: Dict[str, str] = {}
+
+    def build(self, repoDir: str, sourceRevs: List[str], targetRevs: List[str]):
+        """Index the commits listed by `git log @sourceRevs` and
+        `git log @targetRevs` of @repoDir"""
+        self.clear()
+        self._building = True
+        results = self._results
+
+        def _onResult(result=None):
+            if result is not None:
+                results.update(result)
+
+        self._executor.submit(
+            {repoDir: (self._db, sourceRevs, targetRevs)},
+            PatchIdIndex._doBuild, _onResult)
+
+    def clear(self):
+        self.cancel()
+        self._ready = False
+        self._results = {}
+        self._resetIndex()
+
+    def cancel(self, force=False):
+        self._executor.cancel(force)
+        self._building = False
+
+    def isBuilding(self):
+        return self._building
+
+    def isReady(self):
+        return self._ready
+
+    def db(self) -> PatchIdDb:
+        return self._db
+
+    def patchId(self, sha1: str) -> Optional[str]:
+        return self._patchIds.get(sha1) or None
+
+    def equivalents(self, sha1: str) -> List[str]:
+        """The commits of the other branch with the same change as @sha1"""
+        patchId = self.patchId(sha1)
+        if not patchId:
+            return []
+        if sha1 in self._source:
+            return self._targetIds.get(patchId, [])
+        if sha1 in self._target:
+            return self._sourceIds.get(patchId, [])
+        return []
+
+    def isApplied(self, sha1: str) -> bool:
+        """Whether the change of the source commit @sha1 is on the target
+        branch, either picked or made again, and not reverted there"""
+        if sha1 not in self._source:
+            return False
+
+        applied = self.equivalents(sha1) + self._pickedTo.get(sha1, [])
+        return any(self.revertedBy(target) is None for target in applied)
+
+    def revertedBy(self, sha1: str) -> Optional[str]:
+        """The later commit of the same branch reverting @sha1, None if it is
+        not reverted or the revert was reverted too"""
+        if sha1 in self._source:
+            reverts = self._sourceReverts
+        elif sha1 in self._target:
+            reverts = self._targetReverts
+        else:
+            return None
+
+        revert = reverts.get(sha1)
+        if revert and self.revertedBy(revert) is None:
+            return revert
+        return None
+
+    @staticmethod
+    def _doBuild(repoDir: str, data: tuple, cancelEvent: CancelEvent):
+        db, sourceRevs, targetRevs = data
+        source = _listCommits(repoDir, sourceRevs)
+        if cancelEvent.isSet():
+            return None
+        target = _listCommits(repoDir, targetRevs)
+        if cancelEvent.isSet():
+            return None
+
+        sha1s = [sha1 for sha1, _ in source] + [sha1 for sha1, _ in target]
+        patchIds = db.lookup(sha1s)
+        missing = [sha1 for sha1 in sha1s if sha1 not in patchIds]
+
+        batches = [missing[i:i + _BATCH_SIZE]
+                   for i in range(0, len(missing), _BATCH_SIZE)]
+        computed = {}
+        if len(batches) == 1:
+            computed = _computePatchIds(repoDir, batches[0], cancelEvent)
+        elif batches:
+            maxWorkers = min(len(batches), max(2, os.cpu_count() or 2))
+            with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+                for result in executor.map(
+                        lambda batch: _computePatchIds(repoDir, batch, cancelEvent), batches):
+                    computed.update(result)
+
+        db.save(computed)
+        if cancelEvent.isSet():
+            return None
+        patchIds.update(computed)
+
+        def _byPatchId(commits):
+            ids = {}
+            for sha1, _ in commits:
+                patchId = patchIds.get(sha1)
+                if patchId:
+                    ids.setdefault(patchId, []).append(sha1)
+            return ids
+
+        pickedTo = {}
+        for sha1, message in target:
+            for origin in _PICKED_RE.findall(message):
+                pickedTo.setdefault(origin, []).append(sha1)
+
+        def _reverts(commits):
+            reverts = {}
+            for sha1, message in commits:
+                for reverted in _REVERT_RE.findall(message):
+                    reverts.setdefault(reverted, sha1)
+            return reverts
+
+        return {
+            "patchIds": patchIds,
+            "source": {sha1 for sha1, _ in source},
+            "target": {sha1 for sha1, _ in target},
+            "sourceIds": _byPatchId(source),
+            "targetIds": _byPatchId(target),
+            "pickedTo": pickedTo,
+            "sourceReverts": _reverts(source),
+            "targetReverts": _reverts(target),
+        }
+
+    def _onFinished(self):
+        self._building = False
+        results = self._results
+        self._results = {}
+        if not results:
+            return
+
+        self._patchIds = results["patchIds"]
+        self._source = results["source"]
+        self._target = results["target"]
+        self._sourceIds = results["sourceIds"]
+        self._targetIds = results["targetIds"]
+        self._pickedTo = results["pickedTo"]
+        self._sourceReverts = results["sourceReverts"]
+        self._targetReverts = results["targetReverts"]
+        self._ready = True
+        self.ready.emit()
@@ -14,6 +14,7 @@ from qgitc.common import Commit, dataDirPath
 from qgitc.events import ShowCommitEvent
 from qgitc.gitutils import Git
 from qgitc.logview import LogView, MarkType
+from qgitc.patchidindex import PatchIdIndex
 from qgitc.preferences import Preferences
 from qgitc.statewindow import StateWindow
 from qgitc.ui_pickbranchwindow import Ui_PickBranchWindow
@@ -50,6 +51,11 @@ class PickBranchWindow(StateWindow):
         self._isFirstShow = True
         self._pendingSourceBranch = None
 
+        # Patch ids of the source and target commits, for the filters
+        self._patchIdIndex = PatchIdIndex(self)
+        self._patchIdIndex.ready.connect(self._onPatchIdsReady)
+        self._filterPending = False
+
         # Spinner delay timers
         self._commitSpinnerDelayTimer = QTimer(self)
         self._commitSpinnerDelayTimer.setSingleShot(True)
@@ -116,6 +122,7 @@ class PickBranchWindow(StateWindow):
         # Branch selection changes - only when user selects from dropdown or presses Enter
         self.ui.cbSourceBranch.activated.connect(self._delayLoadCommits)
         self.ui.cbBaseBranch.activated.connect(self._delayLoadCommits)
+        self.ui.cbTargetBranch.activated.connect(self._buildPatchIdIndex)
 
         # Button clicks
         self.ui.btnShowLogWindow.clicked.connect(self._showLogWindow)
@@ -160,6 +167,7 @@ class PickBranchWindow(StateWindow):
         """Handle close event"""
         self.ui.diffView.queryClose()
         self.ui.logView.queryClose()
+        self._patchIdIndex.cancel()
         super().closeEvent(event)
 
     def event(self, event: QEvent):
@@ -271,6 +279,8 @@ class PickBranchWindow(StateWindow):
         """Load commits from source branch"""
         self.ui.logView.clear()
         self.ui.diffView.clear()
+        self._patchIdIndex.clear()
+        self._filterPending = False
 
         sourceBranch = self.ui.cbSourceBranch.currentText()
         baseBranch = self.ui.cbBaseBranch.currentText()
@@ -293,9 +303,32 @@ class PickBranchWindow(StateWindow):
         self.ui.logView.showLogs(
             sourceBranch, branchDir, revisionRange)
         self.ui.diffView.setBranchDir(branchDir)
+        self._buildPatchIdIndex()
         self._updateStatus(
             self.tr("Loading commits from {0}...").format(sourceBranch))
 
+    def _buildPatchIdIndex(self):
+        """Index the patch ids of the source commits and of the target
+        commits not on the source branch"""
+        sourceBranch = self.ui.cbSourceBranch.currentText()
+        baseBranch = self.ui.cbBaseBranch.currentText()
+        targetBranch = self.ui.cbTargetBranch.currentText()
+        if not sourceBranch or not baseBranch or sourceBranch == baseBranch:
+            return
+
+        sourceRevs = [sourceBranch, "--not", baseBranch]
+        targetRevs = []
+        if targetBranch and targetBranch != sourceBranch:
+            targetRevs = [targetBranch, "--not", sourceBranch]
+
+        repoDir = Git.branchDir(sourceBranch) or Git.REPO_DIR
+        self._patchIdIndex.build(repoDir, sourceRevs, targetRevs)
+
+    def _onPatchIdsReady(self):
+        """Apply the filters again now that the patch ids are known"""
+        if self._filterPending:
+            self._applyFilters()
+
     def _onCommitsFetchStarted(self):
         """Handle commits fetch started"""
         if not self.ui.spinnerCommits.isSpinning():
@@ -354,10 +387,12 @@ class PickBranchWindow(StateWindow):
         settings = app.settings()
         filterReverted = settings.filterRevertedCommits()
         filterMerge = settings.filterMergeCommits()
+        filterApplied = settings.filterAppliedCommits()
         filterPatterns = settings.filterCommitPatterns()
         useRegex = settings.filterUseRegex()
 
-        if not filterReverted and not filterMerge and not filterPatterns:
+        if not filterReverted and not filterMerge and not filterApplied \
+                and not filterPatterns:
             # No filters enabled, show message
             self._updateStatus(
                 self.tr("No filters configured. Please configure filters in Settings > Cherry-Pick"))
@@ -366,11 +401,28 @@ class PickBranchWindow(StateWindow):
         app.trackFeatureUsage("cherry_pick_filter_commits", {
             "filter_reverted": filterReverted,
             "filter_merge": filterMerge,
+            "filter_applied": filterApplied,
             "filter_patterns": bool(filterPatterns),
             "use_regex": useRegex,
             "by_default": settings.applyFilterByDefault(),
         })
 
+        self._applyFilters()
+
+    def _applyFilters(self):
+        """Unmark the commits matching the filters"""
+        settings = ApplicationBase.instance().settings()
+        filterReverted = settings.filterRevertedCommits()
+        filterMerge = settings.filterMergeCommits()
+        filterApplied = settings.filterAppliedCommits()
+        filterPatterns = settings.filterCommitPatterns()
+        useRegex = settings.filterUseRegex()
+
+        # The reverted and applied commits are filtered again once known
+        patchIds = self._patchIdIndex
+        self._filterPending = (filterReverted or filterApplied) \
+            and patchIds.isBuilding()
+
         commitCount = self.ui.logView.getCount()
         if commitCount == 0:
             return
@@ -402,10 +454,15 @@ class PickBranchWindow(StateWindow):
 
             shouldFilter = False
 
-            # Check if commit is a revert commit
-            # TODO: check if it is reverted later
+            # Check if commit is a revert commit or reverted later
             if filterReverted:
-                if "This reverts commit " in commit.comments:
+                if "This reverts commit " in commit.comments or \
+                        patchIds.revertedBy(commit.sha1):
+                    shouldFilter = True
+
+            # Check if the change is already on the target branch
+            if not shouldFilter and filterApplied:
+                if patchIds.isApplied(commit.sha1):
                     shouldFilter = True
 
             # Check if commit is a merge commit
@@ -436,7 +493,10 @@ class PickBranchWindow(StateWindow):
         self.ui.logView.viewport().update()
         self._updatePickButton()
 
-        if filteredCount > 0:
+        if self._filterPending:
+            self._updateStatus(
+                self.tr("Filtered out {0} commit(s), comparing the changes of the branches...").format(filteredCount))
+        elif filteredCount > 0:
             self._updateStatus(
                 self.tr("Filtered out {0} commit(s)").format(filteredCount))
         else:
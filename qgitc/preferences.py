@@ -726,6 +726,9 @@ class Preferences(QDialog):
         self.ui.cbFilterMerge.setChecked(
             self.settings.filterMergeCommits())
 
+        self.ui.cbFilterAppliedCommits.setChecked(
+            self.settings.filterAppliedCommits())
+
         # Load patterns into list
         patterns = self.settings.filterCommitPatterns()
         self.ui.listFilterPatterns.clear()
@@ -758,6 +761,9 @@ class Preferences(QDialog):
         self.settings.setFilterMergeCommits(
             self.ui.cbFilterMerge.isChecked())
 
+        self.settings.setFilterAppliedCommits(
+            self.ui.cbFilterAppliedCommits.isChecked())
+
         # Save patterns from list
         patterns = []
         for i in range(self.ui.listFilterPatterns.count()):
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+from PySide6.QtCore import QThread
+
+from qgitc.gitutils import Git, RepoRefs
+
+
+class RefsLoader(QThread):
+    """Load the branches and refs of a repo without blocking the GUI"""
+
+    def __init__(self, repoDir, parent=None):
+        super().__init__(parent)
+        self._repoDir = repoDir
+        self._refs: RepoRefs = None
+
+    @property
+    def repoDir(self):
+        return self._repoDir
+
+    @property
+    def refs(self) -> RepoRefs:
+        if self.isFinished() and not self.isInterruptionRequested():
+            return self._refs
+        return None
+
+    def run(self):
+        if self.isInterruptionRequested():
+            return
+        self._refs = Git.loadRefs(self._repoDir)
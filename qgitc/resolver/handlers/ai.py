@@ -13,6 +13,7 @@ from qgitc.resolver.enums import ResolveEventKind, ResolveMethod, ResolveOutcome
 from qgitc.resolver.handlers.base import ResolveHandler
 from qgitc.resolver.models import ResolveContext, ResolveEvent, ResolveOutcome
 from qgitc.resolver.services import ResolveServices
+from qgitc.resolver.trivial import NON_TRIVIAL, TAKE_OURS, TAKE_THEIRS, classifyConflict
 
 
 class AiResolveHandler(ResolveHandler):
@@ -45,21 +46,18 @@ class AiResolveHandler(ResolveHandler):
         ctx = self._ctx
         services = self._services
 
-        # Fast-path checks via blob ids.
+        # Fast-path checks via blob ids, reuse the stages read by a batch
+        # resolve if any.
         def _trivial() -> str:
-            stageIds = Git.getConflictFileBlobIds(path, ctx.repoDir)
-            baseId = stageIds.get(1)
-            oursId = stageIds.get(2)
-            theirsId = stageIds.get(3)
-            if not oursId or not theirsId:
-                return "skip_missing_stage"
-            if oursId == theirsId:
-                return "take_ours" if Git.resolveBy(True, path, repoDir=ctx.repoDir) else "fail_checkout_ours"
-            if baseId == oursId:
-                return "take_theirs" if Git.resolveBy(False, path, repoDir=ctx.repoDir) else "fail_checkout_theirs"
-            if baseId == theirsId:
-                return "take_ours" if Git.resolveBy(True, path, repoDir=ctx.repoDir) else "fail_checkout_ours"
-            return "non_trivial"
+            stageIds = ctx.meta.get("stageIds")
+            if stageIds is None:
+                stageIds = Git.getConflictFileBlobIds(path, ctx.repoDir)
+            mode = classifyConflict(stageIds)
+            if mode == TAKE_OURS:
+                return mode if Git.resolveBy(True, path, repoDir=ctx.repoDir) else "fail_checkout_ours"
+            if mode == TAKE_THEIRS:
+                return mode if Git.resolveBy(False, path, repoDir=ctx.repoDir) else "fail_checkout_theirs"
+            return mode
 
         runner = services.runner
         task = runner.run(_trivial)
@@ -78,7 +76,7 @@ class AiResolveHandler(ResolveHandler):
             return
 
         mode = str(result)
-        if mode in ("take_ours", "take_theirs"):
+        if mode in (TAKE_OURS, TAKE_THEIRS):
             # Stage.
             addTask = services.runner.run(
                 lambda: Git.addFiles(ctx.repoDir, [path]))
@@ -90,7 +88,7 @@ class AiResolveHandler(ResolveHandler):
             self.finished.emit(False, None)
             return
 
-        if mode != "non_trivial":
+        if mode != NON_TRIVIAL:
             self.finished.emit(False, None)
             return
 
@@ -213,7 +211,7 @@ class AiResolveHandler(ResolveHandler):
     def _afterAdd(self, path: str, mode: str, ok: bool, result: object, error: object):
         if ok and not result:
             m = ResolveMethod.AI if mode == "ai" else (
-                ResolveMethod.OURS if mode == "take_ours" else ResolveMethod.THEIRS)
+                ResolveMethod.OURS if mode == TAKE_OURS else ResolveMethod.THEIRS)
             self._emit(
                 ResolveEvent(
                     kind=ResolveEventKind.FILE_RESOLVED,
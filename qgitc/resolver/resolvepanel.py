@@ -41,6 +41,7 @@ from qgitc.resolver.models import (
 )
 from qgitc.resolver.services import ResolveServices
 from qgitc.resolver.taskrunner import TaskRunner
+from qgitc.resolver.trivial import resolveTrivialConflicts
 
 
 class _FileState:
@@ -65,8 +66,16 @@ class ResolvePanel(QWidget):
 
     Designed to be embedded in other windows (cherry-pick progress, merge window, etc).
     Runs ResolveManager asynchronously and keeps UI responsive.
+
+    "Resolve all" first resolves every trivial conflict in one batch, then
+    runs the remaining files through the handlers, at most
+    `maxConcurrentFiles()` of them at a time.
     """
 
+    # The assistant resolves files in a single chat conversation and merge
+    # tools are interactive, so files are resolved one by one by default.
+    DEFAULT_MAX_CONCURRENT_FILES = 1
+
     statusTextChanged = Signal(str)
     currentFileChanged = Signal(object)  # str|None
 
@@ -86,11 +95,15 @@ class ResolvePanel(QWidget):
         self._runner = TaskRunner(self)
         self._services: Optional[ResolveServices] = None
 
-        self._manager: Optional[ResolveManager] = None
+        # path -> manager, "" for the finalize step
+        self._managers: Dict[str, ResolveManager] = {}
+        self._trivialTask = None
+        self._maxConcurrentFiles = self.DEFAULT_MAX_CONCURRENT_FILES
         self._abortRequested = False
 
         self._fileStates: Dict[str, int] = {}
         self._queue: List[str] = []
+        self._stages: Dict[str, Dict[int, str]] = {}
         self._currentPath: Optional[str] = None
 
         self._setupUi()
@@ -174,8 +187,15 @@ class ResolvePanel(QWidget):
     def setAiAutoResolveEnabled(self, enabled: bool):
         self._aiAutoResolveCheck.setChecked(enabled)
 
+    def setMaxConcurrentFiles(self, count: int):
+        """Number of files resolved by the handlers at the same time"""
+        self._maxConcurrentFiles = max(1, count)
+
+    def maxConcurrentFiles(self) -> int:
+        return self._maxConcurrentFiles
+
     def isBusy(self) -> bool:
-        return self._manager is not None
+        return bool(self._managers) or self._trivialTask is not None
 
     def requestAbortSafely(self):
         self._abortRequested = True
@@ -190,6 +210,7 @@ class ResolvePanel(QWidget):
     def clear(self):
         self._abortRequested = False
         self._queue.clear()
+        self._stages.clear()
         self._currentPath = None
         self._fileStates.clear()
         self._list.clear()
@@ -230,6 +251,43 @@ class ResolvePanel(QWidget):
         pending = [p for p, st in self._fileStates.items() if st ==
                    _FileState.PENDING]
         self._queue = list(pending)
+        if len(self._queue) > 1 and self._ctx is not None:
+            self._startTrivialResolve()
+        else:
+            self._startNextFile()
+        self._updateActionState()
+
+    def _startTrivialResolve(self):
+        repoDir = self._ctx.repoDir
+        paths = list(self._queue)
+        self._setStatus(self.tr("Resolving trivial conflicts…"))
+
+        self._trivialTask = self._runner.run(
+            lambda: resolveTrivialConflicts(repoDir, paths))
+        self._trivialTask.finished.connect(self._onTrivialResolved)
+
+    def _onTrivialResolved(self, ok: bool, result: object, error: object):
+        self._trivialTask = None
+
+        if ok:
+            self._stages = result.stages
+            for path, method in result.resolved.items():
+                if path not in self._fileStates:
+                    continue
+                self._fileStates[path] = _FileState.RESOLVED
+                self.eventEmitted.emit(ResolveEvent(
+                    kind=ResolveEventKind.FILE_RESOLVED,
+                    message=self.tr("Resolved {path}").format(path=path),
+                    path=path,
+                    method=method,
+                ))
+                self.fileOutcome.emit(path, ResolveOutcome(
+                    status=ResolveOutcomeStatus.RESOLVED,
+                    message=self.tr("Resolved trivially"),
+                ))
+            self._renderFileList()
+
+        # Files of a failed batch are left to the handlers.
         self._startNextFile()
         self._updateActionState()
 
@@ -320,27 +378,30 @@ class ResolvePanel(QWidget):
             self.abortSafePointReached.emit()
             return
 
-        if self.isBusy():
+        if self._trivialTask is not None or "" in self._managers:
             return
 
-        while self._queue:
+        while self._queue and len(self._managers) < self._maxConcurrentFiles:
             path = self._queue.pop(0)
             if self._fileStates.get(path) != _FileState.PENDING:
                 continue
-            self._startResolveForFile(path)
-            return
+            if not self._startResolveForFile(path):
+                # Stop at the first failure, same as a failed resolve.
+                self._queue.clear()
+                return
 
-        # Nothing else to do.
-        self.currentFileChanged.emit(None)
+        if not self._queue and not self._managers:
+            # Nothing else to do.
+            self.currentFileChanged.emit(None)
 
-    def _startResolveForFile(self, path: str):
+    def _startResolveForFile(self, path: str) -> bool:
         ctx = self._ctx
         services = self._services
         if ctx is None or services is None:
             out = ResolveOutcome(status=ResolveOutcomeStatus.FAILED,
                                  message=self.tr("Resolve context not set"))
             self.fileOutcome.emit(path, out)
-            return
+            return False
 
         handlers, mergeToolName, hasGitDefaultTool = buildResolveHandlers(
             parent=self,
@@ -369,7 +430,7 @@ class ResolvePanel(QWidget):
             self._fileStates[path] = _FileState.FAILED
             self._renderFileList()
             self.fileOutcome.emit(path, out)
-            return
+            return False
 
         self._currentPath = path
         self.currentFileChanged.emit(path)
@@ -385,8 +446,12 @@ class ResolvePanel(QWidget):
             mergetoolName=mergeToolName,
             reportFile=ctx.reportFile,
         )
+        stageIds = self._stages.get(path)
+        if stageIds is not None:
+            rc.meta["stageIds"] = stageIds
 
         self._startManager(handlers, rc, isFinalize=False)
+        return True
 
     def _startManager(self, handlers, ctx: ResolveContext, *, isFinalize: bool):
         services = self._services
@@ -411,7 +476,7 @@ class ResolvePanel(QWidget):
             manager.completed.connect(
                 lambda out, p=ctx.path: self._onFileCompleted(p, out))
 
-        self._manager = manager
+        self._managers["" if isFinalize else ctx.path] = manager
         manager.start(ctx)
 
     def _onResolveEvent(self, ev: ResolveEvent):
@@ -420,7 +485,7 @@ class ResolvePanel(QWidget):
             self._setStatus(ev.message)
 
     def _onFileCompleted(self, path: str, outcome: ResolveOutcome):
-        self._manager = None
+        self._managers.pop(path, None)
 
         if outcome.status == ResolveOutcomeStatus.RESOLVED:
             self._fileStates[path] = _FileState.RESOLVED
@@ -440,14 +505,18 @@ class ResolvePanel(QWidget):
         self._updateActionState()
 
         if self._abortRequested:
-            self.abortSafePointReached.emit()
+            if not self._managers:
+                self.abortSafePointReached.emit()
             return
 
         if outcome.status == ResolveOutcomeStatus.RESOLVED:
             self._startNextFile()
+        else:
+            # Don't start other files, the running ones finish.
+            self._queue.clear()
 
     def _onFinalizeCompleted(self, outcome: ResolveOutcome):
-        self._manager = None
+        self._managers.pop("", None)
         self.finalizeOutcome.emit(outcome)
         self._updateActionState()
         if self._abortRequested:
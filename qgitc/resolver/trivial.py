@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from qgitc.gitutils import Git
+from qgitc.resolver.enums import ResolveMethod
+
+TAKE_OURS = "take_ours"
+TAKE_THEIRS = "take_theirs"
+MISSING_STAGE = "skip_missing_stage"
+NON_TRIVIAL = "non_trivial"
+
+_DATACLASS_KWARGS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+def classifyConflict(stageIds: Optional[Dict[int, str]]) -> str:
+    """Classify a conflict by the blob ids of its stages (1: base, 2: ours,
+    3: theirs).
+
+    A side wins without merging the contents when both sides are the same or
+    when only one side changed the base.
+    """
+    stageIds = stageIds or {}
+    baseId = stageIds.get(1)
+    oursId = stageIds.get(2)
+    theirsId = stageIds.get(3)
+    if not oursId or not theirsId:
+        return MISSING_STAGE
+    if oursId == theirsId:
+        return TAKE_OURS
+    if baseId == oursId:
+        return TAKE_THEIRS
+    if baseId == theirsId:
+        return TAKE_OURS
+    return NON_TRIVIAL
+
+
+@dataclass(**_DATACLASS_KWARGS)
+class TrivialResolveResult:
+    # path -> ResolveMethod.OURS or ResolveMethod.THEIRS
+    resolved: Dict[str, ResolveMethod] = field(default_factory=dict)
+    # files left to the resolve handlers, in the original order
+    remaining: List[str] = field(default_factory=list)
+    # {path: {stage: blobId}} of all unmerged files
+    stages: Dict[str, Dict[int, str]] = field(default_factory=dict)
+
+
+def resolveTrivialConflicts(repoDir: str, paths: List[str]) -> TrivialResolveResult:
+    """Resolve the trivial conflicts of @paths in one go.
+
+    The stages of all files are read with a single `ls-files -u` and each side
+    is taken with one batched checkout and add. Files of a batch that fails
+    are left to the handlers. Runs git, so call it from a worker thread.
+    """
+    result = TrivialResolveResult(stages=Git.conflictFileStages(repoDir))
+
+    sides = {TAKE_OURS: [], TAKE_THEIRS: []}
+    for path in paths:
+        mode = classifyConflict(result.stages.get(path))
+        if mode in sides:
+            sides[mode].append(path)
+
+    for mode, method in ((TAKE_OURS, ResolveMethod.OURS),
+                         (TAKE_THEIRS, ResolveMethod.THEIRS)):
+        files = sides[mode]
+        if files and not Git.resolveFilesBy(mode == TAKE_OURS, files, repoDir):
+            for path in files:
+                result.resolved[path] = method
+
+    result.remaining = [p for p in paths if p not in result.resolved]
+    return result
@@ -5,9 +5,10 @@ import logging
 import os
 import platform
 import uuid
+from dataclasses import dataclass
 from typing import List, Tuple
 
-from PySide6.QtCore import QSettings, Signal
+from PySide6.QtCore import QSettings, QStandardPaths, Signal
 from PySide6.QtGui import QColor, QFont, QFontInfo
 from PySide6.QtWidgets import QApplication
 
@@ -53,6 +54,16 @@ def chineseFont():
     return defaultFont
 
 
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    """The settings read on hot paths, see `Settings.snapshot`"""
+
+    fullCommitMessage: bool = False
+    compositeMode: bool = False
+    maxCompositeCommitsSince: int = 365
+    detectLocalChanges: bool = True
+
+
 class Settings(QSettings):
 
     showWhitespaceChanged = Signal(bool)
@@ -70,6 +81,10 @@ class Settings(QSettings):
     toolExecutionStrategyChanged = Signal(int)
     llmProvidersChanged = Signal()
 
+    # keys of the values in `SettingsSnapshot`
+    _SNAPSHOT_KEYS = {"fullCommitMsg", "compositeMode",
+                      "maxCompositeCommitsSince", "detectLocalChanges"}
+
     def __init__(self, parent=None, testing=False):
         super().__init__(
             QSettings.NativeFormat,
@@ -80,6 +95,45 @@ class Settings(QSettings):
 
         self.setFallbacksEnabled(False)
         self._fixedFont = None
+        self._testing = testing
+        self._snapshot = self._makeSnapshot()
+
+    def _makeSnapshot(self):
+        return SettingsSnapshot(
+            fullCommitMessage=self.isFullCommitMessage(),
+            compositeMode=self.isCompositeMode(),
+            maxCompositeCommitsSince=self.maxCompositeCommitsSince(),
+            detectLocalChanges=self.detectLocalChanges())
+
+    def snapshot(self) -> SettingsSnapshot:
+        """Return the settings read on hot paths (painting, fetching logs...)
+
+        The snapshot is immutable and replaced by the writer when one of its
+        values is changed through this object, so it can be read from any
+        thread without locking.
+        """
+        return self._snapshot
+
+    def _updateSnapshot(self, key: str):
+        # the snapshot values are top level keys, while @key is relative to
+        # the current group, which the snapshot must not be read from
+        if self.group():
+            return
+        if not key or key in Settings._SNAPSHOT_KEYS:
+            self._snapshot = self._makeSnapshot()
+
+    def setValue(self, key: str, value):
+        super().setValue(key, value)
+        self._updateSnapshot(key)
+
+    def remove(self, key: str):
+        super().remove(key)
+        self._updateSnapshot(key)
+
+    def clear(self):
+        super().clear()
+        # all the values are back to their defaults, whatever the group
+        self._snapshot = SettingsSnapshot()
 
     @staticmethod
     def _makeFont(families: List[str], pointSize: int):
@@ -505,6 +559,17 @@ class Settings(QSettings):
         self.setValue("reasoningEnabled", enabled)
         self.endGroup()
 
+    def codeReviewMaxInFlight(self):
+        self.beginGroup("llm")
+        value = self.value("codeReviewMaxInFlight", 4, type=int)
+        self.endGroup()
+        return value
+
+    def setCodeReviewMaxInFlight(self, count: int):
+        self.beginGroup("llm")
+        self.setValue("codeReviewMaxInFlight", count)
+        self.endGroup()
+
     def isCompositeMode(self):
         return self.value("compositeMode", False, type=bool)
 
@@ -904,6 +969,36 @@ class Settings(QSettings):
         self.endGroup()
         self.endGroup()
 
+    def clearChatHistories(self):
+        """Remove all the chat history sessions"""
+        self.beginGroup("AiChat")
+        self.remove("histories")
+        self.endGroup()
+
+    def chatHistoryFile(self):
+        """Database of the chat histories, kept in memory for tests"""
+        if self._testing:
+            return ":memory:"
+        dirPath = QStandardPaths.writableLocation(
+            QStandardPaths.AppLocalDataLocation)
+        return os.path.join(dirPath, "chathistory.db")
+
+    def patchIdFile(self):
+        """Cache of the patch ids of the commits, kept in memory for tests"""
+        if self._testing:
+            return ":memory:"
+        dirPath = QStandardPaths.writableLocation(
+            QStandardPaths.AppLocalDataLocation)
+        return os.path.join(dirPath, "patchids.db")
+
+    def grepIndexFile(self):
+        """Trigram indexes of the agent searches, kept in memory for tests"""
+        if self._testing:
+            return ":memory:"
+        dirPath = QStandardPaths.writableLocation(
+            QStandardPaths.AppLocalDataLocation)
+        return os.path.join(dirPath, "grep-trigrams.db")
+
     # Cherry-Pick Settings Group
     def recordOrigin(self):
         """Whether to record origin commit SHA in cherry-picked commit message"""
@@ -953,6 +1048,18 @@ class Settings(QSettings):
         self.setValue("filterMerge", filter)
         self.endGroup()
 
+    def filterAppliedCommits(self):
+        """Whether to filter out commits whose change is already on the target branch"""
+        self.beginGroup("cherryPick")
+        value = self.value("filterApplied", True, type=bool)
+        self.endGroup()
+        return value
+
+    def setFilterAppliedCommits(self, filter: bool):
+        self.beginGroup("cherryPick")
+        self.setValue("filterApplied", filter)
+        self.endGroup()
+
     def filterCommitPatterns(self):
         """Get the list of patterns to filter commits"""
         self.beginGroup("cherryPick")
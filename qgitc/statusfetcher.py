@@ -18,7 +18,7 @@ def _fetchStatusGit(submodule, cancelEvent: CancelEvent, showUntrackedFiles=True
 
     try:
         data = Git.status(repoDir, showUntrackedFiles, showIgnoredFiles)
-        if not data:
+        if data is None:
             return None, None
     except Exception:
         logger.exception("Error fetching status for `%s`", repoDir)
@@ -29,8 +29,11 @@ def _fetchStatusGit(submodule, cancelEvent: CancelEvent, showUntrackedFiles=True
             "Cancel event set, aborting status fetch for `%s`", repoDir)
         return None, None
 
-    lines = data.rstrip(b'\0').split(b'\0')
     result = []
+    if not data:
+        return submodule, result
+
+    lines = data.rstrip(b'\0').split(b'\0')
     i = 0
     while i < len(lines):
         line = lines[i]
@@ -123,6 +126,8 @@ def _fetchStatusGit2(submodule, userData, cancelEvent: CancelEvent):
 class StatusFetcher(SubmoduleExecutor):
     resultAvailable = Signal(str, list)
     branchInfoAvailable = Signal(str, str)
+    # the full status of a repo, replacing its previous result
+    deltaAvailable = Signal(str, list)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -190,6 +195,18 @@ class StatusFetcher(SubmoduleExecutor):
         if result:
             self.resultAvailable.emit(submodule, result)
 
+    def fetchStatusDelta(self, submodule, cancelEvent: CancelEvent):
+        """ Fetch the status of @submodule only, the receiver should update
+        the files of that repo instead of appending them """
+        _, result = self._fetchStatus(submodule, None, cancelEvent)
+        if cancelEvent.isSet():
+            return
+        # keep the files of the repo rather than dropping them all
+        if result is None:
+            logger.warning("Failed to fetch the status of `%s`", submodule)
+            return
+        self.deltaAvailable.emit(submodule, result)
+
     def _fetchStatus(self, submodule, userData, cancelEvent: CancelEvent):
         return _fetchStatusGit(
             submodule, cancelEvent, self._showUntrackedFiles, self._showIgnoredFiles)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+from typing import Dict, List
+
+from PySide6.QtCore import QObject, Signal
+
+from qgitc.cancelevent import CancelEvent
+from qgitc.common import fullRepoDir
+from qgitc.gitutils import Git
+from qgitc.submoduleexecutor import SubmoduleExecutor
+
+
+class SubmoduleRefsLoader(QObject):
+    """Load the refs of the repos shown in composite mode into
+    `Git.SUBMODULE_REFS`.
+
+    The repos are loaded in parallel by a `SubmoduleExecutor`. A repo is
+    only reloaded when the stamp of its refs (see `Git.refsStamp`) changed
+    since its last load, so refreshing is cheap when nothing changed.
+    """
+
+    refsChanged = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._executor = SubmoduleExecutor(self)
+        self._executor.finished.connect(self._onFinished)
+        self._repoDir = None
+        # submodule -> stamp of its loaded refs
+        self._stamps: Dict[str, tuple] = {}
+        self._submodules: List[str] = []
+        self._results: Dict[str, tuple] = {}
+        self._loading = False
+
+    def load(self, submodules: List[str]):
+        """Load or refresh the refs of @submodules of Git.REPO_DIR"""
+        if self._repoDir != Git.REPO_DIR:
+            self.clear()
+            self._repoDir = Git.REPO_DIR
+
+        self._submodules = list(submodules)
+        # each run has its own results, a cancelled one may still report
+        self._results = {}
+        results = self._results
+
+        def _onResult(submodule=None, stamp=None, refs=None):
+            if submodule is not None:
+                results[submodule] = (stamp, refs)
+
+        self._loading = True
+        self._executor.submit(
+            {submodule: self._stamps.get(submodule) for submodule in submodules},
+            self._doLoadRefs, _onResult)
+
+    def refresh(self):
+        """Reload the repos whose refs changed"""
+        if self._submodules and self._repoDir == Git.REPO_DIR:
+            self.load(self._submodules)
+
+    def clear(self):
+        self._executor.cancel()
+        self._loading = False
+        self._stamps.clear()
+        self._submodules = []
+        self._results = {}
+        if Git.SUBMODULE_REFS:
+            Git.SUBMODULE_REFS = {}
+
+    def cancel(self, force=False):
+        self._executor.cancel(force)
+        self._loading = False
+
+    def isLoading(self):
+        return self._loading
+
+    @staticmethod
+    def _doLoadRefs(submodule: str, stamp: tuple, cancelEvent: CancelEvent):
+        if cancelEvent.isSet():
+            return None
+
+        repoDir = fullRepoDir(submodule)
+        newStamp = Git.refsStamp(repoDir)
+        if newStamp is not None and newStamp == stamp:
+            return None
+
+        refs = Git.loadRefs(repoDir) if newStamp is not None else None
+        return submodule, newStamp, refs
+
+    def _onFinished(self):
+        self._loading = False
+        submoduleRefs = {submodule: refs
+                         for submodule, refs in Git.SUBMODULE_REFS.items()
+                         if submodule in self._submodules}
+        changed = len(submoduleRefs) != len(Git.SUBMODULE_REFS)
+
+        for submodule, (stamp, refs) in self._results.items():
+            changed = True
+            self._stamps[submodule] = stamp
+            if refs:
+                submoduleRefs[submodule] = refs
+            else:
+                submoduleRefs.pop(submodule, None)
+        self._results = {}
+
+        Git.SUBMODULE_REFS = submoduleRefs
+        if changed:
+            self.refsChanged.emit()
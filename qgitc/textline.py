@@ -2,7 +2,7 @@
 
 import bisect
 import re
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 from PySide6.QtCore import QT_TRANSLATE_NOOP, QCoreApplication, QRectF, Qt
 from PySide6.QtGui import (
@@ -24,6 +24,9 @@ sha1_re = re.compile("(?<![a-zA-Z0-9_])[a-f0-9]{7,40}(?![a-zA-Z0-9_])")
 email_re = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
 url_re = re.compile("((https?|ftp)://[a-zA-Z0-9@:%_+-.~#?&/=()]+)")
 
+# Literals a line must contain for the pattern to match
+_REQUIRED_LITERALS = {email_re: "@", url_re: "://"}
+
 cr_char = "^M"
 
 # Lines longer than this skip link detection to avoid catastrophic regex backtracking
@@ -61,6 +64,105 @@ class Link():
         return self.start <= pos and pos <= self.end
 
 
+class LinkScanner():
+    """Find the links of several patterns in one sweep over a line.
+
+    The patterns are searched side by side from left to right: the match
+    starting first wins, then the longest one, then the first pattern. The
+    matched text is skipped, so overlapping links are never produced and
+    each pattern only walks the line once. A pattern requiring a literal
+    (the "@" of an email...) is not run at all on lines without it.
+
+    The links of the recent lines are cached by text, as the same lines
+    (blank ones, braces, common statements...) repeat a lot in diffs.
+    """
+
+    _CACHE_SIZE = 4096
+
+    def __init__(self, patterns: List[Tuple[int, re.Pattern, str]]):
+        self._patterns = list(patterns)
+        self._literals = [_REQUIRED_LITERALS.get(pattern)
+                          for _, pattern, _ in self._patterns]
+        self._cache: Dict[str, tuple] = {}
+
+    def _scan(self, text: str):
+        links = []
+        # the next match of each pattern that can match
+        matches = {}
+        for i, (_, pattern, _) in enumerate(self._patterns):
+            literal = self._literals[i]
+            if literal is None or literal in text:
+                m = pattern.search(text)
+                if m is not None:
+                    matches[i] = m
+
+        pos = 0
+        while matches:
+            index = -1
+            best = None
+            for i, m in matches.items():
+                if best is None or m.start() < best.start() or \
+                        (m.start() == best.start() and m.end() > best.end()):
+                    index, best = i, m
+
+            start, end = best.start(), best.end()
+            if end > start:
+                linkType, pattern, url = self._patterns[index]
+                if url:
+                    if pattern.groups == 1:
+                        data = url + best.group(1)
+                    else:
+                        data = url + best.group(2)
+                elif pattern.groups == 0 or best.lastindex is None:
+                    data = best.group(0)
+                else:
+                    data = best.group(best.lastindex)
+                links.append((start, end, linkType, data))
+                pos = end
+            else:
+                pos = start + 1
+
+            # search again the patterns overlapping the consumed text
+            for i in [i for i, m in matches.items() if m.start() < pos]:
+                m = self._patterns[i][1].search(text, pos)
+                if m is None:
+                    del matches[i]
+                else:
+                    matches[i] = m
+
+        return tuple(links)
+
+    def findLinks(self, text: str):
+        found = self._cache.get(text)
+        if found is None:
+            found = self._scan(text)
+            # dropping the oldest entries one by one is slower than a refill
+            if len(self._cache) >= LinkScanner._CACHE_SIZE:
+                self._cache.clear()
+            self._cache[text] = found
+
+        links: List[Link] = []
+        for start, end, linkType, data in found:
+            link = Link(start, end, linkType)
+            link.setData(data)
+            links.append(link)
+        return links
+
+
+_scanners: Dict[tuple, LinkScanner] = {}
+
+
+def _linkScanner(patterns: List[Tuple[int, re.Pattern, str]]) -> LinkScanner:
+    key = tuple(patterns)
+    scanner = _scanners.get(key)
+    if scanner is None:
+        # the bug patterns are recompiled when changed, drop the old ones
+        if len(_scanners) >= 16:
+            _scanners.clear()
+        scanner = _scanners[key] = LinkScanner(patterns)
+    return scanner
+
+
 class TextLine():
 
     def __init__(self, text: str, font: QFont, option: QTextOption = None):
@@ -99,57 +201,15 @@ class TextLine():
 
     @staticmethod
     def findLinks(text: str, patterns: List[Tuple[int, re.Pattern, str]]):
-        links: List[Link] = []
         if not text or not patterns:
-            return links
+            return []
 
         # Skip link detection on very long lines: email/url regexes can catastrophically
         # backtrack (O(n²)) on long ASCII-only strings without an @ or ://
         if len(text) > _MAX_LINK_SCAN_LEN:
-            return links
-
-        for linkType, pattern, url, in patterns:
-            matches = pattern.finditer(text)
-            for m in matches:
-                shouldAdd = True
-                for i in reversed(range(len(links))):
-                    start = links[i].start
-                    end = links[i].end
-
-                    # prefer the first one if the range is the same
-                    if m.start() == start and m.end() == end:
-                        shouldAdd = False
-                        break
-
-                    # the new one is longer than the old one
-                    if m.start() <= start and end <= m.end():
-                        del links[i]
-                        continue
-
-                    # the old one is longer than the new one or overlap
-                    if (start <= m.start() and m.end() <= end) or \
-                        (start < m.end() and m.start() < end) or \
-                            (m.start() < end and start < m.end()):
-                        shouldAdd = False
-                        break
-
-                if not shouldAdd:
-                    continue
-
-                link = Link(m.start(), m.end(), linkType)
-                if url:
-                    if pattern.groups == 1:
-                        link.setData(url + m.group(1))
-                    else:
-                        link.setData(url + m.group(2))
-                elif pattern.groups == 0 or m.lastindex is None:
-                    link.setData(m.group(0))
-                else:
-                    link.setData(m.group(m.lastindex))
-
-                links.append(link)
+            return []
 
-        return links
+        return _linkScanner(patterns).findLinks(text)
 
     @staticmethod
     def builtinPatterns():
@@ -273,7 +333,7 @@ class TextLine():
 
             builtinPatterns = TextLine.builtinPatterns() if \
                 self._useBuiltinPatterns else {}
-            patterns = self._patterns or []
+            patterns = list(self._patterns or [])
             for type, pattern in builtinPatterns.items():
                 patterns.append((type, pattern, None))
             self._findLinks(patterns)
@@ -204,6 +204,7 @@ class TestBase(unittest.TestCase):
         os.chdir(self.oldDir)
         Git.REPO_DIR = self.oldDir
         Git.REF_MAP = {}
+        Git.SUBMODULE_REFS = {}
         Git.REV_HEAD = None
 
         if self.gitDir:
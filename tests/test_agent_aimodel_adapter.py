@@ -136,6 +136,33 @@ class NetworkErrorAiModel(AiModelBase):
         return True
 
 
+class HangingAiModel(AiModelBase):
+    """Never finishes the query, until it is interrupted."""
+
+    def __init__(self, parent=None):
+        # type: (Optional[Any]) -> None
+        super().__init__("http://fake", model="fake", parent=parent)
+        self.queried = False
+        self.interrupted = False
+
+    def queryAsync(self, params):
+        # type: (AiParameters) -> None
+        _ = params
+        self.queried = True
+
+    def requestInterruption(self):
+        # type: () -> None
+        self.interrupted = True
+
+    def models(self):
+        # type: () -> List[Tuple[str, str]]
+        return [("fake", "Fake")]
+
+    def supportsToolCalls(self, modelId="fake"):
+        # type: (str) -> bool
+        return True
+
+
 class AdapterStreamRunner(QThread):
     def __init__(self, adapter, messages, parent=None):
         # type: (AiModelBaseAdapter, List[Any], Optional[Any]) -> None
@@ -536,6 +563,29 @@ class TestStreamParameters(TestBase):
             list(adapter.stream(messages))
 
 
+    def test_abort_interrupts_stream_off_main_thread(self):
+        model = HangingAiModel()
+        adapter = AiModelBaseAdapter(
+            model=model,
+            modelId="fake",
+            chat_mode=AiChatMode.Chat,
+        )
+
+        messages = [UserMessage(content=[TextBlock(text="Hi")])]
+        runner = AdapterStreamRunner(adapter, messages)
+        runner.start()
+        self.wait(3000, lambda: not model.queried)
+        self.assertTrue(model.queried)
+
+        adapter.abort()
+        self.assertTrue(model.interrupted)
+        self.assertTrue(runner.wait(3000))
+        self.assertIsInstance(runner.error, RuntimeError)
+
+        with self.assertRaisesRegex(RuntimeError, "aborted"):
+            list(adapter.stream(messages))
+
+
 class TestHistoryReasoningPassThrough(TestBase):
     """Adapter must pass reasoning and reasoningData from ThinkingBlock into addHistory."""
 
@@ -1,14 +1,20 @@
 # -*- coding: utf-8 -*-
 
+import threading
 import unittest
 from typing import Iterator, List
+from unittest.mock import patch
 
 from qgitc.agent.aimodel_adapter import AiModelBaseAdapter
 from qgitc.agent.compaction import (
+    BackgroundCompaction,
     CompactionResult,
     ConversationCompactor,
+    TokenLedger,
     _formatCompactSummary,
     _getCompactPrompt,
+    estimateMessageTokens,
+    microcompactCutoff,
     microcompactMessages,
     roughEstimateTokens,
 )
@@ -75,6 +81,69 @@ class TestRoughEstimateTokens(unittest.TestCase):
         self.assertEqual(total, single * 2)
 
 
+# ── TokenLedger ──────────────────────────────────────────────────────
+
+class TestTokenLedger(unittest.TestCase):
+    def _msgs(self, count):
+        return [UserMessage(content=[TextBlock(text="a" * 40)])
+                for _ in range(count)]
+
+    def test_sync_matches_rough_estimate(self):
+        ledger = TokenLedger()
+        msgs = self._msgs(3)
+        self.assertEqual(ledger.sync(msgs), roughEstimateTokens(msgs))
+        self.assertEqual(ledger.sync([]), 0)
+
+    def test_only_new_messages_estimated(self):
+        ledger = TokenLedger()
+        msgs = self._msgs(5)
+        ledger.sync(msgs)
+
+        msgs.append(AssistantMessage(content=[TextBlock(text="b" * 40)]))
+        with patch("qgitc.agent.compaction.estimateMessageTokens",
+                   wraps=estimateMessageTokens) as estimate:
+            self.assertEqual(ledger.sync(msgs), 14 * 6)
+            self.assertEqual(estimate.call_count, 1)
+
+            # unchanged history costs no estimation
+            ledger.sync(list(msgs))
+            self.assertEqual(estimate.call_count, 1)
+
+    def test_replaced_message_reestimated(self):
+        ledger = TokenLedger()
+        msgs = self._msgs(3)
+        ledger.sync(msgs)
+
+        msgs = list(msgs)
+        msgs[1] = UserMessage(content=[TextBlock(text="a" * 4)])
+        self.assertEqual(ledger.sync(msgs), 14 * 2 + 2)
+
+    def test_calibrate(self):
+        ledger = TokenLedger()
+        msgs = self._msgs(2)
+        ledger.sync(msgs)
+        self.assertFalse(ledger.isCalibrated())
+
+        # the real prompt also has the tool schemas
+        ledger.calibrate(1000)
+        self.assertTrue(ledger.isCalibrated())
+        self.assertEqual(ledger.tokens(), 1000)
+
+        msgs.append(AssistantMessage(content=[TextBlock(text="b" * 40)]))
+        self.assertEqual(ledger.sync(msgs), 1014)
+
+        # the offset goes with the calibrated prefix
+        self.assertEqual(ledger.sync(msgs[:1]), 14)
+        self.assertFalse(ledger.isCalibrated())
+
+    def test_calibrate_ignores_missing_usage(self):
+        ledger = TokenLedger()
+        ledger.sync(self._msgs(1))
+        ledger.calibrate(0)
+        self.assertFalse(ledger.isCalibrated())
+        self.assertEqual(ledger.tokens(), 14)
+
+
 # ── _getCompactPrompt ────────────────────────────────────────────────
 
 class TestGetCompactPrompt(unittest.TestCase):
@@ -165,6 +234,11 @@ class FakeSummaryProvider(AiModelBaseAdapter):
     def __init__(self, summary_text="This is the summary."):
         # type: (str) -> None
         self._summary_text = summary_text
+        self.aborted = threading.Event()
+
+    def abort(self):
+        # type: () -> None
+        self.aborted.set()
 
     def stream(self, messages, tools=None,
                model=None, max_tokens=4096):
@@ -175,6 +249,17 @@ class FakeSummaryProvider(AiModelBaseAdapter):
                                           output_tokens=5))
 
 
+class HangingSummaryProvider(FakeSummaryProvider):
+    """Provider waiting for the summary until it is aborted."""
+
+    def stream(self, messages, tools=None,
+               model=None, max_tokens=4096):
+        # type: (...) -> Iterator[StreamEvent]
+        self.aborted.wait(10)
+        raise RuntimeError("Request aborted")
+        yield
+
+
 # ── should_compact ───────────────────────────────────────────────────
 
 class TestShouldCompact(unittest.TestCase):
@@ -196,6 +281,18 @@ class TestShouldCompact(unittest.TestCase):
         msgs = [UserMessage(content=[TextBlock(text="hello")])]
         self.assertFalse(compactor.shouldCompact(msgs))
 
+    def test_precompact_at_soft_watermark(self):
+        provider = FakeSummaryProvider()
+        # threshold = 82904 tokens, soft watermark at 80% = 66323
+        compactor = ConversationCompactor(provider,
+                                          context_window=100000,
+                                          max_output_tokens=4096)
+        msgs = [UserMessage(content=[TextBlock(text="hello")])]
+        self.assertFalse(compactor.shouldPrecompact(msgs, 66000))
+        self.assertTrue(compactor.shouldPrecompact(msgs, 67000))
+        self.assertFalse(compactor.shouldCompact(msgs, 67000))
+        self.assertFalse(compactor.shouldPrecompact([], 67000))
+
     def test_returns_true_when_over_threshold(self):
         provider = FakeSummaryProvider()
         # context=50000, max_out=4096
@@ -327,6 +424,110 @@ class TestCompact(unittest.TestCase):
 
 _CLEARED = "[Old tool result content cleared]"
 
+class RecordingSummaryProvider(FakeSummaryProvider):
+    """Records the messages it was asked to summarize."""
+
+    def __init__(self, summary_text="This is the summary."):
+        # type: (str) -> None
+        super().__init__(summary_text)
+        self.requests = []  # type: List[List[Message]]
+
+    def stream(self, messages, tools=None,
+               model=None, max_tokens=4096):
+        # type: (...) -> Iterator[StreamEvent]
+        self.requests.append(list(messages))
+        yield from super().stream(messages, tools, model, max_tokens)
+
+
+class TestIncrementalCompact(unittest.TestCase):
+    def _compactor(self, provider):
+        return ConversationCompactor(provider,
+                                     context_window=100000,
+                                     max_output_tokens=4096)
+
+    def test_previous_summary_is_updated(self):
+        provider = RecordingSummaryProvider()
+        compactor = self._compactor(provider)
+        first = compactor.compact([UserMessage(content=[TextBlock(text="hi")])])
+        self.assertNotIn("Carry that summary over",
+                         provider.requests[0][-1].content[0].text)
+
+        msgs = [first.boundary, first.summary,
+                UserMessage(content=[TextBlock(text="more")])]
+        compactor.compact(msgs)
+        # the previous summary is sent, not the original conversation
+        self.assertIs(provider.requests[1][1], first.summary)
+        self.assertIn("Carry that summary over",
+                      provider.requests[1][-1].content[0].text)
+
+    def test_aborted(self):
+        compactor = self._compactor(FakeSummaryProvider())
+        msgs = [UserMessage(content=[TextBlock(text="hi")])]
+        with self.assertRaises(RuntimeError):
+            compactor.compact(msgs, is_aborted=lambda: True)
+
+
+class TestBackgroundCompaction(unittest.TestCase):
+    def _msgs(self, count):
+        return [UserMessage(content=[TextBlock(text="m{}".format(i))])
+                for i in range(count)]
+
+    def test_apply_keeps_newer_messages(self):
+        provider = RecordingSummaryProvider("Summary.")
+        compactor = ConversationCompactor(provider,
+                                          context_window=100000,
+                                          max_output_tokens=4096)
+        msgs = self._msgs(3)
+        compaction = BackgroundCompaction(compactor, msgs, 1000)
+        self.assertEqual(compaction.messageCount(), 3)
+        self.assertTrue(compaction.wait(5))
+        self.assertIsNone(compaction.error())
+        self.assertEqual(compaction.result().pre_token_estimate, 1000)
+        # only the snapshot is summarized
+        self.assertEqual(provider.requests[0][:3], msgs)
+
+        newer = self._msgs(2)
+        result = compaction.apply(msgs + newer)
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result[0].subtype, "compact_boundary")
+        self.assertIn("Summary.", result[1].content[0].text)
+        self.assertEqual(result[2:], newer)
+
+    def test_cancelled(self):
+        compactor = ConversationCompactor(FakeSummaryProvider(),
+                                          context_window=100000,
+                                          max_output_tokens=4096)
+        compaction = BackgroundCompaction(compactor, self._msgs(2))
+        compaction.cancel()
+        self.assertTrue(compaction.wait(5))
+        self.assertTrue(compaction.isCancelled())
+        self.assertIsNone(compaction.result())
+        with self.assertRaises(RuntimeError):
+            compaction.apply(self._msgs(2))
+
+    def test_cancel_aborts_request(self):
+        provider = HangingSummaryProvider()
+        compactor = ConversationCompactor(provider,
+                                          context_window=100000,
+                                          max_output_tokens=4096)
+        compaction = BackgroundCompaction(compactor, self._msgs(2))
+        self.assertFalse(compaction.wait(0.1))
+        compaction.cancel()
+        self.assertTrue(provider.aborted.is_set())
+        # the thread stops without waiting for the summary
+        self.assertTrue(compaction.wait(5))
+        self.assertIsNone(compaction.result())
+
+    def test_failed(self):
+        compactor = ConversationCompactor(ErrorOnNthCallProvider(1, "boom"),
+                                          context_window=100000,
+                                          max_output_tokens=4096)
+        compaction = BackgroundCompaction(compactor, self._msgs(2))
+        self.assertTrue(compaction.wait(5))
+        self.assertIsNone(compaction.result())
+        self.assertIn("boom", str(compaction.error()))
+
+
 # ── microcompactMessages ─────────────────────────────────────────────
 
 class TestMicrocompactMessages(unittest.TestCase):
@@ -425,6 +626,17 @@ class TestMicrocompactMessages(unittest.TestCase):
         self.assertEqual(result[0].content[0].content, _CLEARED)  # old
         self.assertEqual(result[2].content[0].content, "y" * 6000)  # protected
 
+    def test_start_skips_compacted_prefix(self):
+        msgs = self._make_history("x" * 6000)
+        self.assertEqual(microcompactCutoff(msgs), 3)
+        # the old result is before start, already handled
+        self.assertIs(microcompactMessages(msgs, thresholdChars=5000, start=3), msgs)
+
+        result = microcompactMessages(msgs, thresholdChars=5000, start=1)
+        self.assertEqual(result[2].content[0].content, _CLEARED)
+        self.assertIs(result[1], msgs[1])
+        self.assertIs(result[4], msgs[4])
+
     def test_returns_same_object_when_no_changes(self):
         msgs = self._make_history("short content")  # under threshold
         result = microcompactMessages(msgs, thresholdChars=5000)
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import threading
 import unittest
 from typing import Any, Dict, Iterator, List, Optional
 
-from PySide6.QtCore import QCoreApplication, QElapsedTimer
+from PySide6.QtCore import QCoreApplication, QElapsedTimer, QThread
 from PySide6.QtTest import QSignalSpy
 
 from qgitc.agent.agent_loop import AgentLoop, QueryParams
+from qgitc.agent.compaction import BackgroundCompaction, ConversationCompactor
 from qgitc.agent.permissions import PermissionEngine
 from qgitc.agent.provider import (
     ContentDelta,
@@ -19,7 +21,14 @@ from qgitc.agent.provider import (
 from qgitc.agent.tool import Tool, ToolContext, ToolResult
 from qgitc.agent.tool_executor import TOOL_ABORTED_MESSAGE, TOOL_SKIPPED_MESSAGE
 from qgitc.agent.tool_registry import ToolRegistry
-from qgitc.agent.types import AssistantMessage, TextBlock, ThinkingBlock, UserMessage
+from qgitc.agent.types import (
+    AssistantMessage,
+    SystemMessage,
+    TextBlock,
+    ThinkingBlock,
+    Usage,
+    UserMessage,
+)
 from tests.base import TestBase
 
 
@@ -105,6 +114,119 @@ class ToolCallProvider(ModelProvider):
         return 10
 
 
+class LargePromptToolCallProvider(ModelProvider):
+    """Reports a prompt close to the context window on the tool call turn,
+    then summarizes."""
+
+    def __init__(self):
+        self.requests = []  # type: List[List[Any]]
+
+    def stream(self, messages, tools=None,
+               model=None, max_tokens=4096):
+        # type: (...) -> Iterator[StreamEvent]
+        self.requests.append(list(messages))
+        if len(self.requests) == 1:
+            yield ToolCallDelta(
+                id="call_1",
+                name="echo",
+                arguments_delta='{"text":"ping"}',
+            )
+            yield MessageComplete(stop_reason="tool_use",
+                                  usage=Usage(input_tokens=90000))
+        else:
+            yield ContentDelta(text="Summary.")
+            yield MessageComplete(stop_reason="end_turn",
+                                  usage=Usage(input_tokens=100))
+
+    def countTokens(self, messages, system_prompt=None, tools=None):
+        # type: (...) -> int
+        return 10
+
+
+class GrowingToolCallProvider(ModelProvider):
+    """Calls the echo tool for three turns, the reported prompt crosses the
+    soft compaction watermark on the first one."""
+
+    def __init__(self):
+        self.loop = None  # type: Optional[AgentLoop]
+        self.requests = []  # type: List[List[Any]]
+        self.compaction_pending = []  # type: List[bool]
+
+    def stream(self, messages, tools=None,
+               model=None, max_tokens=4096):
+        # type: (...) -> Iterator[StreamEvent]
+        self.requests.append(list(messages))
+        compaction = self.loop._compaction
+        self.compaction_pending.append(
+            compaction is not None and not compaction.isDone())
+        if compaction is not None:
+            # let the background compaction finish before the next turn
+            compaction.wait(5)
+
+        if len(self.requests) < 3:
+            yield ToolCallDelta(
+                id="call_{}".format(len(self.requests)),
+                name="echo",
+                arguments_delta='{"text":"ping"}',
+            )
+            yield MessageComplete(stop_reason="tool_use",
+                                  usage=Usage(input_tokens=70000))
+        else:
+            yield ContentDelta(text="done")
+            yield MessageComplete(stop_reason="end_turn",
+                                  usage=Usage(input_tokens=100))
+
+    def countTokens(self, messages, system_prompt=None, tools=None):
+        # type: (...) -> int
+        return 10
+
+
+class SlowSummaryProvider(ModelProvider):
+    """Summarizes once the agent started streaming its next turn."""
+
+    def __init__(self, agent_provider):
+        # type: (GrowingToolCallProvider) -> None
+        self._agent_provider = agent_provider
+        self.requests = []  # type: List[List[Any]]
+
+    def stream(self, messages, tools=None,
+               model=None, max_tokens=4096):
+        # type: (...) -> Iterator[StreamEvent]
+        self.requests.append(list(messages))
+        timer = QElapsedTimer()
+        timer.start()
+        while len(self._agent_provider.requests) < 2 and timer.elapsed() < 5000:
+            QThread.msleep(10)
+        yield ContentDelta(text="Background summary.")
+        yield MessageComplete(stop_reason="end_turn")
+
+    def countTokens(self, messages, system_prompt=None, tools=None):
+        # type: (...) -> int
+        return 10
+
+
+class HangingSummaryProvider(ModelProvider):
+    """Waits for the summary until it is aborted."""
+
+    def __init__(self):
+        self.aborted = threading.Event()
+
+    def abort(self):
+        # type: () -> None
+        self.aborted.set()
+
+    def stream(self, messages, tools=None,
+               model=None, max_tokens=4096):
+        # type: (...) -> Iterator[StreamEvent]
+        self.aborted.wait(10)
+        raise RuntimeError("Request aborted")
+        yield
+
+    def countTokens(self, messages, system_prompt=None, tools=None):
+        # type: (...) -> int
+        return 10
+
+
 class TwoReadOnlyToolCallsProvider(ModelProvider):
     """First call yields two tool calls, second call yields text."""
 
@@ -467,7 +589,7 @@ class TestAgentLoopToolExecution(TestBase):
         # AssistantMessage(text)
         self.assertEqual(len(msgs), 4)
 
-    def test_two_read_only_tool_calls_emit_two_results_in_order(self):
+    def test_two_read_only_tool_calls_stream_results_as_they_finish(self):
         registry = ToolRegistry()
         registry.register(SleepEchoTool())
         provider = TwoReadOnlyToolCallsProvider()
@@ -487,9 +609,10 @@ class TestAgentLoopToolExecution(TestBase):
         waitFor(self.app, lambda: sum(
             1 for e in events if e[0] == "result") >= 2)
 
+        # the faster second call is reported first
         result_events = [e for e in events if e[0] == "result"]
-        self.assertEqual([e[1] for e in result_events], ["c1", "c2"])
-        self.assertEqual([e[2] for e in result_events], ["first", "second"])
+        self.assertEqual([e[1] for e in result_events], ["c2", "c1"])
+        self.assertEqual([e[2] for e in result_events], ["second", "first"])
         self.assertFalse(result_events[0][3])
         self.assertFalse(result_events[1][3])
 
@@ -497,9 +620,13 @@ class TestAgentLoopToolExecution(TestBase):
         self.assertEqual(events[0], ("start", "c1"))
         self.assertEqual(events[1], ("start", "c2"))
         self.assertEqual(events[2][0], "result")
-        self.assertEqual(events[2][1], "c1")
+        self.assertEqual(events[2][1], "c2")
         self.assertEqual(events[3][0], "result")
-        self.assertEqual(events[3][1], "c2")
+        self.assertEqual(events[3][1], "c1")
+
+        # the tool results keep the order of the calls
+        tool_results = loop.messages()[2].content
+        self.assertEqual([r.tool_use_id for r in tool_results], ["c1", "c2"])
 
         loop.abort()
         loop.wait(3000)
@@ -603,6 +730,105 @@ class TestAgentLoopToolExecution(TestBase):
         loop.wait(3000)
 
 
+class TestAgentLoopTokenLedger(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def test_compacts_on_reported_usage(self):
+        registry = ToolRegistry()
+        registry.register(EchoTool())
+        provider = LargePromptToolCallProvider()
+        loop = _make_loop(provider, registry=registry)
+        compacted_spy = QSignalSpy(loop.conversationCompacted)
+        finished_spy = QSignalSpy(loop.agentFinished)
+
+        # the estimate of the history is tiny, the reported prompt is not
+        loop.submit("Please echo", _make_params(provider))
+        waitFor(self.app, lambda: finished_spy.count() > 0)
+        loop.wait(3000)
+
+        self.assertEqual(compacted_spy.count(), 1)
+        # pre compaction tokens are the calibrated count
+        self.assertGreater(compacted_spy.at(0)[0], 90000)
+        # tool call turn, summary, then the turn on the compacted history
+        self.assertEqual(len(provider.requests), 3)
+        self.assertIsInstance(provider.requests[2][0], SystemMessage)
+
+
+class TestAgentLoopBackgroundCompaction(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def test_compaction_swapped_at_turn_boundary(self):
+        registry = ToolRegistry()
+        registry.register(EchoTool())
+        provider = GrowingToolCallProvider()
+        summary_provider = SlowSummaryProvider(provider)
+        loop = _make_loop(provider, registry=registry)
+        provider.loop = loop
+        compacted_spy = QSignalSpy(loop.conversationCompacted)
+        finished_spy = QSignalSpy(loop.agentFinished)
+
+        params = _make_params(provider)
+        params.compaction_provider = summary_provider
+        loop.submit("Please echo", params)
+        waitFor(self.app, lambda: finished_spy.count() > 0)
+        loop.wait(3000)
+
+        # the agent kept streaming while the history was summarized
+        self.assertEqual(provider.compaction_pending, [False, True, False])
+        self.assertEqual(len(summary_provider.requests), 1)
+        # prompt, tool call and its result
+        snapshot = provider.requests[1]
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(summary_provider.requests[0][:3], snapshot)
+
+        self.assertEqual(compacted_spy.count(), 1)
+        history = provider.requests[2]
+        self.assertIsInstance(history[0], SystemMessage)
+        self.assertIn("Background summary.", history[1].content[0].text)
+        # the turn streamed during the compaction is kept
+        self.assertEqual(len(history), 4)
+        self.assertIsInstance(history[2], AssistantMessage)
+        self.assertEqual(history[2].content[0].id, "call_2")
+        self.assertIsNone(loop._compaction)
+
+    def test_no_background_compaction_without_provider(self):
+        registry = ToolRegistry()
+        registry.register(EchoTool())
+        provider = GrowingToolCallProvider()
+        loop = _make_loop(provider, registry=registry)
+        provider.loop = loop
+        compacted_spy = QSignalSpy(loop.conversationCompacted)
+        finished_spy = QSignalSpy(loop.agentFinished)
+
+        loop.submit("Please echo", _make_params(provider))
+        waitFor(self.app, lambda: finished_spy.count() > 0)
+        loop.wait(3000)
+
+        self.assertEqual(provider.compaction_pending, [False, False, False])
+        self.assertEqual(compacted_spy.count(), 0)
+        self.assertEqual(len(provider.requests[2]), 5)
+
+
+    def test_cancel_compaction_waits_for_thread(self):
+        provider = SimpleProvider()
+        loop = _make_loop(provider)
+        summary_provider = HangingSummaryProvider()
+        compactor = ConversationCompactor(summary_provider, 100000, 4096)
+        compaction = BackgroundCompaction(
+            compactor, [UserMessage(content=[TextBlock(text="hi")])])
+        loop._compaction = compaction
+
+        loop.cancelCompaction()
+        self.assertTrue(summary_provider.aborted.is_set())
+        # the summary provider is no longer used
+        self.assertTrue(compaction.isDone())
+        self.assertIsNone(loop._compaction)
+
+
 class TestAgentLoopSetMessages(TestBase):
 
     def setUp(self):
@@ -98,6 +98,9 @@ class TestAgentMode(TestBase):
                 events.append("loop.wait")
                 return True
 
+            def cancelCompaction(self):
+                events.append("loop.cancelCompaction")
+
         fakeLoop = _FakeLoop()
         self.chatWidget._agentLoop = fakeLoop
         self.chatWidget._toolRegistry = MagicMock()
@@ -116,6 +119,7 @@ class TestAgentMode(TestBase):
                 "model.requestInterruption",
                 "loop.abort",
                 "loop.wait",
+                "loop.cancelCompaction",
                 "model.cleanup",
             ],
         )
@@ -150,6 +150,96 @@ class TestAgentReadFile(TestBase):
             assert result.is_error
             assert "outside the repository" in result.content
 
+    def _readRange(self, path, startLine=None, endLine=None):
+        ok, output = readfile_tool.buildReadFileOutput(
+            path, startLine, endLine)
+        assert ok, output
+        return self._parseOutput(output)
+
+    def test_line_index_matches_full_read(self):
+        samples = {
+            "lf.txt": b"a\nbb\n\nccc\n",
+            "crlf.txt": b"a\r\nbb\r\n\r\nlast",
+            "bom.txt": "\ufeff第一行\n第二行\n".encode("utf-8"),
+            "gbk.txt": "第一行\n第二行\n第三行".encode("gbk"),
+            "empty.txt": b"",
+            "single.txt": b"no newline",
+            "separators.txt": "a\fb\u2028c\rd\x1ce\nf\n".encode("utf-8"),
+        }
+        ranges = [(None, None), (1, 1), (2, 3), (3, None), (4, 10),
+                  (10, 20), (None, 2)]
+        for name, data in samples.items():
+            path = os.path.join(Git.REPO_DIR, name)
+            with open(path, "wb") as f:
+                f.write(data)
+
+            for startLine, endLine in ranges:
+                expected = self._readRange(path, startLine, endLine)
+                with patch.object(readfile_tool, "LINE_INDEX_MIN_BYTES", 0), \
+                        patch.object(readfile_tool.LineIndex, "CHECKPOINT_BYTES", 4):
+                    readfile_tool._lineIndexes.clear()
+                    actual = self._readRange(path, startLine, endLine)
+                self.assertEqual(expected, actual, (name, startLine, endLine))
+
+    def test_read_file_splits_on_lf_only(self):
+        path = os.path.join(Git.REPO_DIR, "separators.txt")
+        with open(path, "wb") as f:
+            f.write("a\fb\u2028c\r\nd\re\nf".encode("utf-8"))
+
+        meta, content = self._readRange(path, 2, 2)
+        self.assertEqual(3, meta["totalLines"])
+        self.assertEqual("d\re\n", content)
+
+    def test_line_index_blocks(self):
+        lines = [f"line {i}\n" * (i % 3) for i in range(1, 2000)]
+        text = "".join(lines)
+        path = os.path.join(Git.REPO_DIR, "blocks.txt")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+
+        expected = text.splitlines(keepends=True)
+        with patch.object(readfile_tool.LineIndex, "CHECKPOINT_BYTES", 100):
+            index = readfile_tool.LineIndex.build(path)
+            self.assertGreater(len(index.checkpoints), 10)
+            self.assertEqual(len(expected), index.totalLines)
+            for start, end in [(1, 1), (1, 50), (333, 777), (len(expected), len(expected)),
+                               (1000, len(expected) + 5)]:
+                self.assertEqual("".join(expected[start - 1:end]),
+                                 index.read(start, end), (start, end))
+
+    def test_line_index_cached(self):
+        path = os.path.join(Git.REPO_DIR, "cached.txt")
+        with open(path, "wb") as f:
+            f.write(b"one\ntwo\nthree\n")
+
+        readfile_tool._lineIndexes.clear()
+        with patch.object(readfile_tool, "LINE_INDEX_MIN_BYTES", 0), \
+                patch.object(readfile_tool.LineIndex, "build",
+                             side_effect=readfile_tool.LineIndex.build) as build:
+            _, content = self._readRange(path, 2, 2)
+            self.assertEqual("two\n", content)
+            _, content = self._readRange(path, 3, 3)
+            self.assertEqual("three\n", content)
+            self.assertEqual(1, build.call_count)
+
+            with open(path, "ab") as f:
+                f.write(b"four\n")
+            meta, content = self._readRange(path, 4)
+            self.assertEqual("four\n", content)
+            self.assertEqual(4, meta["totalLines"])
+            self.assertEqual(2, build.call_count)
+
+    def test_line_index_not_for_utf16(self):
+        path = os.path.join(Git.REPO_DIR, "utf16.txt")
+        with open(path, "wb") as f:
+            f.write("a\nb\n".encode("utf-16"))
+
+        self.assertIsNone(readfile_tool.LineIndex.build(path))
+        with patch.object(readfile_tool, "LINE_INDEX_MIN_BYTES", 0):
+            meta, content = self._readRange(path, 2, 2)
+        self.assertEqual("b\n", content)
+        self.assertEqual(2, meta["totalLines"])
+
     def test_normalize_tool_file_path_windows_drive_prefix_only(self):
         # Regression test: only strip the leading slash for the specific "/C:/" pattern.
         with patch.object(readfile_tool.os, "name", "nt"):
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from qgitc.agent.permissions import PermissionEngine
+from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool_cache import (
+    TOOL_RESULT_CACHE_KEY,
+    ToolResultCache,
+    executeCached,
+    repoStateKey,
+)
+from qgitc.agent.tool_executor import executeToolBlocks
+from qgitc.agent.tool_registry import ToolRegistry
+from qgitc.agent.tools.git_blame import GitBlameTool
+from qgitc.agent.tools.git_diff_range import GitDiffRangeTool
+from qgitc.agent.tools.git_log import GitLogTool
+from qgitc.agent.tools.git_status import GitStatusTool
+from qgitc.agent.tools.utils import runGit
+from qgitc.agent.types import ToolUseBlock
+from qgitc.gitutils import GitProcess
+
+
+class CountingTool(Tool):
+    name = "counting"
+    description = "Cacheable test tool"
+
+    def __init__(self):
+        self.calls = 0
+
+    def isReadOnly(self):
+        return True
+
+    def isCacheable(self):
+        return True
+
+    def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
+        self.calls += 1
+        if input_data.get("fail"):
+            return ToolResult(content="failed", is_error=True)
+        return ToolResult(content="x" * input_data.get("size", 1))
+
+    def inputSchema(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "size": {"type": "integer", "default": 1},
+                "fail": {"type": "boolean"},
+            },
+        }
+
+
+class WriteTool(Tool):
+    name = "write_tool"
+    description = "Write test tool"
+
+    def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
+        return ToolResult(content="ok")
+
+    def inputSchema(self) -> Dict[str, Any]:
+        return {"type": "object", "properties": {}}
+
+
+class TestToolResultCache(unittest.TestCase):
+
+    def setUp(self):
+        GitProcess.GIT_BIN = "git"
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.repoDir = self.tempDir.name
+        self._git(["init", "-b", "main"])
+        self._git(["config", "user.email", "test@example.com"])
+        self._git(["config", "user.name", "Test"])
+        self._commit("a.txt", "a\n")
+
+        self.cache = ToolResultCache()
+        self.context = ToolContext(
+            working_directory=self.repoDir,
+            abort_requested=lambda: False,
+            extra={TOOL_RESULT_CACHE_KEY: self.cache},
+        )
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def _git(self, args: List[str]):
+        ok, output = runGit(self.repoDir, args)
+        self.assertTrue(ok, output)
+        return output
+
+    def _commit(self, name: str, content: str):
+        with open(os.path.join(self.repoDir, name), "w") as f:
+            f.write(content)
+        self._git(["add", name])
+        self._git(["commit", "-m", f"update {name}"])
+
+    def testRepoStateKey(self):
+        self.assertIsNone(repoStateKey(None))
+        with tempfile.TemporaryDirectory() as td:
+            self.assertIsNone(repoStateKey(td))
+
+        state = repoStateKey(self.repoDir)
+        self.assertEqual(state, repoStateKey(self.repoDir))
+
+        self._commit("b.txt", "b\n")
+        self.assertNotEqual(state, repoStateKey(self.repoDir))
+
+        state = repoStateKey(self.repoDir)
+        self._git(["branch", "feature"])
+        self.assertNotEqual(state, repoStateKey(self.repoDir))
+
+        state = repoStateKey(self.repoDir)
+        with open(os.path.join(self.repoDir, "a.txt"), "w") as f:
+            f.write("changed\n")
+        self._git(["add", "a.txt"])
+        self.assertNotEqual(state, repoStateKey(self.repoDir))
+
+    def testRepoStateKeyRemoteRef(self):
+        head = self._git(["rev-parse", "HEAD"]).strip()
+        self._git(["update-ref", "refs/remotes/origin/main", head])
+        self._commit("b.txt", "b\n")
+        state = repoStateKey(self.repoDir)
+
+        # as a fetch does, in a subdirectory of refs/remotes
+        self._git(["update-ref", "refs/remotes/origin/main", "HEAD"])
+        self.assertNotEqual(state, repoStateKey(self.repoDir))
+
+        state = repoStateKey(self.repoDir)
+        self._git(["update-ref", "-d", "refs/remotes/origin/main"])
+        self.assertNotEqual(state, repoStateKey(self.repoDir))
+
+        # the key does not grow with the refs
+        state = repoStateKey(self.repoDir)
+        for i in range(50):
+            self._git(["update-ref", f"refs/remotes/origin/b{i}", head])
+        key = repoStateKey(self.repoDir)
+        self.assertNotEqual(state, key)
+        self.assertEqual(len(state), len(key))
+        self.assertIsInstance(key[-1], int)
+
+    def testNormalizedInput(self):
+        tool = CountingTool()
+        key = self.cache.makeKey(tool, {"size": 1, "fail": None}, self.repoDir)
+        self.assertEqual(key, self.cache.makeKey(tool, {}, self.repoDir))
+        self.assertNotEqual(key, self.cache.makeKey(
+            tool, {"size": 2}, self.repoDir))
+        self.assertIsNone(self.cache.makeKey(
+            WriteTool(), {}, self.repoDir))
+
+    def testHitsAndMisses(self):
+        tool = CountingTool()
+        for _ in range(3):
+            result = executeCached(tool, {"size": 3}, self.context)
+            self.assertEqual("xxx", result.content)
+        self.assertEqual(1, tool.calls)
+        self.assertEqual({"hits": 2, "misses": 1, "entries": 1, "bytes": 3},
+                         self.cache.stats())
+
+        # errors are not cached
+        executeCached(tool, {"fail": True}, self.context)
+        executeCached(tool, {"fail": True}, self.context)
+        self.assertEqual(3, tool.calls)
+
+        # any write invalidates the results
+        executeCached(WriteTool(), {}, self.context)
+        self.assertEqual(0, len(self.cache))
+        executeCached(tool, {"size": 3}, self.context)
+        self.assertEqual(4, tool.calls)
+
+    def testSizeBounded(self):
+        cache = ToolResultCache(maxEntries=2, maxBytes=10)
+        tool = CountingTool()
+        keys = [cache.makeKey(tool, {"size": i}, self.repoDir)
+                for i in range(5)]
+
+        cache.put(keys[1], ToolResult(content="1"))
+        cache.put(keys[2], ToolResult(content="22"))
+        self.assertIsNotNone(cache.get(keys[1]))
+        cache.put(keys[3], ToolResult(content="333"))
+        self.assertIsNone(cache.get(keys[2]))
+        self.assertIsNotNone(cache.get(keys[1]))
+
+        cache.put(keys[4], ToolResult(content="4" * 8))
+        self.assertIsNone(cache.get(keys[3]))
+        self.assertEqual(9, cache.stats()["bytes"])
+        cache.put(keys[0], ToolResult(content="0" * 11))
+        self.assertIsNone(cache.get(keys[0]))
+
+    def testWorktreeResultsExpire(self):
+        key = self.cache.makeKey(CountingTool(), {}, self.repoDir)
+        self.cache.put(key, ToolResult(content="x"), ttl=5)
+        self.assertIsNotNone(self.cache.get(key))
+        with patch("qgitc.agent.tool_cache.time.monotonic",
+                   return_value=1e12):
+            self.assertIsNone(self.cache.get(key))
+        self.assertEqual(0, len(self.cache))
+
+    def testGitToolsCached(self):
+        tool = GitLogTool()
+        with patch("qgitc.agent.tools.git_log.runGit",
+                   side_effect=runGit) as run:
+            first = executeCached(tool, {"maxCount": 20}, self.context)
+            second = executeCached(tool, {}, self.context)
+            self.assertEqual(first, second)
+            self.assertEqual(1, run.call_count)
+
+            # a commit made outside of the agent changes the repo state
+            self._commit("b.txt", "b\n")
+            third = executeCached(tool, {}, self.context)
+            self.assertEqual(2, run.call_count)
+            self.assertIn("update b.txt", third.content)
+
+    def testReadsWorktree(self):
+        self.assertTrue(GitStatusTool().readsWorktree({}))
+        self.assertTrue(GitBlameTool().readsWorktree({"path": "a.txt"}))
+        self.assertFalse(GitBlameTool().readsWorktree(
+            {"path": "a.txt", "rev": "HEAD"}))
+        self.assertTrue(GitDiffRangeTool().readsWorktree({"rev": "HEAD~1"}))
+        self.assertFalse(GitDiffRangeTool().readsWorktree(
+            {"rev": "HEAD~1..HEAD"}))
+        self.assertFalse(GitLogTool().readsWorktree({}))
+
+    def testExecutorUsesCache(self):
+        tool = CountingTool()
+        registry = ToolRegistry()
+        registry.register(tool)
+        registry.register(WriteTool())
+
+        def _run(names):
+            blocks = [ToolUseBlock(id=str(i), name=name, input={})
+                      for i, name in enumerate(names)]
+            return executeToolBlocks(
+                tool_blocks=blocks,
+                registry=registry,
+                permission_engine=PermissionEngine(),
+                context=self.context,
+                is_aborted=lambda: False,
+                requestPermission=lambda *args: True,
+                onToolStart=lambda *args: None,
+                onToolResult=lambda *args: None,
+            )
+
+        results = _run(["counting"]) + _run(["counting"])
+        self.assertEqual(["x", "x"], [r.content for r in results])
+        self.assertEqual(1, tool.calls)
+        self.assertEqual(1, self.cache.hits)
+
+        _run(["write_tool", "counting"])
+        self.assertEqual(2, tool.calls)
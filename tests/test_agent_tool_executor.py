@@ -1,15 +1,26 @@
 # -*- coding: utf-8 -*-
 
+import os
 import unittest
 from threading import Lock, current_thread
 from time import sleep
 from typing import Any, Dict
 
 from qgitc.agent.permissions import PermissionAsk, PermissionDeny, PermissionEngine
-from qgitc.agent.tool import Tool, ToolContext, ToolResult
+from qgitc.agent.tool import (
+    ALL_RESOURCES,
+    GIT_STATE,
+    WORKTREE,
+    Tool,
+    ToolContext,
+    ToolFootprint,
+    ToolResult,
+    footprintPath,
+)
 from qgitc.agent.tool_executor import (
     TOOL_SKIPPED_MESSAGE,
-    _partition_tool_calls,
+    _build_dependencies,
+    _shared_pool,
     executeToolBlocks,
 )
 from qgitc.agent.tool_registry import ToolRegistry
@@ -147,9 +158,98 @@ class MutateExtraReadTool(Tool):
         return {"type": "object", "properties": {}}
 
 
-class TestPartitionToolCalls(unittest.TestCase):
+class PathTool(Tool):
+    name = "path_tool"
+    description = "Tool reading or writing a single path"
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.active = 0
+        self.max_active = 0
+        self.events = []
+
+    def execute(self, input_data: Dict[str, Any], context: ToolContext) -> ToolResult:
+        label = input_data.get("label", "")
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.events.append(("start", label))
+        sleep(input_data.get("delay", 0))
+        with self._lock:
+            self.active -= 1
+            self.events.append(("end", label))
+        return ToolResult(content=label)
+
+    def footprint(self, input_data: Dict[str, Any], context: ToolContext) -> ToolFootprint:
+        if input_data.get("write"):
+            return ToolFootprint.make(writes=[input_data["path"]])
+        return ToolFootprint.make(reads=[input_data["path"]])
+
+    def inputSchema(self) -> Dict[str, Any]:
+        return {"type": "object", "properties": {}}
+
+
+def _run_blocks(blocks, registry, onToolResult=None, max_workers=4):
+    context = ToolContext(
+        working_directory=".",
+        abort_requested=lambda: False,
+        extra={},
+    )
+    return executeToolBlocks(
+        tool_blocks=blocks,
+        registry=registry,
+        permission_engine=PermissionEngine(),
+        context=context,
+        is_aborted=lambda: False,
+        requestPermission=lambda tool_id, tool, tool_input: True,
+        onToolStart=lambda tool_id, tool_name, tool_input: None,
+        onToolResult=onToolResult or (lambda tool_id, tool_name, content, is_error: None),
+        max_workers=max_workers,
+    )
+
+
+class TestToolFootprint(unittest.TestCase):
+
+    def test_conflicts(self):
+        read_a = ToolFootprint.make(reads=["a.txt"])
+        write_a = ToolFootprint.make(writes=["a.txt"])
+        write_dir = ToolFootprint.make(writes=["src"])
+        read_file = ToolFootprint.make(reads=["src/b.txt"])
+
+        self.assertFalse(read_a.conflicts(read_a))
+        self.assertTrue(read_a.conflicts(write_a))
+        self.assertTrue(write_a.conflicts(read_a))
+        self.assertTrue(write_dir.conflicts(read_file))
+        self.assertFalse(write_dir.conflicts(read_a))
+        self.assertTrue(ToolFootprint.make(reads=[WORKTREE]).conflicts(write_a))
+        self.assertFalse(ToolFootprint.make(reads=[GIT_STATE]).conflicts(write_a))
+        self.assertTrue(ToolFootprint.make(writes=[ALL_RESOURCES]).isExclusive())
+        self.assertFalse(ToolFootprint().conflicts(write_a))
+
+    def test_footprint_path(self):
+        self.assertEqual("a/b.txt", footprintPath("a/./b.txt"))
+        self.assertEqual("a/b.txt", footprintPath(
+            os.path.join(os.getcwd(), "a", "b.txt"), os.getcwd()))
+        self.assertEqual(WORKTREE, footprintPath(""))
+        self.assertEqual(WORKTREE, footprintPath("../outside.txt"))
+
+    def test_default_footprints(self):
+        context = ToolContext(
+            working_directory=".", abort_requested=lambda: False, extra={})
+        read = ReadOnlyTool().footprint({}, context)
+        write = WriteTool().footprint({}, context)
+        self.assertFalse(read.conflicts(read))
+        self.assertTrue(write.isExclusive())
+        self.assertTrue(read.conflicts(write))
+
 
-    def test_partitions_consecutive_read_only_groups(self):
+class TestBuildDependencies(unittest.TestCase):
+
+    def _context(self):
+        return ToolContext(
+            working_directory=".", abort_requested=lambda: False, extra={})
+
+    def test_write_orders_later_reads(self):
         registry = ToolRegistry()
         registry.register(ReadOnlyTool())
         registry.register(WriteTool())
@@ -161,34 +261,11 @@ class TestPartitionToolCalls(unittest.TestCase):
             ToolUseBlock(id="4", name="read_tool", input={}),
         ]
 
-        batches = _partition_tool_calls(blocks, registry)
+        _, dependencies = _build_dependencies(
+            blocks, registry, self._context())
+        self.assertEqual([set(), set(), {0, 1}, {2}], dependencies)
 
-        self.assertEqual(len(batches), 3)
-        self.assertTrue(batches[0].is_parallel)
-        self.assertEqual([block.id for block in batches[0].blocks], ["1", "2"])
-        self.assertFalse(batches[1].is_parallel)
-        self.assertEqual([block.id for block in batches[1].blocks], ["3"])
-        self.assertTrue(batches[2].is_parallel)
-        self.assertEqual([block.id for block in batches[2].blocks], ["4"])
-
-    def test_does_not_merge_consecutive_non_parallel_blocks(self):
-        registry = ToolRegistry()
-        registry.register(WriteTool())
-
-        blocks = [
-            ToolUseBlock(id="1", name="write_tool", input={}),
-            ToolUseBlock(id="2", name="write_tool", input={}),
-        ]
-
-        batches = _partition_tool_calls(blocks, registry)
-
-        self.assertEqual(len(batches), 2)
-        self.assertFalse(batches[0].is_parallel)
-        self.assertEqual([block.id for block in batches[0].blocks], ["1"])
-        self.assertFalse(batches[1].is_parallel)
-        self.assertEqual([block.id for block in batches[1].blocks], ["2"])
-
-    def test_skill_tool_breaks_parallel_read_only_group(self):
+    def test_skill_tool_is_exclusive(self):
         registry = ToolRegistry()
         registry.register(ReadOnlyTool())
         registry.register(SkillTool())
@@ -199,19 +276,54 @@ class TestPartitionToolCalls(unittest.TestCase):
             ToolUseBlock(id="3", name="read_tool", input={}),
         ]
 
-        batches = _partition_tool_calls(blocks, registry)
+        footprints, dependencies = _build_dependencies(
+            blocks, registry, self._context())
+        self.assertTrue(footprints[1].isExclusive())
+        self.assertEqual([set(), {0}, {1}], dependencies)
 
-        self.assertEqual(len(batches), 3)
-        self.assertTrue(batches[0].is_parallel)
-        self.assertEqual([block.id for block in batches[0].blocks], ["1"])
-        self.assertFalse(batches[1].is_parallel)
-        self.assertEqual([block.id for block in batches[1].blocks], ["2"])
-        self.assertTrue(batches[2].is_parallel)
-        self.assertEqual([block.id for block in batches[2].blocks], ["3"])
+    def test_unrelated_paths_are_independent(self):
+        registry = ToolRegistry()
+        registry.register(PathTool())
+
+        blocks = [
+            ToolUseBlock(id="1", name="path_tool", input={"path": "a.txt", "write": True}),
+            ToolUseBlock(id="2", name="path_tool", input={"path": "b.txt", "write": True}),
+            ToolUseBlock(id="3", name="path_tool", input={"path": "a.txt"}),
+            ToolUseBlock(id="4", name="unknown", input={}),
+        ]
+
+        _, dependencies = _build_dependencies(
+            blocks, registry, self._context())
+        self.assertEqual([set(), set(), {0}, set()], dependencies)
 
 
 class TestExecuteToolBlocks(unittest.TestCase):
 
+    def test_independent_call_not_blocked_by_waiting_call(self):
+        registry = ToolRegistry()
+        tool = PathTool()
+        registry.register(tool)
+
+        blocks = [
+            ToolUseBlock(id="0", name="path_tool",
+                         input={"path": "a.txt", "write": True, "label": "0", "delay": 0.3}),
+            ToolUseBlock(id="1", name="path_tool",
+                         input={"path": "b.txt", "label": "1"}),
+            # waits for block 0
+            ToolUseBlock(id="2", name="path_tool",
+                         input={"path": "a.txt", "label": "2"}),
+            ToolUseBlock(id="3", name="path_tool",
+                         input={"path": "c.txt", "write": True, "label": "3"}),
+        ]
+
+        results = _run_blocks(blocks, registry)
+        self.assertEqual(["0", "1", "2", "3"],
+                         [result.content for result in results])
+        self.assertLess(tool.events.index(("start", "3")),
+                        tool.events.index(("end", "0")))
+        self.assertLess(tool.events.index(("end", "0")),
+                        tool.events.index(("start", "2")))
+
     def test_parallel_batch_preserves_original_order(self):
         registry = ToolRegistry()
         registry.register(SleepyReadTool())
@@ -628,10 +740,58 @@ class TestExecuteToolBlocks(unittest.TestCase):
         )
 
         self.assertEqual([call[:2] for call in start_calls], [("a", "sleepy_read"), ("b", "sleepy_read")])
-        self.assertEqual([call[:3] for call in result_calls], [("a", "A", False), ("b", "B", False)])
+        self.assertEqual(sorted(call[:3] for call in result_calls), [("a", "A", False), ("b", "B", False)])
         self.assertTrue(all(call[2] == caller_thread_id for call in start_calls))
         self.assertTrue(all(call[3] == caller_thread_id for call in result_calls))
 
+    def test_unrelated_write_runs_concurrently(self):
+        registry = ToolRegistry()
+        tool = PathTool()
+        registry.register(tool)
+
+        blocks = [
+            ToolUseBlock(id="a", name="path_tool", input={
+                         "path": "a.txt", "write": True, "delay": 0.1, "label": "A"}),
+            ToolUseBlock(id="b", name="path_tool", input={
+                         "path": "b.txt", "delay": 0.1, "label": "B"}),
+            ToolUseBlock(id="c", name="path_tool", input={
+                         "path": "a.txt", "delay": 0.01, "label": "C"}),
+        ]
+
+        results = _run_blocks(blocks, registry)
+
+        self.assertEqual([result.content for result in results], ["A", "B", "C"])
+        self.assertEqual(tool.max_active, 2)
+
+    def test_results_stream_as_tools_finish(self):
+        registry = ToolRegistry()
+        registry.register(SleepyReadTool())
+
+        blocks = [
+            ToolUseBlock(id="slow", name="sleepy_read", input={"label": "S", "delay": 0.2}),
+            ToolUseBlock(id="fast", name="sleepy_read", input={"label": "F", "delay": 0.01}),
+        ]
+
+        result_ids = []
+        results = _run_blocks(
+            blocks, registry,
+            onToolResult=lambda tool_id, tool_name, content, is_error: result_ids.append(tool_id))
+
+        self.assertEqual(result_ids, ["fast", "slow"])
+        self.assertEqual([result.tool_use_id for result in results], ["slow", "fast"])
+
+    def test_max_workers_limits_concurrency(self):
+        registry = ToolRegistry()
+        tool = PathTool()
+        registry.register(tool)
+
+        blocks = [ToolUseBlock(id=str(i), name="path_tool", input={
+                               "path": f"{i}.txt", "delay": 0.02}) for i in range(4)]
+
+        _run_blocks(blocks, registry, max_workers=1)
+        self.assertEqual(tool.max_active, 1)
+        self.assertIs(_shared_pool(), _shared_pool())
+
 
 if __name__ == "__main__":
     unittest.main()
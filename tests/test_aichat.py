@@ -97,6 +97,8 @@ class TestAiChat(TestBase):
             # so that QTimer-based mock signals (finished etc.) can fire.
             self.wait(10000, lambda: self.chatWidget._agentLoop is not None
                       and self.chatWidget._agentLoop.isRunning())
+            # streamed deltas are rendered in batches
+            self.wait(1000, chatbot.hasPendingDeltas)
 
             self.assertGreater(chatbot.blockCount(), initialBlockCount)
             self.assertEqual("This is a mock response",
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from unittest.mock import patch
+
 from PySide6.QtCore import QPoint
 from PySide6.QtGui import QTextCursor
 from PySide6.QtTest import QTest
@@ -76,6 +78,8 @@ class TestAiChatbot(TestBase):
         response2.is_delta = True
         response2.first_delta = False
         self.chatbot.appendResponse(response2)
+        # continuations are rendered in batches
+        self.chatbot.flushDeltas()
 
         # Verify content is appended
         cursor = self.chatbot.textCursor()
@@ -87,6 +91,69 @@ class TestAiChatbot(TestBase):
         text = self.chatbot.toPlainText()
         self.assertIn("Hello World", text)
 
+    def _delta(self, text: str, first=False, description=None):
+        response = AiResponse(role=AiRole.Assistant, message=text,
+                              description=description)
+        response.is_delta = True
+        response.first_delta = first
+        return response
+
+    def testAppendResponse_DeltasCoalesced(self):
+        """Stream deltas are rendered in one batch per flush interval"""
+        self.chatbot.appendResponse(self._delta("Hello", first=True))
+        flushed = []
+        self.chatbot.deltasFlushed.connect(lambda: flushed.append(True))
+
+        with patch.object(self.chatbot, "_appendResponse",
+                          wraps=self.chatbot._appendResponse) as appendResponse:
+            for i in range(100):
+                self.chatbot.appendResponse(self._delta(f" {i}"))
+            self.assertTrue(self.chatbot.hasPendingDeltas())
+            self.assertNotIn(" 0", self.chatbot.toPlainText())
+
+            self.wait(1000, self.chatbot.hasPendingDeltas)
+            self.assertEqual(1, appendResponse.call_count)
+
+        self.assertEqual([True], flushed)
+        expected = "Hello" + "".join(f" {i}" for i in range(100))
+        self.assertEqual(expected, self.chatbot.document().lastBlock().text())
+
+    def testAppendResponse_FlushBeforeNewBlock(self):
+        """Buffered deltas stay in their block when another response follows"""
+        self.chatbot.appendResponse(self._delta("thinking", first=True,
+                                                description="Reasoning"))
+        self.chatbot.appendResponse(self._delta(" more\nlines"))
+
+        response = AiResponse(role=AiRole.Tool, message="tool output")
+        self.chatbot.appendResponse(response)
+        self.assertFalse(self.chatbot.hasPendingDeltas())
+
+        text = self.chatbot.toPlainText()
+        self.assertIn("thinking more\nlines\nTool: \ntool output", text)
+
+    def testAppendResponse_CollapsedDeltaBatch(self):
+        """A flushed batch spanning several blocks keeps the group collapsed"""
+        self.chatbot.appendResponse(self._delta("thinking", first=True,
+                                                description="Reasoning"))
+        self.chatbot.collapseLatestReasoningBlock()
+
+        self.chatbot.appendResponse(self._delta("\nline 1\nline 2"))
+        self.chatbot.flushDeltas()
+
+        block = self.chatbot.document().firstBlock().next()
+        while block.isValid():
+            self.assertFalse(block.isVisible(), block.text())
+            block = block.next()
+
+    def testClear_DropsPendingDeltas(self):
+        self.chatbot.appendResponse(self._delta("Hello", first=True))
+        self.chatbot.appendResponse(self._delta(" World"))
+        self.chatbot.clear()
+
+        self.assertFalse(self.chatbot.hasPendingDeltas())
+        QTest.qWait(AiChatbot.FLUSH_INTERVAL * 2)
+        self.assertEqual("", self.chatbot.toPlainText())
+
     def testAppendResponse_NoSelectionNoCursorChange(self):
         """Test that when there's no selection and cursor is not at end, cursor stays in place"""
         # Add initial content
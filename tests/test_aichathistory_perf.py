@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Performance of the AI chat history store with many long conversations.
+
+Every conversation used to be read from the settings and deserialized when
+the chat panel was opened, and each save rewrote the whole conversation.
+"""
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from qgitc.aichathistory import AiChatHistory
+from qgitc.aichathistorydb import AiChatHistoryDb
+from qgitc.aichathistorystore import AiChatHistoryStore
+from tests.base import TestBase
+
+# Budget to list 300 conversations of 200 messages
+_LOAD_MAX_MS = 500
+
+# Budget to save a conversation after a new message
+_SAVE_MAX_MS = 100
+
+
+def _makeHistory(index: int, count: int):
+    messages = [{"role": "user" if i % 2 == 0 else "assistant",
+                 "content": f"message {i} of conversation {index} " + "x" * 500}
+                for i in range(count)]
+    return AiChatHistory(title=f"Conversation {index}", messages=messages)
+
+
+class TestAiChatHistoryPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self._tempDir = tempfile.TemporaryDirectory()
+        self._dbFile = os.path.join(self._tempDir.name, "chathistory.db")
+
+        db = AiChatHistoryDb(self._dbFile)
+        db.saveMany([_makeHistory(i, 200) for i in range(300)])
+        db.close()
+
+    def tearDown(self):
+        self._tempDir.cleanup()
+        super().tearDown()
+
+    def test_load_and_save(self):
+        settings = self.app.settings()
+        with patch.object(settings, "chatHistoryFile",
+                          return_value=self._dbFile):
+            store = AiChatHistoryStore(settings)
+        store.setSaveDebounceMs(0)
+
+        start = time.perf_counter()
+        store.ensureLoaded()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.assertEqual(300, store.model().rowCount())
+        self.assertLess(elapsed, _LOAD_MAX_MS,
+                        f"loading took {elapsed:.0f}ms (limit {_LOAD_MAX_MS}ms)")
+
+        history = store.model().getHistory(0)
+        messages = list(history.messages)
+        self.assertEqual(200, len(messages))
+
+        messages.append({"role": "user", "content": "one more"})
+        with patch('qgitc.agent.message_convert.messagesToHistoryDicts',
+                   side_effect=lambda m: list(m)):
+            start = time.perf_counter()
+            store.updateFromMessages(history.historyId, messages)
+            elapsed = (time.perf_counter() - start) * 1000
+        self.assertLess(elapsed, _SAVE_MAX_MS,
+                        f"saving took {elapsed:.0f}ms (limit {_SAVE_MAX_MS}ms)")
+
+        store.database().close()
+        db = AiChatHistoryDb(self._dbFile)
+        self.assertEqual(messages, db.messages(history.historyId))
+        db.close()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from qgitc.aichathistory import AiChatHistory
+from qgitc.aichathistorydb import MEMORY_DB, AiChatHistoryDb
+
+
+def _messages(count: int, start: int = 0):
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"message {i}"}
+            for i in range(start, start + count)]
+
+
+class TestAiChatHistoryDb(unittest.TestCase):
+
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempDir.name, "sub", "chathistory.db")
+        self.db = AiChatHistoryDb(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        self.tempDir.cleanup()
+
+    def _reopen(self):
+        self.db.close()
+        self.db = AiChatHistoryDb(self.path)
+
+    def _traceWrites(self):
+        statements = []
+        self.db._connection().set_trace_callback(
+            lambda sql: statements.append(sql)
+            if sql.startswith(("INSERT INTO messages", "DELETE")) else None)
+        return statements
+
+    def testLazyMessages(self):
+        history = AiChatHistory(title="Chat", modelKey="key", modelId="model",
+                                messages=_messages(3))
+        self.db.save(history)
+        self.db.save(AiChatHistory(title="Empty"))
+        self.assertTrue(self.db.isPersistent())
+
+        self._reopen()
+        histories = self.db.histories()
+        self.assertEqual(1, len(histories))
+        loaded = histories[0]
+        self.assertEqual(history.historyId, loaded.historyId)
+        self.assertEqual("Chat", loaded.title)
+        self.assertEqual("model", loaded.modelId)
+        self.assertEqual(history.timestamp, loaded.timestamp)
+
+        self.assertFalse(loaded.isLoaded())
+        self.assertEqual(_messages(3), loaded.messages)
+        self.assertTrue(loaded.isLoaded())
+
+    def testMetadataOnlySave(self):
+        self.db.save(AiChatHistory(messages=_messages(2)))
+        self._reopen()
+
+        history = self.db.histories()[0]
+        history.title = "Renamed"
+        statements = self._traceWrites()
+        self.db.save(history)
+        self.assertEqual([], statements)
+        self.assertFalse(history.isLoaded())
+
+        self._reopen()
+        history = self.db.histories()[0]
+        self.assertEqual("Renamed", history.title)
+        self.assertEqual(_messages(2), history.messages)
+
+    def testIncrementalSave(self):
+        history = AiChatHistory(messages=_messages(10))
+        self.db.save(history)
+
+        statements = self._traceWrites()
+        history.messages = _messages(12)
+        self.db.save(history)
+        self.assertEqual(2, len(statements))
+
+        # a changed message rewrites the messages after it only
+        statements.clear()
+        messages = _messages(12)
+        messages[9]["content"] = "edited"
+        history.messages = messages
+        self.db.save(history)
+        self.assertEqual(4, len(statements))
+        self.assertTrue(statements[0].startswith("DELETE"))
+
+        # compaction may shorten the history
+        history.messages = _messages(1)
+        self.db.save(history)
+
+        self._reopen()
+        self.assertEqual(_messages(1), self.db.messages(history.historyId))
+
+        history.messages = _messages(1) + _messages(2, 5)
+        self.db.save(history)
+        self._reopen()
+        self.assertEqual(history.messages,
+                         self.db.histories()[0].messages)
+
+    def testRemove(self):
+        histories = [AiChatHistory(messages=_messages(1)) for _ in range(3)]
+        self.db.saveMany(histories)
+        self.db.remove(histories[0].historyId)
+        self.db.removeMany([histories[1].historyId, "unknown"])
+
+        self._reopen()
+        self.assertEqual([histories[2].historyId],
+                         [h.historyId for h in self.db.histories()])
+        self.assertEqual([], self.db.messages(histories[0].historyId))
+
+    def testInvalidPath(self):
+        with open(os.path.join(self.tempDir.name, "file"), "w"):
+            pass
+        db = AiChatHistoryDb(os.path.join(self.tempDir.name, "file", "a.db"))
+        with self.assertLogs(level="WARNING"):
+            self.assertFalse(db.isPersistent())
+        self.assertEqual(MEMORY_DB, db.path())
+
+        db.save(AiChatHistory(messages=_messages(1)))
+        self.assertEqual(1, len(db.histories()))
+        db.close()
+
+    def testInvalidMessage(self):
+        history = AiChatHistory(messages=_messages(2))
+        self.db.save(history)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("UPDATE messages SET data = '{' WHERE seq = 0")
+        conn.close()
+
+        self._reopen()
+        with self.assertLogs(level="WARNING"):
+            messages = self.db.messages(history.historyId)
+        self.assertEqual(_messages(1, 1), messages)
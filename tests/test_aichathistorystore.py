@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import os
+import tempfile
 from unittest.mock import MagicMock, PropertyMock, patch
 
 from qgitc.aichathistory import AiChatHistory
@@ -171,6 +173,102 @@ class TestAiChatHistoryStoreEmptyHistories(TestBase):
         self.assertEqual(loaded[0].historyId, history.historyId)
 
 
+class TestAiChatHistoryStorePersistence(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self._settings = self.app.settings()
+        self._tempDir = tempfile.TemporaryDirectory()
+        dbFile = os.path.join(self._tempDir.name, "chathistory.db")
+        self._patcher = patch.object(
+            self._settings, "chatHistoryFile", return_value=dbFile)
+        self._patcher.start()
+        self._stores = []
+
+    def tearDown(self):
+        for store in self._stores:
+            store.database().close()
+        self._patcher.stop()
+        self._tempDir.cleanup()
+        super().tearDown()
+
+    def _newStore(self):
+        store = AiChatHistoryStore(self._settings)
+        store.setSaveDebounceMs(0)
+        self._stores.append(store)
+        return store
+
+    def test_migrates_settings_histories(self):
+        history = AiChatHistory(
+            title="Old", messages=[{"role": "user", "content": "hi"}])
+        self._settings.saveChatHistory(history.historyId, history.toDict())
+
+        store = self._newStore()
+        store.ensureLoaded()
+        self.assertEqual([], self._settings.chatHistories())
+
+        store = self._newStore()
+        store.ensureLoaded()
+        loaded = store.get(history.historyId)
+        self.assertEqual("Old", loaded.title)
+        self.assertFalse(loaded.isLoaded())
+        self.assertEqual(history.messages, loaded.messages)
+
+    def test_title_then_restart_keeps_messages(self):
+        store = self._newStore()
+        store.ensureLoaded()
+        history = AiChatHistory()
+        store.insertHistoryAtTop(history)
+
+        messages = [{"role": "user", "content": str(i)} for i in range(2)]
+        with patch('qgitc.agent.message_convert.messagesToHistoryDicts',
+                   side_effect=lambda m: list(m)):
+            store.updateFromMessages(history.historyId, messages)
+            store.updateTitle(history.historyId, "Title")
+            # a copy written to Settings when the title was generated
+            self._settings.saveChatHistory(history.historyId, history.toDict())
+            messages += [{"role": "assistant", "content": str(i)}
+                         for i in range(4)]
+            store.updateFromMessages(history.historyId, messages)
+        self.assertEqual(6, len(store.get(history.historyId).messages))
+
+        store = self._newStore()
+        store.ensureLoaded()
+        loaded = store.get(history.historyId)
+        self.assertEqual("Title", loaded.title)
+        self.assertEqual(messages, loaded.messages)
+        self.assertEqual([], self._settings.chatHistories())
+
+    def test_saves_and_reloads(self):
+        store = self._newStore()
+        store.ensureLoaded()
+        history = AiChatHistory()
+        store.insertHistoryAtTop(history)
+
+        messages = [{"role": "user", "content": "a"}]
+        with patch('qgitc.agent.message_convert.messagesToHistoryDicts',
+                   side_effect=lambda m: list(m)):
+            store.updateFromMessages(history.historyId, messages, modelId="m")
+            messages.append({"role": "assistant", "content": "b"})
+            store.updateFromMessages(history.historyId, messages)
+        store.updateTitle(history.historyId, "Title")
+
+        store = self._newStore()
+        store.ensureLoaded()
+        loaded = store.get(history.historyId)
+        self.assertEqual("Title", loaded.title)
+        self.assertEqual("m", loaded.modelId)
+        self.assertEqual(messages, loaded.messages)
+
+        store.remove(history.historyId)
+        store = self._newStore()
+        store.ensureLoaded()
+        self.assertEqual([], store.model().histories())
+
+
 if __name__ == "__main__":
     import unittest
     unittest.main()
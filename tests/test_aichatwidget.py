@@ -6,6 +6,8 @@ from unittest.mock import MagicMock, PropertyMock, patch
 from qgitc.aichathistory import AiChatHistory
 from qgitc.aichatwidget import AiChatWidget
 from qgitc.applicationbase import ApplicationBase
+from qgitc.common import Commit
+from qgitc.gitutils import Git
 from qgitc.llm import AiModelBase
 from tests.base import TestBase
 
@@ -297,6 +299,23 @@ class TestReasoningDeltaAutoScroll(TestBase):
             "_scrollToBottom should NOT be called when auto-scroll is disabled",
         )
 
+    def test_deltas_scroll_once_per_flush(self):
+        """Continuation deltas scroll once their batch is rendered."""
+        widget = self._makeWidget()
+        widget._disableAutoScroll = False
+
+        scrollCalls = []
+        with patch.object(widget, '_scrollToBottom',
+                          side_effect=lambda: scrollCalls.append(1)):
+            for i in range(20):
+                widget._onAgentReasoningDelta(f"step {i} ")
+            self.assertEqual(1, len(scrollCalls))
+
+            self.wait(1000, widget.messages.hasPendingDeltas)
+
+        self.assertEqual(2, len(scrollCalls))
+        self.assertIn("step 0 step 1 ", widget.messages.toPlainText())
+
 
 class TestCreateNewConversation(TestBase):
     """Tests for _createNewConversation: empty conversations must bypass the store."""
@@ -455,5 +474,74 @@ class TestCreateNewConversation(TestBase):
         )
 
 
+class TestCommitCodeReview(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def _makeCommit(self, sha1, repoDir):
+        commit = Commit(sha1=sha1)
+        commit.repoDir = repoDir
+        return commit
+
+    def test_codeReview_fetches_sub_commit_diffs_in_background(self):
+        widget = AiChatWidget(parent=None, embedded=False, hideHistoryPanel=True)
+        self.processEvents()
+
+        commit = self._makeCommit("1" * 40, ".")
+        commit.subCommits = [
+            self._makeCommit("2" * 40, "sub1"),
+            self._makeCommit("3" * 40, "sub2"),
+            self._makeCommit("4" * 40, "sub3"),
+        ]
+
+        diffs = {
+            "1" * 40: b"diff --git a/main.txt b/main.txt\n",
+            "2" * 40: b"diff --git a/sub1/a.txt b/sub1/a.txt\n",
+            "3" * 40: None,
+            "4" * 40: b"diff --git a/sub3/b.txt b/sub3/b.txt\n",
+        }
+
+        with patch.object(Git, "commitRawDiff",
+                          side_effect=lambda sha1, **kwargs: diffs[sha1]) as rawDiff, \
+                patch.object(Git, "commitSubject", return_value=b"Fix foo") as subject, \
+                patch.object(widget, "_executeSkillDirectly") as executeSkill, \
+                patch.object(widget, "_createNewConversation"):
+            widget.codeReview(commit)
+            executeSkill.assert_not_called()
+
+            self.wait(5000, lambda: not executeSkill.called)
+
+        self.assertEqual(rawDiff.call_count, 4)
+        subject.assert_called_once()
+
+        skillName, args = executeSkill.call_args[0]
+        self.assertEqual(skillName, "patch-review")
+        # keep the order of the composite commit
+        self.assertLess(args.index("main.txt"), args.index("sub1/a.txt"))
+        self.assertLess(args.index("sub1/a.txt"), args.index("sub3/b.txt"))
+
+        scene = widget._injectedContext
+        self.assertIn("subject: Fix foo", scene)
+        self.assertIn("repo: sub1", scene)
+        self.assertNotIn("repo: sub2", scene)
+        self.assertIn("sha1: " + "4" * 40, scene)
+
+    def test_codeReview_no_diff(self):
+        widget = AiChatWidget(parent=None, embedded=False, hideHistoryPanel=True)
+        self.processEvents()
+
+        commit = self._makeCommit("1" * 40, ".")
+        with patch.object(Git, "commitRawDiff", return_value=None), \
+                patch.object(Git, "commitSubject") as subject, \
+                patch.object(widget, "_executeSkillDirectly") as executeSkill:
+            widget.codeReview(commit)
+            self.wait(5000, widget._codeReviewExecutor.isRunning)
+            self.processEvents()
+
+        subject.assert_not_called()
+        executeSkill.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
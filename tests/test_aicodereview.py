@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+from unittest.mock import patch
+
+from qgitc.aichatwidget import AiChatWidget
+from qgitc.aicodereview import (
+    MIN_CHUNK_TOKENS,
+    AiCodeReview,
+    chunkTokenBudget,
+    estimateTokens,
+    splitDiff,
+    splitDiffFiles,
+)
+from qgitc.llm import AiModelCapabilities
+from qgitc.llmprovider import AiModelProvider
+from tests.base import TestBase
+from tests.mocklocalllm import MockLocalLLM
+
+
+def _makeFileDiff(name: str, hunks: int = 1, lines: int = 5):
+    diff = f"diff --git a/{name} b/{name}\n" \
+        "index 1111111..2222222 100644\n" \
+        f"--- a/{name}\n" \
+        f"+++ b/{name}\n"
+    for h in range(hunks):
+        diff += f"@@ -{h * 100 + 1},{lines} +{h * 100 + 1},{lines} @@\n"
+        for i in range(lines):
+            diff += f"+line {h} {i} of {name}\n"
+    return diff
+
+
+class TestSplitDiff(unittest.TestCase):
+
+    def testSplitFiles(self):
+        diff = _makeFileDiff("a.txt") + _makeFileDiff("b.txt") + \
+            "Submodule sub 1111111..2222222:\n  > Update\n"
+        files = splitDiffFiles(diff)
+        self.assertEqual(3, len(files))
+        self.assertTrue(files[1].startswith("diff --git a/b.txt"))
+        self.assertTrue(files[2].startswith("Submodule sub"))
+        self.assertEqual(diff, "".join(files))
+
+    def testSmallFilesPacked(self):
+        diff = "".join(_makeFileDiff(f"{i}.txt") for i in range(10))
+        self.assertEqual([diff], splitDiff(diff, estimateTokens(diff)))
+
+        budget = estimateTokens(_makeFileDiff("0.txt")) * 3
+        chunks = splitDiff(diff, budget)
+        self.assertEqual(4, len(chunks))
+        self.assertEqual(diff, "".join(chunks))
+        for chunk in chunks:
+            self.assertLessEqual(estimateTokens(chunk), budget)
+
+    def testSplitByHunk(self):
+        fileDiff = _makeFileDiff("big.txt", hunks=6)
+        header = fileDiff[:fileDiff.index("@@")]
+        budget = estimateTokens(fileDiff) // 3
+
+        chunks = splitDiff(_makeFileDiff("a.txt") + fileDiff, budget)
+        self.assertGreater(len(chunks), 3)
+        self.assertTrue(chunks[0].startswith("diff --git a/a.txt"))
+
+        hunks = 0
+        for chunk in chunks[1:]:
+            # every part is reviewable on its own
+            self.assertTrue(chunk.startswith(header))
+            self.assertLessEqual(estimateTokens(chunk), budget)
+            hunks += chunk.count("\n@@ ")
+        self.assertEqual(6, hunks)
+
+    def testSplitHugeHunk(self):
+        fileDiff = _makeFileDiff("huge.txt", hunks=1, lines=200)
+        budget = estimateTokens(fileDiff) // 4
+
+        chunks = splitDiff(fileDiff, budget)
+        self.assertGreaterEqual(len(chunks), 4)
+        for chunk in chunks:
+            self.assertIn("\n@@ -1,200 +1,200 @@\n", chunk)
+            self.assertLessEqual(estimateTokens(chunk), budget)
+
+        text = "".join(chunks)
+        for i in range(200):
+            self.assertEqual(1, text.count(f"+line 0 {i} of huge.txt\n"))
+
+    def testEmpty(self):
+        self.assertEqual([], splitDiff("", 100))
+        self.assertEqual([], splitDiff(None, 100))
+
+    def testChunkTokenBudget(self):
+        caps = AiModelCapabilities(context_window=200000,
+                                   max_output_tokens=200000)
+        # only the output tokens requested are reserved
+        self.assertEqual(200000 - 4096 - 2000, chunkTokenBudget(caps, 4096))
+        # and never more than a quarter of the window
+        self.assertEqual(150000 - 2000, chunkTokenBudget(caps))
+
+        caps = AiModelCapabilities(context_window=2048, max_output_tokens=2048)
+        self.assertEqual(MIN_CHUNK_TOKENS, chunkTokenBudget(caps, 4096))
+
+
+class TestAiCodeReview(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.app.settings().setLocalLlmProviders([{
+            "id": "local-1",
+            "name": "Ollama",
+            "url": "http://127.0.0.1:11434/v1",
+            "headers": {},
+        }])
+        self.createdModels = []
+
+    def _createModel(self, parent):
+        model = AiModelProvider.createSpecificModel(
+            "LocalLLM:local-1", "mock-model", parent)
+        self.createdModels.append(model)
+        return model
+
+    def _makeDiff(self, files=8):
+        diff = "".join(_makeFileDiff(f"{i}.txt") for i in range(files))
+        return diff, estimateTokens(_makeFileDiff("0.txt"))
+
+    def testReview(self):
+        review = AiCodeReview(self._createModel, maxInFlight=3)
+        reviews = []
+        progress = []
+        finished = []
+        review.reviewAvailable.connect(reviews.append)
+        review.progressChanged.connect(
+            lambda done, total: progress.append((done, total)))
+        review.finished.connect(lambda: finished.append(True))
+
+        diff, budget = self._makeDiff()
+        with MockLocalLLM(True):
+            self.assertEqual(8, review.start(diff, budget))
+            self.assertTrue(review.isRunning())
+            self.assertEqual(3, len(self.createdModels))
+
+            maxInFlight = 0
+
+            def _isRunning():
+                nonlocal maxInFlight
+                maxInFlight = max(maxInFlight, len(review._models))
+                return not finished
+
+            self.wait(10000, _isRunning)
+
+        self.assertEqual([True], finished)
+        self.assertEqual(["This is a mock response"], reviews)
+        self.assertEqual(3, maxInFlight)
+        self.assertEqual([(i, 8) for i in range(1, 9)], progress)
+        # 8 chunk reviews and the summary
+        self.assertEqual(9, len(self.createdModels))
+        self.assertFalse(review.isRunning())
+
+    def testFindingsOverBudget(self):
+        review = AiCodeReview(self._createModel, maxInFlight=3)
+        reviews = []
+        finished = []
+        prompts = []
+        review.reviewAvailable.connect(reviews.append)
+        review.finished.connect(lambda: finished.append(True))
+
+        makeParams = review._makeParams
+
+        def _makeParams(prompt):
+            prompts.append(prompt)
+            return makeParams(prompt)
+
+        review._makeParams = _makeParams
+
+        diff, budget = self._makeDiff()
+        part = "<part index=\"1\">\nThis is a mock response\n</part>"
+        # the findings of the 8 chunks don't fit in a single request
+        self.assertGreater(8 * estimateTokens(part), budget)
+        with MockLocalLLM(True), \
+                patch("qgitc.aicodereview.MIN_CHUNK_TOKENS", 1):
+            self.assertEqual(8, review.start(diff, budget))
+            self.wait(10000, lambda: not finished)
+
+        self.assertEqual(["This is a mock response"], reviews)
+        self.assertFalse(review.isRunning())
+
+        merges = [prompt for prompt in prompts[8:-1]
+                  if "merged with the other ones later" in prompt]
+        self.assertEqual(len(prompts) - 9, len(merges))
+        self.assertGreater(len(merges), 1)
+        for prompt in merges:
+            self.assertLess(prompt.count("<part "), 8)
+
+        summary = prompts[-1]
+        self.assertIn("reviewed in 8 parts", summary)
+        self.assertLess(summary.count("<part "), 8)
+
+    def testChunkPrompts(self):
+        review = AiCodeReview(self._createModel, maxInFlight=2)
+        prompts = []
+
+        def _queryAsync(model, params):
+            prompts.append(params.prompt)
+
+        diff, budget = self._makeDiff(files=2)
+        with patch("qgitc.models.openaicompat.LocalLLM.queryAsync",
+                   autospec=True, side_effect=_queryAsync):
+            review.start(diff, budget, "type: commit")
+
+        self.assertEqual(2, len(prompts))
+        self.assertIn("part 1 of 2", prompts[0])
+        self.assertIn("0.txt", prompts[0])
+        self.assertNotIn("1.txt", prompts[0])
+        self.assertIn("part 2 of 2", prompts[1])
+        self.assertIn("<context>\ntype: commit\n</context>", prompts[1])
+
+        review.cancel()
+        self.assertFalse(review.isRunning())
+
+    def testServiceUnavailable(self):
+        review = AiCodeReview(self._createModel, maxInFlight=2)
+        errors = []
+        reviews = []
+        finished = []
+        review.errorOccurred.connect(errors.append)
+        review.reviewAvailable.connect(reviews.append)
+        review.finished.connect(lambda: finished.append(True))
+
+        diff, budget = self._makeDiff(files=4)
+        with MockLocalLLM(False):
+            review.start(diff, budget)
+            self.wait(10000, lambda: not finished)
+
+        self.assertEqual([True], finished)
+        self.assertEqual(1, len(errors))
+        self.assertEqual([], reviews)
+        self.assertFalse(review.isRunning())
+        # pending chunks are not sent after a failure
+        self.assertEqual(2, len(self.createdModels))
+
+
+class TestChatChunkedReview(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def testLargeDiffReviewedInChunks(self):
+        widget = AiChatWidget(parent=None, embedded=False,
+                              hideHistoryPanel=True)
+        self.processEvents()
+
+        diff = "".join(_makeFileDiff(f"{i}.txt") for i in range(4))
+        budget = estimateTokens(_makeFileDiff("0.txt"))
+
+        def _start(review, diff, maxChunkTokens, context=None):
+            self.assertEqual(budget, maxChunkTokens)
+            self.assertEqual("type: commit", context)
+            return 4
+
+        with patch("qgitc.aichatwidget.chunkTokenBudget", return_value=budget), \
+                patch.object(AiCodeReview, "start", autospec=True, side_effect=_start), \
+                patch.object(widget, "_executeSkillDirectly") as executeSkill, \
+                patch.object(widget, "_createNewConversation"):
+            widget._injectedContext = "type: commit"
+            widget.codeReviewForDiff(diff)
+
+            executeSkill.assert_not_called()
+            self.assertTrue(widget.isGenerating())
+            self.assertTrue(widget._contextPanel.btnSend.isHidden())
+
+            widget._chunkedReview.reviewAvailable.emit("### 1.txt#1: bug")
+            widget._chunkedReview.finished.emit()
+
+        self.assertFalse(widget.isGenerating())
+        self.assertIsNone(widget._chunkedReview)
+        self.assertIn("### 1.txt#1: bug", widget.messages.toPlainText())
+
+        messages = widget._agentLoop.messages()
+        self.assertEqual(2, len(messages))
+        self.assertIn("in 4 parts", messages[0].content[0].text)
+        self.assertIn("type: commit", messages[0].content[0].text)
+        self.assertEqual("### 1.txt#1: bug", messages[1].content[0].text)
+
+    def testSmallDiffUsesSkill(self):
+        widget = AiChatWidget(parent=None, embedded=False,
+                              hideHistoryPanel=True)
+        self.processEvents()
+
+        diff = _makeFileDiff("a.txt")
+        with patch.object(widget, "_executeSkillDirectly") as executeSkill:
+            widget.codeReviewForDiff(diff)
+
+        executeSkill.assert_called_once()
+        self.assertIsNone(widget._chunkedReview)
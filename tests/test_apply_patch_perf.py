@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Performance of the apply_patch engine on large files.
+
+Agents send patches with hundreds of hunks against big source files. The
+context of every hunk used to be searched by comparing it at each position
+of the file, and at each fuzz level, which was quadratic for CRLF files
+where exact matches always fail.
+"""
+import time
+
+from qgitc.agent.tools.apply_patch import processPatch
+from tests.base import TestBase
+
+# Time budget to apply 400 hunks to a file of 140k lines
+_APPLY_MAX_MS = 2000
+
+
+def _makeFile(count: int):
+    lines = []
+    for i in range(count):
+        lines += [
+            f"class C{i}:",
+            f"def func{i}(self):",
+            "    value = compute()",
+            "    if value:",
+            "        return value",
+            "    return None",
+            "",
+        ]
+    return lines
+
+
+def _makePatch(path: str, count: int, step: int):
+    lines = ["*** Begin Patch", f"*** Update File: {path}"]
+    for i in range(0, count, step):
+        lines += [
+            f"@@ class C{i}:",
+            f" def func{i}(self):",
+            "     value = compute()",
+            "-    if value:",
+            "+    if value is not None:",
+            "         return value",
+        ]
+    lines.append("*** End Patch")
+    return "\n".join(lines)
+
+
+class TestApplyPatchPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def _apply(self, lineEnd: str):
+        files = {"big.py": lineEnd.join(_makeFile(20000))}
+        patch = _makePatch("big.py", 20000, 50)
+
+        def _write(path, content, source_path=None):
+            files[path] = content
+
+        start = time.perf_counter()
+        result = processPatch(patch, files.__getitem__, _write, files.pop)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.assertEqual("Done!", result)
+        self.assertEqual(400, files["big.py"].count("is not None"))
+        return elapsed
+
+    def test_apply_lf(self):
+        elapsed = self._apply("\n")
+        self.assertLess(elapsed, _APPLY_MAX_MS,
+                        f"applying took {elapsed:.0f}ms (limit {_APPLY_MAX_MS}ms)")
+
+    def test_apply_crlf(self):
+        elapsed = self._apply("\r\n")
+        self.assertLess(elapsed, _APPLY_MAX_MS,
+                        f"applying took {elapsed:.0f}ms (limit {_APPLY_MAX_MS}ms)")
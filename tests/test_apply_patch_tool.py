@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 
 import os
+import unittest
 from unittest import skipIf
 
 from qgitc.agent.tool import ToolContext
-from qgitc.agent.tools.apply_patch import ApplyPatchTool
+from qgitc.agent.tools.apply_patch import (
+    ApplyPatchTool,
+    DiffError,
+    LineIndex,
+    processPatch,
+)
 from qgitc.gitutils import Git
 from tests.base import TestBase
 
@@ -421,3 +427,154 @@ class TestApplyPatchTool(TestBase):
 
         _test(patch_template.format(path, "@@ void foo()"))
         _test(patch_template.format(path, "@@void foo()"))
+
+
+class TestApplyPatchEngine(unittest.TestCase):
+    def setUp(self):
+        self.files = {}
+        self.failWrites = set()
+
+    def _open(self, path):
+        if path not in self.files:
+            raise DiffError("File does not exist: {}".format(path))
+        return self.files[path]
+
+    def _write(self, path, content, source_path=None):
+        if path in self.failWrites:
+            # the file is truncated when it is opened for writing, a
+            # later write of the rollback succeeds
+            self.failWrites.discard(path)
+            self.files[path] = ""
+            raise OSError("disk full")
+        self.files[path] = content
+
+    def _remove(self, path):
+        self.files.pop(path, None)
+
+    def _apply(self, patch):
+        return processPatch(patch, self._open, self._write, self._remove)
+
+    def test_line_index(self):
+        lines = ["a", "b", "x", "a", "b", "c", "  a", "b"]
+        index = LineIndex(lines)
+        self.assertEqual(0, index.find(["a", "b"], 0))
+        self.assertEqual(3, index.find(["a", "b"], 1))
+        self.assertEqual(4, index.find(["b", "c"], 0))
+        self.assertEqual(-1, index.find(["a", "b", "d"], 0))
+        self.assertEqual(-1, index.find(["a", "b"], 4))
+        self.assertEqual(6, index.find(["a", "b"], 4, 100))
+        self.assertTrue(index.occursBefore("x", 3))
+        self.assertFalse(index.occursBefore("x", 2))
+        self.assertFalse(index.occursBefore("z", 8))
+
+    def test_exact_match_is_not_reported(self):
+        self.files["a.txt"] = "1\n2\n3\n4\n5\n"
+        result = self._apply(
+            "*** Begin Patch\n"
+            "*** Update File: a.txt\n"
+            " 2\n"
+            "-3\n"
+            "+three\n"
+            " 4\n"
+            "*** End Patch")
+        self.assertEqual("Done!", result)
+        self.assertEqual("1\n2\nthree\n4\n5\n", self.files["a.txt"])
+
+    def test_drifted_context(self):
+        self.files["a.txt"] = "def f():\n    x = 1\n    y = 2\n    return x\n"
+        # the outer context lines no longer match the file
+        result = self._apply(
+            "*** Begin Patch\n"
+            "*** Update File: a.txt\n"
+            " def f(a):\n"
+            " x = 1\n"
+            "-    y = 2\n"
+            "+    y = 3\n"
+            "     return y\n"
+            "*** End Patch")
+        self.assertEqual("def f():\n    x = 1\n    y = 3\n    return x\n",
+                         self.files["a.txt"])
+        self.assertIn("a.txt: hunk 1 applied at line 1", result)
+        self.assertIn("ignoring 2 mismatched context line(s)", result)
+        self.assertIn("ignoring indentation", result)
+
+    def test_changed_lines_must_match(self):
+        self.files["a.txt"] = "1\n2\n3\n4\n5\n"
+        with self.assertRaises(DiffError):
+            self._apply(
+                "*** Begin Patch\n"
+                "*** Update File: a.txt\n"
+                " 2\n"
+                "-three\n"
+                "+3\n"
+                " 4\n"
+                "*** End Patch")
+        # too much drifted context
+        with self.assertRaises(DiffError):
+            self._apply(
+                "*** Begin Patch\n"
+                "*** Update File: a.txt\n"
+                " x\n"
+                " y\n"
+                " z\n"
+                "-3\n"
+                "+three\n"
+                " 4\n"
+                "*** End Patch")
+        self.assertEqual("1\n2\n3\n4\n5\n", self.files["a.txt"])
+
+    def test_multi_file_patch_is_transactional(self):
+        names = ["f{}.txt".format(i) for i in range(6)]
+        for name in names:
+            self.files[name] = "old\n"
+        self.files["gone.txt"] = "bye\n"
+
+        patch = "*** Begin Patch\n"
+        for name in names:
+            patch += "*** Update File: {}\n-old\n+new\n".format(name)
+        patch += "*** Delete File: gone.txt\n"
+        patch += "*** Add File: added.txt\n+hello\n"
+        patch += "*** End Patch"
+
+        original = dict(self.files)
+        self.failWrites.add("f3.txt")
+        with self.assertRaises(OSError):
+            self._apply(patch)
+        self.assertEqual(original, self.files)
+
+        self.failWrites.clear()
+        self.assertEqual("Done!", self._apply(patch))
+        for name in names:
+            self.assertEqual("new\n", self.files[name])
+        self.assertNotIn("gone.txt", self.files)
+        self.assertEqual("hello", self.files["added.txt"])
+
+    def test_move_onto_existing_file_is_restored(self):
+        self.files["a.txt"] = "old\n"
+        self.files["b.txt"] = "keep\n"
+        self.files["c.txt"] = "x\n"
+        patch = (
+            "*** Begin Patch\n"
+            "*** Update File: a.txt\n"
+            "*** Move to: b.txt\n"
+            "-old\n"
+            "+new\n"
+            "*** Update File: c.txt\n"
+            "-x\n"
+            "+y\n"
+            "*** Add File: d.txt\n"
+            "+added\n"
+            "*** End Patch")
+
+        self.files["d.txt"] = "existing\n"
+        original = dict(self.files)
+        self.failWrites.add("c.txt")
+        with self.assertRaises(OSError):
+            self._apply(patch)
+        self.assertEqual(original, self.files)
+
+        self.failWrites.clear()
+        self.assertEqual("Done!", self._apply(patch))
+        self.assertNotIn("a.txt", self.files)
+        self.assertEqual("new\n", self.files["b.txt"])
+        self.assertEqual("y\n", self.files["c.txt"])
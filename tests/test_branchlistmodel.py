@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from PySide6.QtCore import Qt
+
+from qgitc.branchlistmodel import BranchFilterModel, BranchListModel
+from tests.base import TestBase
+
+
+class TestBranchListModel(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.model = BranchListModel()
+        self.model.setBranches(
+            ["main", "Feature/Login", "feature/logout",
+             "remotes/origin/main", "remotes/origin/feature/login"])
+        self.filterModel = BranchFilterModel()
+        self.filterModel.setSourceModel(self.model)
+
+    def _filtered(self):
+        return [self.filterModel.index(i, 0).data()
+                for i in range(self.filterModel.rowCount())]
+
+    def testFindBranch(self):
+        self.assertEqual(0, self.model.indexOf("main"))
+        self.assertEqual(-1, self.model.indexOf("origin/main"))
+        self.assertEqual(3, self.model.findBranch("origin/main"))
+        self.assertEqual(-1, self.model.findBranch("develop"))
+
+    def testFilter(self):
+        self.assertEqual(5, self.filterModel.rowCount())
+
+        self.filterModel.setFilterText("log")
+        self.assertEqual(["Feature/Login", "feature/logout",
+                          "remotes/origin/feature/login"], self._filtered())
+
+        # narrowed from the previous matches
+        self.filterModel.setFilterText("LOGI")
+        self.assertEqual(["Feature/Login", "remotes/origin/feature/login"],
+                         self._filtered())
+
+        self.filterModel.setFilterText("main")
+        self.assertEqual(["main", "remotes/origin/main"], self._filtered())
+
+        self.filterModel.setFilterText("")
+        self.assertEqual(5, self.filterModel.rowCount())
+
+    def testMapToSource(self):
+        self.filterModel.setFilterText("origin")
+        index = self.filterModel.index(1, 0)
+        sourceIndex = self.filterModel.mapToSource(index)
+        self.assertEqual(4, sourceIndex.row())
+        self.assertEqual(index, self.filterModel.mapFromSource(sourceIndex))
+        self.assertFalse(self.filterModel.mapFromSource(
+            self.model.index(0, 0)).isValid())
+
+    def testSourceReset(self):
+        self.filterModel.setFilterText("login")
+        self.model.setBranches(["login", "main"])
+        self.assertEqual(["login"], self._filtered())
+        self.assertEqual("login", self.filterModel.index(0, 0).data(Qt.EditRole))
@@ -67,7 +67,7 @@ class TestCherryPickProgressDialog(TestBase):
                          self.dialog._list.item(0).data(Qt.UserRole))
 
     def test_ai_toggle_shows_and_hides_ai_container(self):
-        with patch("qgitc.cherrypickprogressdialog.AiChatWidget", _DummyAiChatWidget):
+        with patch("qgitc.aichatwidget.AiChatWidget", _DummyAiChatWidget):
             self.dialog.show()
             self.processEvents()
 
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
 from unittest import mock
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 from PySide6.QtCore import QItemSelectionModel, Qt, QThread
 from PySide6.QtTest import QSignalSpy, QTest
@@ -11,7 +11,7 @@ from qgitc.aichatwindow import AiChatWidget
 from qgitc.cancelevent import CancelEvent
 from qgitc.events import CodeReviewEvent, LocalChangesCommittedEvent
 from qgitc.gitutils import Git
-from qgitc.llm import AiModelBase
+from qgitc.llm import AiModelBase, AiModelCapabilities
 from qgitc.windowtype import WindowType
 from tests.base import TemporaryDirectory, TestBase, createRepo
 from tests.mockgithubcopilot import MockGithubCopilot, MockGithubCopilotStep
@@ -144,6 +144,44 @@ class TestCommitWindow(TestBase):
         self.window.cancel(True)
         self.processEvents()
 
+    def testStageKeepsOtherRepos(self):
+        self.waitForLoaded()
+
+        with open(os.path.join(self.gitDir.name, "test.txt"), "w+") as f:
+            f.write("test")
+
+        subRepoFile = os.path.join("subRepo", "test.py")
+        with open(os.path.join(self.gitDir.name, subRepoFile), "a+") as f:
+            f.write("# new line\n")
+
+        QTest.mouseClick(self.window.ui.tbRefresh, Qt.LeftButton)
+        self.waitForLoaded()
+
+        lvFiles = self.window.ui.lvFiles
+        filesModel = lvFiles.model()
+        self.assertEqual(filesModel.rowCount(), 2)
+
+        for row in range(filesModel.rowCount()):
+            index = filesModel.index(row, 0)
+            if filesModel.data(index) == subRepoFile:
+                lvFiles.selectionModel().select(
+                    index, QItemSelectionModel.ClearAndSelect)
+                break
+
+        spyFinished = QSignalSpy(self.window._submoduleExecutor.finished)
+        with patch.object(self.window, "clearModels") as mock_clear, \
+                patch.object(self.window, "_onStatusAvailable") as mock_status:
+            QTest.mouseClick(self.window.ui.tbStage, Qt.LeftButton)
+            self.wait(10000, lambda: spyFinished.count() == 0)
+            mock_clear.assert_not_called()
+            mock_status.assert_not_called()
+
+        stagedModel = self.window.ui.lvStaged.model()
+        self.assertEqual(stagedModel.rowCount(), 1)
+        self.assertEqual(subRepoFile, stagedModel.data(stagedModel.index(0, 0)))
+        self.assertEqual(filesModel.rowCount(), 1)
+        self.assertEqual("test.txt", filesModel.data(filesModel.index(0, 0)))
+
     def testOptions(self):
         self.waitForLoaded()
 
@@ -259,10 +297,9 @@ class TestCommitWindow(TestBase):
 
         with patch("PySide6.QtWidgets.QMessageBox.critical") as mock_critical:
             spyFinished = QSignalSpy(self.window._commitExecutor.finished)
-            spyReload = QSignalSpy(self.window._statusFetcher.finished)
             QTest.mouseClick(self.window.ui.btnCommit, Qt.LeftButton)
             self.wait(10000, lambda: spyFinished.count() == 0)
-            self.wait(10000, lambda: spyReload.count() == 0)
+            self.processEvents()
             mock_critical.assert_not_called()
             self.assertEqual(
                 self.window.ui.stackedWidget.currentWidget(), self.window.ui.pageProgress)
@@ -308,12 +345,56 @@ class TestCommitWindow(TestBase):
             self.window._onCommitFinished()
 
             self.assertFalse(self.window.ui.cbAmend.isChecked())
-            mock_reload.assert_called_once()
+            # the committed repos update the models with status deltas
+            mock_reload.assert_not_called()
             mock_update_status.assert_called_once_with(False)
             self.assertEqual(mock_post_event.call_count, 1)
             posted_event = mock_post_event.call_args[0][1]
             self.assertIsInstance(posted_event, LocalChangesCommittedEvent)
 
+    def testCommitFinishedReloadAfterCommittedActions(self):
+        self.waitForLoaded()
+
+        self.window._committedActions = [MagicMock()]
+        with patch.object(self.window, "reloadLocalChanges") as mock_reload, \
+                patch.object(self.window._commitExecutor, "submit") as mock_submit, \
+                patch.object(self.app, "postEvent"):
+            self.window._onCommitFinished()
+            mock_submit.assert_called_once()
+            mock_reload.assert_not_called()
+
+            self.window._onCommitFinished()
+            mock_reload.assert_called_once()
+
+    def testCommitUpdatesStatusDelta(self):
+        self.waitForLoaded()
+
+        with open(os.path.join(self.gitDir.name, "test.txt"), "w+") as f:
+            f.write("test")
+        with open(os.path.join(self.gitDir.name, "README.md"), "a+") as f:
+            f.write("# new line\n")
+        Git.addFiles(repoDir=self.gitDir.name, files=["README.md"])
+
+        QTest.mouseClick(self.window.ui.tbRefresh, Qt.LeftButton)
+        self.waitForLoaded()
+
+        self.assertEqual(self.window._stagedModel.rowCount(), 1)
+        self.assertEqual(self.window._filesModel.rowCount(), 1)
+
+        self.window.ui.teMessage.clear()
+        self.window.ui.teMessage.insertPlainText("Update README.md")
+        spyFinished = QSignalSpy(self.window._commitExecutor.finished)
+        with patch.object(self.window, "clearModels") as mock_clear:
+            self.window._onCommitClicked()
+            self.wait(10000, lambda: spyFinished.count() == 0)
+            self.processEvents()
+            mock_clear.assert_not_called()
+
+        self.assertEqual(self.window._stagedModel.rowCount(), 0)
+        self.assertEqual(self.window._filesModel.rowCount(), 1)
+        self.assertEqual(self.window._filesModel.data(
+            self.window._filesModel.index(0, 0)), "test.txt")
+
     def testCodeReview(self):
         self.waitForLoaded()
 
@@ -403,6 +484,7 @@ class TestCommitWindow(TestBase):
         mock_model.queryAsync = mock.MagicMock()
         mock_model.isLocal.return_value = False
         mock_model.modelId = "test-model"
+        mock_model.getModelCapabilities.return_value = AiModelCapabilities()
 
         # Mock lazy model creation to return our mock model
         with patch('qgitc.llmprovider.AiModelProvider.createSpecificModel', return_value=mock_model), \
@@ -435,7 +517,7 @@ class TestCommitWindow(TestBase):
             chatWidget: AiChatWidget = chatWindow.centralWidget()
             # Prevent agent loop from starting - mock model can't handle
             # queryAsync properly, causing the thread to hang on close
-            with patch.object(chatWidget, '_doRequest'):
+            with patch.object(chatWidget, '_doRequest') as mockDoRequest:
                 chatWindow.codeReviewForStagedFiles(test_event.submodules)
                 spyFinished = QSignalSpy(chatWidget._codeReviewExecutor.finished)
 
@@ -453,6 +535,8 @@ class TestCommitWindow(TestBase):
                 model = chatWidget.currentChatModel()
                 self.assertIsNotNone(model)
                 self.assertEqual(model.modelId, "test-model")
+                # the review is sent in one request
+                mockDoRequest.assert_called_once()
 
             chatWindow.close()
 
@@ -1332,6 +1416,20 @@ class TestCommitWindow(TestBase):
         self.assertGreater(viewer.textLineCount(), 0)
         self.assertEqual(len(viewer._highlightFind), 3)
 
+    def testCommittedStatusOfSubRepo(self):
+        self.waitForLoaded()
+        cancelEvent = CancelEvent(QThread.currentThread())
+
+        with patch.object(self.window._statusFetcher, "fetchStatusDelta") as fetch:
+            self.window._fetchCommittedStatus("subRepo", cancelEvent)
+        # the main repo status changes with the submodule commit
+        self.assertEqual([call("subRepo", cancelEvent), call(".", cancelEvent)],
+                         fetch.call_args_list)
+
+        with patch.object(self.window._statusFetcher, "fetchStatusDelta") as fetch:
+            self.window._fetchCommittedStatus(".", cancelEvent)
+        fetch.assert_called_once_with(".", cancelEvent)
+
 
 class TestHideUntrackedFiles(TestBase):
     """Test suite for hide untracked files feature"""
@@ -1,7 +1,14 @@
 import os
 import unittest
+from datetime import datetime
 
-from qgitc.common import extractFilePaths, isRevisionRange, pathsEqual
+from qgitc.common import (
+    Commit,
+    LazyCommit,
+    extractFilePaths,
+    isRevisionRange,
+    pathsEqual,
+)
 
 
 class TestCommon(unittest.TestCase):
@@ -105,3 +112,63 @@ class TestCommon(unittest.TestCase):
             with self.subTest(path1=path1, path2=path2):
                 self.assertEqual(pathsEqual(path1, path2), expected,
                                  f"pathsEqual({path1!r}, {path2!r}) should be {expected}")
+
+
+class TestLazyCommit(unittest.TestCase):
+
+    def setUp(self):
+        sha1 = "1" * 40
+        self.raw = "\x01".join([
+            sha1, "Subject\n\nBody\n", "foo <foo@bar.com>",
+            "2025-01-02 10:00:00 +0800", "bar <bar@foo.com>",
+            "2025-01-03 11:00:00 +0800", "2" * 40 + " " + "3" * 40])
+        self.dateTime = datetime(2025, 1, 3, 11)
+
+    def testFields(self):
+        commit = LazyCommit(self.raw.encode("utf-8"), "sub", self.dateTime)
+        self.assertEqual("1" * 40, commit.sha1)
+        self.assertEqual([], commit.subCommits)
+        self.assertIsNone(commit.children)
+        self.assertFalse(commit.isMaterialized())
+
+        expected = Commit.fromRawString(self.raw)
+        self.assertEqual(expected.comments, commit.comments)
+        self.assertTrue(commit.isMaterialized())
+        self.assertEqual(expected.author, commit.author)
+        self.assertEqual(expected.committerDate, commit.committerDate)
+        self.assertEqual(expected.parents, commit.parents)
+        self.assertEqual("sub", commit.repoDir)
+
+        with self.assertRaises(AttributeError):
+            commit.foo
+
+    def testRelease(self):
+        commit = LazyCommit(self.raw.encode("utf-8"), "sub", self.dateTime)
+        subCommit = LazyCommit(self.raw.encode("utf-8"), ".", self.dateTime)
+        commit.subCommits.append(subCommit)
+        commit.children = [subCommit]
+        comments = commit.comments
+
+        commit.release()
+        self.assertFalse(commit.isMaterialized())
+        self.assertIsNone(commit.children)
+        self.assertEqual([subCommit], commit.subCommits)
+        self.assertEqual(comments, commit.comments)
+
+    def testParentSha1s(self):
+        commit = LazyCommit(self.raw.encode("utf-8"), "sub", self.dateTime)
+        self.assertEqual(["2" * 40, "3" * 40], commit.parentSha1s())
+        self.assertFalse(commit.isMaterialized())
+
+        commit.parents = ["4" * 40]
+        self.assertEqual(["4" * 40], commit.parentSha1s())
+
+    def testMergeKey(self):
+        commit = LazyCommit(self.raw.encode("utf-8"), "sub", self.dateTime)
+        key = commit.mergeKey()
+        self.assertFalse(commit.isMaterialized())
+
+        expected = Commit.fromRawString(self.raw)
+        expected.committerDateTime = self.dateTime
+        self.assertEqual(expected.mergeKey(), key)
+        self.assertEqual(key, commit.mergeKey())
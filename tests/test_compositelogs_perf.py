@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Memory of the commits of the composite logs.
+
+The commits of every repo shown in composite mode were parsed into full
+`Commit` objects when fetched, although only the painted rows are read.
+"""
+import tracemalloc
+
+from PySide6.QtTest import QTest
+
+from qgitc.common import LazyCommit
+from qgitc.gitutils import Git
+from qgitc.logsfetcherimpl import LogsFetcherImpl
+from qgitc.logview import LogView
+from tests.base import TestBase
+
+_COMMIT_COUNT = 50000
+
+# The commits kept as raw records must take at most this part of the memory
+_MAX_MEMORY_RATIO = 0.7
+
+
+def _makeLogs(count: int):
+    records = []
+    for i in range(count):
+        author = f"Author {i % 13} <author{i % 13}@example.com>"
+        date = f"2025-{i % 12 + 1:02}-{i % 28 + 1:02} 12:00:00 +0800"
+        records.append("\x01".join([
+            f"{i + 1:040x}",
+            f"Fix issue #{i} in module {i % 37}\n\nLonger description {i}\n",
+            author, date, author, date,
+            f"{i + 2:040x}" if i + 1 < count else ""]))
+    return "\0".join(records).encode("utf-8")
+
+
+def _parsedMemory(parse, data: bytes):
+    tracemalloc.start()
+    try:
+        commits = parse(data, b'\0', "subRepo")
+        memory, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return memory, commits
+
+
+class TestCompositeLogsPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def testMemory(self):
+        data = _makeLogs(_COMMIT_COUNT)
+        fullMemory, commits = _parsedMemory(LogsFetcherImpl.parseLogs, data)
+        del commits
+
+        lazyMemory, commits = _parsedMemory(
+            LogsFetcherImpl.parseLazyLogs, data)
+        self.assertEqual(_COMMIT_COUNT, len(commits))
+        self.assertLess(lazyMemory, fullMemory * _MAX_MEMORY_RATIO)
+
+    def testScrollReleasesCommits(self):
+        Git.REF_MAP = {}
+        view = LogView()
+        view.resize(1000, 800)
+        view.show()
+        QTest.qWaitForWindowExposed(view)
+
+        view.data = LogsFetcherImpl.parseLazyLogs(
+            _makeLogs(_COMMIT_COUNT), b'\0', "subRepo")
+        view.updateGeometries()
+
+        vScrollBar = view.verticalScrollBar()
+        pageStep = vScrollBar.pageStep()
+        for line in range(0, _COMMIT_COUNT // 4, pageStep):
+            vScrollBar.setValue(line)
+            view.viewport().repaint()
+
+        # only the rows painted lately are read
+        materialized = sum(commit.isMaterialized() for commit in view.data)
+        self.assertGreater(materialized, 0)
+        self.assertLessEqual(materialized, 4096 + pageStep)
+
+        view.close()
+        self.processEvents()
+
+    def testSelectKeepsCommitsLazy(self):
+        Git.REF_MAP = {}
+        view = LogView()
+        view.resize(1000, 800)
+        view.show()
+        QTest.qWaitForWindowExposed(view)
+
+        view.data = LogsFetcherImpl.parseLazyLogs(
+            _makeLogs(_COMMIT_COUNT), b'\0', "subRepo")
+        view.updateGeometries()
+
+        index = _COMMIT_COUNT - 10
+        view.setCurrentIndex(index)
+        commit = view.data[index]
+        self.assertEqual([view.data[index - 1]], commit.children)
+
+        # the rows above are scanned for the children without reading them
+        materialized = sum(commit.isMaterialized() for commit in view.data)
+        self.assertLessEqual(materialized, 4096)
+
+        view.close()
+        self.processEvents()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+import os
+import unittest
+from unittest.mock import patch
+
+from qgitc.diffcache import DiffCache, diffCache
+from qgitc.difffetcher import DiffFetcher
+from qgitc.gitutils import Git, GitProcess
+from tests.base import TestBase
+
+SHA1_A = "a" * 40
+SHA1_B = "b" * 40
+SHA1_C = "c" * 40
+
+
+class TestDiffCache(unittest.TestCase):
+
+    def testMakeKey(self):
+        self.assertIsNone(DiffCache.makeKey("/repo", Git.LCC_SHA1))
+        self.assertIsNone(DiffCache.makeKey("/repo", Git.LUC_SHA1))
+        self.assertIsNone(DiffCache.makeKey("/repo", "HEAD"))
+        self.assertIsNone(DiffCache.makeKey("/repo", "abc1234"))
+        self.assertIsNone(DiffCache.makeKey("/repo", None))
+        self.assertIsNone(DiffCache.makeKey(None, SHA1_A))
+
+        key = DiffCache.makeKey("/repo", SHA1_A, ["a.txt"], ["-w"])
+        self.assertEqual(key, DiffCache.makeKey(
+            "/repo/", SHA1_A, ("a.txt",), ("-w",)))
+        self.assertNotEqual(key, DiffCache.makeKey("/repo", SHA1_A))
+        self.assertNotEqual(key, DiffCache.makeKey("/other", SHA1_A))
+
+    def testLru(self):
+        cache = DiffCache(maxEntries=2)
+        keyA = DiffCache.makeKey("/repo", SHA1_A)
+        keyB = DiffCache.makeKey("/repo", SHA1_B)
+        keyC = DiffCache.makeKey("/repo", SHA1_C)
+
+        cache.put(keyA, b"a")
+        cache.put(keyB, b"b")
+        # touch A so that B is the least recently used
+        self.assertEqual(cache.get(keyA), b"a")
+        cache.put(keyC, b"c")
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(keyA), b"a")
+        self.assertIsNone(cache.get(keyB))
+        self.assertEqual(cache.get(keyC), b"c")
+
+    def testByteBudget(self):
+        cache = DiffCache(maxBytes=10, maxEntryBytes=8)
+        keyA = DiffCache.makeKey("/repo", SHA1_A)
+        keyB = DiffCache.makeKey("/repo", SHA1_B)
+        keyC = DiffCache.makeKey("/repo", SHA1_C)
+
+        cache.put(keyA, b"1234")
+        cache.put(keyB, b"123456")
+        self.assertEqual(len(cache), 2)
+
+        # too large for a single entry
+        cache.put(keyC, b"123456789")
+        self.assertIsNone(cache.get(keyC))
+
+        cache.put(keyC, b"12")
+        self.assertIsNone(cache.get(keyA))
+        self.assertEqual(cache.get(keyB), b"123456")
+        self.assertEqual(cache.get(keyC), b"12")
+
+        # empty and uncacheable diffs are ignored
+        cache.put(keyA, b"")
+        cache.put(None, b"data")
+        self.assertEqual(len(cache), 2)
+
+
+class TestDiffCacheFetch(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        diffCache().clear()
+
+    def tearDown(self):
+        diffCache().clear()
+        super().tearDown()
+
+    def _fetch(self, fetcher: DiffFetcher, sha1: str):
+        lines = []
+        finished = []
+        fetcher.diffAvailable.connect(
+            lambda lineItems, _: lines.extend(lineItems))
+        fetcher.fetchFinished.connect(finished.append)
+        fetcher.cwd = self.gitDir.name
+        fetcher.resetRow(0)
+        fetcher.fetch(sha1, None, None)
+        self.wait(5000, lambda: not finished)
+        self.assertEqual(finished, [0])
+        return lines
+
+    def testCommitRawDiffCached(self):
+        sha1 = Git.checkOutput(["rev-parse", "HEAD"]).rstrip().decode()
+
+        with patch.object(GitProcess, "communicate", autospec=True,
+                          side_effect=GitProcess.communicate) as communicate:
+            diff = Git.commitRawDiff(sha1, repoDir=self.gitDir.name)
+            self.assertIn(b"test.py", diff)
+            self.assertEqual(communicate.call_count, 1)
+
+            self.assertEqual(
+                diff, Git.commitRawDiff(sha1, repoDir=self.gitDir.name))
+            self.assertEqual(communicate.call_count, 1)
+
+            # local changes are never cached
+            with open(os.path.join(self.gitDir.name, "test.py"), "a") as f:
+                f.write("print('foo')\n")
+            Git.commitRawDiff(Git.LUC_SHA1, repoDir=self.gitDir.name)
+            Git.commitRawDiff(Git.LUC_SHA1, repoDir=self.gitDir.name)
+            self.assertEqual(communicate.call_count, 3)
+
+    def testDiffFetcherUsesCache(self):
+        sha1 = Git.checkOutput(["rev-parse", "HEAD"]).rstrip().decode()
+
+        fetcher = DiffFetcher()
+        fetcher.separator = b'\n'
+        lines = self._fetch(fetcher, sha1)
+        self.assertTrue(lines)
+        self.assertIsNotNone(
+            diffCache().get(DiffCache.makeKey(self.gitDir.name, sha1)))
+
+        fetcher2 = DiffFetcher()
+        fetcher2.separator = b'\n'
+        with patch.object(fetcher2, "_ensureProcess") as ensureProcess:
+            self.assertEqual(lines, self._fetch(fetcher2, sha1))
+            ensureProcess.assert_not_called()
+
+    def testCancelCachedFetch(self):
+        sha1 = Git.checkOutput(["rev-parse", "HEAD"]).rstrip().decode()
+        self.assertIsNotNone(Git.commitRawDiff(sha1, repoDir=self.gitDir.name))
+
+        fetcher = DiffFetcher()
+        finished = []
+        fetcher.fetchFinished.connect(finished.append)
+        fetcher.cwd = self.gitDir.name
+        fetcher.fetch(sha1, None, None)
+        fetcher.cancel()
+        self.wait(100)
+        self.assertEqual(finished, [])
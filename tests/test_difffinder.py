@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from qgitc.common import FIND_NOTFOUND, FindField, FindParameter
+from qgitc.difffinder import DiffFinder, FindResult
+from tests.base import TestBase
+
+
+class TestFindResult(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def testAdd(self):
+        result = FindResult()
+        self.assertFalse(result)
+
+        result.add([5, 1, 9])
+        result.add([3, 5, 7])
+        self.assertEqual(5, len(result))
+        self.assertIn(3, result)
+        self.assertNotIn(4, result)
+        self.assertEqual([1, 3, 5, 7, 9], result.sortedRows())
+
+        result.add([0])
+        self.assertEqual([0, 1, 3, 5, 7, 9], list(result))
+
+        result.clear()
+        self.assertFalse(result)
+        self.assertEqual([], result.sortedRows())
+
+    def testRemap(self):
+        result = FindResult()
+        result.add([5, 1, 9])
+        result.remap(lambda row: -1 if row == 5 else row + 2)
+        self.assertEqual([3, 11], list(result))
+        self.assertNotIn(5, result)
+
+
+class TestDiffFinder(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.finder = DiffFinder(None)
+        self.finder._sha1IndexMap = {f"{i:040x}": i for i in range(100)}
+
+    def _addResult(self, rows):
+        self.finder._onResultAvailable([f"{i:040x}" for i in rows])
+
+    def _nextResult(self, start, stop):
+        step = 1 if start <= stop else -1
+        self.finder._param = FindParameter(
+            range(start, stop, step), "foo", FindField.Changes, 0)
+        return self.finder.nextResult()
+
+    def testNextResult(self):
+        self.assertEqual(FIND_NOTFOUND, self._nextResult(0, 100))
+
+        self._addResult([50, 10])
+        self._addResult([30])
+        self.assertIn(30, self.finder.findResult)
+
+        self.assertEqual(10, self._nextResult(0, 100))
+        self.assertEqual(30, self._nextResult(11, 100))
+        self.assertEqual(30, self._nextResult(30, 100))
+        self.assertEqual(FIND_NOTFOUND, self._nextResult(51, 100))
+
+        # find backward
+        self.assertEqual(30, self._nextResult(49, -1))
+        self.assertEqual(50, self._nextResult(99, -1))
+        self.assertEqual(FIND_NOTFOUND, self._nextResult(9, -1))
+
+    def testRemapRows(self):
+        self._addResult([50, 10])
+        self.finder.remapRows(lambda row: -1 if row == 50 else row + 1)
+        self.assertEqual([11], list(self.finder.findResult))
+
+        # the commits removed are ignored when found
+        self._addResult([50, 20])
+        self.assertEqual([11, 21], list(self.finder.findResult))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Performance of the find results of the log with many hits.
+
+The rows found were kept in a list: each hit was inserted by `insort` and
+each painted row was looked up by a linear scan.
+"""
+import random
+import time
+
+from qgitc.common import FindField, FindParameter
+from qgitc.difffinder import DiffFinder
+from tests.base import TestBase
+
+_COMMIT_COUNT = 200000
+_HIT_COUNT = 50000
+
+# Budget to receive all the hits
+_ADD_MAX_MS = 2000
+
+# Budget to paint 1000 frames of 40 rows and find the next hit each time
+_NAVIGATE_MAX_MS = 2000
+
+
+class TestDiffFinderPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.finder = DiffFinder(None)
+        sha1s = [f"{i:040x}" for i in range(_COMMIT_COUNT)]
+        self.finder._sha1IndexMap = {sha1: i for i, sha1 in enumerate(sha1s)}
+
+        # the hits of several repos are interleaved
+        random.seed(0)
+        hits = random.sample(sha1s, _HIT_COUNT)
+        self.batches = [hits[i:i + 500] for i in range(0, len(hits), 500)]
+
+    def _time_ms(self, fn):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, result
+
+    def testAddResult(self):
+        def _add():
+            for batch in self.batches:
+                self.finder._onResultAvailable(batch)
+
+        elapsed, _ = self._time_ms(_add)
+        self.assertLess(elapsed, _ADD_MAX_MS)
+        self.assertEqual(_HIT_COUNT, len(self.finder.findResult))
+
+    def testNavigate(self):
+        result = self.finder.findResult
+        # more hits come while navigating
+        batches = iter(self.batches)
+
+        def _navigate():
+            found = 0
+            for frame in range(1000):
+                batch = next(batches, None)
+                if batch:
+                    self.finder._onResultAvailable(batch)
+
+                first = frame * 150
+                for row in range(first, first + 40):
+                    if row in result:
+                        found += 1
+
+                self.finder._param = FindParameter(
+                    range(first, _COMMIT_COUNT), "foo", FindField.Changes, 0)
+                self.finder.nextResult()
+            return found
+
+        elapsed, found = self._time_ms(_navigate)
+        self.assertLess(elapsed, _NAVIGATE_MAX_MS)
+        self.assertGreater(found, 0)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from qgitc.filestatus import StatusFileListModel
+from tests.base import TestBase
+
+
+class TestStatusFileListModel(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def _files(self, model: StatusFileListModel):
+        files = []
+        for row in range(model.rowCount()):
+            index = model.index(row, 0)
+            files.append((model.data(index),
+                          model.data(index, StatusFileListModel.RepoDirRole),
+                          model.data(index, StatusFileListModel.StatusCodeRole)))
+        return files
+
+    def testUpdateRepoFiles(self):
+        model = StatusFileListModel()
+        model.addFile("a.txt", ".", "M")
+        model.addFile("sub/b.txt", "sub", "M")
+        model.addFile("c.txt", ".", "M")
+        model.addFile("d.txt", ".", "?")
+        model.addFile("sub/e.txt", "sub", "A")
+
+        changedRows = []
+        model.dataChanged.connect(
+            lambda first, last: changedRows.append(first.row()))
+
+        model.updateRepoFiles(".", [
+            ("c.txt", "D", None),
+            ("f.txt", "A", None),
+        ])
+
+        self.assertEqual(self._files(model), [
+            ("sub/b.txt", "sub", "M"),
+            ("c.txt", ".", "D"),
+            ("sub/e.txt", "sub", "A"),
+            ("f.txt", ".", "A"),
+        ])
+        self.assertEqual(changedRows, [2])
+
+    def testUpdateRepoFilesMainRepoAlias(self):
+        model = StatusFileListModel()
+        model.addFile("a.txt", ".", "M")
+        model.addFile("b.txt", ".", "M")
+
+        model.updateRepoFiles(None, [("b.txt", "M", None)])
+        self.assertEqual(self._files(model), [("b.txt", ".", "M")])
+
+        model.updateRepoFiles("", [])
+        self.assertEqual(model.rowCount(), 0)
@@ -1,6 +1,7 @@
 import os
+from unittest.mock import patch
 
-from qgitc.gitutils import Git
+from qgitc.gitutils import Git, GitProcess, Ref
 from tests.base import TestBase
 
 
@@ -226,3 +227,82 @@ class TestGitUtils(TestBase):
         self.assertIn("a.txt", filesToRestore)
         self.assertNotIn("b.txt", filesToRestore)
         self.assertEqual(len(filesToRestore), 1)
+
+    def testAddFilesPathspecFromFile(self):
+        files = ["file{}.txt".format(i) for i in range(100)]
+        files.append("with space.txt")
+        for file in files:
+            with open(file, "w", encoding="utf-8") as f:
+                f.write(file)
+
+        with patch.object(GitProcess, "communicate", autospec=True,
+                          side_effect=GitProcess.communicate) as mock_process:
+            self.assertIsNone(Git.addFiles(None, files))
+            self.assertEqual(mock_process.call_count, 1)
+
+        status = Git.status(self.gitDir.name).decode("utf-8")
+        for file in files:
+            self.assertIn("A  " + file, status)
+
+        error, filesToRestore = Git.restoreStagedFiles(None, files)
+        self.assertIsNone(error)
+        self.assertEqual(filesToRestore, [])
+
+        status = Git.status(self.gitDir.name).decode("utf-8")
+        for file in files:
+            self.assertIn("?? " + file, status)
+
+    def testAddFilesWithoutPathspecFromFile(self):
+        files = ["file{}.txt".format(i) for i in range(10)]
+        for file in files:
+            with open(file, "w", encoding="utf-8") as f:
+                f.write(file)
+
+        with patch.object(Git, "supportsPathspecFromFile", return_value=False), \
+                patch.object(Git, "MAX_PATHSPEC_ARGS_LENGTH", 30), \
+                patch.object(GitProcess, "communicate", autospec=True,
+                             side_effect=GitProcess.communicate) as mock_process:
+            self.assertIsNone(Git.addFiles(None, files))
+            # 10 bytes for each file
+            self.assertEqual(mock_process.call_count, 4)
+
+        status = Git.status(self.gitDir.name).decode("utf-8")
+        for file in files:
+            self.assertIn("A  " + file, status)
+
+    def testLoadRefs(self):
+        Git.checkOutput(["tag", "-a", "v1.0", "-m", "v1.0"])
+        Git.checkOutput(["tag", "v1.1", "HEAD~1"])
+        Git.checkOutput(["branch", "feature"])
+        Git.checkOutput(["update-ref", "refs/remotes/origin/main", "HEAD"])
+        Git.checkOutput(["symbolic-ref", "refs/remotes/origin/HEAD",
+                         "refs/remotes/origin/main"])
+
+        refs = Git.loadRefs()
+        self.assertEqual(["feature", "main", "remotes/origin/main"],
+                         refs.branches)
+        self.assertEqual("main", refs.currentBranch)
+        self.assertEqual(Git.revHead(), refs.revHead)
+
+        # same refs as `git show-ref -d`
+        showRefs = Git.refs()
+        self.assertEqual(set(showRefs.keys()), set(refs.refMap.keys()))
+        for sha1, refList in showRefs.items():
+            self.assertEqual(
+                sorted((ref.type, ref.name) for ref in refList),
+                sorted((ref.type, ref.name) for ref in refs.refMap[sha1]))
+
+        headRefs = [(ref.type, ref.name) for ref in refs.refMap[refs.revHead]]
+        self.assertIn((Ref.TAG, "v1.0"), headRefs)
+        self.assertIn((Ref.REMOTE, "origin/main"), headRefs)
+
+    def testLoadRefsDetached(self):
+        Git.checkOutput(["checkout", "-q", "--detach", "HEAD~1"])
+        sha1 = Git.revHead()
+
+        refs = Git.loadRefs()
+        detached = "(HEAD detached at {0})".format(sha1[:7])
+        self.assertEqual([detached, "main"], refs.branches)
+        self.assertEqual(detached, refs.currentBranch)
+        self.assertEqual(sha1, refs.revHead)
+
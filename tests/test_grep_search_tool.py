@@ -3,10 +3,13 @@
 import os
 import tempfile
 import unittest
+from contextlib import contextmanager
 from pathlib import Path
 from typing import List
+from unittest.mock import patch
 
-from qgitc.agent.tools.grep_search import grepSearch
+from qgitc.agent.tools import grep_search
+from qgitc.agent.tools.grep_search import TrigramIndex, grepSearch, trigramIndex
 from qgitc.gitutils import Git, GitProcess
 
 
@@ -16,6 +19,16 @@ class TestGrepSearchTool(unittest.TestCase):
         super().setUp()
         GitProcess.GIT_BIN = "git"
 
+    @contextmanager
+    def _tempDir(self):
+        with tempfile.TemporaryDirectory() as td:
+            try:
+                yield td
+            finally:
+                # the index may still be saved into the repo
+                for index in list(grep_search._indexes.values()):
+                    index.waitForBuilder()
+
     def _git(self, repoDir: str, args: List[str]) -> None:
         process = Git.run(args, repoDir=repoDir, text=True)
         out, err = process.communicate()
@@ -31,7 +44,7 @@ class TestGrepSearchTool(unittest.TestCase):
         return path
 
     def test_plain_text_search_case_insensitive(self):
-        with tempfile.TemporaryDirectory() as td:
+        with self._tempDir() as td:
             self._write(td, 'a.txt', b'Hello World\nnope\n')
             self._write(td, 'sub/b.txt', b'say hello again\n')
 
@@ -41,7 +54,7 @@ class TestGrepSearchTool(unittest.TestCase):
             self.assertIn('Matches:', out)
 
     def test_regex_search(self):
-        with tempfile.TemporaryDirectory() as td:
+        with self._tempDir() as td:
             self._write(td, 'a.txt', b'abc123\nABC999\nzzz\n')
 
             out = grepSearch(repoDir=td, query=r'abc\d+', isRegexp=True)
@@ -50,7 +63,7 @@ class TestGrepSearchTool(unittest.TestCase):
             self.assertIn('a.txt:2:', out)
 
     def test_include_pattern_limits_files(self):
-        with tempfile.TemporaryDirectory() as td:
+        with self._tempDir() as td:
             self._write(td, 'a.txt', b'needle\n')
             self._write(td, 'b.md', b'needle\n')
             self._write(td, 'sub/c.txt', b'needle\n')
@@ -66,7 +79,7 @@ class TestGrepSearchTool(unittest.TestCase):
             self.assertNotIn('sub/c.txt:1:', out)
 
     def test_max_results_truncates(self):
-        with tempfile.TemporaryDirectory() as td:
+        with self._tempDir() as td:
             # 10 matching lines
             self._write(td, 'a.txt', b"".join([b'hit\n' for _ in range(10)]))
 
@@ -80,7 +93,7 @@ class TestGrepSearchTool(unittest.TestCase):
             self.assertIn('Truncated: true', out)
 
     def test_skips_binary_files(self):
-        with tempfile.TemporaryDirectory() as td:
+        with self._tempDir() as td:
             self._write(td, 'bin.dat', b'hello\x00world\n')
             self._write(td, 'a.txt', b'hello\n')
 
@@ -89,7 +102,7 @@ class TestGrepSearchTool(unittest.TestCase):
             self.assertNotIn('bin.dat', out)
 
     def test_respects_gitignore_by_default(self):
-        with tempfile.TemporaryDirectory() as tmp:
+        with self._tempDir() as tmp:
             repoDir = str(Path(tmp))
 
             self._git(repoDir, ["init"])
@@ -109,7 +122,7 @@ class TestGrepSearchTool(unittest.TestCase):
             self.assertNotIn("ignored.txt", result)
 
     def test_include_ignored_files_option(self):
-        with tempfile.TemporaryDirectory() as tmp:
+        with self._tempDir() as tmp:
             repoDir = str(Path(tmp))
 
             self._git(repoDir, ["init"])
@@ -131,7 +144,7 @@ class TestGrepSearchTool(unittest.TestCase):
             self.assertIn("ignored.txt", result)
 
     def test_git_worktree_dotgit_is_file(self):
-        with tempfile.TemporaryDirectory() as tmp:
+        with self._tempDir() as tmp:
             tmpPath = Path(tmp)
             mainRepo = tmpPath / "main"
             worktreeRepo = tmpPath / "worktree"
@@ -173,3 +186,161 @@ class TestGrepSearchTool(unittest.TestCase):
                 includeIgnoredFiles=True,
             )
             self.assertIn("ignored.txt", outInclude)
+
+    def _initRepo(self, repoDir: str):
+        self._git(repoDir, ["init"])
+        self._git(repoDir, ["config", "user.email", "test@example.com"])
+        self._git(repoDir, ["config", "user.name", "Test"])
+
+    def test_git_grep_searches_untracked_files(self):
+        with self._tempDir() as repoDir:
+            self._initRepo(repoDir)
+            self._write(repoDir, 'tracked.txt', b'Needle one\r\n')
+            self._write(repoDir, 'sub/new.md', b'x\nneedle two\n')
+            self._git(repoDir, ["add", "tracked.txt"])
+
+            with patch.object(grep_search, "_scanFiles",
+                              side_effect=grep_search._scanFiles) as scanFiles:
+                out = grepSearch(repoDir=repoDir, query='NEEDLE',
+                                 isRegexp=False)
+                scanFiles.assert_not_called()
+
+            self.assertIn('tracked.txt:1: Needle one\n', out)
+            self.assertIn('sub/new.md:2: needle two', out)
+            self.assertIn('Matches: 2 | Files: 2', out)
+
+            out = grepSearch(repoDir=repoDir, query='needle',
+                             isRegexp=False, includePattern='**/*.md')
+            self.assertNotIn('tracked.txt', out)
+            self.assertIn('sub/new.md:2:', out)
+
+            out = grepSearch(repoDir=repoDir, query=r'needle\s+t\w+',
+                             isRegexp=True)
+            self.assertEqual('sub/new.md:2: needle two', out.split('\n')[0])
+
+    def test_git_grep_stops_at_max_results(self):
+        with self._tempDir() as repoDir:
+            self._initRepo(repoDir)
+            for i in range(5):
+                self._write(repoDir, f'{i}.txt', b'hit\n' * 100)
+
+            out = grepSearch(repoDir=repoDir, query='hit',
+                             isRegexp=False, maxResults=3)
+            self.assertEqual(3, out.count(': hit'))
+            self.assertIn('Matches: 3 | Files: 1 | Truncated: true', out)
+
+    def test_fallback_when_git_grep_fails(self):
+        with self._tempDir() as repoDir:
+            self._initRepo(repoDir)
+            self._write(repoDir, 'a.txt', b'Hello\n')
+
+            with patch.object(grep_search, "_gitGrep", return_value=None):
+                out = grepSearch(repoDir=repoDir, query='hello',
+                                 isRegexp=False)
+            self.assertIn('a.txt:1: Hello', out)
+            self.assertIn('Scanned files:', out)
+
+    def test_fallback_numbers_lines_as_git_grep(self):
+        with self._tempDir() as repoDir:
+            self._initRepo(repoDir)
+            # CR, form feeds and line separators do not end a line
+            self._write(repoDir, 'a.txt',
+                        'a\rb\x0cc\u2028d\r\nHello\r\n'.encode('utf-8'))
+
+            out = grepSearch(repoDir=repoDir, query='hello', isRegexp=False)
+            self.assertIn('a.txt:2: Hello', out)
+
+            with patch.object(grep_search, "_gitGrep", return_value=None):
+                out = grepSearch(repoDir=repoDir, query='hello',
+                                 isRegexp=False)
+            self.assertIn('a.txt:2: Hello', out)
+            self.assertIn('Scanned files:', out)
+
+    def test_scanner_encodings(self):
+        with self._tempDir() as td:
+            self._write(td, 'bom.txt', 'x\nHello 世界\n'.encode('utf-8-sig'))
+            self._write(td, 'gbk.txt', 'hello 世界\n'.encode('gb18030'))
+            self._write(td, 'empty.txt', b'')
+
+            out = grepSearch(repoDir=td, query='hello', isRegexp=False)
+            self.assertIn('bom.txt:2: Hello 世界', out)
+            self.assertIn('gbk.txt:1:', out)
+
+            out = grepSearch(repoDir=td, query='世界', isRegexp=False)
+            self.assertIn('bom.txt:2:', out)
+            self.assertIn('gbk.txt:1:', out)
+
+    def test_scanner_keeps_file_order(self):
+        with self._tempDir() as td:
+            for i in range(100):
+                self._write(td, f'f{i:03}.txt', b'no\nhit\n')
+
+            out = grepSearch(repoDir=td, query='hit',
+                             isRegexp=False, maxResults=50)
+            files = [line.split(':')[0] for line in out.split('\n')[:50]]
+            self.assertEqual([f'f{i:03}.txt' for i in range(50)], files)
+            self.assertIn('Truncated: true', out)
+
+    def test_trigram_index_skips_files(self):
+        with self._tempDir() as td:
+            self._write(td, 'a.txt', b'def findLinks(self):\n')
+            self._write(td, 'b.txt', b'nothing here\n')
+            self._write(td, 'bin.dat', b'findLinks\x00')
+
+            out = grepSearch(repoDir=td, query='findlinks', isRegexp=False)
+            self.assertIn('a.txt:1:', out)
+            self.assertIn('Scanned files: 2 | Skipped files: 1', out)
+
+            index = trigramIndex(td)
+            index.waitForBuilder()
+            self.assertEqual(3, len(index))
+
+            # indexed files that can't match are not read anymore
+            with patch.object(grep_search, "detectBom",
+                              side_effect=grep_search.detectBom) as detectBom:
+                out = grepSearch(repoDir=td, query='FindLinks', isRegexp=False)
+                self.assertIn('a.txt:1:', out)
+                detectBom.assert_called_once_with(os.path.join(td, 'a.txt'))
+
+                # a modified file is scanned again
+                self._write(td, 'b.txt', b'findLinks too\n')
+                out = grepSearch(repoDir=td, query='findLinks', isRegexp=False)
+                self.assertIn('b.txt:1: findLinks too', out)
+
+            os.remove(os.path.join(td, 'b.txt'))
+            grepSearch(repoDir=td, query='findLinks', isRegexp=False)
+            index.waitForBuilder()
+            self.assertEqual(2, len(index))
+
+    def test_trigram_index_persisted(self):
+        with self._tempDir() as repoDir, self._tempDir() as dataDir:
+            self._initRepo(repoDir)
+            Path(repoDir, ".gitignore").write_text("out/\n", encoding="utf-8")
+            self._write(repoDir, 'out/gen.txt', b'generated needle\n')
+
+            path = os.path.join(dataDir, "grep-trigrams.db")
+            grep_search.setTrigramIndexFile(path)
+            try:
+                out = grepSearch(repoDir=repoDir, query='needle',
+                                 isRegexp=False, includeIgnoredFiles=True)
+                trigramIndex(repoDir).waitForBuilder()
+            finally:
+                grep_search.setTrigramIndexFile(None)
+            self.assertIn('out/gen.txt:1:', out)
+
+            self.assertTrue(os.path.isfile(path))
+            # nothing is written into the repo
+            self.assertFalse(os.path.exists(
+                os.path.join(repoDir, ".git", "qgitc")))
+
+            # the indexes of other trees are kept apart
+            self.assertEqual(0, len(TrigramIndex(dataDir, path)))
+
+            index = TrigramIndex(os.path.abspath(repoDir), path)
+            st = os.stat(os.path.join(repoDir, 'out', 'gen.txt'))
+            entry = index.lookup('out/gen.txt', st.st_mtime_ns, st.st_size)
+            self.assertIsNotNone(entry)
+            self.assertTrue(index.makeQuery(b'needle')(*entry))
+            self.assertFalse(index.makeQuery(b'qwerty')(*entry))
+            self.assertIsNone(index.lookup(
+                'out/gen.txt', st.st_mtime_ns + 1, st.st_size))
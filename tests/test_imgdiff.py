@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QColor, QImage, QPainter, QPixmap
+
+from mergetool import diffengine
+from mergetool.diffengine import DIFF_COLOR, diffImages, mergeImages
+from mergetool.imgdiff import DiffWindow
+from tests.base import TestBase
+
+
+def makeImage(width, height, color=0xFF112233, rects=(), format=QImage.Format_ARGB32):
+    image = QImage(width, height, format)
+    image.fill(color)
+    painter = QPainter(image)
+    for rect, rectColor in rects:
+        painter.fillRect(rect, QColor.fromRgba(rectColor))
+    painter.end()
+    return image
+
+
+class _DiffEngineTests:
+
+    def testIdentical(self):
+        image = makeImage(64, 48)
+        difference = diffImages(image, image.copy())
+        self.assertTrue(difference.isIdentical())
+        self.assertEqual(1.0, difference.similarity())
+        self.assertEqual([], difference.regions())
+
+        # same pixels in another format
+        difference = diffImages(image, makeImage(
+            64, 48, format=QImage.Format_RGB32))
+        self.assertTrue(difference.isIdentical())
+
+    def testRegions(self):
+        base = makeImage(200, 150)
+        changed = makeImage(200, 150, rects=[
+            (QRect(10, 5, 20, 10), 0xFF00FF00),
+            # crosses the tiles boundaries
+            (QRect(100, 60, 40, 50), 0xFFFF00FF),
+        ])
+        changed.setPixel(199, 149, 0xFF000000)
+
+        difference = diffImages(base, changed)
+        self.assertEqual(200 + 2000 + 1, difference.changedPixels())
+        self.assertAlmostEqual(1 - 2201 / 30000, difference.similarity())
+        self.assertEqual([QRect(10, 5, 20, 10), QRect(100, 60, 40, 50),
+                          QRect(199, 149, 1, 1)], difference.regions())
+
+        mask = difference.maskImage()
+        self.assertEqual(QImage.Format_ARGB32, mask.format())
+        self.assertEqual(DIFF_COLOR, mask.pixel(10, 5))
+        self.assertEqual(DIFF_COLOR, mask.pixel(199, 149))
+        self.assertEqual(0, mask.pixel(9, 5))
+        self.assertEqual(0, mask.pixel(0, 0))
+
+    def testOddWidth(self):
+        base = makeImage(101, 70)
+        changed = base.copy()
+        changed.setPixel(100, 0, 0xFF000000)
+        changed.setPixel(0, 69, 0xFF000000)
+        changed.setPixel(1, 69, 0xFF000001)
+
+        difference = diffImages(QPixmap.fromImage(base), changed)
+        self.assertEqual(3, difference.changedPixels())
+        self.assertEqual([QRect(100, 0, 1, 1), QRect(0, 69, 2, 1)],
+                         difference.regions())
+
+    def testSizeMismatch(self):
+        difference = diffImages(makeImage(10, 20), makeImage(30, 5))
+        self.assertFalse(difference.sizeMatched())
+        self.assertEqual(0.0, difference.similarity())
+        self.assertEqual([QRect(0, 0, 30, 20)], difference.regions())
+        self.assertEqual(DIFF_COLOR, difference.maskImage().pixel(0, 0))
+
+    def testMerge(self):
+        base = makeImage(100, 80)
+        ours = makeImage(100, 80, rects=[(QRect(0, 0, 10, 10), 0xFF00FF00),
+                                         (QRect(50, 50, 5, 5), 0xFF0000FF)])
+        theirs = makeImage(100, 80, rects=[(QRect(60, 0, 10, 10), 0xFFFF0000),
+                                           (QRect(50, 50, 5, 5), 0xFF0000FF)])
+
+        merge = mergeImages(base, ours, theirs)
+        self.assertFalse(merge.hasConflicts())
+        self.assertEqual([], merge.conflicts())
+        image = merge.image()
+        self.assertEqual(0xFF00FF00, image.pixel(0, 0))
+        self.assertEqual(0xFFFF0000, image.pixel(69, 9))
+        self.assertEqual(0xFF0000FF, image.pixel(52, 52))
+        self.assertEqual(0xFF112233, image.pixel(30, 30))
+        # inputs are not modified
+        self.assertEqual(0xFF112233, base.pixel(0, 0))
+
+    def testMergeConflicts(self):
+        base = makeImage(100, 80)
+        ours = makeImage(100, 80, rects=[(QRect(20, 20, 30, 30), 0xFF00FF00)])
+        theirs = makeImage(100, 80, rects=[(QRect(40, 40, 30, 30), 0xFFFF0000)])
+
+        merge = mergeImages(base, ours, theirs)
+        self.assertTrue(merge.hasConflicts())
+        self.assertEqual(100, merge.conflictPixels())
+        self.assertEqual([QRect(40, 40, 10, 10)], merge.conflicts())
+        image = merge.image()
+        # ours wins in the conflicts
+        self.assertEqual(0xFF00FF00, image.pixel(45, 45))
+        self.assertEqual(0xFFFF0000, image.pixel(60, 60))
+
+        self.assertIsNone(mergeImages(base, ours, makeImage(10, 10)))
+
+
+class TestBufferDiffEngine(_DiffEngineTests, TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(diffengine, "HAVE_NUMPY", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@unittest.skipUnless(diffengine.HAVE_NUMPY, "numpy is not installed")
+class TestNumpyDiffEngine(_DiffEngineTests, TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+
+class TestDiffWindow(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempDir.cleanup)
+
+    def _save(self, name, image):
+        path = os.path.join(self.tempDir.name, name)
+        self.assertTrue(image.save(path))
+        return path
+
+    def testShowDifferenceAndAutoMerge(self):
+        base = makeImage(64, 64)
+        pathA = self._save("a.png", base)
+        pathB = self._save("b.png", makeImage(
+            64, 64, rects=[(QRect(0, 0, 8, 8), 0xFF00FF00)]))
+        pathC = self._save("c.png", makeImage(
+            64, 64, rects=[(QRect(40, 40, 8, 8), 0xFFFF0000)]))
+        pathO = self._save("o.png", base)
+
+        window = DiffWindow()
+        window.diff(pathA, pathB, pathC, pathO)
+        window.setBase("A")
+        diffView = window.diffView()
+
+        differences = diffView.showDifference(True)
+        self.assertEqual([diffView.imageB, diffView.imageC],
+                         [viewer for viewer, _ in differences])
+        self.assertEqual([QRect(0, 0, 8, 8)], differences[0][1].regions())
+        self.assertEqual([QRect(40, 40, 8, 8)], differences[1][1].regions())
+        self.assertEqual(diffView.imageA.viewImage, diffView.imageA.orgImage)
+        self.assertNotEqual(diffView.imageB.viewImage.toImage(),
+                            diffView.imageB.orgImage.toImage())
+        self.assertEqual([], diffView.showDifference(False))
+        self.assertEqual(diffView.imageB.viewImage, diffView.imageB.orgImage)
+
+        merge = diffView.autoMerge()
+        self.assertFalse(merge.hasConflicts())
+        output = diffView.getImageO().toImage()
+        self.assertEqual(0xFF00FF00, output.pixel(0, 0))
+        self.assertEqual(0xFFFF0000, output.pixel(47, 47))
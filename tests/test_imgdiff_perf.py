@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Performance of the imgdiff difference engine on 8K x 8K images.
+
+Screenshots and textures are compared through the raw pixel buffers of the
+images, with numpy when available. Without numpy the buffer backend only
+looks pixel by pixel at the rows that differ, so it is benchmarked with
+sparse changes.
+"""
+import time
+import unittest
+from unittest.mock import patch
+
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QImage
+
+from mergetool import diffengine
+from mergetool.diffengine import diffImages, mergeImages
+from tests.base import TestBase
+from tests.test_imgdiff import makeImage
+
+_SIZE = 8192
+
+# Budget to diff two images, with the regions and the mask image
+_NUMPY_DIFF_MAX_MS = 1000
+_BUFFER_DIFF_MAX_MS = 3000
+
+# Budget of a three-way merge
+_NUMPY_MERGE_MAX_MS = 1500
+_BUFFER_MERGE_MAX_MS = 6000
+
+
+class TestImageDiffPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.base = makeImage(_SIZE, _SIZE)
+        self.ours = makeImage(_SIZE, _SIZE, rects=[
+            (QRect(i * 400, i * 400, 120, 80), 0xFF00FF00) for i in range(20)])
+        self.theirs = makeImage(_SIZE, _SIZE, rects=[
+            (QRect(100, 7000, 300, 300), 0xFF0000FF)])
+
+    def _diff(self, imageB: QImage, regions: int):
+        start = time.perf_counter()
+        difference = diffImages(self.base, imageB)
+        self.assertEqual(regions, len(difference.regions()))
+        difference.maskImage()
+        return (time.perf_counter() - start) * 1000
+
+    def _merge(self):
+        start = time.perf_counter()
+        merge = mergeImages(self.base, self.ours, self.theirs)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.assertFalse(merge.hasConflicts())
+        self.assertEqual(0xFF0000FF, merge.image().pixel(100, 7000))
+        return elapsed
+
+    @unittest.skipUnless(diffengine.HAVE_NUMPY, "numpy is not installed")
+    def test_numpy(self):
+        elapsed = self._diff(self.ours, 20)
+        self.assertLess(elapsed, _NUMPY_DIFF_MAX_MS,
+                        f"diff took {elapsed:.0f}ms (limit {_NUMPY_DIFF_MAX_MS}ms)")
+
+        elapsed = self._diff(makeImage(_SIZE, _SIZE, 0xFF000000), 1)
+        self.assertLess(elapsed, _NUMPY_DIFF_MAX_MS,
+                        f"diff of all pixels took {elapsed:.0f}ms (limit {_NUMPY_DIFF_MAX_MS}ms)")
+
+        elapsed = self._merge()
+        self.assertLess(elapsed, _NUMPY_MERGE_MAX_MS,
+                        f"merge took {elapsed:.0f}ms (limit {_NUMPY_MERGE_MAX_MS}ms)")
+
+    def test_buffer(self):
+        with patch.object(diffengine, "HAVE_NUMPY", False):
+            elapsed = self._diff(self.ours, 20)
+            self.assertLess(elapsed, _BUFFER_DIFF_MAX_MS,
+                            f"diff took {elapsed:.0f}ms (limit {_BUFFER_DIFF_MAX_MS}ms)")
+
+            elapsed = self._merge()
+            self.assertLess(elapsed, _BUFFER_MERGE_MAX_MS,
+                            f"merge took {elapsed:.0f}ms (limit {_BUFFER_MERGE_MAX_MS}ms)")
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Streaming throughput of AiModelBase.
+
+Replays recorded SSE streams through MockQNetworkReply with the chunking a
+batching proxy produces (few very large chunks), which used to make the
+stream buffer quadratic.
+"""
+import json
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from PySide6.QtCore import QByteArray
+
+from qgitc.llm import AiModelBase, AiResponse, SseDecoder, decodeJsonBatch
+from tests.base import TestBase
+from tests.mockqnetworkreply import MockQNetworkReply
+
+# Time budget to stream a recording of about 2MB
+_STREAM_MAX_MS = 3000
+
+
+class _DummyModel(AiModelBase):
+
+    @property
+    def name(self):
+        return "dummy"
+
+
+def _recordStream(reasoningDeltas: int, contentDeltas: int, lineEnd=b"\n"):
+    events = [{"choices": [{"index": 0, "delta": {"role": "assistant"}}]}]
+    for i in range(reasoningDeltas):
+        events.append({"choices": [{"index": 0, "delta": {
+            "reasoning_content": f"thinking step {i} about the change, "}}]})
+    for i in range(contentDeltas):
+        events.append({"choices": [{"index": 0, "delta": {
+            "content": f"word{i} "}}]})
+    events.append({"choices": [{"index": 0, "delta": {},
+                   "finish_reason": "stop"}]})
+
+    delimiter = lineEnd * 2
+    data = b"".join(b"data: " + json.dumps(evt).encode() + delimiter
+                    for evt in events)
+    data += b": ping - 2025-01-01 00:00:00" + delimiter
+    data += b"data: [DONE]" + delimiter
+    return data
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestSseDecoder(unittest.TestCase):
+
+    def _decode(self, chunks):
+        decoder = SseDecoder()
+        events = []
+        for chunk in chunks:
+            events.extend(decoder.feed(chunk))
+        return events, decoder
+
+    def testEvents(self):
+        data = b"data: 1\n\ndata: 2\r\n\r\nevent: x\ndata: 3\n\n\n\ndata: 4"
+        expected = [b"data: 1", b"data: 2", b"event: x\ndata: 3"]
+
+        events, decoder = self._decode([data])
+        self.assertEqual(expected, events)
+        self.assertEqual(b"data: 4", decoder.pending())
+
+        # the result never depends on the chunking
+        for size in range(1, 8):
+            events, decoder = self._decode(_chunks(data, size))
+            self.assertEqual(expected, events, size)
+            self.assertEqual(b"data: 4", decoder.pending())
+
+    def testCompact(self):
+        event = b"data: " + b"x" * 1000
+        data = (event + b"\n\n") * 200 + b"data: tail"
+
+        events, decoder = self._decode(_chunks(data, 4096))
+        self.assertEqual([event] * 200, events)
+        self.assertEqual(b"data: tail", decoder.pending())
+        self.assertLess(len(decoder._buffer), 2 * SseDecoder.COMPACT_SIZE)
+
+        events = decoder.feed(b"\n\n")
+        self.assertEqual([b"data: tail"], events)
+        self.assertEqual(b"", decoder.pending())
+        self.assertEqual(0, len(decoder._buffer))
+
+    def testDecodeJsonBatch(self):
+        self.assertEqual([{"a": 1}, [2], None, 3],
+                         decodeJsonBatch([b'{"a": 1}', b'[2]', b'{bad', b'3']))
+        # valid in an array but not alone
+        self.assertEqual([None, 3], decodeJsonBatch([b'1,2', b'3']))
+        self.assertEqual([], decodeJsonBatch([]))
+
+
+class TestLlmStreamPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def _replay(self, data: bytes, chunkSize: int):
+        model = _DummyModel(url="http://example.invalid")
+        model._isStreaming = True
+
+        chunks = [QByteArray(c) for c in _chunks(data, chunkSize)]
+        reply = MockQNetworkReply(data)
+        # one more read for the readyRead scheduled by the mock
+        reply.readAll = MagicMock(side_effect=chunks + [QByteArray()])
+        model._initReply(reply)
+
+        content = []
+        reasoning = []
+
+        def _onResponse(response: AiResponse):
+            if response.message:
+                content.append(response.message)
+            if response.reasoning:
+                reasoning.append(response.reasoning)
+
+        model.responseAvailable.connect(_onResponse)
+
+        start = time.perf_counter()
+        for _ in chunks:
+            model._onDataReady()
+        elapsed = (time.perf_counter() - start) * 1000
+
+        self.wait(1000, lambda: model._reply is not None)
+        return model, elapsed, "".join(content), reasoning
+
+    def _check(self, model: AiModelBase, content: str, reasoning: list):
+        self.assertEqual(20000, len(reasoning))
+        self.assertTrue(content.startswith("word0 word1 "))
+        self.assertTrue(content.endswith("word1999 "))
+        self.assertEqual(1, len(model.history))
+        self.assertEqual(content, model.history[0].message)
+
+    def test_stream_large_chunks(self):
+        data = _recordStream(20000, 2000)
+        self.assertGreater(len(data), 2 * 1024 * 1024)
+
+        model, elapsed, content, reasoning = self._replay(data, len(data))
+        self._check(model, content, reasoning)
+        self.assertLess(elapsed, _STREAM_MAX_MS,
+                        f"streaming took {elapsed:.0f}ms in a single chunk (limit {_STREAM_MAX_MS}ms)")
+
+        model, elapsed, content, reasoning = self._replay(data, 512 * 1024)
+        self._check(model, content, reasoning)
+        self.assertLess(elapsed, _STREAM_MAX_MS,
+                        f"streaming took {elapsed:.0f}ms in 512KB chunks (limit {_STREAM_MAX_MS}ms)")
+
+    def test_stream_crlf_small_chunks(self):
+        data = _recordStream(20000, 2000, lineEnd=b"\r\n")
+
+        model, elapsed, content, reasoning = self._replay(data, 1000)
+        self._check(model, content, reasoning)
+        self.assertLess(elapsed, _STREAM_MAX_MS,
+                        f"streaming took {elapsed:.0f}ms in 1KB chunks (limit {_STREAM_MAX_MS}ms)")
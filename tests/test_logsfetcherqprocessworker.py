@@ -5,7 +5,7 @@ from unittest.mock import patch
 from PySide6.QtCore import QThread
 from PySide6.QtTest import QSignalSpy
 
-from qgitc.common import Commit
+from qgitc.common import Commit, LazyCommit
 from qgitc.gitutils import Git
 from qgitc.logsfetcherimpl import LogsFetcherImpl
 from qgitc.logsfetcherqprocessworker import LogsFetcherQProcessWorker
@@ -35,6 +35,14 @@ class TestLogsFetcherQProcessWorker(TestBase):
         self.assertIsInstance(logs, list)
         self.assertEqual(len(logs), 3)
 
+        # the commits are read when needed
+        self.assertIsInstance(logs[0], LazyCommit)
+        self.assertFalse(logs[0].isMaterialized())
+        self.assertEqual(logs[0].comments, "Add .gitignore")
+        self.assertEqual({".", "subRepo"},
+                         {logs[1].repoDir, logs[1].subCommits[0].repoDir})
+        self.assertEqual(logs[1].comments, logs[1].subCommits[0].comments)
+
         self.assertEqual(spyLocalChangesAvailable.count(), 1)
         lccCommit: Commit = spyLocalChangesAvailable.at(0)[0]
         lucCommit: Commit = spyLocalChangesAvailable.at(0)[1]
@@ -52,6 +52,7 @@ class TestLogViewDragDrop(TestBase):
         delayTimer = self.window._delayTimer
         self.wait(10000, delayTimer.isActive)
         self.wait(10000, lambda: spySubmodule.count() == 0)
+        self.wait(10000, self.window.isLoadingRefs)
 
         self.wait(10000, self.logview.fetcher.isLoading)
         self.wait(50)
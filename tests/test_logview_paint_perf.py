@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Frame time of scrolling a large log.
+
+Every visible row used to be measured and formatted again on each repaint:
+the author regex, the date and subject splits, the bounding rect of each
+tag and the highlight pattern.
+"""
+import re
+import time
+
+from PySide6.QtTest import QTest
+
+from qgitc.common import Commit
+from qgitc.gitutils import Git
+from qgitc.logview import LogView
+from tests.base import TestBase
+
+_COMMIT_COUNT = 20000
+
+# Budget of a frame once the rows were painted once
+_FRAME_MAX_MS = 30
+
+
+def _makeCommits(count: int):
+    commits = []
+    for i in range(count):
+        commit = Commit(
+            sha1=f"{i + 1:040x}",
+            comments=f"Fix issue #{i} in module {i % 37}\n\nLonger description {i}",
+            author=f"Author {i % 13} <author{i % 13}@example.com>",
+            authorDate=f"2025-{i % 12 + 1:02}-{i % 28 + 1:02} 12:00:00 +0800",
+            parents=[f"{i + 2:040x}"] if i + 1 < count else [])
+        commits.append(commit)
+    return commits
+
+
+class TestLogViewPaintPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        Git.REF_MAP = {}
+        self.view = LogView()
+        self.view.resize(1000, 800)
+        self.view.show()
+        QTest.qWaitForWindowExposed(self.view)
+
+        self.view.data = _makeCommits(_COMMIT_COUNT)
+        self.view.updateGeometries()
+
+    def tearDown(self):
+        self.view.close()
+        self.processEvents()
+        super().tearDown()
+
+    def _scroll(self, first: int, last: int):
+        """Scroll from line @first to @last one line per frame, return the
+        mean frame time"""
+        vScrollBar = self.view.verticalScrollBar()
+        start = time.perf_counter()
+        for line in range(first, last):
+            vScrollBar.setValue(line)
+            self.view.viewport().repaint()
+        return (time.perf_counter() - start) * 1000 / (last - first)
+
+    def _scrollFrameTime(self):
+        # paint the rows once, so that the lanes are computed
+        self._scroll(0, 100)
+        return min(self._scroll(0, 100) for _ in range(2))
+
+    def testScroll(self):
+        frameMs = self._scrollFrameTime()
+        self.assertLess(frameMs, _FRAME_MAX_MS)
+
+    def testScrollHighlight(self):
+        self.view.highlightKeyword(re.compile("issue|module"))
+        frameMs = self._scrollFrameTime()
+        self.assertLess(frameMs, _FRAME_MAX_MS)
+
+    def testRenderCache(self):
+        self.view.viewport().repaint()
+        rows = self.view._rows
+        self.assertIn(0, rows)
+        self.assertEqual("Author 0", rows[0].authorName)
+        self.assertEqual("Fix issue #0 in module 0", rows[0].message)
+
+        # a row whose commit was replaced
+        oldCommit = self.view.data[0]
+        commit = Commit(sha1=oldCommit.sha1, comments="Amended\n\nbody",
+                        author=oldCommit.author, parents=oldCommit.parents)
+        self.view.data[0] = commit
+        self.view.viewport().repaint()
+        self.assertIs(commit, rows[0].commit)
+        self.assertEqual("Amended", rows[0].message)
+
+        self.view.updateSettings()
+        self.assertEqual({}, self.view._rows)
+        self.assertEqual({}, self.view._tagTexts)
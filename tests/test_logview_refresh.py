@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import os
+
+from qgitc.gitutils import Git
+from qgitc.logview import LogView, MarkType
+from tests.base import TestBase
+
+
+class TestLogViewRefresh(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.view = LogView()
+        self.view.showLogs("main", self.gitDir.name)
+        self._waitForLogs()
+        self.assertEqual(["Add test.py", "Initial commit"],
+                         self._comments())
+
+    def tearDown(self):
+        self.view.queryClose()
+        self.view.close()
+        self.processEvents()
+        super().tearDown()
+
+    def _waitForLogs(self):
+        self.wait(10000, self.view.fetcher.isLoading)
+        self.processEvents()
+
+    def _refresh(self):
+        self.assertTrue(self.view.refreshLogs())
+        self._waitForLogs()
+
+    def _comments(self):
+        return [commit.comments.rstrip('\n') for commit in self.view.data]
+
+    def _commitFile(self, name, message):
+        with open(os.path.join(self.gitDir.name, name), "w") as f:
+            f.write(message)
+        Git.addFiles(repoDir=self.gitDir.name, files=[name])
+        Git.commit(message, repoDir=self.gitDir.name)
+
+    def testNewCommits(self):
+        oldCommits = list(self.view.data)
+        self.view.setCurrentIndex(1)
+        self.view.marker.mark(0, 1, MarkType.PICKED)
+
+        self._commitFile("foo.txt", "Add foo.txt")
+        self._commitFile("bar.txt", "Add bar.txt")
+        self._refresh()
+
+        self.assertEqual(["Add bar.txt", "Add foo.txt", "Add test.py",
+                          "Initial commit"], self._comments())
+        # the loaded commits are kept
+        self.assertIs(oldCommits[0], self.view.data[2])
+        self.assertIs(oldCommits[1], self.view.data[3])
+
+        self.assertEqual(3, self.view.currentIndex())
+        self.assertEqual([3], self.view.getSelectedIndices())
+        self.assertEqual([2, 3], self.view.marker.getMarkedIndices())
+        self.assertEqual(MarkType.PICKED, self.view.marker.getMarkType(2))
+
+        # the children are found again when needed
+        self.view.setCurrentIndex(2)
+        self.assertEqual([self.view.data[1]], oldCommits[0].children)
+
+    def testNothingNew(self):
+        oldCommits = list(self.view.data)
+        self._refresh()
+        self.assertEqual(oldCommits, self.view.data)
+        self.assertIs(oldCommits[0], self.view.data[0])
+
+    def testLocalChanges(self):
+        self.view.setCurrentIndex(1)
+
+        with open(os.path.join(self.gitDir.name, "test.py"), "a") as f:
+            f.write("# changed\n")
+        self._refresh()
+
+        self.assertEqual(Git.LUC_SHA1, self.view.data[0].sha1)
+        self.assertEqual(3, len(self.view.data))
+        self.assertEqual(2, self.view.currentIndex())
+
+        Git.addFiles(repoDir=self.gitDir.name, files=["test.py"])
+        Git.commit("Change test.py", repoDir=self.gitDir.name)
+        self._refresh()
+
+        self.assertEqual(["Change test.py", "Add test.py", "Initial commit"],
+                         self._comments())
+        self.assertEqual(2, self.view.currentIndex())
+
+    def testRewrite(self):
+        oldCommits = list(self.view.data)
+        self.view.setCurrentIndex(0)
+        self.view.marker.mark(0, 1)
+
+        # the loaded tip is replaced
+        Git.commit("Amended", amend=True, repoDir=self.gitDir.name)
+        self._refresh()
+        self.assertEqual(["Amended", "Initial commit"], self._comments())
+        self.assertIs(oldCommits[1], self.view.data[1])
+
+        # the current commit is gone
+        self.assertEqual(0, self.view.currentIndex())
+        self.assertEqual([1], self.view.marker.getMarkedIndices())
+
+        Git.checkOutput(["reset", "--hard", "HEAD~1"], repoDir=self.gitDir.name)
+        self._refresh()
+        self.assertEqual(["Initial commit"], self._comments())
+        self.assertIs(oldCommits[1], self.view.data[0])
+        self.assertEqual([0], self.view.marker.getMarkedIndices())
+
+    def testReloadFallback(self):
+        self.view.showLogs("main", self.gitDir.name, ["--", "README.md"])
+        self._waitForLogs()
+        self.assertFalse(self.view.refreshLogs())
+
+        self._commitFile("README.md", "Update README.md")
+        self.view.reloadLogs()
+        self._waitForLogs()
+        self.assertEqual(["Update README.md", "Initial commit"],
+                         self._comments())
@@ -36,6 +36,7 @@ class TestLogWindowBase(TestBase):
         delayTimer = self.window._delayTimer
         self.wait(10000, delayTimer.isActive)
         self.wait(10000, lambda: spySubmodule.count() == 0)
+        self.wait(10000, self.window.isLoadingRefs)
 
         logview = self.window.ui.gitViewA.ui.logView
         self.wait(10000, logview.fetcher.isLoading)
@@ -492,3 +493,7 @@ class TestLogWindowCompositeMode2(TestLogWindowBase):
 
         self.assertTrue(not Git.REF_MAP)
         self.assertTrue(not Git.REV_HEAD)
+
+        # the refs of each repo are loaded instead
+        self.wait(10000, self.window._submoduleRefsLoader.isLoading)
+        self.assertEqual({".", "subRepo"}, set(Git.SUBMODULE_REFS.keys()))
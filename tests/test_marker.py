@@ -280,3 +280,14 @@ class TestMarker(unittest.TestCase):
         self.assertFalse(self.marker.isMarked(15))
         self.assertTrue(self.marker.isMarked(19))
         self.assertTrue(self.marker.isMarked(20))
+
+    def test_remap(self):
+        """Test moving the marks along with their rows"""
+        self.marker.mark(0, 4)
+        self.marker.mark(8, 8, MarkType.PICKED)
+
+        # row 2 removed, the others moved down by 3 rows
+        self.marker.remap(lambda index: -1 if index == 2 else index + 3)
+        self.assertEqual([3, 4, 6, 7, 11], self.marker.getMarkedIndices())
+        self.assertFalse(self.marker.isMarked(5))
+        self.assertEqual(MarkType.PICKED, self.marker.getMarkType(11))
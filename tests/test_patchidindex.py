@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import os
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from PySide6.QtCore import QThread
+
+from qgitc.cancelevent import CancelEvent
+from qgitc.gitutils import Git
+from qgitc.patchidindex import MEMORY_DB, PatchIdDb, PatchIdIndex
+from tests.base import TestBase
+
+
+class TestPatchIdIndex(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.index = PatchIdIndex()
+
+    def tearDown(self):
+        self.index.cancel(True)
+        self.index.db().close()
+        super().tearDown()
+
+    def _git(self, *args):
+        return Git.checkOutput(list(args), text=True,
+                               repoDir=self.gitDir.name).strip()
+
+    def _commitFile(self, name, message):
+        with open(os.path.join(self.gitDir.name, name), "w") as f:
+            f.write(message)
+        Git.addFiles(repoDir=self.gitDir.name, files=[name])
+        Git.commit(message, repoDir=self.gitDir.name)
+        return self._git("rev-parse", "HEAD")
+
+    def _build(self):
+        self.index.build(self.gitDir.name, ["dev", "--not", "main"],
+                         ["main", "--not", "dev"])
+        self.assertTrue(self.index.isBuilding())
+        self.wait(10000, self.index.isBuilding)
+        self.assertTrue(self.index.isReady())
+
+    def testApplied(self):
+        self._git("checkout", "-b", "dev")
+        picked = self._commitFile("foo.txt", "Add foo.txt")
+        remade = self._commitFile("bar.txt", "Add bar.txt")
+        notApplied = self._commitFile("baz.txt", "Add baz.txt")
+
+        self._git("checkout", "main")
+        self._git("cherry-pick", "-x", picked)
+        pick = self._git("rev-parse", "HEAD")
+        # the same change made again
+        self._commitFile("bar.txt", "Add bar.txt")
+
+        self._build()
+        self.assertTrue(self.index.isApplied(picked))
+        self.assertEqual([pick], self.index.equivalents(picked))
+        self.assertEqual([picked], self.index.equivalents(pick))
+        self.assertTrue(self.index.isApplied(remade))
+        self.assertFalse(self.index.isApplied(notApplied))
+        self.assertEqual([], self.index.equivalents(notApplied))
+        # only the source commits are applied
+        self.assertFalse(self.index.isApplied(pick))
+
+    def testAppliedThenReverted(self):
+        self._git("checkout", "-b", "dev")
+        sha1 = self._commitFile("foo.txt", "Add foo.txt")
+
+        self._git("checkout", "main")
+        self._commitFile("bar.txt", "Add bar.txt")
+        self._git("cherry-pick", sha1)
+        self._build()
+        self.assertTrue(self.index.isApplied(sha1))
+
+        self._git("revert", "--no-edit", "HEAD")
+        self._build()
+        self.assertFalse(self.index.isApplied(sha1))
+
+    def testRevertedLater(self):
+        self._git("checkout", "-b", "dev")
+        sha1 = self._commitFile("foo.txt", "Add foo.txt")
+        self._git("revert", "--no-edit", sha1)
+        revert = self._git("rev-parse", "HEAD")
+        kept = self._commitFile("bar.txt", "Add bar.txt")
+
+        self._build()
+        self.assertEqual(revert, self.index.revertedBy(sha1))
+        self.assertIsNone(self.index.revertedBy(revert))
+        self.assertIsNone(self.index.revertedBy(kept))
+
+        # the revert is reverted
+        self._git("revert", "--no-edit", revert)
+        reapply = self._git("rev-parse", "HEAD")
+        self._build()
+        self.assertIsNone(self.index.revertedBy(sha1))
+        self.assertEqual(reapply, self.index.revertedBy(revert))
+
+    def testRevertedOnOtherBranch(self):
+        self._git("checkout", "-b", "dev")
+        sha1 = self._commitFile("foo.txt", "Add foo.txt")
+
+        self._git("checkout", "main")
+        self._commitFile("bar.txt", f"Drop foo\n\nThis reverts commit {sha1}.")
+        self._build()
+        # only a revert of the same branch counts
+        self.assertIsNone(self.index.revertedBy(sha1))
+
+    def testBatches(self):
+        self._git("checkout", "-b", "dev")
+        sha1s = [self._commitFile(f"{i}.txt", f"Add {i}.txt")
+                 for i in range(5)]
+        self._build()
+        patchIds = [self.index.patchId(sha1) for sha1 in sha1s]
+        self.assertEqual(5, len(set(patchIds)))
+
+        self.index.db().close()
+        self.index = PatchIdIndex()
+        with patch("qgitc.patchidindex._BATCH_SIZE", 2):
+            self._build()
+        self.assertEqual(patchIds,
+                         [self.index.patchId(sha1) for sha1 in sha1s])
+
+    def testBatchesWithoutCpuCount(self):
+        self._git("checkout", "-b", "dev")
+        sha1s = [self._commitFile(f"{i}.txt", f"Add {i}.txt")
+                 for i in range(3)]
+
+        data = (self.index.db(), ["dev", "--not", "main"], [])
+        with patch("qgitc.patchidindex._BATCH_SIZE", 2), \
+                patch("os.cpu_count", return_value=None):
+            results = PatchIdIndex._doBuild(
+                self.gitDir.name, data, CancelEvent(QThread()))
+        self.assertEqual(set(sha1s), set(results["patchIds"]))
+
+    def testClear(self):
+        self._git("checkout", "-b", "dev")
+        sha1 = self._commitFile("foo.txt", "Add foo.txt")
+        self._build()
+        self.assertIsNotNone(self.index.patchId(sha1))
+
+        self.index.clear()
+        self.assertFalse(self.index.isReady())
+        self.assertIsNone(self.index.patchId(sha1))
+
+    def testPersistentCache(self):
+        self._git("checkout", "-b", "dev")
+        sha1 = self._commitFile("foo.txt", "Add foo.txt")
+        self._git("commit", "--allow-empty", "-m", "Empty")
+        empty = self._git("rev-parse", "HEAD")
+
+        with TemporaryDirectory() as dataDir:
+            path = os.path.join(dataDir, "patchids.db")
+            self.index.db().close()
+            self.index = PatchIdIndex(db=PatchIdDb(path))
+            self._build()
+            self.assertTrue(self.index.db().isPersistent())
+            patchId = self.index.patchId(sha1)
+            self.assertIsNotNone(patchId)
+            self.index.db().close()
+
+            db = PatchIdDb(path)
+            # the commit without changes is not computed again
+            self.assertEqual({sha1: patchId, empty: ""},
+                             db.lookup([sha1, empty]))
+            db.close()
+
+    def testInvalidDbPath(self):
+        with TemporaryDirectory() as dataDir:
+            path = os.path.join(dataDir, "file")
+            with open(path, "w") as f:
+                f.write("")
+
+            db = PatchIdDb(os.path.join(path, "patchids.db"))
+            with self.assertLogs("qgitc", level="WARNING"):
+                self.assertFalse(db.isPersistent())
+            self.assertEqual(MEMORY_DB, db.path())
+            db.save({"1234": "5678"})
+            self.assertEqual({"1234": "5678"}, db.lookup(["1234", "abcd"]))
+            db.close()
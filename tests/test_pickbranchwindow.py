@@ -397,6 +397,72 @@ class TestPickBranchWindow(TestBase):
         markedCount = self.window.ui.logView.marker.countMarked()
         self.assertLess(markedCount, self.window.ui.logView.getCount())
 
+    def _loadDevCommits(self):
+        self.window._reloadBranches()
+        self._waitForBranchesLoaded()
+
+        devIndex = self.window.ui.cbSourceBranch.findText("dev")
+        mainIndex = self.window.ui.cbBaseBranch.findText("main")
+        self.window.ui.cbSourceBranch.setCurrentIndex(devIndex)
+        self.window.ui.cbBaseBranch.setCurrentIndex(mainIndex)
+        self.window.ui.cbTargetBranch.setCurrentIndex(mainIndex)
+        self.window._loadCommits()
+        self._waitForCommitsLoaded()
+        self.window._selectAllCommits()
+
+    def _markedComments(self):
+        logView = self.window.ui.logView
+        return [logView.getCommit(index).comments.strip()
+                for index in logView.marker.getMarkedIndices()]
+
+    def testFilterAppliedCommits(self):
+        """Test filtering commits already on the target branch"""
+        self._createTestBranches()
+        devSha1 = Git.checkOutput(
+            ["rev-parse", "dev~1"], text=True, repoDir=self.gitDir.name).strip()
+        with open(os.path.join(self.gitDir.name, "main.txt"), "w") as f:
+            f.write("main file")
+        Git.addFiles(repoDir=self.gitDir.name, files=["main.txt"])
+        Git.commit("Add main.txt", repoDir=self.gitDir.name)
+        Git.checkOutput(["cherry-pick", devSha1], repoDir=self.gitDir.name)
+
+        settings = self.app.settings()
+        settings.setApplyFilterByDefault(False)
+        self._loadDevCommits()
+        self.assertEqual(["Add dev2.txt", "Add dev.txt"],
+                         self._markedComments())
+
+        # Filtered again once the patch ids are known
+        self.window._filterCommits()
+        self.wait(5000, self.window._patchIdIndex.isBuilding)
+        self.processEvents()
+        self.assertEqual(["Add dev2.txt"], self._markedComments())
+
+        settings.setFilterAppliedCommits(False)
+        self.window._selectAllCommits()
+        self.window._filterCommits()
+        self.assertEqual(["Add dev2.txt", "Add dev.txt"],
+                         self._markedComments())
+
+    def testFilterRevertedLater(self):
+        """Test filtering commits reverted later"""
+        self._createTestBranches()
+        Git.checkOutput(["checkout", "dev"], repoDir=self.gitDir.name)
+        Git.checkOutput(["revert", "--no-edit", "HEAD~1"],
+                        repoDir=self.gitDir.name)
+        Git.checkOutput(["checkout", "main"], repoDir=self.gitDir.name)
+
+        settings = self.app.settings()
+        settings.setFilterRevertedCommits(True)
+
+        self._loadDevCommits()
+        self.wait(5000, self.window._patchIdIndex.isBuilding)
+        self.window._filterCommits()
+        self.processEvents()
+
+        # Both the revert and the reverted commit are not picked
+        self.assertEqual(["Add dev2.txt"], self._markedComments())
+
     def testOnCommitSelected(self):
         """Test commit selection shows diff"""
         self._createTestBranches()
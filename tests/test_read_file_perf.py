@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Performance of partial reads of large files by the read_file tool.
+
+The model usually asks for a few dozen lines of a huge log or generated
+source, which used to decode and split the whole file on every call.
+"""
+import json
+import os
+import tempfile
+import time
+
+from qgitc.agent.tools import read_file as readfile_tool
+from qgitc.agent.tools.read_file import buildReadFileOutput
+from tests.base import TestBase
+
+# Budget of a repeated partial read once the file is indexed
+_PARTIAL_READ_MAX_MS = 20
+
+# Budget to index the file on the first read
+_FIRST_READ_MAX_MS = 2000
+
+
+class TestReadFilePerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempDir.name, "big.log")
+        line = "2025-01-01 00:00:00 INFO worker {} processed the request\n"
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            for i in range(0, 600000, 1000):
+                f.write("".join(line.format(j) for j in range(i, i + 1000)))
+        readfile_tool._lineIndexes.clear()
+
+    def tearDown(self):
+        readfile_tool._lineIndexes.clear()
+        self.tempDir.cleanup()
+        super().tearDown()
+
+    def _read(self, startLine, endLine):
+        start = time.perf_counter()
+        ok, output = buildReadFileOutput(self.path, startLine, endLine)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.assertTrue(ok, output)
+
+        metaJson, content = output.split("\n<<<CONTENT>>>\n", 1)
+        meta = json.loads(metaJson[len("<<<METADATA>>>\n"):])
+        return elapsed, meta, content
+
+    def test_repeated_partial_reads(self):
+        self.assertGreater(os.path.getsize(self.path), 30 * 1024 * 1024)
+
+        elapsed, meta, content = self._read(10, 40)
+        self.assertLess(elapsed, _FIRST_READ_MAX_MS,
+                        f"first read took {elapsed:.0f}ms (limit {_FIRST_READ_MAX_MS}ms)")
+        self.assertEqual(600000, meta["totalLines"])
+        self.assertEqual(31, len(content.splitlines()))
+        self.assertIn("worker 9 processed", content.splitlines()[0])
+
+        for startLine in (10, 123456, 299990, 599990):
+            elapsed, meta, content = self._read(startLine, startLine + 30)
+            self.assertLess(elapsed, _PARTIAL_READ_MAX_MS,
+                            f"reading from line {startLine} took {elapsed:.0f}ms "
+                            f"(limit {_PARTIAL_READ_MAX_MS}ms)")
+            lines = content.splitlines()
+            self.assertIn(f"worker {startLine - 1} processed", lines[0])
+            self.assertEqual(min(startLine + 30, 600000), meta["endLine"])
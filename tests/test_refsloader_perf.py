@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Performance of loading the branches of a repo with many refs.
+
+The branches were read by `git branch -a` and the refs by `git show-ref -d`
+on the GUI thread, then added to the branch combobox one by one.
+"""
+import os
+import time
+
+from qgitc.branchlistmodel import BranchFilterModel, BranchListModel
+from qgitc.gitutils import Git
+from qgitc.refsloader import RefsLoader
+from tests.base import TestBase
+
+_BRANCH_COUNT = 20000
+_TAG_COUNT = 30000
+
+# Budget to read and parse all the refs
+_LOAD_MAX_MS = 1500
+
+# Budget to fill the model and filter it while typing
+_FILTER_MAX_MS = 500
+
+
+class TestRefsLoaderPerformance(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        sha1 = Git.revHead()
+        lines = ["# pack-refs with: peeled fully-peeled sorted "]
+        for i in range(_BRANCH_COUNT):
+            lines.append(f"{sha1} refs/remotes/origin/feature/branch-{i:05}")
+        for i in range(_TAG_COUNT):
+            lines.append(f"{sha1} refs/tags/release-{i:05}")
+        lines.sort()
+        with open(os.path.join(self.gitDir.name, ".git", "packed-refs"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _time_ms(self, fn):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, result
+
+    def testLoadRefs(self):
+        elapsed, refs = self._time_ms(lambda: Git.loadRefs(self.gitDir.name))
+        self.assertLess(elapsed, _LOAD_MAX_MS)
+
+        self.assertEqual(_BRANCH_COUNT + 1, len(refs.branches))
+        self.assertEqual(_BRANCH_COUNT + _TAG_COUNT + 1,
+                         len(refs.refMap[refs.revHead]))
+
+    def testLoaderThread(self):
+        loader = RefsLoader(self.gitDir.name)
+        loader.start()
+        # the GUI thread is free while loading
+        self.assertTrue(loader.isRunning())
+        self.wait(10000, lambda: not loader.isFinished())
+        self.assertIsNotNone(loader.refs)
+        self.assertEqual("main", loader.refs.currentBranch)
+
+    def testFilterModel(self):
+        refs = Git.loadRefs(self.gitDir.name)
+        model = BranchListModel()
+        filterModel = BranchFilterModel()
+        filterModel.setSourceModel(model)
+
+        def _fillAndType():
+            model.setBranches(refs.branches)
+            text = "branch-12345"
+            for i in range(7, len(text) + 1):
+                filterModel.setFilterText(text[:i])
+            return filterModel.rowCount()
+
+        elapsed, count = self._time_ms(_fillAndType)
+        self.assertLess(elapsed, _FILTER_MAX_MS)
+        self.assertEqual(1, count)
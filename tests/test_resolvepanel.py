@@ -1,9 +1,35 @@
 # -*- coding: utf-8 -*-
 
-from qgitc.resolver.enums import ResolveOutcomeStatus
+from unittest.mock import patch
+
+from PySide6.QtCore import QTimer
+
+from qgitc.resolver.enums import ResolveOperation, ResolveOutcomeStatus
+from qgitc.resolver.handlers.base import ResolveHandler
 from qgitc.resolver.models import ResolveOutcome
 from qgitc.resolver.resolvepanel import ResolvePanel
 from tests.base import TestBase
+from tests.test_resolver_trivial import createUnmergedFiles
+
+
+class _FakeHandler(ResolveHandler):
+
+    def __init__(self, tracker: dict, parent=None):
+        super().__init__(parent)
+        self._tracker = tracker
+
+    def start(self, ctx, services):
+        tracker = self._tracker
+        tracker["contexts"].append(ctx)
+        tracker["active"] += 1
+        tracker["maxActive"] = max(tracker["maxActive"], tracker["active"])
+        QTimer.singleShot(20, self._finish)
+
+    def _finish(self):
+        self._tracker["active"] -= 1
+        ok = self._tracker["ok"]
+        self.finished.emit(True, ResolveOutcome(
+            status=ResolveOutcomeStatus.RESOLVED if ok else ResolveOutcomeStatus.FAILED))
 
 
 class TestResolvePanel(TestBase):
@@ -29,3 +55,73 @@ class TestResolvePanel(TestBase):
         self.assertIn("Failed to resolve", p._label.text())
         self.assertIn("a.txt", p._label.text())
         self.assertIn("no merge tool configured", p._label.text())
+
+
+class TestResolvePanelResolveAll(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.repoDir = self.gitDir.name
+        createUnmergedFiles(self.repoDir, {
+            "a.txt": ("base\n", "same\n", "same\n"),
+            "b.txt": ("base\n", "base\n", "theirs\n"),
+            "c.txt": ("base\n", "ours\n", "theirs\n"),
+            "d.txt": ("base\n", "ours\n", "theirs\n"),
+            "e.txt": ("base\n", "ours\n", "theirs\n"),
+        })
+        self.tracker = {"contexts": [], "active": 0, "maxActive": 0, "ok": True}
+
+    def _resolveAll(self, maxConcurrent: int):
+        panel = ResolvePanel()
+        panel.setContext(repoDir=self.repoDir,
+                         operation=ResolveOperation.MERGE, sha1="")
+        panel.setMaxConcurrentFiles(maxConcurrent)
+        panel.setConflictFiles(["a.txt", "b.txt", "c.txt", "d.txt", "e.txt"])
+
+        outcomes = {}
+        current = []
+        panel.fileOutcome.connect(
+            lambda path, out: outcomes.__setitem__(path, out.status))
+        panel.currentFileChanged.connect(current.append)
+
+        def _handlers(*, parent, path, aiEnabled, chatWidget):
+            return [_FakeHandler(self.tracker, parent)], None, False
+
+        with patch("qgitc.resolver.resolvepanel.buildResolveHandlers",
+                   side_effect=_handlers):
+            panel.startResolveAll()
+            self.assertTrue(panel.isBusy())
+            self.wait(5000, lambda: panel.isBusy())
+
+        return panel, outcomes, current
+
+    def test_trivial_conflicts_resolved_in_batch(self):
+        panel, outcomes, current = self._resolveAll(2)
+
+        self.assertEqual({p: ResolveOutcomeStatus.RESOLVED for p in "abcde"},
+                         {p[0]: s for p, s in outcomes.items()})
+        self.assertEqual(None, current[-1])
+        # only the real conflicts reach the handlers, with their stages
+        contexts = self.tracker["contexts"]
+        self.assertEqual(["c.txt", "d.txt", "e.txt"],
+                         sorted(ctx.path for ctx in contexts))
+        self.assertTrue(all(sorted(ctx.meta["stageIds"]) == [1, 2, 3]
+                            for ctx in contexts))
+        self.assertEqual(2, self.tracker["maxActive"])
+
+    def test_files_resolved_one_by_one_by_default(self):
+        self.assertEqual(1, ResolvePanel.DEFAULT_MAX_CONCURRENT_FILES)
+        panel, outcomes, _ = self._resolveAll(
+            ResolvePanel.DEFAULT_MAX_CONCURRENT_FILES)
+        self.assertEqual(5, len(outcomes))
+        self.assertEqual(1, self.tracker["maxActive"])
+
+    def test_failure_stops_starting_files(self):
+        self.tracker["ok"] = False
+        panel, outcomes, current = self._resolveAll(2)
+
+        # the two files started together both fail, the last is not started
+        self.assertEqual(2, len(self.tracker["contexts"]))
+        self.assertEqual(ResolveOutcomeStatus.RESOLVED, outcomes["a.txt"])
+        self.assertNotIn("e.txt", outcomes)
+        self.assertNotIn(None, current)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import os
+import unittest
+
+from qgitc.gitutils import Git, GitProcess
+from qgitc.resolver.enums import ResolveMethod
+from qgitc.resolver.trivial import (
+    MISSING_STAGE,
+    NON_TRIVIAL,
+    TAKE_OURS,
+    TAKE_THEIRS,
+    classifyConflict,
+    resolveTrivialConflicts,
+)
+from tests.base import TestBase
+
+
+def _hashObject(repoDir: str, content: str) -> str:
+    process = GitProcess(repoDir, ["hash-object", "-w", "--stdin"],
+                         stdinPipe=True)
+    out, _ = process.communicate(content.encode("utf-8"))
+    return out.decode("utf-8").strip()
+
+
+def createUnmergedFiles(repoDir: str, files: dict):
+    """Put @files ({path: (base, ours, theirs)}) in the index as unmerged
+    entries, None for a missing stage."""
+    lines = []
+    for path, contents in files.items():
+        for stage, content in enumerate(contents, 1):
+            if content is not None:
+                blob = _hashObject(repoDir, content)
+                lines.append(f"100644 {blob} {stage}\t{path}\n")
+        with open(os.path.join(repoDir, path), "w", encoding="utf-8") as f:
+            f.write("<<<<<<< ours\n=======\n>>>>>>> theirs\n")
+
+    process = GitProcess(repoDir, ["update-index", "--index-info"],
+                         stdinPipe=True)
+    process.communicate("".join(lines).encode("utf-8"))
+    assert process.returncode == 0
+
+
+class TestClassifyConflict(unittest.TestCase):
+
+    def testClassify(self):
+        self.assertEqual(TAKE_OURS, classifyConflict({1: "a", 2: "b", 3: "b"}))
+        self.assertEqual(TAKE_THEIRS, classifyConflict({1: "a", 2: "a", 3: "c"}))
+        self.assertEqual(TAKE_OURS, classifyConflict({1: "a", 2: "b", 3: "a"}))
+        self.assertEqual(TAKE_OURS, classifyConflict({2: "b", 3: "b"}))
+        self.assertEqual(NON_TRIVIAL, classifyConflict({1: "a", 2: "b", 3: "c"}))
+        self.assertEqual(NON_TRIVIAL, classifyConflict({2: "b", 3: "c"}))
+        self.assertEqual(MISSING_STAGE, classifyConflict({1: "a", 2: "b"}))
+        self.assertEqual(MISSING_STAGE, classifyConflict(None))
+
+
+class TestResolveTrivialConflicts(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.repoDir = self.gitDir.name
+        createUnmergedFiles(self.repoDir, {
+            "same.txt": ("base\n", "same\n", "same\n"),
+            "theirs.txt": ("base\n", "base\n", "theirs\n"),
+            "ours.txt": ("base\n", "ours\n", "base\n"),
+            "real.txt": ("base\n", "ours\n", "theirs\n"),
+            "deleted.txt": ("base\n", "ours\n", None),
+        })
+
+    def _read(self, path):
+        with open(os.path.join(self.repoDir, path), encoding="utf-8") as f:
+            return f.read()
+
+    def testConflictFileStages(self):
+        stages = Git.conflictFileStages(self.repoDir)
+        self.assertEqual(5, len(stages))
+        self.assertEqual([1, 2, 3], sorted(stages["real.txt"]))
+        self.assertEqual([1, 2], sorted(stages["deleted.txt"]))
+        self.assertEqual(stages["same.txt"][2], stages["same.txt"][3])
+        self.assertEqual(stages["real.txt"], Git.getConflictFileBlobIds(
+            "real.txt", self.repoDir))
+
+    def testResolve(self):
+        paths = ["real.txt", "same.txt", "deleted.txt", "theirs.txt", "ours.txt"]
+        result = resolveTrivialConflicts(self.repoDir, paths)
+
+        self.assertEqual({
+            "same.txt": ResolveMethod.OURS,
+            "theirs.txt": ResolveMethod.THEIRS,
+            "ours.txt": ResolveMethod.OURS,
+        }, result.resolved)
+        self.assertEqual(["real.txt", "deleted.txt"], result.remaining)
+        self.assertEqual(5, len(result.stages))
+
+        self.assertEqual("same\n", self._read("same.txt"))
+        self.assertEqual("theirs\n", self._read("theirs.txt"))
+        self.assertEqual("ours\n", self._read("ours.txt"))
+        self.assertEqual(["deleted.txt", "real.txt"],
+                         sorted(Git.conflictFileStages(self.repoDir)))
+
+    def testOnlyGivenPaths(self):
+        result = resolveTrivialConflicts(self.repoDir, ["theirs.txt"])
+        self.assertEqual({"theirs.txt": ResolveMethod.THEIRS}, result.resolved)
+        self.assertEqual([], result.remaining)
+        self.assertIn("same.txt", Git.conflictFileStages(self.repoDir))
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import dataclasses
+
 from qgitc.gitutils import Git
 from qgitc.settings import Settings
 from tests.base import TestBase
@@ -91,3 +93,48 @@ class TestSettings(TestBase):
         self.assertFalse(self.settings.contains("localAuth"))
         self.assertFalse(self.settings.contains("customHeaders"))
         self.settings.endGroup()
+
+    def testSnapshot(self):
+        snapshot = self.settings.snapshot()
+        self.assertFalse(snapshot.fullCommitMessage)
+        self.assertEqual(365, snapshot.maxCompositeCommitsSince)
+        self.assertTrue(snapshot.detectLocalChanges)
+        self.assertIs(snapshot, self.settings.snapshot())
+
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            snapshot.compositeMode = True
+
+        # unrelated settings keep the snapshot
+        self.settings.setDefaultLlmModel("TestModel")
+        self.assertIs(snapshot, self.settings.snapshot())
+
+        self.settings.setFullCommitMessage(True)
+        self.settings.setMaxCompositeCommitsSince(30)
+        self.settings.setDetectLocalChanges(False)
+        self.settings.setCompositeMode(True)
+        snapshot = self.settings.snapshot()
+        self.assertTrue(snapshot.fullCommitMessage)
+        self.assertEqual(30, snapshot.maxCompositeCommitsSince)
+        self.assertFalse(snapshot.detectLocalChanges)
+        self.assertTrue(snapshot.compositeMode)
+
+        self.settings.remove("maxCompositeCommitsSince")
+        self.assertEqual(365, self.settings.snapshot().maxCompositeCommitsSince)
+
+        # keys removed inside a group don't reset the snapshot
+        self.settings.beginGroup("llm")
+        self.settings.setValue("localServer", "http://127.0.0.1:11434")
+        self.settings.remove("localServer")
+        self.settings.remove("compositeMode")
+        self.settings.endGroup()
+        snapshot = self.settings.snapshot()
+        self.assertTrue(snapshot.fullCommitMessage)
+        self.assertTrue(snapshot.compositeMode)
+
+        self.settings.setValue("llm/localServer", "http://127.0.0.1:11434")
+        self.settings.localLlmProviders()
+        self.assertTrue(self.settings.snapshot().compositeMode)
+        self.assertTrue(self.settings.snapshot().fullCommitMessage)
+
+        self.settings.clear()
+        self.assertFalse(self.settings.snapshot().compositeMode)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Cost of reading the settings used on hot paths.
+
+Painting the log and fetching the logs of each submodule read their settings
+by `QSettings.value`, which looks up and converts the stored value each time.
+"""
+import time
+
+from qgitc.settings import Settings
+from tests.base import TestBase
+
+_READ_COUNT = 20000
+
+# The snapshot must be at least this many times faster than the getters
+_MIN_SPEEDUP = 3
+
+
+class TestSettingsPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.settings = Settings(testing=True)
+
+    def tearDown(self):
+        del self.settings
+        super().tearDown()
+
+    def _perCallUs(self, fn):
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(_READ_COUNT):
+                fn()
+            elapsed = (time.perf_counter() - start) * 1000000 / _READ_COUNT
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def testSnapshotRead(self):
+        settings = self.settings
+
+        def _getters():
+            settings.isFullCommitMessage()
+            settings.maxCompositeCommitsSince()
+            settings.detectLocalChanges()
+
+        def _snapshot():
+            snapshot = settings.snapshot()
+            snapshot.fullCommitMessage
+            snapshot.maxCompositeCommitsSince
+            snapshot.detectLocalChanges
+
+        getterUs = self._perCallUs(_getters)
+        snapshotUs = self._perCallUs(_snapshot)
+        self.assertLess(snapshotUs * _MIN_SPEEDUP, getterUs,
+                        f"snapshot {snapshotUs:.2f}us, getters {getterUs:.2f}us")
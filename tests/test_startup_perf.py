@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Import time of the modules loaded before the first window of each
+subcommand is shown.
+
+Every window, the AI chat stack and the OpenTelemetry SDK used to be imported
+by `qgitc.application`, whatever the subcommand.
+"""
+import os
+import subprocess
+import sys
+
+from tests.base import TestBase
+
+# Budget to import the entry point and the window of a subcommand
+_COLD_START_MAX_MS = 1500
+
+# Window modules shown by each subcommand
+_SUBCOMMAND_WINDOWS = {
+    "log": ["qgitc.mainwindow"],
+    "blame": ["qgitc.blamewindow"],
+    "commit": ["qgitc.commitwindow"],
+    # the main window with its merge widget
+    "mergetool": ["qgitc.mainwindow", "qgitc.mergewidget"],
+}
+
+# Modules that must only be loaded on demand
+_DEFERRED_MODULES = (
+    "opentelemetry.sdk",
+    "qgitc.otelimpl",
+    "qgitc.aichatwidget",
+    "qgitc.aichatwindow",
+    "qgitc.agent.agent_loop",
+)
+
+
+def _importTimes(modules):
+    """Return the cumulative import time (ms) of the top level modules
+    imported by `import @modules`, and the set of all loaded modules"""
+    env = dict(os.environ)
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    rootDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = rootDir + os.pathsep + env.get("PYTHONPATH", "")
+    code = "import " + ", ".join(modules)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, cwd=rootDir, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr)
+
+    total = 0
+    loaded = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        loaded.add(name.strip())
+        # top level entries are indented by a single space
+        if not name.startswith("  "):
+            total += int(parts[1])
+    return total / 1000, loaded
+
+
+class TestStartupPerformance(TestBase):
+
+    def doCreateRepo(self):
+        pass
+
+    def testColdStart(self):
+        for subcommand, windows in _SUBCOMMAND_WINDOWS.items():
+            with self.subTest(subcommand=subcommand):
+                elapsed, loaded = _importTimes(["qgitc.main"] + windows)
+                self.assertLess(
+                    elapsed, _COLD_START_MAX_MS,
+                    f"Importing {subcommand} took {elapsed:.0f}ms")
+
+                for module in _DEFERRED_MODULES:
+                    self.assertNotIn(module, loaded)
+
+    def testLazyAgentPackage(self):
+        _, loaded = _importTimes(["qgitc.agent"])
+        self.assertIn("qgitc.agent", loaded)
+        self.assertNotIn("qgitc.agent.agent_loop", loaded)
@@ -3,7 +3,7 @@ import os
 from unittest.mock import MagicMock, patch
 
 from qgitc.gitutils import Git
-from qgitc.statusfetcher import _fetchStatusGit, _fetchStatusGit2
+from qgitc.statusfetcher import StatusFetcher, _fetchStatusGit, _fetchStatusGit2
 from tests.base import TestBase
 
 
@@ -16,14 +16,37 @@ class TestStatusFetcher(TestBase):
         cancelEvent = MagicMock()
         cancelEvent.isSet.return_value = False
 
+        # no change
         submodule, status = _fetchStatusGit(".", cancelEvent)
-        self.assertIsNone(submodule)
-        self.assertIsNone(status)
+        self.assertEqual(".", submodule)
+        self.assertEqual([], status)
 
         submodule, status = _fetchStatusGit("subRepo", cancelEvent)
+        self.assertEqual("subRepo", submodule)
+        self.assertEqual([], status)
+
+        with patch.object(Git, "status", return_value=None):
+            submodule, status = _fetchStatusGit(".", cancelEvent)
         self.assertIsNone(submodule)
         self.assertIsNone(status)
 
+    def testStatusDelta(self):
+        cancelEvent = MagicMock()
+        cancelEvent.isSet.return_value = False
+
+        fetcher = StatusFetcher()
+        deltas = []
+        fetcher.deltaAvailable.connect(
+            lambda repoDir, files: deltas.append((repoDir, files)))
+
+        # e.g. the index is locked, the files of the repo are kept
+        with patch.object(Git, "status", return_value=None):
+            fetcher.fetchStatusDelta(".", cancelEvent)
+        self.assertEqual([], deltas)
+
+        fetcher.fetchStatusDelta(".", cancelEvent)
+        self.assertEqual([(".", [])], deltas)
+
     def testGitStatusModified(self):
         with open(os.path.join(self.gitDir.name, "README.md"), "a+") as f:
             f.write("Test content")
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import os
+from unittest.mock import patch
+
+from PySide6.QtTest import QSignalSpy
+
+from qgitc.common import Commit
+from qgitc.gitutils import Git, Ref
+from qgitc.submodulerefsloader import SubmoduleRefsLoader
+from tests.base import TestBase
+
+
+class TestSubmoduleRefsLoader(TestBase):
+
+    def createSubRepo(self):
+        return True
+
+    def setUp(self):
+        super().setUp()
+        self.subRepoDir = os.path.join(self.gitDir.name, "subRepo")
+        self.loader = SubmoduleRefsLoader()
+
+    def tearDown(self):
+        self.loader.cancel(True)
+        Git.SUBMODULE_REFS = {}
+        super().tearDown()
+
+    def _load(self, submodules=None):
+        spy = QSignalSpy(self.loader.refsChanged)
+        if submodules is None:
+            self.loader.refresh()
+        else:
+            self.loader.load(submodules)
+        self.wait(10000, self.loader.isLoading)
+        return spy.count()
+
+    def testLoad(self):
+        Git.checkOutput(["tag", "v1.0"], repoDir=self.subRepoDir)
+        self.assertEqual(1, self._load([".", "subRepo"]))
+
+        self.assertEqual({".", "subRepo"}, set(Git.SUBMODULE_REFS.keys()))
+        subRefs = Git.SUBMODULE_REFS["subRepo"]
+        head = Git.revHead()
+        self.assertNotEqual(head, subRefs.revHead)
+        self.assertEqual([(Ref.TAG, "v1.0"), (Ref.HEAD, "main")],
+                         [(ref.type, ref.name) for ref in subRefs.refMap[subRefs.revHead]])
+
+    def testRefreshChangedReposOnly(self):
+        self._load([".", "subRepo"])
+
+        with patch.object(Git, "loadRefs", wraps=Git.loadRefs) as loadRefs:
+            self.assertEqual(0, self._load())
+            loadRefs.assert_not_called()
+
+            Git.checkOutput(["branch", "feature"], repoDir=self.subRepoDir)
+            self.assertEqual(1, self._load())
+            self.assertEqual(1, loadRefs.call_count)
+            self.assertEqual(os.path.join(Git.REPO_DIR, "subRepo"),
+                             loadRefs.call_args[0][0])
+
+        subRefs = Git.SUBMODULE_REFS["subRepo"]
+        self.assertIn("feature", subRefs.branches)
+
+    def testRemovedSubmodule(self):
+        self._load([".", "subRepo"])
+        self.assertEqual(1, self._load(["."]))
+        self.assertEqual(["."], list(Git.SUBMODULE_REFS.keys()))
+
+        self.loader.clear()
+        self.assertEqual({}, Git.SUBMODULE_REFS)
+
+    def testRefsStamp(self):
+        stamp = Git.refsStamp(self.subRepoDir)
+        self.assertIsNotNone(stamp)
+        self.assertEqual(stamp, Git.refsStamp(self.subRepoDir))
+        self.assertIsNone(Git.refsStamp(os.path.dirname(self.gitDir.name)))
+
+        Git.checkOutput(["tag", "v1.0"], repoDir=self.subRepoDir)
+        self.assertNotEqual(stamp, Git.refsStamp(self.subRepoDir))
+
+        stamp = Git.refsStamp(self.subRepoDir)
+        Git.checkOutput(["checkout", "-q", "--detach"], repoDir=self.subRepoDir)
+        self.assertNotEqual(stamp, Git.refsStamp(self.subRepoDir))
+
+    def testCommitRefs(self):
+        self._load([".", "subRepo"])
+        mainHead = Git.SUBMODULE_REFS["."].revHead
+        subHead = Git.SUBMODULE_REFS["subRepo"].revHead
+
+        commit = Commit(sha1=mainHead)
+        commit.repoDir = "."
+        subCommit = Commit(sha1=subHead)
+        subCommit.repoDir = "subRepo"
+        commit.subCommits = [subCommit]
+
+        from qgitc.logview import LogView
+        refs, isHead = LogView._LogView__commitRefs(commit)
+        # `main` of both repos is shown once
+        self.assertEqual(["main"], [ref.name for ref in refs])
+        self.assertTrue(isHead)
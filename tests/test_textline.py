@@ -67,6 +67,28 @@ class TestTextLine(unittest.TestCase):
         self.assertEqual(1, len(links))
         self.assertEqual(links[0].type, Link.BugId)
 
+        # the longest one wins at the same position
+        links = TextLine.findLinks("12345678abc", patterns)
+        self.assertEqual(1, len(links))
+        self.assertEqual(links[0].type, Link.Sha1)
+
+        # the email is part of the url
+        patterns = []
+        for type, pattern in TextLine.builtinPatterns().items():
+            patterns.append((type, pattern, None))
+        links = TextLine.findLinks("ftp://user@host.com/a x@y.org", patterns)
+        self.assertEqual([(Link.Url, 0, 21), (Link.Email, 22, 29)],
+                         [(link.type, link.start, link.end) for link in links])
+
+    def testLinkCache(self):
+        patterns = [(Link.BugId, re.compile(r"#([0-9]+)"), "https://bug/")]
+        links = TextLine.findLinks("fix #123", patterns)
+        links[0].setData(None)
+
+        links = TextLine.findLinks("fix #123", patterns)
+        self.assertEqual(1, len(links))
+        self.assertEqual("https://bug/123", links[0].data)
+
     def testTextLength(self):
         textLine = TextLine("hello", None)
         self.assertEqual(textLine.utf16Length(), 5)
@@ -3,6 +3,9 @@
 
 Reproduces the UI-freeze issue caused by email_re catastrophic backtracking
 and QTextLayout overhead on 100k+ char lines (e.g. minified JS in diffs).
+
+Also measures the link detection throughput on huge diffs, where every
+pattern used to be run separately on each line.
 """
 import time
 from unittest.mock import patch
@@ -19,6 +22,34 @@ from tests.base import TestBase
 # Threshold: any single-line operation must complete within this time budget
 _SINGLE_LINE_MAX_MS = 100
 
+_DIFF_LINE_COUNT = 1000000
+
+# Link detection throughput on a diff of distinct lines
+_DIFF_MIN_LINES_PER_SEC = 100000
+
+# Link detection throughput on a diff whose lines repeat
+_REPEATED_DIFF_MIN_LINES_PER_SEC = 300000
+
+
+def _makeDiffLines(count: int, distinct=True):
+    lines = []
+    for i in range(count):
+        n = i if distinct else i % 100
+        r = i % 50
+        if r == 0:
+            lines.append(f"+    // see https://example.com/issues/{n} for details")
+        elif r == 1:
+            lines.append(f"+    revert {n:07x}abcdef0123456789")
+        elif r == 2:
+            lines.append(f"+    Author: dev{n}@example.com")
+        elif r % 7 == 0:
+            lines.append("+    }")
+        elif r % 5 == 0:
+            lines.append("")
+        else:
+            lines.append(f"+    value_{n} = compute(value_{n + 1}, {n}) + offset * {r}")
+    return lines
+
 
 class TestTextLinePerformance(TestBase):
     """Verify that long-line operations complete quickly enough for a responsive UI."""
@@ -86,6 +117,38 @@ class TestTextLinePerformance(TestBase):
         self.assertIn(Link.Email, types)
         self.assertIn(Link.Url, types)
 
+    def _diffThroughput(self, lines):
+        patterns = []
+        for linkType, pattern in TextLine.builtinPatterns().items():
+            patterns.append((linkType, pattern, None))
+
+        def _scan():
+            count = 0
+            for line in lines:
+                count += len(TextLine.findLinks(line, patterns))
+            return count
+
+        elapsed, count = self._time_ms(_scan)
+        return len(lines) * 1000 / elapsed, count
+
+    def test_findLinks_diff_throughput(self):
+        """findLinks keeps up with a 1M-line diff of distinct lines."""
+        lines = _makeDiffLines(_DIFF_LINE_COUNT)
+        linesPerSec, count = self._diffThroughput(lines)
+        self.assertEqual(_DIFF_LINE_COUNT // 50 * 3, count)
+        self.assertGreater(linesPerSec, _DIFF_MIN_LINES_PER_SEC,
+                           f"findLinks scanned {linesPerSec:.0f} lines/s "
+                           f"(minimum {_DIFF_MIN_LINES_PER_SEC})")
+
+    def test_findLinks_repeated_diff_throughput(self):
+        """Repeated lines of a 1M-line diff are served from the cache."""
+        lines = _makeDiffLines(_DIFF_LINE_COUNT, distinct=False)
+        linesPerSec, count = self._diffThroughput(lines)
+        self.assertEqual(_DIFF_LINE_COUNT // 50 * 3, count)
+        self.assertGreater(linesPerSec, _REPEATED_DIFF_MIN_LINES_PER_SEC,
+                           f"findLinks scanned {linesPerSec:.0f} lines/s "
+                           f"(minimum {_REPEATED_DIFF_MIN_LINES_PER_SEC})")
+
     # ------------------------------------------------------------------
     # TextLine construction + ensureLayout on very long text
     # ------------------------------------------------------------------